@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Depends
 
+from app.api.routes.salas import obtener_sala
 from app.services.input_service import procesar_pulsacion
+from app.services.sala_service import Sala
 
 router = APIRouter(
     prefix="/entradas",
@@ -12,6 +14,7 @@ router = APIRouter(
 def recibir_tecla(
     dispositivo: str = Body(..., embed=True),
     tecla: str = Body(..., embed=True),
+    sala: Sala = Depends(obtener_sala),
 ):
     """
     Recibe una pulsación desde un dispositivo físico (teclado).
@@ -22,4 +25,5 @@ def recibir_tecla(
       "tecla": "1"
     }
     """
-    return procesar_pulsacion(dispositivo, tecla)
+    with sala.sesion_service.comando():
+        return procesar_pulsacion(dispositivo, tecla, sala)
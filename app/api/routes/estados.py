@@ -1,7 +1,17 @@
-from fastapi import APIRouter
+import time
+from typing import Any, Optional
 
-from app.services.sesion_service import sesion_service
-from app.utils.logging import get_log_tail
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.routes.salas import obtener_sala
+from app.services.analisis_service import analisis_votos
+from app.services.historial_service import historial_service
+from app.services.publicacion_service import codificar, publicacion_service
+from app.services.sala_service import Sala
+from app.services.vistas_service import VISTAS, vistas_service
+from app.utils import codificacion_binaria
 
 
 router = APIRouter(
@@ -11,23 +21,168 @@ router = APIRouter(
 
 
 
+def _respuesta_estado(data: bytes, binario: bool) -> Response:
+    """Respuesta de estado_global o de una vista, en el formato negociado."""
+    headers = {"X-Hora-Servidor": str(round(time.time() * 1000)), "Vary": "Accept"}
+    if binario:
+        headers["X-Claves-Version"] = codificacion_binaria.CLAVES_VERSION
+        return Response(content=data, media_type=codificacion_binaria.MEDIA_TYPE, headers=headers)
+    return Response(content=data, media_type="application/json", headers=headers)
+
+
 @router.get("/estado_global")
-def estado_sesion():
+def estado_sesion(accept: Optional[str] = Header(default=None), sala: Sala = Depends(obtener_sala)):
+    """
+    Devuelve el estado de la sesión actual de la sala.
+
+    Si está publicado en memoria compartida (settings.estado_mmap, solo
+    sala principal) se devuelven esos bytes tal cual, sin tocar el estado
+    de dominio.
+
+    Con `Accept: application/msgpack` se devuelve en MessagePack con claves
+    numéricas (ver app/utils/codificacion_binaria.py; X-Claves-Version
+    indica el diccionario). Lo publicado es JSON: el binario se arma con el
+    lock de dominio.
+
+    X-Hora-Servidor: hora del servidor (epoch ms) al responder. Con ella las
+    pantallas corrigen la diferencia de reloj para las cuentas regresivas
+    (votacion.vence_ms).
+    """
+    binario = codificacion_binaria.acepta_msgpack(accept)
+
+    if sala.principal and not binario:
+        publicado = publicacion_service.leer()
+        if publicado is not None:
+            return _respuesta_estado(publicado, False)
+
+    with sala.sesion_service.lectura():
+        doc = publicacion_service.estado_global(sala.sesion_service)
+    return _respuesta_estado(codificar(doc, binario), binario)
+
+
+@router.get("/vista/{nombre}")
+def vista(
+    nombre: str,
+    accept: Optional[str] = Header(default=None),
+    sala: Sala = Depends(obtener_sala),
+):
+    """
+    Parte del estado que usa cada cliente (ver app/services/vistas_service.py):
+    pantalla, moderacion o monitor.
+
+    Se arma y serializa una vez por revisión del estado; mientras no
+    cambie se devuelven los mismos bytes. Mismas cabeceras y negociación
+    (JSON o MessagePack) que estado_global.
+    """
+    if nombre not in VISTAS:
+        raise HTTPException(status_code=404, detail="vista_inexistente")
+
+    binario = codificacion_binaria.acepta_msgpack(accept)
+    with sala.sesion_service.lectura():
+        data = vistas_service.obtener(nombre, sala.sesion_service, binario)
+    return _respuesta_estado(data, binario)
+
+
+def _respuesta_versionada(request: Request, version: str, cuerpo: Any) -> Response:
+    """
+    Documento que cambia poco y trae su versión (claves, layout, orden del día):
+
+    - ETag = versión (If-None-Match → 304).
+    - Con ?version=<versión vigente> la respuesta es inmutable (se puede
+      cachear sin revalidar); sin ella o con otra versión, se revalida.
+    """
+    etag = '"' + version + '"'
+    if request.query_params.get("version") == version:
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = "no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(cuerpo), headers=headers)
+
+
+@router.get("/claves")
+def claves(request: Request):
+    """
+    Diccionario de claves de las respuestas MessagePack: la clave número i
+    es claves[i] (ver app/utils/codificacion_binaria.py).
+
+    Caché por versión (?version=, ETag): ver _respuesta_versionada.
+    """
+    version = codificacion_binaria.CLAVES_VERSION
+    return _respuesta_versionada(request, version, {"version": version, "claves": list(codificacion_binaria.CLAVES)})
+
+
+@router.get("/layout")
+def layout(request: Request, sala: Sala = Depends(obtener_sala)):
+    """
+    Geometría del recinto de la sesión actual (ver app/utils/layout_bancas.py).
+
+    estado_global solo trae sesion.layout_version; las pantallas piden este
+    documento cuando cambia. Se calcula una vez por disposición y padrón.
+    Caché por versión (?version=, ETag): ver _respuesta_versionada.
+    """
+    with sala.sesion_service.lectura():
+        sesion = sala.sesion_service.obtener_sesion_actual()
+        if sesion is None:
+            raise HTTPException(status_code=404, detail="no_hay_sesion_abierta")
+        doc = sesion.layout
+    return _respuesta_versionada(request, doc["version"], doc)
+
+
+@router.get("/orden_del_dia")
+def orden_del_dia(request: Request, sala: Sala = Depends(obtener_sala)):
     """
-    Devuelve el estado de la sesión actual.
+    Orden del día cargado en la sala, con todos sus puntos.
+
+    estado_global solo trae orden_del_dia.version (y el próximo punto); las
+    consolas piden este documento cuando cambia. Caché por versión
+    (?version=, ETag): ver _respuesta_versionada.
     """
+    with sala.sesion_service.lectura():
+        orden = sala.sesion_service.orden_del_dia
+        if orden is None:
+            raise HTTPException(status_code=404, detail="no_hay_orden_del_dia")
+        doc = orden.to_dict()
+    return _respuesta_versionada(request, doc["version"], doc)
+
 
-    sesion = sesion_service.obtener_sesion_actual()
+@router.get("/analisis_votos")
+def analisis(sala: Sala = Depends(obtener_sala)):
+    """
+    Análisis de las votaciones de la sesión actual (ver analisis_service.py):
+    participación y votos por concejal, índices de acuerdo por bloque.
+    """
+    with sala.sesion_service.lectura():
+        sesion = sala.sesion_service.obtener_sesion_actual()
+        if sesion is None:
+            raise HTTPException(status_code=404, detail="no_hay_sesion_abierta")
+        return analisis_votos(sesion)
 
-    if sesion is None:
-        return {
-            "hay_sesion": False,
-            "sesion": None,
-            "eventos":get_log_tail(),
-        }
 
-    return {
-        "hay_sesion": True,
-        "sesion": sesion.to_dict(),
-        "eventos":get_log_tail(),
-    }
+@router.get("/historial/concejal/{dni}")
+def historial_concejal(dni: str, limite: int = 500, sala: Sala = Depends(obtener_sala)):
+    """
+    Votos registrados de un concejal en todas las sesiones guardadas.
+    """
+    if not sala.principal:
+        raise HTTPException(status_code=404, detail="historial_solo_sala_principal")
+    try:
+        return historial_service.votos_de_concejal(dni, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/historial/sesion/{numero_sesion}")
+def historial_sesion(numero_sesion: int, sala: Sala = Depends(obtener_sala)):
+    """
+    Sesiones guardadas con ese número, con sus votaciones y votos.
+    """
+    if not sala.principal:
+        raise HTTPException(status_code=404, detail="historial_solo_sala_principal")
+    try:
+        return historial_service.sesiones_por_numero(numero_sesion)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
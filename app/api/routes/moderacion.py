@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, Body
+from typing import Optional
 
-from app.services.sesion_service import sesion_service
+from fastapi import APIRouter, HTTPException, Body, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.routes.salas import obtener_sala
+from app.config import settings
+from app.services.sala_service import Sala
 from app.models.sesion import Sesion
+from app.utils.csv_orden_del_dia import LectorOrdenDelDia
 
-from app.services.votacion_service import votacion_service
 from app.models.votacion import Votacion
 from app.models.voto import Voto, ValorVoto
 
@@ -17,6 +22,7 @@ router = APIRouter(
 @router.post("/abrir_sesion")
 def abrir_sesion(
     numero_sesion: int = Body(..., embed=True),
+    sala: Sala = Depends(obtener_sala),
 ):
     """
     Endpoint para ABRIR una sesión.
@@ -25,56 +31,70 @@ def abrir_sesion(
         { "numero_sesion": 52 }
     """
 
-    try:
-        sesion: Sesion = sesion_service.abrir_sesion(numero_sesion)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    with sala.sesion_service.comando():
+        try:
+            sesion: Sesion = sala.sesion_service.abrir_sesion(numero_sesion)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    return sesion.to_dict()
+        return sesion.to_dict()
 
 
 @router.post("/cerrar_sesion")
-def cerrar_sesion():
+def cerrar_sesion(sala: Sala = Depends(obtener_sala)):
     """
     Endpoint para CERRAR la sesión actual.
     """
-    try:
-        sesion: Sesion = sesion_service.cerrar_sesion()
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    with sala.sesion_service.comando():
+        try:
+            sesion: Sesion = sala.sesion_service.cerrar_sesion()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    return sesion.to_dict()
+        return sesion.to_dict()
 
 
 @router.post("/otorgar_uso_palabra")
-def otorgar_uso_palabra():
+def otorgar_uso_palabra(
+    duracion_s: Optional[float] = Body(None, embed=True),
+    sala: Sala = Depends(obtener_sala),
+):
     """
     Endpoint para otorgar el uso de la palabra.
+
+    Body opcional:
+        { "duracion_s": 120 }   tiempo límite del turno (al vencer se quita sola)
+    Sin "duracion_s" se usa palabra_duracion_s de config.json (null = sin límite).
     """
-    try:
-        sesion: Sesion = sesion_service.otorgar_uso_palabra()
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    if duracion_s is None:
+        duracion_s = settings.palabra_duracion_s
 
-    if sesion_service.sesion_actual.en_uso_de_palabra is not None:
-        return sesion_service.sesion_actual.en_uso_de_palabra.to_dict()
-    else:
-        return {
-        "ven_uso_palabra": None
-    }
+    with sala.sesion_service.comando():
+        try:
+            sesion: Sesion = sala.sesion_service.otorgar_uso_palabra(duracion_s)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if sala.sesion_service.sesion_actual.en_uso_de_palabra is not None:
+            return sala.sesion_service.sesion_actual.en_uso_de_palabra.to_dict()
+        else:
+            return {
+            "ven_uso_palabra": None
+        }
 
 
 @router.post("/quitar_uso_palabra")
-def quitar_uso_palabra():
+def quitar_uso_palabra(sala: Sala = Depends(obtener_sala)):
     """
     Endpoint para quitar el uso de la palabra.
     """
-    try:
-        sesion: Sesion = sesion_service.quitar_uso_palabra()
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    with sala.sesion_service.comando():
+        try:
+            sesion: Sesion = sala.sesion_service.quitar_uso_palabra()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    return [d.to_dict() for d in sesion_service.sesion_actual.pedidos_uso_de_palabra]
+        return [d.to_dict() for d in sala.sesion_service.sesion_actual.pedidos_uso_de_palabra]
 
 
 @router.post("/abrir_votacion")
@@ -84,6 +104,8 @@ def abrir_votacion(
     tema: str = Body(...),
     computa_sobre_los_presentes: bool = Body(...),
     factor_mayoria_especial: float = Body(...), #0 para mayoria simple
+    duracion_s: Optional[float] = Body(None), # tiempo límite opcional
+    sala: Sala = Depends(obtener_sala),
 ):
     """
     Abre una nueva votación en la sesión en curso.
@@ -95,50 +117,120 @@ def abrir_votacion(
       "tema": "Aprobación del presupuesto"
       "computa_sobre_los_presentes": true
       "factor_mayoria_especial": 0.66
+      "duracion_s": 60            (opcional: al vencer se cierra sola)
     }
     """
+    with sala.sesion_service.comando():
+        try:
+            votacion: Votacion = sala.votacion_service.abrir_votacion(numero=numero, tipo=tipo, tema=tema, computa_sobre_los_presentes=computa_sobre_los_presentes, factor_mayoria_especial=factor_mayoria_especial, duracion_s=duracion_s)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return votacion.to_dict()
+
+
+@router.post("/abrir_votacion_orden_del_dia")
+def abrir_votacion_orden_del_dia(
+    id: Optional[int] = Body(None, embed=True),
+    duracion_s: Optional[float] = Body(None, embed=True),
+    sala: Sala = Depends(obtener_sala),
+):
+    """
+    Abre la votación de un punto del orden del día cargado.
+
+    Body esperado:
+        { "id": 12 }     el punto 12 (posición en el orden del día)
+        {}               el siguiente punto sin votar
+    Con "duracion_s" (opcional) la votación tiene tiempo límite.
+    """
+    with sala.sesion_service.comando():
+        try:
+            votacion: Votacion = sala.votacion_service.abrir_votacion_orden_del_dia(id, duracion_s)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return votacion.to_dict()
+
+
+@router.post("/orden_del_dia")
+async def cargar_orden_del_dia(
+    request: Request,
+    nombre: str = "",
+    sala: Sala = Depends(obtener_sala),
+):
+    """
+    Carga el orden del día de la sala (reemplaza al anterior).
+
+    Body: el archivo CSV tal cual (Content-Type: text/csv), con el formato
+    de app/utils/csv_orden_del_dia.py. ?nombre= es el nombre del archivo.
+
+    Se parsea y valida a medida que llegan los bytes; si es inválido se
+    rechaza completo (400 con el motivo) y queda el orden anterior.
+    """
+    lector = LectorOrdenDelDia()
     try:
-        votacion: Votacion = votacion_service.abrir_votacion(numero=numero, tipo=tipo, tema=tema, computa_sobre_los_presentes=computa_sobre_los_presentes, factor_mayoria_especial=factor_mayoria_especial)
+        async for pedazo in request.stream():
+            lector.alimentar(pedazo)
+        orden = lector.terminar(nombre)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return votacion.to_dict()
+    def cargar():
+        with sala.sesion_service.comando():
+            sala.sesion_service.cargar_orden_del_dia(orden)
+            sesion = sala.sesion_service.obtener_sesion_actual()
+            return orden.resumen(sesion.votaciones if sesion is not None else [])
+
+    # El lock de dominio y el fsync del journal bloquean: fuera del event loop
+    return await run_in_threadpool(cargar)
+
+
+@router.post("/limpiar_orden_del_dia")
+def limpiar_orden_del_dia(sala: Sala = Depends(obtener_sala)):
+    """
+    Descarta el orden del día cargado en la sala.
+    """
+    with sala.sesion_service.comando():
+        sala.sesion_service.limpiar_orden_del_dia()
+        return {"orden_del_dia": None}
 
 
 @router.post("/cerrar_votacion")
-def cerrar_votacion_forzado():
+def cerrar_votacion_forzado(sala: Sala = Depends(obtener_sala)):
     """
     Fuerza el cierre de la votación actual.
 
     Si hay concejales presentes que no votaron, quedan registrados
     en el log del sistema.
     """
-    try:
-        votacion = votacion_service.cierre_forzado()
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    with sala.sesion_service.comando():
+        try:
+            votacion = sala.votacion_service.cierre_forzado()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    return {
-        "votacion": votacion.to_dict(),
-        "cerrada_forzada": True,
-    }
+        return {
+            "votacion": votacion.to_dict(),
+            "cerrada_forzada": True,
+        }
 
 @router.post("/voto_desempate")
-def voto_desempate(valor_voto: bool = Body(...),):
+def voto_desempate(valor_voto: bool = Body(...), sala: Sala = Depends(obtener_sala)):
     """
     si hay votacion abierta y empatada, procesa el voto de desempate
     """
-    if valor_voto:
-        voto = Voto(concejal=None, valor_voto=ValorVoto.POSITIVO)
-    else:
-        voto = Voto(concejal=None, valor_voto=ValorVoto.NEGATIVO)
+    with sala.sesion_service.comando():
+        if valor_voto:
+            voto = Voto(concejal=None, valor_voto=ValorVoto.POSITIVO)
+        else:
+            voto = Voto(concejal=None, valor_voto=ValorVoto.NEGATIVO)
 
-    try:
-        votacion=votacion_service.voto_desempate(voto)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        try:
+            votacion=sala.votacion_service.voto_desempate(voto)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    return {
-        "votacion": votacion.to_dict(),
-        "cerrada_desempate": True,
-    }
\ No newline at end of file
+        return {
+            "votacion": votacion.to_dict(),
+            "cerrada_desempate": True,
+        }
\ No newline at end of file
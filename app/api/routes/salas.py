@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from app.services.sala_service import Sala, sala_service
+
+
+router = APIRouter(
+    prefix="/salas",
+    tags=["salas"],
+)
+
+
+def obtener_sala(request: Request) -> Sala:
+    """
+    Dependencia: sala del request.
+
+    Los routers de moderación, estados y entradas se montan dos veces (ver
+    main.py): en la raíz (sala principal) y bajo /salas/{sala_id}.
+    """
+    try:
+        return sala_service.obtener(request.path_params.get("sala_id"))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("")
+def listar_salas():
+    """
+    Salas disponibles. La principal tiene id null (endpoints en la raíz).
+    """
+    return [sala.to_dict() for sala in sala_service.listar()]
@@ -1,40 +1,177 @@
+"""
+Configuración de la aplicación (config.json).
+
+El archivo se valida contra un modelo tipado e inmutable (ConfigApp). La
+instancia `settings` de este módulo da acceso a la versión vigente:
+
+    settings.quorum              atributo de la versión vigente (sin locks)
+    settings.actual              la versión vigente completa (ConfigApp)
+
+Los campos de la versión vigente se copian como atributos comunes de
+`settings` (un solo dict.update, atómico bajo el GIL), así leerlos cuesta
+lo mismo que leer cualquier atributo. Para leer varios valores que deben
+ser coherentes entre sí, tomar una vez `cfg = settings.actual` y leer de
+ahí.
+
+Importar este módulo no lee el archivo: se carga con settings.cargar()
+(desde el lifespan, ver main.py) o, si alguien lo usa antes, en el primer
+acceso a uno de sus atributos.
+
+Recarga en caliente (iniciar_vigilancia(), desde el lifespan): al editar
+config.json se valida el archivo nuevo y, si es válido, se reemplaza la
+versión vigente y se avisa a los suscriptores. Si es inválido se loguea el error y sigue la versión
+anterior. Las claves de CLAVES_CON_REINICIO necesitan reiniciar el
+backend: si cambian, se loguea y se mantiene su valor anterior.
+"""
+
 import json
 import os
-from typing import Any, Dict
+import re
+import threading
+from typing import Annotated, Any, Callable, Dict, List, Optional
 
+from pydantic import BaseModel, ConfigDict, Field, StrictInt, ValidationError, field_validator, model_validator
 
-class Settings:
+
+# Ruta no vacía, o null para desactivar la función
+RutaOpcional = Optional[Annotated[str, Field(min_length=1)]]
+
+
+class FilaBancas(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="allow")
+
+    fila: StrictInt
+    columnas: Annotated[StrictInt, Field(gt=0)]
+
+
+class DisposicionBancas(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="allow")
+
+    filas: Annotated[List[FilaBancas], Field(min_length=1)]
+
+
+class IntervalosPoll(BaseModel):
+    """Intervalo de polling (ms) sugerido a los frontends según la fase."""
+
+    model_config = ConfigDict(frozen=True)
+
+    votacion: Annotated[StrictInt, Field(ge=50)] = 250      # votación en curso o empatada
+    sesion: Annotated[StrictInt, Field(ge=50)] = 1000       # sesión abierta sin votación
+    sin_sesion: Annotated[StrictInt, Field(ge=50)] = 3000   # sin sesión abierta
+
+
+class SalaConfig(BaseModel):
+    """Sala adicional (ver sala_service.py)."""
+
+    model_config = ConfigDict(frozen=True)
+
+    nombre: Optional[str] = None
+    concejales_file: Annotated[str, Field(min_length=1)]
+    quorum: Annotated[StrictInt, Field(ge=0)]
+    disposicion_bancas: DisposicionBancas
+
+
+class ConfigApp(BaseModel):
     """
-    Configuración global obligatoria de la aplicación.
-    - NO tiene valores por defecto.
-    - Si falta config.json → error.
-    - Si faltan claves requeridas → error.
+    Contenido validado de config.json (inmutable).
+
+    Los campos sin valor por defecto son obligatorios.
     """
 
-    REQUIRED_KEYS = [
-        "concejales_file",
-        "log_file",
-        "log_dir",
-        "quorum",
-        "disposicion_bancas"
-    ]
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    concejales_file: Annotated[str, Field(min_length=1)]
+    log_file: str
+    log_dir: Annotated[str, Field(min_length=1)]
+    quorum: Annotated[StrictInt, Field(ge=0)]
+    disposicion_bancas: DisposicionBancas
+
+    # Nivel mínimo (1..3) que se escribe en los archivos de log
+    log_nivel_minimo: Annotated[StrictInt, Field(ge=1, le=3)] = 1
+    # Directorio del journal de comandos (recuperación ante caídas); null lo desactiva
+    journal_dir: RutaOpcional = "data/journal"
+    # Base SQLite con el historial de sesiones, votaciones y votos; null lo desactiva
+    historial_db: RutaOpcional = "data/historial.sqlite3"
+    # Base SQLite con el estado compartido entre workers; null = un solo worker
+    estado_compartido_db: RutaOpcional = None
+    # Archivo mapeado donde se publica estado_global ya serializado; null lo desactiva
+    estado_mmap: RutaOpcional = None
+    # Salas adicionales (comisiones): {id: {nombre, concejales_file, quorum, disposicion_bancas}}
+    salas: Dict[str, SalaConfig] = {}
+    # Intervalos de polling sugeridos en estado_global ("poll_ms")
+    poll_ms: IntervalosPoll = IntervalosPoll()
+    # Tiempo límite (s) por turno de uso de la palabra si el pedido no lo indica; null = sin límite
+    palabra_duracion_s: Optional[Annotated[float, Field(gt=0, le=3600)]] = None
+
+    @field_validator("salas")
+    @classmethod
+    def _ids_de_sala(cls, salas: Dict[str, SalaConfig]) -> Dict[str, SalaConfig]:
+        for sala_id in salas:
+            if not re.fullmatch(r"[a-z0-9_-]+", sala_id):
+                raise ValueError(f"id de sala inválido '{sala_id}' (usar a-z, 0-9, '-' o '_')")
+        return salas
+
+    @model_validator(mode="after")
+    def _salas_un_worker(self) -> "ConfigApp":
+        if self.salas and self.estado_compartido_db:
+            raise ValueError("'salas' requiere un solo worker y no se puede usar con 'estado_compartido_db'")
+        return self
+
+
+# Claves que solo se aplican al arrancar (servicios ya iniciados con ese valor)
+CLAVES_CON_REINICIO = ("log_dir", "journal_dir", "historial_db", "estado_compartido_db", "estado_mmap", "salas")
+
+Suscriptor = Callable[[ConfigApp, ConfigApp], None]
+
+
+def _describir_errores(e: ValidationError) -> str:
+    partes = []
+    for err in e.errors():
+        donde = ".".join(str(x) for x in err["loc"])
+        partes.append(f"'{donde}': {err['msg']}" if donde else err["msg"])
+    return "; ".join(partes)
+
+
+class Settings:
+    """
+    Configuración vigente de la aplicación.
+
+    - Si falta config.json o es inválido al cargarlo → RuntimeError.
+    - Los atributos de ConfigApp se leen directo (settings.quorum).
+    """
 
     def __init__(self, config_path: str = "config.json") -> None:
         self.config_path = config_path
-        self._raw: Dict[str, Any] = {}
+        self.version = 1
+        self._suscriptores: List[Suscriptor] = []
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._carga_lock = threading.Lock()
 
-        self.load()
-        self.validate()
+    def __getattr__(self, nombre: str) -> Any:
+        # Solo se llega acá si el atributo no existe, o sea, antes de cargar
+        if nombre == "actual" or nombre in ConfigApp.model_fields:
+            self.cargar()
+            return self.__dict__[nombre]
+        raise AttributeError(nombre)
 
-        # Asignamos los atributos obligatorios
-        self.concejales_file = self._raw["concejales_file"]
-        self.log_file = self._raw["log_file"]
-        self.log_dir = self._raw["log_dir"]
-        self.quorum = self._raw["quorum"]
-        self.disposicion_bancas = self._raw["disposicion_bancas"]
+    @property
+    def cargada(self) -> bool:
+        return "actual" in self.__dict__
 
-    def load(self) -> None:
-        """Carga estricta del archivo de configuración."""
+    def cargar(self) -> ConfigApp:
+        """Lee y valida config.json si todavía no se cargó (RuntimeError si falla)."""
+        with self._carga_lock:
+            if not self.cargada:
+                self._publicar(self.load())
+        return self.actual
+
+    def _publicar(self, config: ConfigApp) -> None:
+        self.actual = config
+        self.__dict__.update(config.__dict__)
+
+    def load(self) -> ConfigApp:
+        """Lee y valida el archivo de configuración (RuntimeError si falla)."""
 
         if not os.path.exists(self.config_path):
             raise RuntimeError(
@@ -43,20 +180,80 @@ class Settings:
 
         try:
             with open(self.config_path, "r", encoding="utf-8") as f:
-                self._raw = json.load(f)
+                raw: Dict[str, Any] = json.load(f)
         except Exception as e:
             raise RuntimeError(
                 f"ERROR: No se pudo leer '{self.config_path}': {e}"
             )
 
-    def validate(self) -> None:
-        """Verifica que todas las claves requeridas existan."""
+        try:
+            return ConfigApp.model_validate(raw)
+        except ValidationError as e:
+            raise RuntimeError(
+                f"ERROR en configuración: {_describir_errores(e)} en {self.config_path}"
+            )
+
+    # ------------------------------------------------------------------
+    # Recarga en caliente
+    # ------------------------------------------------------------------
+
+    def suscribir(self, callback: Suscriptor) -> None:
+        """Registra un callback(anterior, nueva) que se llama tras cada recarga."""
+        if callback not in self._suscriptores:
+            self._suscriptores.append(callback)
+
+    def recargar(self) -> bool:
+        """
+        Vuelve a leer config.json. Devuelve True si cambió la versión vigente.
+
+        Si el archivo es inválido se mantiene la versión anterior.
+        """
+        from app.utils import logging
+
+        try:
+            nueva = self.load()
+        except RuntimeError as e:
+            logging.log_internal("CONFIG", 3, "Configuración rechazada, sigue la versión %s: %s", self.version, e)
+            return False
+
+        anterior = self.actual
+        sin_aplicar = {k: getattr(anterior, k) for k in CLAVES_CON_REINICIO if getattr(nueva, k) != getattr(anterior, k)}
+        if sin_aplicar:
+            logging.log_internal("CONFIG", 3, "Requieren reiniciar el backend (sin aplicar): %s", ", ".join(sin_aplicar))
+            nueva = nueva.model_copy(update=sin_aplicar)
+        if nueva == anterior:
+            return False
+
+        self._publicar(nueva)
+        self.version += 1
+        logging.log_internal("CONFIG", 3, "Configuración recargada (versión %s)", self.version)
+
+        for callback in self._suscriptores:
+            try:
+                callback(anterior, nueva)
+            except Exception as e:
+                logging.log_internal("CONFIG", 3, "Error aplicando la configuración nueva: %s", e)
+        return True
+
+    def _loop_vigilancia(self) -> None:
+        from app.utils.vigilancia import vigilar_archivos
+
+        vigilar_archivos([self.config_path], self._parar, lambda _ruta: self.recargar())
+
+    def iniciar_vigilancia(self) -> None:
+        """Arranca el hilo que recarga config.json cuando cambia."""
+        if self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._loop_vigilancia, name="config-watcher", daemon=True)
+        self._hilo.start()
 
-        for key in self.REQUIRED_KEYS:
-            if key not in self._raw:
-                raise RuntimeError(
-                    f"ERROR en configuración: falta la clave obligatoria '{key}' en {self.config_path}"
-                )
+    def detener_vigilancia(self) -> None:
+        if self._hilo is None:
+            return
+        self._parar.set()
+        self._hilo.join(timeout=2)
+        self._hilo = None
 
 
 # Instancia única, global
@@ -1,38 +1,163 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-
-from app.api.routes import moderacion, estados, entradas
-
-app = FastAPI(title="API Concejo Deliberante")
-
-app.include_router(moderacion.router)
-app.include_router(estados.router)
-app.include_router(entradas.router)
-
-# Monta el monitor simple en /monitor-simple
-app.mount(
-    "/monitor-simple",
-    StaticFiles(directory="app/web/static/monitor_simple", html=True),
-    name="monitor-simple",
-)
-
-# Monta la pantalla de moderacion en /moderacion
-app.mount(
-    "/moderacion",
-    StaticFiles(directory="app/web/static/moderacion", html=True),
-    name="moderacion",
-)
-
-# Monta la pantalla de recinto en /pantalla
-app.mount(
-    "/pantalla",
-    StaticFiles(directory="app/web/static/pantalla", html=True),
-    name="pantalla",
-)
-
-# Monta SOLO las imágenes de bancas
-app.mount(
-    "/bancas",
-    StaticFiles(directory="app/web/static/bancas"),
-    name="bancas",
-)
\ No newline at end of file
+"""
+Aplicación FastAPI.
+
+create_app() arma la aplicación (routers y estáticos) sin leer config.json
+ni iniciar servicios: eso lo hace el lifespan al arrancar, en este orden:
+
+    1. Carga y valida config.json (RuntimeError → el backend no arranca).
+    2. Inicia historial, journal / estado compartido, salas y publicación.
+    3. Carga y valida los padrones (quedan en caché para abrir_sesion).
+    4. Precalienta: pasa por la propia aplicación, en proceso, un pedido
+       de estado_global, de cada vista (y de layout si hay sesión) por
+       sala, para que el primer poll real no pague el armado de rutas,
+       dependencias, serialización y pool de hilos.
+
+`app` es la instancia que usan uvicorn / gunicorn (app.main:app). Para
+medir el arranque ver app/utils/perfil_arranque.py.
+"""
+
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.api.routes import moderacion, estados, entradas, salas
+from app.config import settings
+from app.services.concejal_service import concejal_service
+from app.services.estado_compartido_service import estado_compartido_service
+from app.services.historial_service import historial_service
+from app.services.journal_service import JournalNoConfirmado, journal_service
+from app.services.publicacion_service import publicacion_service
+from app.services.sala_service import sala_service
+from app.services.sesion_service import sesion_service
+from app.services.vistas_service import VISTAS
+from app.utils import estaticos, log_compactor, logging
+
+
+def _al_recargar_config(anterior, nueva) -> None:
+    """Publica en los servicios una versión nueva de config.json."""
+    if nueva.concejales_file != anterior.concejales_file:
+        concejal_service.detener()
+        concejal_service.iniciar(
+            [nueva.concejales_file] + [s.concejales_file for s in nueva.salas.values()]
+        )
+    with sesion_service.comando():
+        sesion_service.aplicar_configuracion()
+
+
+async def _get_interno(app: FastAPI, path: str) -> int:
+    """GET en proceso (sin red) contra la aplicación. Devuelve el status."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"precalentamiento")],
+        "client": None,
+        "server": None,
+    }
+    respuesta = {"status": 0}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta["status"] = mensaje["status"]
+
+    await app(scope, receive, send)
+    return respuesta["status"]
+
+
+async def _precalentar(app: FastAPI) -> None:
+    """Recorre en proceso los endpoints de lectura de cada sala."""
+    t0 = time.perf_counter()
+    for sala in sala_service.listar():
+        base = "" if sala.principal else f"/salas/{sala.id}"
+        await _get_interno(app, base + "/estados/estado_global")
+        for vista in VISTAS:
+            await _get_interno(app, base + "/estados/vista/" + vista)
+        if sala.sesion_service.sesion_actual is not None:
+            await _get_interno(app, base + "/estados/layout")
+    logging.log_internal("BACKEND", 1, "Precalentamiento en %.1f ms", (time.perf_counter() - t0) * 1000)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Configuración: si es inválida el backend no arranca
+    settings.cargar()
+    # Historial en SQLite (antes del journal: también recibe lo reaplicado)
+    if settings.historial_db:
+        historial_service.iniciar(settings.historial_db)
+    if settings.estado_compartido_db:
+        # Varios workers: el estado vive en la base compartida (que también
+        # lo deja en disco en cada comando, por eso no se usa el journal)
+        estado_compartido_service.iniciar(settings.estado_compartido_db)
+    elif settings.journal_dir:
+        # Reconstruye el estado previo a una caída (snapshot + journal)
+        journal_service.iniciar(settings.journal_dir)
+    # Salas adicionales (comisiones), cada una con su journal
+    sala_service.iniciar()
+    # estado_global publicado en memoria compartida para todos los workers
+    if settings.estado_mmap:
+        publicacion_service.iniciar(settings.estado_mmap)
+    # Padrones en caché, recargados al editar el CSV
+    concejal_service.iniciar(
+        [settings.concejales_file] + [s.concejales_file for s in settings.salas.values()]
+    )
+    # Recarga config.json al editarlo
+    settings.suscribir(_al_recargar_config)
+    settings.iniciar_vigilancia()
+    # Compacta en segundo plano los días de log ya cerrados
+    log_compactor.iniciar_compactador(settings.log_dir)
+    await _precalentar(app)
+    yield
+    log_compactor.detener_compactador()
+    settings.detener_vigilancia()
+    concejal_service.detener()
+    publicacion_service.detener()
+    sala_service.detener()
+    journal_service.detener()
+    historial_service.detener()
+
+
+def create_app() -> FastAPI:
+    """Arma la aplicación (uvicorn --factory app.main:create_app)."""
+    app = FastAPI(title="API Concejo Deliberante", lifespan=lifespan)
+
+    # El comando se aplicó pero no llegó al journal en disco: no se confirma
+    # (ver journal_service.confirmar)
+    @app.exception_handler(JournalNoConfirmado)
+    async def _journal_no_confirmado(_request: Request, e: JournalNoConfirmado):
+        return JSONResponse(status_code=503, content={"detail": "journal_no_confirmado", "motivo": str(e)})
+
+    app.include_router(moderacion.router)
+    app.include_router(estados.router)
+    app.include_router(entradas.router)
+
+    # Mismos endpoints para cada sala adicional: /salas/{sala_id}/moderacion/...
+    app.include_router(salas.router)
+    app.include_router(moderacion.router, prefix="/salas/{sala_id}")
+    app.include_router(estados.router, prefix="/salas/{sala_id}")
+    app.include_router(entradas.router, prefix="/salas/{sala_id}")
+
+    # Frontends estáticos (/monitor-simple, /moderacion, /pantalla, /comun,
+    # /bancas): desde el build con huella y precompresión si existe, si no
+    # desde app/web/static (ver app/utils/estaticos.py)
+    for prefijo, fuente, html in estaticos.SITIOS:
+        app.mount(
+            f"/{prefijo}",
+            estaticos.Estaticos(prefijo, fuente, html=html),
+            name=prefijo,
+        )
+
+    return app
+
+
+app = create_app()
\ No newline at end of file
@@ -1,5 +1,5 @@
 from .sesion import Sesion
 from .concejal import Concejal
+from .bancada import Bancada
 
-__all__ = ["Sesion", "Concejal"]
-
+__all__ = ["Sesion", "Concejal", "Bancada"]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from app.models.voto import CODIGO_VOTO
+
+if TYPE_CHECKING:
+    from app.models.concejal import Concejal
+    from app.models.votacion import Votacion
+
+
+class Bancada:
+    """
+    Estado por banca del padrón de una sesión, en columnas.
+
+    Cada concejal de la sesión tiene un índice denso (su posición en
+    sesion.concejales, 0..n-1) y su estado variable vive acá:
+
+    - presentes: bitset (int), bit i = concejal i presente.
+    - test_hasta: array('d'), vencimiento (time.monotonic()) del indicador
+      de test (tecla 8) de cada banca.
+    - votos: bytearray, código (CODIGO_VOTO) del voto de cada banca en la
+      votación en curso; 0 = no votó.
+    - votaron: bitset de las bancas que votaron en la votación en curso.
+
+    Los objetos Concejal leen y escriben presente / test en estas columnas
+    (ver Concejal.presente), así el resto del código no cambia.
+    """
+
+    __slots__ = ("concejales", "indice_dni", "presentes", "test_hasta",
+                 "votos", "votaron", "_votacion", "_n_votos")
+
+    def __init__(self, concejales: List["Concejal"]) -> None:
+        n = len(concejales)
+        self.concejales = concejales
+        self.indice_dni: Dict[str, int] = {}
+        self.presentes = 0
+        self.test_hasta = array("d", bytes(8 * n))
+        self.votos = bytearray(n)
+        self.votaron = 0
+        # Votación a la que corresponden votos / votaron
+        self._votacion: Optional["Votacion"] = None
+        self._n_votos = 0
+
+        for i, c in enumerate(concejales):
+            self.indice_dni[c.dni] = i
+            if c.presente:
+                self.presentes |= 1 << i
+            self.test_hasta[i] = c._mostrar_test_hasta
+            c._vincular(self, i)
+
+    def __len__(self) -> int:
+        return len(self.concejales)
+
+    # ------------------------------------------------------------------
+    # Presencia
+    # ------------------------------------------------------------------
+
+    def marcar_presente(self, i: int, presente: bool) -> None:
+        if presente:
+            self.presentes |= 1 << i
+        else:
+            self.presentes &= ~(1 << i)
+
+    def es_presente(self, i: int) -> bool:
+        return (self.presentes >> i) & 1 == 1
+
+    def cantidad_presentes(self) -> int:
+        return self.presentes.bit_count()
+
+    # ------------------------------------------------------------------
+    # Votación en curso
+    # ------------------------------------------------------------------
+
+    def seguir(self, votacion: "Votacion") -> None:
+        """
+        Deja votos / votaron con los votos de `votacion`.
+
+        Si ya correspondían a ella no hace nada; si no (votación nueva, o
+        restaurada del journal / snapshot) se rearman desde votacion.votos.
+        """
+        if self._votacion is votacion and self._n_votos == len(votacion.votos):
+            return
+        self.votos = bytearray(len(self.concejales))
+        self.votaron = 0
+        for voto in votacion.votos:
+            i = self.indice_dni.get(voto.concejal.dni) if voto.concejal is not None else None
+            if i is not None:
+                self.votos[i] = CODIGO_VOTO[voto.valor_voto]
+                self.votaron |= 1 << i
+        self._votacion = votacion
+        self._n_votos = len(votacion.votos)
+
+    def ya_voto(self, i: int) -> bool:
+        return (self.votaron >> i) & 1 == 1
+
+    def registrar_voto(self, i: int, codigo: int) -> None:
+        """Marca el voto de la banca i (llamar después de seguir() y de agregarlo a la votación)."""
+        self.votos[i] = codigo
+        self.votaron |= 1 << i
+        self._n_votos += 1
+
+    def votaron_todos_los_presentes(self) -> bool:
+        return self.presentes & ~self.votaron == 0
@@ -1,6 +1,12 @@
-from typing import Optional, Dict, Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Dict, Any
 import time
 
+if TYPE_CHECKING:
+    from app.models.bancada import Bancada
+
+
 class Concejal:
     """
     Clase de dominio para representar un concejal.
@@ -13,8 +19,14 @@ class Concejal:
     - presente: bool
     - banca: int
     - dispositivo_votacion: Optional[str]
+
+    Una vez en una sesión (ver Bancada), presente y el indicador de test se
+    guardan en las columnas de la bancada, en la posición `indice`.
     """
 
+    __slots__ = ("dni", "nombre", "apellido", "bloque", "banca", "dispositivo_votacion",
+                 "indice", "_bancada", "_presente", "_test_hasta")
+
     def __init__(
         self,
         dni: str,
@@ -30,10 +42,46 @@ class Concejal:
         self.nombre = nombre
         self.apellido = apellido
         self.bloque = bloque
-        self.presente = presente
         self.banca = banca
-        self._mostrar_test_hasta = 0.0  # time.monotonic() hasta cuándo mostrar
         self.dispositivo_votacion = dispositivo_votacion
+        # Índice denso en la bancada de la sesión (None = sin sesión)
+        self.indice: Optional[int] = None
+        self._bancada: Optional["Bancada"] = None
+        self._presente = bool(presente)
+        self._test_hasta = 0.0  # time.monotonic() hasta cuándo mostrar
+
+    def _vincular(self, bancada: "Bancada", indice: int) -> None:
+        """Pasa a guardar su estado en la bancada (llamado por Bancada)."""
+        self._bancada = bancada
+        self.indice = indice
+
+    @property
+    def presente(self) -> bool:
+        b = self._bancada
+        if b is None:
+            return self._presente
+        return (b.presentes >> self.indice) & 1 == 1
+
+    @presente.setter
+    def presente(self, presente: bool) -> None:
+        b = self._bancada
+        if b is None:
+            self._presente = bool(presente)
+        else:
+            b.marcar_presente(self.indice, presente)
+
+    @property
+    def _mostrar_test_hasta(self) -> float:
+        b = self._bancada
+        return self._test_hasta if b is None else b.test_hasta[self.indice]
+
+    @_mostrar_test_hasta.setter
+    def _mostrar_test_hasta(self, hasta: float) -> None:
+        b = self._bancada
+        if b is None:
+            self._test_hasta = hasta
+        else:
+            b.test_hasta[self.indice] = hasta
 
     def __repr__(self)->str:
         return self.print_corto()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from app.models.voto import CODIGO_VOTO
+
+if TYPE_CHECKING:
+    from app.models.bancada import Bancada
+    from app.models.votacion import Votacion
+
+
+class MatrizVotos:
+    """
+    Matriz bancas × votaciones de una sesión, en un solo bytearray.
+
+    - Cada celda es el código del voto (CODIGO_VOTO; 0 = no votó).
+    - Se guarda por columnas: la votación c ocupa datos[c*n:(c+1)*n].
+    - Las filas no van en el orden de la bancada sino agrupadas por bloque
+      (y por banca dentro del bloque): así los votos de un bloque en una
+      votación son un tramo contiguo de la columna y se cuentan con
+      bytes.count(). posicion[i] es la fila del concejal i de la bancada.
+    - La fila de un concejal en todas las votaciones es datos[p::n].
+
+    Se actualiza voto a voto (registrar, desde Votacion.registrar_voto).
+    sincronizar() agrega las votaciones nuevas y rearma las columnas que
+    no coinciden con su lista de votos (votaciones restauradas del journal
+    o de un snapshot).
+    """
+
+    __slots__ = ("bancada", "orden", "posicion", "bloques", "datos",
+                 "_columnas", "_n_votos", "version", "cache")
+
+    def __init__(self, bancada: "Bancada") -> None:
+        concejales = bancada.concejales
+        self.bancada = bancada
+        # Filas: índices de la bancada ordenados por (bloque, banca)
+        self.orden: List[int] = sorted(range(len(concejales)),
+                                       key=lambda i: ((concejales[i].bloque or ""), concejales[i].banca))
+        self.posicion: List[int] = [0] * len(concejales)
+        for p, i in enumerate(self.orden):
+            self.posicion[i] = p
+        # (bloque, fila inicial, fila final exclusiva)
+        self.bloques: List[Tuple[str, int, int]] = []
+        for p, i in enumerate(self.orden):
+            bloque = concejales[i].bloque or ""
+            if self.bloques and self.bloques[-1][0] == bloque:
+                self.bloques[-1] = (bloque, self.bloques[-1][1], p + 1)
+            else:
+                self.bloques.append((bloque, p, p + 1))
+
+        self.datos = bytearray()
+        self._columnas: Dict[int, int] = {}   # votacion.id -> columna
+        self._n_votos: List[int] = []         # votos cargados por columna
+        # Cambia con cada modificación; `cache` es (version, resultado) del análisis
+        self.version = 0
+        self.cache: Optional[Tuple[int, dict]] = None
+
+    def __len__(self) -> int:
+        return len(self.orden)
+
+    @property
+    def cantidad_votaciones(self) -> int:
+        return len(self._n_votos)
+
+    def _columna(self, votacion: "Votacion") -> int:
+        c = self._columnas.get(votacion.id)
+        if c is None:
+            c = len(self._n_votos)
+            self._columnas[votacion.id] = c
+            self._n_votos.append(0)
+            self.datos.extend(bytes(len(self.orden)))
+            self.version += 1
+        return c
+
+    def registrar(self, votacion: "Votacion", i: int, codigo: int) -> None:
+        """Anota el voto de la banca i (índice de la bancada) en la columna de la votación."""
+        c = self._columna(votacion)
+        self.datos[c * len(self.orden) + self.posicion[i]] = codigo
+        self._n_votos[c] += 1
+        self.version += 1
+
+    def sincronizar(self, votaciones: Iterable["Votacion"]) -> None:
+        n = len(self.orden)
+        indice_dni = self.bancada.indice_dni
+        for votacion in votaciones:
+            c = self._columna(votacion)
+            if self._n_votos[c] == len(votacion.votos):
+                continue
+            base = c * n
+            self.datos[base:base + n] = bytes(n)
+            for voto in votacion.votos:
+                i = indice_dni.get(voto.concejal.dni) if voto.concejal is not None else None
+                if i is not None:
+                    self.datos[base + self.posicion[i]] = CODIGO_VOTO[voto.valor_voto]
+            self._n_votos[c] = len(votacion.votos)
+            self.version += 1
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.models.votacion import Votacion
+
+
+class ItemOrdenDelDia:
+    """
+    Un punto del orden del día (una fila del CSV ya validada).
+
+    - id: posición en el orden (1 = primera fila).
+    - nro_votacion: número con el que se abre la votación. Puede repetirse
+      (la numeración suele reiniciarse en cada sección del orden del día).
+    - tipo / respecto: valores canónicos (ver app/utils/csv_orden_del_dia.py).
+    - factor_de_mayoria: 0 = mayoría simple.
+    """
+
+    __slots__ = ("id", "nro_votacion", "tipo", "tema", "factor_de_mayoria", "respecto")
+
+    def __init__(self, nro_votacion: int, tipo: str, tema: str, factor_de_mayoria: float, respecto: str) -> None:
+        self.id = 0     # lo asigna OrdenDelDia
+        self.nro_votacion = nro_votacion
+        self.tipo = tipo
+        self.tema = tema
+        self.factor_de_mayoria = factor_de_mayoria
+        self.respecto = respecto
+
+    @property
+    def computa_sobre_los_presentes(self) -> bool:
+        return self.respecto == "Presentes"
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "nro_votacion": self.nro_votacion,
+            "tipo": self.tipo,
+            "tema": self.tema,
+            "factor_de_mayoria": self.factor_de_mayoria,
+            "respecto": self.respecto,
+        }
+
+    @classmethod
+    def desde_dict(cls, d: Dict[str, Any]) -> "ItemOrdenDelDia":
+        return cls(d["nro_votacion"], d["tipo"], d["tema"], d["factor_de_mayoria"], d["respecto"])
+
+
+class OrdenDelDia:
+    """
+    Orden del día cargado en una sala (inmutable).
+
+    - items en el orden del archivo; el id de cada uno es su posición.
+    - por_nro: nro_votacion -> ids de los puntos con ese número.
+    - version: huella del contenido. estado_global solo trae la versión y
+      las consolas piden el documento (/estados/orden_del_dia) cuando cambia.
+    """
+
+    __slots__ = ("nombre", "items", "por_nro", "_por_clave", "version", "_doc")
+
+    def __init__(self, items: Iterable[ItemOrdenDelDia], nombre: str = "") -> None:
+        self.nombre = nombre
+        self.items: List[ItemOrdenDelDia] = list(items)
+        self.por_nro: Dict[int, List[int]] = {}
+        # (numero, tipo, tema) de una votación -> ids de los puntos que la abren
+        self._por_clave: Dict[Tuple[int, str, str], List[int]] = {}
+        for i, item in enumerate(self.items, start=1):
+            item.id = i
+            self.por_nro.setdefault(item.nro_votacion, []).append(i)
+            self._por_clave.setdefault((item.nro_votacion, item.tipo, item.tema), []).append(i)
+
+        filas = [item.to_dict() for item in self.items]
+        canonico = json.dumps([nombre, filas], ensure_ascii=False, separators=(",", ":"))
+        self.version = hashlib.sha1(canonico.encode("utf-8")).hexdigest()[:12]
+        self._doc = {"version": self.version, "nombre": nombre, "items": filas}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def item(self, id: int) -> Optional[ItemOrdenDelDia]:
+        return self.items[id - 1] if 1 <= id <= len(self.items) else None
+
+    def siguiente(self, votaciones: List["Votacion"]) -> Optional[ItemOrdenDelDia]:
+        """
+        Próximo punto a votar según las votaciones de la sesión.
+
+        Recorre las votaciones en orden avanzando sobre el orden del día:
+        cada una que corresponde a un punto posterior al último reconocido
+        (mismo número, tipo y tema) lo marca como votado. Las votaciones
+        fuera del orden del día y las repetidas no mueven la posición.
+        None si ya se votó el último punto.
+        """
+        proximo = 1
+        for votacion in votaciones:
+            ids = self._por_clave.get((votacion.numero, votacion.tipo, votacion.tema))
+            if ids:
+                k = bisect_left(ids, proximo)
+                if k < len(ids):
+                    proximo = ids[k] + 1
+        return self.item(proximo)
+
+    def resumen(self, votaciones: List["Votacion"]) -> dict:
+        """Lo que va en estado_global: versión, cantidad y próximo punto."""
+        siguiente = self.siguiente(votaciones)
+        return {
+            "version": self.version,
+            "nombre": self.nombre,
+            "cantidad": len(self.items),
+            "siguiente": siguiente.id if siguiente is not None else None,
+        }
+
+    def to_dict(self) -> dict:
+        """Documento completo (armado una sola vez: el orden no cambia)."""
+        return self._doc
+
+    @classmethod
+    def desde_dict(cls, d: Dict[str, Any]) -> "OrdenDelDia":
+        return cls((ItemOrdenDelDia.desde_dict(x) for x in d["items"]), d.get("nombre", ""))
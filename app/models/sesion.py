@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
-from collections import deque
+from typing import Any, Dict, List, Optional
 
+from app.models.bancada import Bancada
 from app.models.concejal import Concejal
+from app.models.matriz_votos import MatrizVotos
+from app.models.uso_de_palabra import UsoDePalabra
 from app.models.votacion import Votacion
+from app.utils.layout_bancas import calcular_layout
 
 
 class Sesion:
@@ -16,9 +19,15 @@ class Sesion:
     - abierta: indica si la sesión sigue activa.
     - hora_inicio / hora_fin: timestamps.
     - concejales: lista de concejales asociados.
+    - bancada: estado por banca de esos concejales (presencia, test, votos
+      de la votación en curso) indexado por posición en la lista.
+    - matriz: votos de todas las votaciones (bancas × votaciones), base del
+      análisis de /estados/analisis_votos.
     - votaciones: lista de votaciones realizadas en la sesión.
+    - palabra: cola de pedidos de la palabra, turno en curso y tiempos de
+      uso (ver app/models/uso_de_palabra.py).
     - en_uso_de_palabra: concejal en uso de la palabra si lo hubiese
-    - pedidos_de_uso_de_palabra: cola de concejales que pidieron la palabra
+    - pedidos_uso_de_palabra: concejales que pidieron la palabra, en orden
     """
 
     def __init__(self, numero_sesion: int) -> None:
@@ -28,13 +37,63 @@ class Sesion:
         self.hora_fin: Optional[datetime] = None
         self.presentes: Optional[int]=None
         self.quorum: Optional[int]=None
-        self.disposicion_bancas:Optional[str]=None
-        self.concejales: List[Concejal] = []
+        self._disposicion_bancas: Optional[str] = None
+        self._layout: Optional[Dict[str, Any]] = None
+        self._concejales: List[Concejal] = []
+        self.bancada = Bancada([])
+        self.matriz = MatrizVotos(self.bancada)
+        self._por_dispositivo: Optional[Dict[str, Concejal]] = None
         self.votaciones: List[Votacion] = []
-        self.pedidos_uso_de_palabra = deque()   # deque[Concejal]
-        self.en_uso_de_palabra: Optional[Concejal] = None 
+        self.palabra = UsoDePalabra()
 
 
+    @property
+    def concejales(self) -> List[Concejal]:
+        return self._concejales
+
+    @concejales.setter
+    def concejales(self, concejales: List[Concejal]) -> None:
+        self._concejales = concejales
+        self.bancada = Bancada(concejales)
+        self.matriz = MatrizVotos(self.bancada)
+        self._por_dispositivo = None
+        self._layout = None
+
+    @property
+    def en_uso_de_palabra(self) -> Optional[Concejal]:
+        return self.palabra.en_uso
+
+    @property
+    def pedidos_uso_de_palabra(self) -> List[Concejal]:
+        return list(self.palabra)
+
+    @property
+    def disposicion_bancas(self) -> Optional[str]:
+        return self._disposicion_bancas
+
+    @disposicion_bancas.setter
+    def disposicion_bancas(self, disposicion: Optional[str]) -> None:
+        self._disposicion_bancas = disposicion
+        self._layout = None
+
+    @property
+    def layout(self) -> Dict[str, Any]:
+        """
+        Geometría del recinto (ver app/utils/layout_bancas.py).
+
+        Se calcula en la primera consulta y vale hasta que cambie la
+        disposición o el padrón.
+        """
+        if self._layout is None:
+            self._layout = calcular_layout(self._disposicion_bancas, ((c.banca, c.dni) for c in self._concejales))
+        return self._layout
+
+    def concejal_por_dispositivo(self, dispositivo: str) -> Optional[Concejal]:
+        """Concejal asignado al dispositivo (índice armado en la primera consulta)."""
+        if self._por_dispositivo is None:
+            self._por_dispositivo = {c.dispositivo_votacion: c for c in self._concejales if c.dispositivo_votacion}
+        return self._por_dispositivo.get(dispositivo)
+
     def cerrar(self) -> None:
         """Cierra la sesión y fija la hora de fin."""
         if not self.abierta:
@@ -43,18 +102,26 @@ class Sesion:
         self.hora_fin = datetime.now()
 
 
-    def to_dict(self) -> dict:
+    def to_dict(self, ultimas_votaciones: Optional[int] = None) -> dict:
+        """
+        Vista para el frontend. ultimas_votaciones: solo las n últimas
+        votaciones (None = todas); las vistas por cliente usan 1.
+        """
+        votaciones = self.votaciones
+        if ultimas_votaciones is not None:
+            votaciones = votaciones[max(0, len(votaciones) - ultimas_votaciones):]
         return {
             "numero_sesion": self.numero_sesion,
             "abierta": self.abierta,
             "hora_inicio": self.hora_inicio.isoformat(),
             "hora_fin": self.hora_fin.isoformat() if self.hora_fin else None,
             "cantidad_concejales": len(self.concejales),
-            "cantidad_presentes": sum(1 for c in self.concejales if c.presente),
+            "cantidad_presentes": self.bancada.cantidad_presentes(),
             "quorum":self.quorum,
-            "disposicion_bancas":self.disposicion_bancas,
+            "layout_version":self.layout["version"],
             "concejales": [c.to_dict() for c in self.concejales],
-            "votaciones": [v.to_dict() for v in self.votaciones],
-            "pedidos_uso_de_palabra":[p.to_dict() for p in self.pedidos_uso_de_palabra],
-            "en_uso_de_palabra":self.en_uso_de_palabra
+            "votaciones": [v.to_dict() for v in votaciones],
+            "pedidos_uso_de_palabra":[p.to_dict() for p in self.palabra],
+            "en_uso_de_palabra":self.en_uso_de_palabra.to_dict() if self.en_uso_de_palabra else None,
+            "uso_de_palabra": self.palabra.to_dict(),
         }
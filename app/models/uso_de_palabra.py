@@ -1,40 +1,201 @@
-# from __future__ import annotations
-
-# from datetime import datetime
-# from typing import Optional
-
-# from app.models.concejal import Concejal
-
-
-# class UsoDePalabra:
-#     """
-#     Representa el voto de un concejal en una votación.
-#     """
-
-#     _next_id: int = 1
-
-#     def __init__(
-#         self,
-#         concejal: Concejal,
-#         valor_voto: str,
-#         hora_emision: Optional[datetime] = None,
-#         id: Optional[int] = None,
-#     ) -> None:
-#         # ID interno en memoria, auto-incremental si no se pasa
-#         if id is None:
-#             self.id = UsoDePalabra._next_id
-#             UsoDePalabra._next_id += 1
-#         else:
-#             self.id = id
-
-#         self.concejal = concejal
-#         self.valor_voto = valor_voto
-#         self.hora_emision = hora_emision or datetime.now()
-
-#     def to_dict(self) -> dict:
-#         return {
-#             "id": self.id,
-#             "concejal": self.concejal.to_dict(),
-#             "valor_voto": self.valor_voto,
-#             "hora_emision": self.hora_emision.isoformat(),
-#         }
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.models.concejal import Concejal
+
+
+def _ms(hora: datetime) -> int:
+    return round(hora.timestamp() * 1000)
+
+
+class TiempoPalabra:
+    """Totales de uso de la palabra de un concejal en la sesión."""
+
+    __slots__ = ("pedidos", "turnos", "hablado_s", "espera_s")
+
+    def __init__(self, pedidos: int = 0, turnos: int = 0, hablado_s: float = 0.0, espera_s: float = 0.0) -> None:
+        self.pedidos = pedidos
+        self.turnos = turnos
+        self.hablado_s = hablado_s
+        self.espera_s = espera_s
+
+    def to_dict(self) -> dict:
+        return {
+            "pedidos": self.pedidos,
+            "turnos": self.turnos,
+            "hablado_s": round(self.hablado_s, 1),
+            "espera_s": round(self.espera_s, 1),
+        }
+
+
+class UsoDePalabra:
+    """
+    Cola de pedidos de la palabra de una sesión y tiempos de uso.
+
+    Cola: cada pedido toma un número de orden creciente y los números en
+    cola son los bits encendidos de `_en_cola` (un int, como los bitsets
+    de la bancada). Por concejal:
+      - pertenencia y baja: dict dni -> número (O(1))
+      - posición: bits encendidos antes del suyo (un bit_count)
+      - próximo a hablar: el bit más bajo
+    La numeración vuelve a 0 cada vez que la cola se vacía.
+
+    Tiempos (TiempoPalabra por dni y totales de la sesión) se acumulan al
+    terminar cada tramo: la espera al salir de la cola (otorgado o
+    retirado), lo hablado al terminar el turno. El tramo en curso no se
+    suma: se informa su hora de inicio (en_uso_desde, desde de cada pedido).
+
+    Turno con tiempo límite: duracion_s (ver SesionService, que lo quita al
+    vencer).
+
+    Las horas las pasa quien llama (SesionService): las mismas que quedan
+    en el journal, así reaplicarlo da los mismos tiempos.
+    """
+
+    __slots__ = ("_orden", "_pedidos", "_en_cola", "_proximo",
+                 "en_uso", "en_uso_desde", "duracion_s",
+                 "tiempos", "total_hablado_s", "total_espera_s")
+
+    def __init__(self) -> None:
+        self._orden: Dict[str, int] = {}                          # dni -> número en la cola
+        self._pedidos: Dict[int, Tuple[Concejal, datetime]] = {}  # número -> (concejal, desde)
+        self._en_cola = 0
+        self._proximo = 0
+
+        self.en_uso: Optional[Concejal] = None
+        self.en_uso_desde: Optional[datetime] = None
+        self.duracion_s: Optional[float] = None
+
+        self.tiempos: Dict[str, TiempoPalabra] = {}
+        self.total_hablado_s = 0.0
+        self.total_espera_s = 0.0
+
+    # ------------------------------------------------------------------
+    # Cola
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._orden)
+
+    def __contains__(self, concejal: Concejal) -> bool:
+        return concejal.dni in self._orden
+
+    def pedidos(self) -> Iterator[Tuple[Concejal, datetime]]:
+        """(concejal, hora del pedido) en orden de la cola."""
+        bits = self._en_cola
+        while bits:
+            bajo = bits & -bits
+            yield self._pedidos[bajo.bit_length() - 1]
+            bits ^= bajo
+
+    def __iter__(self) -> Iterator[Concejal]:
+        for concejal, _desde in self.pedidos():
+            yield concejal
+
+    def posicion(self, concejal: Concejal) -> Optional[int]:
+        """Lugar en la cola (1 = el próximo), o None si no pidió la palabra."""
+        n = self._orden.get(concejal.dni)
+        if n is None:
+            return None
+        return (self._en_cola & ((1 << n) - 1)).bit_count() + 1
+
+    def _tiempo(self, concejal: Concejal) -> TiempoPalabra:
+        t = self.tiempos.get(concejal.dni)
+        if t is None:
+            t = self.tiempos[concejal.dni] = TiempoPalabra()
+        return t
+
+    def _sacar(self, n: int, hora: datetime) -> Concejal:
+        concejal, desde = self._pedidos.pop(n)
+        del self._orden[concejal.dni]
+        self._en_cola &= ~(1 << n)
+        if not self._en_cola:
+            self._proximo = 0
+        espera = max(0.0, (hora - desde).total_seconds())
+        self._tiempo(concejal).espera_s += espera
+        self.total_espera_s += espera
+        return concejal
+
+    def encolar(self, concejal: Concejal, hora: datetime) -> None:
+        """Agrega el pedido al final de la cola (si ya estaba, no hace nada)."""
+        if concejal.dni in self._orden:
+            return
+        n = self._proximo
+        self._proximo += 1
+        self._orden[concejal.dni] = n
+        self._pedidos[n] = (concejal, hora)
+        self._en_cola |= 1 << n
+        self._tiempo(concejal).pedidos += 1
+
+    def retirar(self, concejal: Concejal, hora: datetime) -> None:
+        """Saca el pedido de la cola (suma la espera)."""
+        n = self._orden.get(concejal.dni)
+        if n is not None:
+            self._sacar(n, hora)
+
+    # ------------------------------------------------------------------
+    # Turno
+    # ------------------------------------------------------------------
+
+    @property
+    def vence(self) -> Optional[datetime]:
+        """Hora en que vence el turno en curso (None si no tiene límite)."""
+        if self.en_uso is None or self.duracion_s is None:
+            return None
+        return self.en_uso_desde + timedelta(seconds=self.duracion_s)
+
+    def terminar_turno(self, hora: datetime) -> Optional[Concejal]:
+        """Termina el turno en curso (suma lo hablado). Devuelve quién hablaba."""
+        concejal = self.en_uso
+        if concejal is None:
+            return None
+        hablado = max(0.0, (hora - self.en_uso_desde).total_seconds())
+        self._tiempo(concejal).hablado_s += hablado
+        self.total_hablado_s += hablado
+        self.en_uso = None
+        self.en_uso_desde = None
+        self.duracion_s = None
+        return concejal
+
+    def otorgar(self, hora: datetime, duracion_s: Optional[float] = None) -> Optional[Concejal]:
+        """
+        Da la palabra al primero de la cola (termina el turno anterior).
+        None si la cola está vacía (no cambia nada).
+        """
+        if not self._en_cola:
+            return None
+        self.terminar_turno(hora)
+        concejal = self._sacar((self._en_cola & -self._en_cola).bit_length() - 1, hora)
+        self._tiempo(concejal).turnos += 1
+        self.en_uso = concejal
+        self.en_uso_desde = hora
+        self.duracion_s = duracion_s
+        return concejal
+
+    def cerrar(self, hora: datetime) -> None:
+        """Fin de la sesión: termina el turno y saca a todos de la cola."""
+        self.terminar_turno(hora)
+        while self._en_cola:
+            self._sacar((self._en_cola & -self._en_cola).bit_length() - 1, hora)
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        """
+        Lo que va en estado_global (horas en epoch ms). Cambia solo con los
+        comandos: los tramos en curso se muestran desde su hora de inicio.
+        """
+        vence = self.vence
+        return {
+            "en_uso_desde_ms": _ms(self.en_uso_desde) if self.en_uso_desde else None,
+            "duracion_s": self.duracion_s,
+            "vence_ms": _ms(vence) if vence else None,
+            "cola": [{"dni": c.dni, "desde_ms": _ms(desde)} for c, desde in self.pedidos()],
+            "tiempos": {dni: t.to_dict() for dni, t in self.tiempos.items()},
+            "total_hablado_s": round(self.total_hablado_s, 1),
+            "total_espera_s": round(self.total_espera_s, 1),
+        }
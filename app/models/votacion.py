@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-from datetime import datetime
+import math
+import threading
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import List, Optional, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from app.services.sesion_service import SesionService  # solo para type hints
 
-from app.models.voto import Voto, ValorVoto
+from app.models.voto import CODIGO_VOTO, Voto, ValorVoto
 
 class EstadosVotacion(Enum):
     APROBADA = "APROBADA"
@@ -16,12 +18,44 @@ class EstadosVotacion(Enum):
     EN_CURSO = "EN_CURSO"
     INCONCLUSA = "INCONCLUSA"
 
+def votos_minimos(factor: float, base: int) -> Optional[int]:
+    """
+    Menor cantidad k de votos positivos con k / base >= factor (mayoría
+    especial). Misma comparación en float que al cerrar. None si base == 0.
+    """
+    if base <= 0:
+        return None
+    k = max(0, math.ceil(factor * base))
+    while k > 0 and (k - 1) / base >= factor:
+        k -= 1
+    while k / base < factor:
+        k += 1
+    return k
+
+
 class Votacion:
     """
     Representa una votación dentro de una sesión.
+
+    Estado en vivo (en_vivo()): con los votos ya emitidos y los presentes
+    que faltan votar dice cuántos votos faltan para aprobar / rechazar y si
+    el resultado ya no puede cambiar. Es O(1): los votos por tipo se
+    cuentan al registrarlos y el mínimo de la mayoría especial sobre el
+    total se calcula una vez al abrir (preparar()).
+
+    Tiempo límite (opcional): con duracion_s la votación vence en
+    hora_inicio + duracion_s y VotacionService la cierra sola (cierre
+    forzado) si para entonces sigue en curso.
     """
 
+    __slots__ = ("id", "sesion_service", "estado", "numero", "tipo", "tema",
+                 "computa_sobre_los_presentes", "factor_mayoria_especial",
+                 "hora_inicio", "hora_fin", "duracion_s", "votos",
+                 "_conteo", "_n_contados", "_minimo_sobre_total", "proyectado_avisado")
+
     _next_id: int = 1
+    # Varias salas crean objetos en paralelo (cada una con su propio lock)
+    _id_lock = threading.Lock()
 
    
     def __init__(
@@ -33,11 +67,13 @@ class Votacion:
         computa_sobre_los_presentes: bool,
         factor_mayoria_especial: float,
         id: Optional[int] = None,
+        duracion_s: Optional[float] = None,
     ) -> None:
         # ID interno en memoria, auto-incremental
         if id is None:
-            self.id = Votacion._next_id
-            Votacion._next_id += 1
+            with Votacion._id_lock:
+                self.id = Votacion._next_id
+                Votacion._next_id += 1
         else:
             self.id = id
 
@@ -50,8 +86,33 @@ class Votacion:
         self.factor_mayoria_especial = factor_mayoria_especial
         self.hora_inicio: datetime = datetime.now()
         self.hora_fin: Optional[datetime] = None
+        # Tiempo límite en segundos desde hora_inicio (None = sin límite)
+        self.duracion_s = duracion_s
         # self.presentes_al_cierre: Optional[int] = None
         self.votos: List[Voto] = []
+        # Votos por tipo de los primeros _n_contados votos de self.votos
+        self._conteo = {ValorVoto.POSITIVO: 0, ValorVoto.NEGATIVO: 0, ValorVoto.ABSTENCION: 0}
+        self._n_contados = 0
+        self._minimo_sobre_total: Optional[int] = None
+        # Último resultado proyectado que se informó en el log
+        self.proyectado_avisado: Optional[str] = None
+
+    @property
+    def mayoria_especial(self) -> bool:
+        return bool(self.factor_mayoria_especial)
+
+    @property
+    def vence(self) -> Optional[datetime]:
+        """Hora en que vence el tiempo límite (None si no tiene)."""
+        if self.duracion_s is None:
+            return None
+        return self.hora_inicio + timedelta(seconds=self.duracion_s)
+
+    def preparar(self) -> None:
+        """Calcula los umbrales fijos (se llama al abrir; si no, en el primer uso)."""
+        if self.mayoria_especial and not self.computa_sobre_los_presentes:
+            self._minimo_sobre_total = votos_minimos(
+                self.factor_mayoria_especial, self.sesion_service.cantidad_concejales_totales())
 
     def registrar_voto(self, voto: Voto) -> None:
         """
@@ -60,23 +121,32 @@ class Votacion:
         Reglas:
         - La votación debe estar abierta.
         - Solo un voto por concejal.
+
+        Quién votó y quién está presente se consulta en los bitsets de la
+        bancada de la sesión (O(1) por voto).
         """
         if (self.estado != EstadosVotacion.EN_CURSO):
             raise ValueError("votacion_cerrada")
 
-        for v in self.votos:
-            if v.concejal.dni == voto.concejal.dni:
-                raise ValueError("concejal_ya_voto")
-
-        self.votos.append(voto)
-
         sesion = self.sesion_service.obtener_sesion_actual()
         if sesion is None or not sesion.abierta:
             raise ValueError("no_hay_sesion_abierta")
-        presentes = [c for c in sesion.concejales if c.presente]
-        dnis_presentes = {c.dni for c in presentes}
-        dnis_que_votaron = {v.concejal.dni for v in self.votos}
-        if dnis_presentes.issubset(dnis_que_votaron):
+
+        bancada = sesion.bancada
+        bancada.seguir(self)
+        i = bancada.indice_dni[voto.concejal.dni]
+        if bancada.ya_voto(i):
+            raise ValueError("concejal_ya_voto")
+
+        self.contar_votos()
+        self.votos.append(voto)
+        self._conteo[voto.valor_voto] += 1
+        self._n_contados += 1
+        codigo = CODIGO_VOTO[voto.valor_voto]
+        bancada.registrar_voto(i, codigo)
+        sesion.matriz.registrar(self, i, codigo)
+
+        if bancada.votaron_todos_los_presentes():
             # self.presentes_al_cierre=
             self.cerrar()
 
@@ -89,9 +159,10 @@ class Votacion:
         # if sesion is None or not sesion.:
         #     raise ValueError("no_hay_sesion_abierta")
         
-        votos_positivos = self.contar_votos_por_tipo(ValorVoto.POSITIVO)
-        votos_negativos = self.contar_votos_por_tipo(ValorVoto.NEGATIVO)
-        votos_abstencion = self.contar_votos_por_tipo(ValorVoto.ABSTENCION)
+        conteo = self.contar_votos()
+        votos_positivos = conteo[ValorVoto.POSITIVO]
+        votos_negativos = conteo[ValorVoto.NEGATIVO]
+        votos_abstencion = conteo[ValorVoto.ABSTENCION]
         votos_emitidos = votos_positivos + votos_negativos + votos_abstencion
         
         if self.factor_mayoria_especial == 0 or self.factor_mayoria_especial is None:
@@ -104,17 +175,16 @@ class Votacion:
 
 
         if self.factor_mayoria_especial != 0:
+            # Umbral: menor cantidad de positivos que alcanza la mayoría
+            # (sin votos emitidos no hay umbral: queda INCONCLUSA más abajo)
             if self.computa_sobre_los_presentes:
-                if votos_positivos/votos_emitidos >= self.factor_mayoria_especial:
-                    self.estado = EstadosVotacion.APROBADA
-                else:
-                    self.estado = EstadosVotacion.RECHAZADA
+                minimo = votos_minimos(self.factor_mayoria_especial, votos_emitidos)
             else:
-                
-                if votos_positivos/self.sesion_service.cantidad_concejales_totales() >= self.factor_mayoria_especial:
-                    self.estado = EstadosVotacion.APROBADA
-                else:
-                    self.estado = EstadosVotacion.RECHAZADA
+                minimo = self._minimo_total()
+            if minimo is not None and votos_positivos >= minimo:
+                self.estado = EstadosVotacion.APROBADA
+            else:
+                self.estado = EstadosVotacion.RECHAZADA
 
         if (votos_emitidos < self.sesion_service.cantidad_concejales_presentes()) or (votos_emitidos < self.sesion_service.sesion_actual.quorum) or (votos_emitidos==0):
             self.estado = EstadosVotacion.INCONCLUSA
@@ -135,11 +205,10 @@ class Votacion:
         sesion = self.sesion_service.obtener_sesion_actual()
         if sesion is None or not sesion.abierta:
             raise ValueError("no_hay_sesion_abierta")
-        
-        presentes = [c for c in sesion.concejales if c.presente]
-        dnis_presentes = {c.dni for c in presentes}
-        dnis_que_votaron = {v.concejal.dni for v in self.votos}
-        if dnis_presentes.issubset(dnis_que_votaron):
+
+        bancada = sesion.bancada
+        bancada.seguir(self)
+        if bancada.votaron_todos_los_presentes():
             self.cerrar()
         return
 
@@ -150,6 +219,114 @@ class Votacion:
                 n += 1
         return n
 
+    def contar_votos(self) -> Dict[ValorVoto, int]:
+        """
+        Votos de cada tipo.
+
+        Los votos registrados se cuentan al llegar; si la lista se armó de
+        otra forma (snapshot) se recuentan una vez.
+        """
+        if self._n_contados != len(self.votos):
+            conteo = {ValorVoto.POSITIVO: 0, ValorVoto.NEGATIVO: 0, ValorVoto.ABSTENCION: 0}
+            for v in self.votos:
+                conteo[v.valor_voto] += 1
+            self._conteo = conteo
+            self._n_contados = len(self.votos)
+        return dict(self._conteo)
+
+    # ------------------------------------------------------------------
+    # Estado en vivo
+    # ------------------------------------------------------------------
+
+    def _minimo_total(self) -> Optional[int]:
+        if self._minimo_sobre_total is None:
+            self.preparar()
+        return self._minimo_sobre_total
+
+    def en_vivo(self) -> Optional[Dict[str, Any]]:
+        """
+        Situación de la votación en curso si votan todos los presentes que faltan.
+
+        - faltan_para_aprobar: votos positivos más que hacen falta para que
+          se apruebe aunque el resto vote en contra (0 = ya aprobada,
+          None = ya no puede aprobarse).
+        - faltan_para_rechazar: votos no positivos más que hacen falta para
+          que se rechace (mismo criterio).
+        - resultado_proyectado: APROBADA / RECHAZADA / INCONCLUSA con que
+          cerraría si votan todos los presentes que faltan, cuando ya no
+          depende de qué voten; None si todavía depende.
+
+        Es una proyección, no el resultado: si la votación se cierra antes
+        de que voten todos los presentes (cierre forzado, tiempo límite) o
+        cambia la presencia, cerrar() la deja INCONCLUSA.
+
+        None si la votación no está en curso o no hay sesión.
+        """
+        if self.estado is not EstadosVotacion.EN_CURSO:
+            return None
+        sesion = self.sesion_service.sesion_actual
+        if sesion is None:
+            return None
+
+        conteo = self.contar_votos()
+        pos = conteo[ValorVoto.POSITIVO]
+        neg = conteo[ValorVoto.NEGATIVO]
+        emitidos = pos + neg + conteo[ValorVoto.ABSTENCION]
+        bancada = sesion.bancada
+        bancada.seguir(self)
+        presentes = bancada.cantidad_presentes()
+        # Presentes que todavía no votaron; al cerrarse habrá `final` votos
+        faltan = (bancada.presentes & ~bancada.votaron).bit_count()
+        final = emitidos + faltan
+
+        if self.mayoria_especial:
+            if self.computa_sobre_los_presentes:
+                minimo = votos_minimos(self.factor_mayoria_especial, final)
+            else:
+                minimo = self._minimo_total()
+            para_aprobar = None if minimo is None else max(0, minimo - pos)
+            para_rechazar = None if minimo is None else max(0, pos + faltan - minimo + 1)
+        else:
+            # Mayoría simple: positivos > negativos (peor caso: el resto vota lo contrario)
+            minimo = None
+            para_aprobar = max(0, (neg + faltan - pos) // 2 + 1)
+            para_rechazar = max(0, (pos + faltan - neg) // 2 + 1)
+        if para_aprobar is not None and para_aprobar > faltan:
+            para_aprobar = None
+        if para_rechazar is not None and para_rechazar > faltan:
+            para_rechazar = None
+
+        quorum = sesion.quorum or 0
+        if final == 0 or final < quorum:
+            proyectado = EstadosVotacion.INCONCLUSA.value
+        elif para_aprobar == 0:
+            proyectado = EstadosVotacion.APROBADA.value
+        elif para_rechazar == 0:
+            proyectado = EstadosVotacion.RECHAZADA.value
+        else:
+            proyectado = None
+
+        return {
+            "presentes": presentes,
+            "emitidos": emitidos,
+            "faltan_votar": faltan,
+            "positivos_necesarios": minimo,
+            "faltan_para_aprobar": para_aprobar,
+            "faltan_para_rechazar": para_rechazar,
+            "resultado_proyectado": proyectado,
+        }
+
+    def resumen_resultado(self, cantidad_concejales: int) -> str:
+        """Texto de resultado para el log: estado y votos por tipo."""
+        conteo = self.contar_votos()
+        return (
+            "Resultado: " + self.estado.value
+            + " - Votos: " + str(len(self.votos)) + " de " + str(cantidad_concejales)
+            + " - " + str(conteo[ValorVoto.POSITIVO]) + " Positivos, "
+            + str(conteo[ValorVoto.NEGATIVO]) + " Negativos y "
+            + str(conteo[ValorVoto.ABSTENCION]) + " Abstenciones"
+        )
+
     def to_linea_votos(self) -> str:
         linea = "Votos votacion Nº" + str(self.numero) + "/S" + str(self.sesion_service.sesion_actual.numero_sesion) + ": "
 
@@ -169,6 +346,7 @@ class Votacion:
 
 
     def to_dict(self) -> dict:
+        vence = self.vence
         return {
             "id": self.id,
             "numero": self.numero,
@@ -179,5 +357,11 @@ class Votacion:
             "factor_mayoria_especial": self.factor_mayoria_especial,
             "hora_inicio": self.hora_inicio.isoformat(),
             "hora_fin": self.hora_fin.isoformat() if self.hora_fin else None,
+            # Tiempo límite: vence_ms en epoch ms. Lo que falta es vence_ms menos
+            # la hora del servidor (X-Hora-Servidor de /estados/estado_global); no
+            # va en el documento para que no cambie en cada armado
+            "duracion_s": self.duracion_s,
+            "vence_ms": round(vence.timestamp() * 1000) if vence else None,
             "votos": [v.to_dict() for v in self.votos],
+            "en_vivo": self.en_vivo(),
         }
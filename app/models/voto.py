@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from typing import Optional
 from enum import Enum
 
@@ -12,12 +13,27 @@ class ValorVoto(Enum):
     NEGATIVO = "Negativo"
     ABSTENCION = "Abstención"
 
+# Código de un byte por valor (columna de votos de la Bancada); 0 = sin voto
+CODIGO_VOTO = {ValorVoto.POSITIVO: 1, ValorVoto.NEGATIVO: 2, ValorVoto.ABSTENCION: 3}
+VALOR_POR_CODIGO = {codigo: valor for valor, codigo in CODIGO_VOTO.items()}
+
+# Origen de la hora de emisión guardada como entero (microsegundos, hora local)
+_ORIGEN = datetime(2000, 1, 1)
+
+
 class Voto:
     """
     Representa el voto de un concejal en una votación.
+
+    La hora de emisión se guarda como microsegundos desde _ORIGEN (un int
+    en lugar de un datetime por voto); hora_emision la reconstruye exacta.
     """
 
+    __slots__ = ("id", "concejal", "valor_voto", "_hora_us")
+
     _next_id: int = 1
+    # Varias salas crean objetos en paralelo (cada una con su propio lock)
+    _id_lock = threading.Lock()
 
     def __init__(
         self,
@@ -28,8 +44,9 @@ class Voto:
     ) -> None:
         # ID interno en memoria, auto-incremental si no se pasa
         if id is None:
-            self.id = Voto._next_id
-            Voto._next_id += 1
+            with Voto._id_lock:
+                self.id = Voto._next_id
+                Voto._next_id += 1
         else:
             self.id = id
 
@@ -39,6 +56,15 @@ class Voto:
         self.valor_voto = valor_voto
         self.hora_emision = hora_emision or datetime.now()
 
+    @property
+    def hora_emision(self) -> datetime:
+        return _ORIGEN + timedelta(microseconds=self._hora_us)
+
+    @hora_emision.setter
+    def hora_emision(self, hora: datetime) -> None:
+        d = hora - _ORIGEN
+        self._hora_us = (d.days * 86400 + d.seconds) * 1_000_000 + d.microseconds
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
@@ -6,5 +6,5 @@ y acoplamiento innecesario. Los servicios se importan directamente
 desde sus módulos, por ejemplo:
 
     from app.services.sesion_service import sesion_service, SesionService
-    from app.services.concejal_service import cargar_concejales_desde_archivo
+    from app.services.concejal_service import concejal_service
 """
@@ -0,0 +1,117 @@
+"""
+Análisis de las votaciones de la sesión sobre la matriz de votos.
+
+Trabaja sobre sesion.matriz (ver app/models/matriz_votos.py): los conteos
+son bytes.count() sobre filas (datos[p::n]) y tramos de columna (un
+bloque en una votación), sin recorrer objetos Voto. El resultado queda en
+caché en la matriz hasta el próximo voto o votación, así la pantalla de
+moderación puede pedirlo después de cada voto.
+
+Índices por bloque, en cada votación en la que el bloque emitió votos:
+    acuerdo   (Hix-Noury-Roland)  (max(P,N,A) - (P+N+A - max)/2) / (P+N+A)
+              1 = todos votan igual, 0 = dispersión máxima entre tres opciones
+    rice      |P - N| / (P + N)   (solo si hubo positivos o negativos)
+Se informa el promedio sobre esas votaciones.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from app.models.voto import CODIGO_VOTO, ValorVoto
+
+if TYPE_CHECKING:
+    from app.models.sesion import Sesion
+
+
+_POS = CODIGO_VOTO[ValorVoto.POSITIVO]
+_NEG = CODIGO_VOTO[ValorVoto.NEGATIVO]
+_ABS = CODIGO_VOTO[ValorVoto.ABSTENCION]
+
+
+def _promedio(valores: List[float]) -> Optional[float]:
+    return round(sum(valores) / len(valores), 4) if valores else None
+
+
+def _analizar(sesion: "Sesion") -> Dict[str, Any]:
+    matriz = sesion.matriz
+    concejales = sesion.bancada.concejales
+    n = len(matriz)
+    cantidad = matriz.cantidad_votaciones
+    datos = bytes(matriz.datos)
+
+    # Por concejal: su fila en todas las votaciones
+    por_concejal = []
+    emitidos_total = 0
+    for i, c in enumerate(concejales):
+        fila = datos[matriz.posicion[i]::n]
+        pos, neg, abst = fila.count(_POS), fila.count(_NEG), fila.count(_ABS)
+        emitidos = pos + neg + abst
+        emitidos_total += emitidos
+        por_concejal.append({
+            "dni": c.dni,
+            "apellido": c.apellido,
+            "nombre": c.nombre,
+            "bloque": c.bloque,
+            "banca": c.banca,
+            "votos_emitidos": emitidos,
+            "participacion": round(emitidos / cantidad, 4) if cantidad else None,
+            "positivos": pos,
+            "negativos": neg,
+            "abstenciones": abst,
+        })
+    por_concejal.sort(key=lambda d: d["banca"])
+
+    # Por bloque: su tramo en cada columna
+    por_bloque = []
+    for bloque, ini, fin in matriz.bloques:
+        acuerdos: List[float] = []
+        rices: List[float] = []
+        unanimes = 0
+        emitidos = 0
+        for base in range(0, cantidad * n, n):
+            tramo = datos[base + ini:base + fin]
+            pos, neg, abst = tramo.count(_POS), tramo.count(_NEG), tramo.count(_ABS)
+            total = pos + neg + abst
+            if not total:
+                continue
+            emitidos += total
+            mayor = max(pos, neg, abst)
+            acuerdos.append((mayor - (total - mayor) / 2) / total)
+            if pos + neg:
+                rices.append(abs(pos - neg) / (pos + neg))
+            if mayor == total:
+                unanimes += 1
+        integrantes = fin - ini
+        por_bloque.append({
+            "bloque": bloque,
+            "integrantes": integrantes,
+            "votaciones_con_votos": len(acuerdos),
+            "participacion": round(emitidos / (cantidad * integrantes), 4) if cantidad else None,
+            "indice_acuerdo": _promedio(acuerdos),
+            "indice_rice": _promedio(rices),
+            "votaciones_unanimes": unanimes,
+        })
+
+    return {
+        "votaciones": cantidad,
+        "concejales": por_concejal,
+        "bloques": por_bloque,
+        "participacion": round(emitidos_total / (cantidad * n), 4) if cantidad and n else None,
+        "nunca_se_abstuvieron": [d["dni"] for d in por_concejal if d["votos_emitidos"] and not d["abstenciones"]],
+        "sin_votos": [d["dni"] for d in por_concejal if not d["votos_emitidos"]],
+    }
+
+
+def analisis_votos(sesion: "Sesion") -> Dict[str, Any]:
+    """
+    Análisis de todas las votaciones de la sesión (participación, votos por
+    concejal e índices por bloque).
+
+    Debe llamarse con el lock de dominio tomado (sesion_service.lectura()).
+    """
+    matriz = sesion.matriz
+    matriz.sincronizar(sesion.votaciones)
+    if matriz.cache is None or matriz.cache[0] != matriz.version:
+        matriz.cache = (matriz.version, _analizar(sesion))
+    return matriz.cache[1]
@@ -1,43 +1,247 @@
+"""
+Padrón de concejales (archivo CSV) con caché y recarga automática.
+
+    dni,nombre,apellido,bloque,presente,banca,dispositivo_votacion
+
+El archivo se parsea y valida UNA vez por versión (mtime + tamaño, y hash
+del contenido para no reparsear si solo cambió el mtime). Cada apertura
+de sesión solo hace un stat y arma los objetos Concejal desde las filas
+ya parseadas.
+
+Validación (si falla, el padrón es inválido y no se puede abrir sesión):
+    - dni, banca (distinta de 0) y dispositivo_votacion no se repiten.
+    - banca es un entero (vacía = 0, sin banca asignada).
+
+Con iniciar() un hilo (watchfiles) vigila los archivos de padrón y los
+recarga apenas cambian: la sesión que se abra después de editar el CSV
+ya encuentra el padrón nuevo parseado.
+"""
+
+from __future__ import annotations
+
 import csv
-from typing import List
+import hashlib
+import io
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from app.models.concejal import Concejal
+from app.utils import logging
+
+
+# Fila parseada: (dni, nombre, apellido, bloque, presente, banca, dispositivo_votacion)
+Fila = Tuple[str, str, str, str, bool, int, str]
+
+
+class Padron:
+    """Padrón parseado y validado (inmutable)."""
+
+    def __init__(self, filas: List[Fila]) -> None:
+        self.filas = tuple(filas)
+        # Índices: valor -> posición en filas
+        self.indice_dni: Dict[str, int] = {}
+        self.indice_banca: Dict[int, int] = {}
+        self.indice_dispositivo: Dict[str, int] = {}
+
+        errores = []
+        for i, (dni, _n, _a, _b, _p, banca, dispositivo) in enumerate(self.filas):
+            if dni in self.indice_dni:
+                errores.append(f"dni {dni} repetido")
+            self.indice_dni[dni] = i
+            if banca:
+                if banca in self.indice_banca:
+                    errores.append(f"banca {banca} repetida")
+                self.indice_banca[banca] = i
+            if dispositivo:
+                if dispositivo in self.indice_dispositivo:
+                    errores.append(f"dispositivo {dispositivo} repetido")
+                self.indice_dispositivo[dispositivo] = i
+        if errores:
+            raise ValueError("; ".join(errores))
+
+    def __len__(self) -> int:
+        return len(self.filas)
+
+    def concejales(self) -> List[Concejal]:
+        """Objetos nuevos (cada sesión modifica los suyos: presente, test)."""
+        return [
+            Concejal(dni=dni, nombre=nombre, apellido=apellido, bloque=bloque,
+                     presente=presente, banca=banca, dispositivo_votacion=dispositivo)
+            for dni, nombre, apellido, bloque, presente, banca, dispositivo in self.filas
+        ]
+
+
+def parsear_padron(texto: str) -> Padron:
+    """Parsea y valida el CSV. ValueError si es inválido."""
+    filas: List[Fila] = []
+    errores = []
+
+    reader = csv.DictReader(io.StringIO(texto))
+    for n, fila in enumerate(reader, start=2):
+        if not fila.get("dni"):
+            continue
+
+        presente_str = (fila.get("presente") or "").strip().lower()
+        presente = presente_str in ("true", "1", "si", "sí", "yes")
+
+        banca_str = (fila.get("banca") or "0").strip() or "0"
+        try:
+            banca = int(banca_str)
+        except ValueError:
+            errores.append(f"línea {n}: banca inválida '{banca_str}'")
+            continue
+
+        filas.append((
+            fila.get("dni", "").strip(),
+            fila.get("nombre", "").strip(),
+            fila.get("apellido", "").strip(),
+            fila.get("bloque", "").strip(),
+            presente,
+            banca,
+            (fila.get("dispositivo_votacion") or "").strip(),
+        ))
+
+    if errores:
+        raise ValueError("; ".join(errores))
+    return Padron(filas)
 
 
 def cargar_concejales_desde_archivo(ruta: str) -> List[Concejal]:
     """
-    Carga concejales desde un archivo CSV.
+    Carga concejales desde un archivo CSV (sin caché).
 
     Formato esperado:
     dni,nombre,apellido,bloque,presente,banca,dispositivo_votacion
     """
+    with open(ruta, "r", encoding="utf-8") as f:
+        return parsear_padron(f.read()).concejales()
 
-    concejales: List[Concejal] = []
 
-    with open(ruta, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for fila in reader:
-            if not fila.get("dni"):
-                continue
-
-            presente_str = (fila.get("presente") or "").strip().lower()
-            presente = presente_str in ("true", "1", "si", "sí", "yes")
-
-            banca_str = (fila.get("banca") or "0").strip()
-            try:
-                banca = int(banca_str)
-            except ValueError:
-                banca = 0
-
-            concejal = Concejal(
-                dni=fila.get("dni", "").strip(),
-                nombre=fila.get("nombre", "").strip(),
-                apellido=fila.get("apellido", "").strip(),
-                bloque=fila.get("bloque", "").strip(),
-                presente=presente,
-                banca=banca,
-                dispositivo_votacion=(fila.get("dispositivo_votacion") or "").strip(),
-            )
-            concejales.append(concejal)
-
-    return concejales
+class _Entrada:
+    __slots__ = ("mtime_ns", "tamanio", "hash", "padron", "error")
+
+    def __init__(self, mtime_ns: int, tamanio: int, hash: str,
+                 padron: Optional[Padron], error: Optional[str]) -> None:
+        self.mtime_ns = mtime_ns
+        self.tamanio = tamanio
+        self.hash = hash
+        self.padron = padron
+        self.error = error
+
+
+class ConcejalService:
+    """
+    Caché de padrones por ruta de archivo.
+
+    - padron() / concejales() se usan al abrir sesión.
+    - iniciar(rutas) precarga y vigila los archivos (hilo de fondo).
+    """
+
+    def __init__(self) -> None:
+        self._cache: Dict[str, _Entrada] = {}
+        self._lock = threading.Lock()
+        self._rutas: set = set()
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Caché
+    # ------------------------------------------------------------------
+
+    def _cargar(self, ruta: str) -> _Entrada:
+        """Lee el archivo y, si el contenido cambió, lo vuelve a parsear."""
+        with open(ruta, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            anterior = self._cache.get(ruta)
+            if anterior is not None and anterior.hash == digest:
+                # Mismo contenido (p. ej. solo cambió el mtime): no se reparsea
+                entrada = _Entrada(st.st_mtime_ns, st.st_size, digest, anterior.padron, anterior.error)
+                self._cache[ruta] = entrada
+                return entrada
+
+        try:
+            entrada = _Entrada(st.st_mtime_ns, st.st_size, digest, parsear_padron(data.decode("utf-8")), None)
+        except ValueError as e:
+            entrada = _Entrada(st.st_mtime_ns, st.st_size, digest, None, str(e))
+
+        with self._lock:
+            self._cache[ruta] = entrada
+        return entrada
+
+    def padron(self, ruta: str) -> Padron:
+        """
+        Padrón vigente del archivo.
+
+        FileNotFoundError si no existe; ValueError si es inválido.
+        """
+        ruta = os.path.abspath(ruta)
+        st = os.stat(ruta)
+        with self._lock:
+            entrada = self._cache.get(ruta)
+        if entrada is None or entrada.mtime_ns != st.st_mtime_ns or entrada.tamanio != st.st_size:
+            entrada = self._cargar(ruta)
+        if entrada.error is not None:
+            raise ValueError(entrada.error)
+        return entrada.padron
+
+    def concejales(self, ruta: str) -> List[Concejal]:
+        """Concejales nuevos desde el padrón en caché (ver padron())."""
+        return self.padron(ruta).concejales()
+
+    # ------------------------------------------------------------------
+    # Vigilancia de archivos
+    # ------------------------------------------------------------------
+
+    def _recargar(self, ruta: str) -> None:
+        with self._lock:
+            anterior = self._cache.get(ruta)
+        try:
+            entrada = self._cargar(ruta)
+        except FileNotFoundError:
+            with self._lock:
+                self._cache.pop(ruta, None)
+            logging.log_internal("PADRON", 3, "Archivo de padrón eliminado: %s", ruta)
+            return
+        if anterior is not None and anterior.hash == entrada.hash:
+            return
+        if entrada.error is not None:
+            logging.log_internal("PADRON", 3, "Padrón inválido en %s: %s", ruta, entrada.error)
+        else:
+            logging.log_internal("PADRON", 2, "Padrón cargado: %s (%s concejales)", ruta, len(entrada.padron))
+
+    def _loop_vigilancia(self) -> None:
+        from app.utils.vigilancia import vigilar_archivos
+
+        vigilar_archivos(self._rutas, self._parar, self._recargar)
+
+    def iniciar(self, rutas: Iterable[str]) -> None:
+        """Precarga los padrones y arranca el hilo que los recarga al cambiar."""
+        if self._hilo is not None:
+            return
+
+        self._rutas = {os.path.abspath(r) for r in rutas}
+        for ruta in self._rutas:
+            if os.path.exists(ruta):
+                self._recargar(ruta)
+
+        if not self._rutas:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._loop_vigilancia, name="padron-watcher", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        if self._hilo is None:
+            return
+        self._parar.set()
+        self._hilo.join(timeout=2)
+        self._hilo = None
+
+
+# Instancia única
+concejal_service = ConcejalService()
@@ -0,0 +1,348 @@
+"""
+Estado de dominio compartido entre varios procesos (workers de gunicorn).
+
+Sin este servicio el estado vive en singletons por proceso y el backend
+tiene que correr con un solo worker (-w 1). Con settings.estado_compartido_db
+configurado, el estado se guarda en una base SQLite (modo WAL) que leen y
+escriben todos los workers:
+
+    estado(id = 1, revision, payload)     snapshot completo (snapshot_service)
+                                          a esa revisión
+    comandos(revision, orden, tipo, datos)
+                                          comandos posteriores al snapshot:
+                                          los eventos del journal de cada uno
+    eventos(seq, line)                    cola de eventos de log para el frontend
+    tests(dni, hasta)                     indicador de test (tecla 8) vigente,
+                                          fuera de las revisiones
+
+La revisión vigente es la del último comando (o la del snapshot si no hay
+comandos después).
+
+Escritura (comandos, ver SesionService.comando):
+    1. BEGIN IMMEDIATE: toma el lock de escritura de la base (entre procesos).
+    2. Si la revisión vigente no es la que tiene este proceso, se pone al
+       día antes de aplicar el comando.
+    3. Aplica el comando en memoria.
+    4. Si el comando cambió algo (registró eventos en el journal), guarda
+       esos eventos con revision + 1: unas decenas de bytes por voto, sin
+       volver a serializar el estado. Cada SNAPSHOT_CADA_COMANDOS comandos
+       (y al abrir o cerrar sesión) guarda en su lugar el snapshot
+       completo y borra los comandos anteriores. COMMIT.
+    Si el comando falla no se guarda nada (las líneas de log sí) y el
+    estado en memoria, que pudo quedar a medio cambiar, se recarga en el
+    próximo acceso.
+
+Puesta al día (lecturas y escrituras): consulta la revisión vigente (sin
+bloquear a nadie gracias a WAL). Si cambió y este proceso tiene una
+revisión posterior al snapshot, reaplica solo los comandos que le faltan
+(journal_service.aplicar_evento, como al recuperar una caída: mismas horas
+e ids); si no, carga el snapshot y los comandos posteriores.
+
+El indicador de test (tecla 8) es efímero y se pulsa seguido: no es un
+comando (no sube la revisión ni guarda eventos). publicar_test() deja la
+hora de vencimiento en la tabla tests, dentro de la misma transacción, y
+cada puesta al día activa en memoria los que no tenía.
+
+Cada COMMIT deja el estado en disco, así que en este modo la base cumple
+también la función del journal (recuperación ante caídas) y el journal
+no se usa.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services import snapshot_service
+from app.services.journal_service import aplicar_evento, journal_service
+from app.utils import logging
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+# Espera máxima por el lock de escritura de la base (otro worker escribiendo)
+BUSY_TIMEOUT_MS = 5000
+
+# Eventos de log que se conservan en la tabla (el frontend lee los últimos 20)
+EVENTOS_CONSERVADOS = 200
+
+# Cada cuántos comandos se guarda el snapshot completo (y se borran los comandos)
+SNAPSHOT_CADA_COMANDOS = 200
+
+# Después de estos comandos siempre se guarda snapshot
+_TIPOS_CON_SNAPSHOT = ("abrir_sesion", "cerrar_sesion")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS estado (
+    id        INTEGER PRIMARY KEY CHECK (id = 1),
+    revision  INTEGER NOT NULL,
+    payload   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS comandos (
+    revision  INTEGER NOT NULL,
+    orden     INTEGER NOT NULL,
+    tipo      TEXT NOT NULL,
+    datos     TEXT NOT NULL,
+    PRIMARY KEY (revision, orden)
+);
+CREATE TABLE IF NOT EXISTS eventos (
+    seq   INTEGER PRIMARY KEY AUTOINCREMENT,
+    line  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    dni    TEXT PRIMARY KEY,
+    hasta  REAL NOT NULL
+);
+"""
+
+
+class EstadoCompartidoService:
+    """
+    Estado de dominio en SQLite compartido entre procesos.
+
+    - Inactivo hasta iniciar(): escritura() y refrescar() no hacen nada.
+    - Una conexión sqlite3 por hilo (sqlite3 no comparte conexiones entre hilos).
+    """
+
+    def __init__(self) -> None:
+        self.ruta: Optional[str] = None
+        self.revision = 0           # revisión cargada en este proceso
+        self._revision_snapshot: Optional[int] = None   # None: la base no tiene snapshot
+        self._local = threading.local()
+        # Eventos (tipo, datos en JSON) que registró el comando en curso
+        self._comando: List[Tuple[str, str]] = []
+        # Indicadores de test ya activados en memoria: dni -> hasta (time.time())
+        self._tests: Dict[str, float] = {}
+        self._insertados = 0
+
+    @property
+    def activo(self) -> bool:
+        return self.ruta is not None
+
+    # ------------------------------------------------------------------
+    # Conexión
+    # ------------------------------------------------------------------
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: las transacciones se abren a mano (BEGIN IMMEDIATE)
+            conn = sqlite3.connect(self.ruta, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    def _cargar(self, conn: sqlite3.Connection) -> None:
+        """
+        Si la revisión vigente en la base cambió, pone al día el estado en
+        memoria. Dentro de una transacción (lecturas consistentes).
+        """
+        from app.services.sesion_service import sesion_service
+        from app.services.votacion_service import votacion_service
+
+        snapshot, ultimo = conn.execute(
+            "SELECT (SELECT revision FROM estado WHERE id = 1), (SELECT MAX(revision) FROM comandos)"
+        ).fetchone()
+        self._revision_snapshot = snapshot
+        if snapshot is None:
+            # Base recién creada: nadie escribió todavía
+            if self.revision != 0:
+                sesion_service.sesion_actual = None
+                sesion_service.orden_del_dia = None
+                votacion_service.votacion_actual = None
+                self.revision = 0
+                sesion_service.revision += 1
+            return
+        vigente = max(snapshot, ultimo or snapshot)
+        if vigente == self.revision:
+            return
+
+        if not (snapshot <= self.revision < vigente and self._reaplicar(conn, self.revision)):
+            revision, payload = conn.execute("SELECT revision, payload FROM estado WHERE id = 1").fetchone()
+            snapshot_service.restaurar_estado(json.loads(payload), sesion_service, votacion_service)
+            if not self._reaplicar(conn, revision):
+                raise RuntimeError("estado_compartido: no se pudieron reaplicar los comandos guardados")
+        self.revision = vigente
+        sesion_service.revision += 1
+        # Cada worker arma los tiempos límite (votación, turno de la palabra) que trae
+        sesion_service.programar_vencimientos()
+
+    def _reaplicar(self, conn: sqlite3.Connection, desde: int) -> bool:
+        """Reaplica los comandos posteriores a la revisión `desde`. False si alguno falla."""
+        from app.services.sesion_service import sesion_service
+        from app.services.votacion_service import votacion_service
+
+        filas = conn.execute(
+            "SELECT tipo, datos FROM comandos WHERE revision > ? ORDER BY revision, orden", (desde,)
+        ).fetchall()
+        try:
+            # Ya los notificó y logueó el worker que los aplicó
+            with journal_service.sin_suscriptores(), logging.suspendido():
+                for tipo, datos in filas:
+                    aplicar_evento(tipo, json.loads(datos), sesion_service, votacion_service, efimeros=True)
+        except (ValueError, KeyError, AttributeError) as e:
+            logging.log_internal("BACKEND", 2, "Estado compartido: no se pudo reaplicar %s (%r)", tipo, e)
+            return False
+        return True
+
+    def _guardar(self, conn: sqlite3.Connection) -> None:
+        from app.services.sesion_service import sesion_service
+        from app.services.votacion_service import votacion_service
+
+        revision = self.revision + 1
+        snapshot = (
+            self._revision_snapshot is None
+            or revision - self._revision_snapshot >= SNAPSHOT_CADA_COMANDOS
+            or any(tipo in _TIPOS_CON_SNAPSHOT for tipo, _datos in self._comando)
+        )
+        if snapshot:
+            estado = snapshot_service.capturar_estado(sesion_service, votacion_service)
+            payload = json.dumps(estado, ensure_ascii=False, separators=(",", ":"))
+            conn.execute(
+                "INSERT INTO estado (id, revision, payload) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET revision = excluded.revision, payload = excluded.payload",
+                (revision, payload),
+            )
+            conn.execute("DELETE FROM comandos WHERE revision <= ?", (revision,))
+            self._revision_snapshot = revision
+        else:
+            conn.executemany(
+                "INSERT INTO comandos (revision, orden, tipo, datos) VALUES (?, ?, ?, ?)",
+                [(revision, i, tipo, datos) for i, (tipo, datos) in enumerate(self._comando)],
+            )
+        self.revision = revision
+
+    def _al_registrar(self, tipo: str, datos: Dict[str, Any]) -> None:
+        self._comando.append((tipo, json.dumps(datos, ensure_ascii=False, separators=(",", ":"))))
+
+    @contextmanager
+    def escritura(self) -> Iterator[None]:
+        """
+        Transacción de escritura entre procesos para un comando.
+
+        Se usa con el lock de dominio del proceso ya tomado.
+        """
+        if not self.activo:
+            yield
+            return
+
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._cargar(conn)
+            self._traer_tests(conn)
+            self._comando = []
+            yield
+            if self._comando:
+                self._guardar(conn)
+        except BaseException:
+            # El estado en memoria pudo quedar a medio cambiar (aun sin haber
+            # registrado eventos): se recarga en el próximo acceso
+            self.revision = -1
+            raise
+        finally:
+            self._comando = []
+            conn.execute("COMMIT")
+
+    def refrescar(self) -> None:
+        """Trae a memoria la última revisión (para lecturas)."""
+        if not self.activo:
+            return
+        conn = self._conexion()
+        conn.execute("BEGIN")
+        try:
+            self._cargar(conn)
+            self._traer_tests(conn)
+        finally:
+            conn.execute("COMMIT")
+
+    # ------------------------------------------------------------------
+    # Indicador de test (tecla 8)
+    # ------------------------------------------------------------------
+
+    def publicar_test(self, dni: str, duracion_s: float) -> None:
+        """Avisa a los demás workers el indicador de test de un concejal. Dentro de escritura()."""
+        if not self.activo:
+            return
+        hasta = time.time() + duracion_s
+        self._conexion().execute(
+            "INSERT INTO tests (dni, hasta) VALUES (?, ?) "
+            "ON CONFLICT(dni) DO UPDATE SET hasta = MAX(hasta, excluded.hasta)",
+            (dni, hasta),
+        )
+        self._tests[dni] = max(hasta, self._tests.get(dni, 0.0))
+
+    def _traer_tests(self, conn: sqlite3.Connection) -> None:
+        """Activa en memoria los indicadores de test vigentes que puso otro worker."""
+        from app.services.sesion_service import sesion_service
+
+        ahora = time.time()
+        vigentes = dict(conn.execute("SELECT dni, hasta FROM tests WHERE hasta > ?", (ahora,)).fetchall())
+        nuevos = {dni: hasta for dni, hasta in vigentes.items() if hasta > self._tests.get(dni, 0.0)}
+        self._tests = vigentes
+        sesion = sesion_service.sesion_actual
+        if not nuevos or sesion is None:
+            return
+        for concejal in sesion.concejales:
+            if concejal.dni in nuevos:
+                concejal.activar_test_temporal(nuevos[concejal.dni] - ahora)
+        sesion_service.revision += 1
+
+    # ------------------------------------------------------------------
+    # Eventos de log (reemplaza al buffer RAM de logging.py)
+    # ------------------------------------------------------------------
+
+    def agregar_evento(self, line: str) -> None:
+        conn = self._conexion()
+        conn.execute("INSERT INTO eventos (line) VALUES (?)", (line,))
+        self._insertados += 1
+        if self._insertados % EVENTOS_CONSERVADOS == 0:
+            conn.execute(
+                "DELETE FROM eventos WHERE seq <= (SELECT MAX(seq) FROM eventos) - ?",
+                (EVENTOS_CONSERVADOS,),
+            )
+
+    def ultimos_eventos(self, cantidad: int) -> List[dict]:
+        from app.utils.logging import nivel_de_linea
+
+        filas = self._conexion().execute(
+            "SELECT seq, line FROM eventos ORDER BY seq DESC LIMIT ?", (cantidad,)
+        ).fetchall()
+        return [{"seq": seq, "level": nivel_de_linea(line), "line": line} for seq, line in reversed(filas)]
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self, ruta_db: str) -> None:
+        """Abre (o crea) la base y carga el estado guardado."""
+        if self.activo:
+            return
+
+        directorio = os.path.dirname(ruta_db)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self.ruta = ruta_db
+        conn = self._conexion()
+        conn.executescript(_ESQUEMA)
+
+        journal_service.suscribir(self._al_registrar)
+        logging.usar_tail_compartido(self.agregar_evento, self.ultimos_eventos)
+        self.refrescar()
+
+
+# Instancia única
+estado_compartido_service = EstadoCompartidoService()
@@ -0,0 +1,438 @@
+"""
+Historial persistente de sesiones, votaciones y votos en SQLite.
+
+Al cerrar la sesión el objeto Sesion (con sus votaciones y votos) se
+descarta de memoria; este servicio guarda todo en una base SQLite local
+(settings.historial_db) a medida que ocurre:
+
+    sesiones            una fila por sesión (apertura, cierre, quórum)
+    sesion_concejales   padrón de cada sesión (dni, nombre, bloque, banca)
+    votaciones          una fila por votación, se actualiza al cerrarse
+    votos               un voto por fila (dni NULL = voto de desempate)
+    uso_palabra         resumen de uso de la palabra por concejal (al cerrar la sesión)
+
+Escritura fuera del request:
+    El servicio se suscribe a journal_service: por cada comando aplicado
+    el callback solo copia los datos necesarios y los encola. Un hilo de
+    fondo junta los eventos de ~0,5 s y los escribe en una transacción.
+    La base usa WAL, así las consultas no bloquean al writer (ni al revés).
+
+Idempotencia:
+    Todas las altas son INSERT ... ON CONFLICT DO NOTHING sobre claves
+    naturales (sesión = número + hora de inicio; votación y voto = id en
+    memoria dentro de la sesión/votación). Reaplicar el journal tras una
+    caída vuelve a encolar eventos sin duplicar filas.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    create_engine,
+    event,
+    select,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection, Engine
+
+from app.services.journal_service import journal_service
+from app.utils import logging
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+# Máximo de eventos por transacción del writer
+TANDA_MAX = 500
+
+# Espera del writer tras el primer evento, para juntar los siguientes
+ESPERA_TANDA_S = 0.5
+
+# Eventos que pueden cambiar el estado de la votación actual
+_TIPOS_VOTACION = ("abrir_votacion", "voto", "desempate", "cierre_forzado", "presencia")
+
+# Marca de fin para el hilo writer
+_FIN = None
+
+
+# ---------------------------------------------------------------------------
+# Esquema
+# ---------------------------------------------------------------------------
+
+metadata = MetaData()
+
+sesiones = Table(
+    "sesiones",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("numero_sesion", Integer, nullable=False),
+    Column("hora_inicio", DateTime, nullable=False),
+    Column("hora_fin", DateTime),
+    Column("quorum", Integer),
+    UniqueConstraint("numero_sesion", "hora_inicio"),
+)
+
+sesion_concejales = Table(
+    "sesion_concejales",
+    metadata,
+    Column("sesion_id", Integer, ForeignKey("sesiones.id"), primary_key=True),
+    Column("dni", String, primary_key=True),
+    Column("nombre", String),
+    Column("apellido", String),
+    Column("bloque", String),
+    Column("banca", Integer),
+    Index("ix_sesion_concejales_dni", "dni"),
+)
+
+votaciones = Table(
+    "votaciones",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("sesion_id", Integer, ForeignKey("sesiones.id"), nullable=False),
+    Column("id_memoria", Integer, nullable=False),
+    Column("numero", Integer),
+    Column("tipo", String),
+    Column("tema", String),
+    Column("estado", String),
+    Column("computa_sobre_los_presentes", Boolean),
+    Column("factor_mayoria_especial", Float),
+    Column("hora_inicio", DateTime),
+    Column("hora_fin", DateTime),
+    UniqueConstraint("sesion_id", "id_memoria"),
+    Index("ix_votaciones_sesion_numero", "sesion_id", "numero"),
+)
+
+votos = Table(
+    "votos",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("votacion_id", Integer, ForeignKey("votaciones.id"), nullable=False),
+    Column("id_memoria", Integer, nullable=False),
+    Column("dni", String),
+    Column("valor", String, nullable=False),
+    Column("hora", DateTime, nullable=False),
+    UniqueConstraint("votacion_id", "id_memoria"),
+    Index("ix_votos_dni_hora", "dni", "hora"),
+)
+
+uso_palabra = Table(
+    "uso_palabra",
+    metadata,
+    Column("sesion_id", Integer, ForeignKey("sesiones.id"), primary_key=True),
+    Column("dni", String, primary_key=True),
+    Column("pedidos", Integer),
+    Column("turnos", Integer),
+    Column("hablado_s", Float),
+    Column("espera_s", Float),
+)
+
+
+# ---------------------------------------------------------------------------
+# Funciones internas (helpers)
+# ---------------------------------------------------------------------------
+
+def _fecha(valor: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def _configurar_sqlite(dbapi_conn, _record) -> None:
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA foreign_keys=ON")
+    cur.close()
+
+
+def _fila_votacion(v) -> Dict[str, Any]:
+    return {
+        "id_memoria": v.id,
+        "numero": v.numero,
+        "tipo": v.tipo,
+        "tema": v.tema,
+        "estado": v.estado.value,
+        "computa_sobre_los_presentes": v.computa_sobre_los_presentes,
+        "factor_mayoria_especial": v.factor_mayoria_especial,
+        "hora_inicio": v.hora_inicio,
+        "hora_fin": v.hora_fin,
+    }
+
+
+class HistorialService:
+    """
+    Escritura (en segundo plano) y consultas del historial en SQLite.
+
+    - Inactivo hasta iniciar(): el callback no encola nada.
+    """
+
+    def __init__(self) -> None:
+        self.engine: Optional[Engine] = None
+        self._cola: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._hilo: Optional[threading.Thread] = None
+
+        # Caché de ids de la base (solo la usa el hilo writer)
+        self._ids_sesion: Dict[Tuple[int, datetime], int] = {}
+        self._ids_votacion: Dict[Tuple[int, int], int] = {}
+
+    # ------------------------------------------------------------------
+    # Encolado (hilo del request, con el lock de dominio tomado)
+    # ------------------------------------------------------------------
+
+    def _al_registrar(self, tipo: str, datos: Dict[str, Any]) -> None:
+        if self.engine is None:
+            return
+
+        from app.services.sesion_service import sesion_service
+        from app.services.votacion_service import votacion_service
+
+        if tipo == "cerrar_sesion":
+            sesion = {"numero_sesion": datos["numero_sesion"], "hora_inicio": _fecha(datos["hora_inicio"]), "quorum": None}
+        else:
+            s = sesion_service.sesion_actual
+            if s is None:
+                return
+            sesion = {"numero_sesion": s.numero_sesion, "hora_inicio": s.hora_inicio, "quorum": s.quorum}
+
+        votacion = None
+        if tipo in _TIPOS_VOTACION and votacion_service.votacion_actual is not None:
+            votacion = _fila_votacion(votacion_service.votacion_actual)
+
+        self._cola.put((tipo, datos, sesion, votacion))
+
+    # ------------------------------------------------------------------
+    # Escritura (hilo writer)
+    # ------------------------------------------------------------------
+
+    def _id_sesion(self, conn: Connection, sesion: Dict[str, Any]) -> int:
+        clave = (sesion["numero_sesion"], sesion["hora_inicio"])
+        if clave not in self._ids_sesion:
+            conn.execute(insert(sesiones).values(**sesion).on_conflict_do_nothing())
+            self._ids_sesion[clave] = conn.execute(
+                select(sesiones.c.id).where(
+                    sesiones.c.numero_sesion == clave[0], sesiones.c.hora_inicio == clave[1]
+                )
+            ).scalar_one()
+        return self._ids_sesion[clave]
+
+    def _id_votacion(self, conn: Connection, sesion_id: int, fila: Dict[str, Any]) -> int:
+        clave = (sesion_id, fila["id_memoria"])
+        if clave not in self._ids_votacion:
+            conn.execute(insert(votaciones).values(sesion_id=sesion_id, **fila).on_conflict_do_nothing())
+            self._ids_votacion[clave] = conn.execute(
+                select(votaciones.c.id).where(
+                    votaciones.c.sesion_id == sesion_id, votaciones.c.id_memoria == fila["id_memoria"]
+                )
+            ).scalar_one()
+        return self._ids_votacion[clave]
+
+    def _escribir_tanda(self, conn: Connection, tanda: List[tuple]) -> None:
+        """
+        Escribe una tanda de eventos con pocas sentencias: los votos y el
+        padrón van en un solo executemany y de cada votación se guarda
+        solo el último estado de la tanda.
+        """
+        filas_padron: List[Dict[str, Any]] = []
+        filas_voto: List[Dict[str, Any]] = []
+        filas_palabra: List[Dict[str, Any]] = []
+        estado_votacion: Dict[int, Dict[str, Any]] = {}
+        cierres_sesion: Dict[int, datetime] = {}
+
+        for tipo, datos, sesion, votacion in tanda:
+            sesion_id = self._id_sesion(conn, sesion)
+
+            if tipo == "abrir_sesion":
+                filas_padron.extend(
+                    {"sesion_id": sesion_id, "dni": c["dni"], "nombre": c["nombre"],
+                     "apellido": c["apellido"], "bloque": c["bloque"], "banca": c["banca"]}
+                    for c in datos["concejales"]
+                )
+            elif tipo == "cerrar_sesion":
+                cierres_sesion[sesion_id] = _fecha(datos["hora_fin"])
+                # Journals anteriores a los tiempos de uso de la palabra no lo traen
+                filas_palabra.extend({"sesion_id": sesion_id, **f} for f in datos.get("uso_de_palabra", ()))
+
+            if votacion is None:
+                continue
+
+            votacion_id = self._id_votacion(conn, sesion_id, votacion)
+            estado_votacion[votacion_id] = votacion
+
+            if tipo in ("voto", "desempate"):
+                filas_voto.append({
+                    "votacion_id": votacion_id,
+                    "id_memoria": datos["id"],
+                    "dni": datos["dni"],
+                    "valor": datos["valor"],
+                    "hora": _fecha(datos["hora"]),
+                })
+
+        if filas_padron:
+            conn.execute(insert(sesion_concejales).on_conflict_do_nothing(), filas_padron)
+        if filas_voto:
+            conn.execute(insert(votos).on_conflict_do_nothing(), filas_voto)
+        if filas_palabra:
+            conn.execute(insert(uso_palabra).on_conflict_do_nothing(), filas_palabra)
+        for votacion_id, v in estado_votacion.items():
+            conn.execute(update(votaciones).where(votaciones.c.id == votacion_id)
+                         .values(estado=v["estado"], hora_fin=v["hora_fin"]))
+        for sesion_id, hora_fin in cierres_sesion.items():
+            conn.execute(update(sesiones).where(sesiones.c.id == sesion_id).values(hora_fin=hora_fin))
+
+    def _loop_escritura(self) -> None:
+        while True:
+            tanda = [self._cola.get()]
+            # Esperamos a juntar más eventos: menos transacciones y menos
+            # tiempo de CPU (GIL) compitiendo con los requests
+            if tanda[0] is not _FIN:
+                time.sleep(ESPERA_TANDA_S)
+            while len(tanda) < TANDA_MAX:
+                try:
+                    tanda.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            fin = _FIN in tanda
+            tanda = [item for item in tanda if item is not _FIN]
+
+            if tanda:
+                try:
+                    with self.engine.begin() as conn:
+                        self._escribir_tanda(conn, tanda)
+                except Exception as e:
+                    # La transacción se descartó: los ids cacheados pueden no existir
+                    self._ids_sesion.clear()
+                    self._ids_votacion.clear()
+                    logging.log_internal("HISTORIAL", 3, "Error guardando historial (%s eventos): %s", len(tanda), e)
+
+            if fin:
+                return
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self, ruta_db: str) -> None:
+        """Abre (o crea) la base y arranca el hilo writer."""
+        if self.engine is not None:
+            return
+
+        directorio = os.path.dirname(ruta_db)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        engine = create_engine(f"sqlite:///{ruta_db}")
+        event.listen(engine, "connect", _configurar_sqlite)
+        # Varios workers arrancan a la vez: el esquema lo crea uno solo por vez
+        with open(ruta_db + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            metadata.create_all(engine)
+
+        self.engine = engine
+        journal_service.suscribir(self._al_registrar)
+        self._hilo = threading.Thread(target=self._loop_escritura, name="historial-writer", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        """Escribe lo pendiente y detiene el hilo writer."""
+        if self._hilo is None:
+            return
+        self._cola.put(_FIN)
+        self._hilo.join(timeout=10)
+        self._hilo = None
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _conectar(self) -> Connection:
+        if self.engine is None:
+            raise ValueError("historial_desactivado")
+        return self.engine.connect()
+
+    def votos_de_concejal(self, dni: str, limite: int = 500) -> List[Dict[str, Any]]:
+        """Votos de un concejal (más recientes primero), con su votación y sesión."""
+        q = (
+            select(
+                votos.c.valor,
+                votos.c.hora,
+                votaciones.c.numero.label("numero_votacion"),
+                votaciones.c.tema,
+                votaciones.c.estado,
+                sesiones.c.numero_sesion,
+            )
+            .join(votaciones, votos.c.votacion_id == votaciones.c.id)
+            .join(sesiones, votaciones.c.sesion_id == sesiones.c.id)
+            .where(votos.c.dni == dni)
+            .order_by(votos.c.hora.desc())
+            .limit(limite)
+        )
+        with self._conectar() as conn:
+            return [dict(r._mapping) for r in conn.execute(q)]
+
+    def sesiones_por_numero(self, numero_sesion: int) -> List[Dict[str, Any]]:
+        """
+        Sesiones con ese número, cada una con sus votaciones y votos y el
+        resumen de uso de la palabra (de más a menos tiempo hablado).
+        """
+        with self._conectar() as conn:
+            filas_sesion = conn.execute(
+                select(sesiones).where(sesiones.c.numero_sesion == numero_sesion)
+                .order_by(sesiones.c.hora_inicio)
+            ).all()
+
+            resultado = []
+            for s in filas_sesion:
+                filas_votacion = conn.execute(
+                    select(votaciones).where(votaciones.c.sesion_id == s.id)
+                    .order_by(votaciones.c.hora_inicio)
+                ).all()
+                filas_voto = conn.execute(
+                    select(votos).join(votaciones, votos.c.votacion_id == votaciones.c.id)
+                    .where(votaciones.c.sesion_id == s.id)
+                    .order_by(votos.c.id)
+                ).all()
+
+                votos_por_votacion: Dict[int, List[Dict[str, Any]]] = {}
+                for v in filas_voto:
+                    votos_por_votacion.setdefault(v.votacion_id, []).append(
+                        {"dni": v.dni, "valor": v.valor, "hora": v.hora}
+                    )
+
+                sesion = dict(s._mapping)
+                sesion["votaciones"] = [
+                    {**dict(v._mapping), "votos": votos_por_votacion.get(v.id, [])}
+                    for v in filas_votacion
+                ]
+                sesion["uso_de_palabra"] = [
+                    dict(p._mapping) for p in conn.execute(
+                        select(uso_palabra.c.dni, uso_palabra.c.pedidos, uso_palabra.c.turnos,
+                               uso_palabra.c.hablado_s, uso_palabra.c.espera_s)
+                        .where(uso_palabra.c.sesion_id == s.id)
+                        .order_by(uso_palabra.c.hablado_s.desc(), uso_palabra.c.dni)
+                    )
+                ]
+                resultado.append(sesion)
+            return resultado
+
+
+# Instancia única
+historial_service = HistorialService()
@@ -1,8 +1,7 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
-from app.services.sesion_service import sesion_service
-from app.services.votacion_service import votacion_service
+from app.services.sala_service import Sala, sala_service
 from app.models.votacion import EstadosVotacion
 from app.models.voto import Voto, ValorVoto
 from app.config import settings
@@ -49,10 +48,13 @@ from app.utils import logging
 #         f.write(linea + "\n")
 
 
-def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
+def procesar_pulsacion(dispositivo: str, tecla: str, sala: Optional[Sala] = None) -> Dict[str, Any]:
     """
     Procesa una pulsación de tecla proveniente de un dispositivo físico.
 
+    El dispositivo se busca en el padrón de la sesión de `sala` (por
+    defecto la principal): cada sala tiene su propio mapa de dispositivos.
+
     Reglas:
     - Siempre loguea PULSACION_RAW.
     - Si no hay sesión abierta -> rechaza.
@@ -69,8 +71,13 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
     - Cualquier otra tecla -> rechaza (por ahora).
     """
 
+    if sala is None:
+        sala = sala_service.principal
+    sesion_service = sala.sesion_service
+    votacion_service = sala.votacion_service
+
     # 1) Log crudo inmediato
-    logging.log_internal("INPUT",2,"Pulsación registrada: Tecla [" + tecla + "] del dispositivo [" + dispositivo +"]")
+    logging.log_internal("INPUT", 2, "Pulsación registrada: Tecla [%s] del dispositivo [%s]", tecla, dispositivo)
 
     # 2) Verificar sesión
     sesion = sesion_service.obtener_sesion_actual()
@@ -85,11 +92,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
         }
 
     # 3) Buscar concejal asociado a dispositivo
-    concejal = None
-    for c in sesion.concejales:
-        if c.dispositivo_votacion == dispositivo:
-            concejal = c
-            break
+    concejal = sesion.concejal_por_dispositivo(dispositivo)
 
     if concejal is None:
         logging.log_internal("INPUT",2,"Pulsación ignorada: No hay concejal asociado")
@@ -102,15 +105,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
 
     # 4) Tecla 9: toggle presente/ausente
     if tecla == "9":
-        concejal.presente = not concejal.presente
-        sesion.presentes = sesion_service.cantidad_concejales_presentes()
-        if concejal.presente:
-            logging.log_internal("INPUT",3,concejal.print_corto() + " se PRESENTÓ")
-        else:
-            logging.log_internal("INPUT",3,concejal.print_corto() + " se AUSENTÓ")
-
-        if (votacion_service.votacion_actual is not None) and (votacion_service.votacion_actual.estado is EstadosVotacion.EN_CURSO):
-            votacion_service.recalcular_cierre_por_cambio_en_presencia()
+        sesion_service.alternar_presencia(concejal)
         return {
                 "aceptada": True,
                 "motivo": "cambio_presencia",
@@ -123,7 +118,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
 
     #5) Tecla 8: mostrar_test por x segundos
     if tecla == "8":
-        concejal.activar_test_temporal(0.6)
+        sesion_service.mostrar_test(concejal, 0.6)
         return {
             "aceptada": True,
             "motivo": "mostrar_test_1s",
@@ -135,7 +130,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
 
     # 6) Tecla 7: pedido de palabra
     if tecla == "7":
-        logging.log_internal("INPUT",2,concejal.print_corto() + "Presiono tecla de PALABRA")
+        logging.log_internal("INPUT", 2, "%sPresiono tecla de PALABRA", concejal)
         # Concejal debe estar presente
         if concejal.presente:
             if concejal is sesion_service.sesion_actual.en_uso_de_palabra:
@@ -157,7 +152,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
                     "concejal": concejal.to_dict(),
                     }
         else:
-            logging.log_internal("INPUT",2,concejal.print_corto() + " interactúa sin dar presente")
+            logging.log_internal("INPUT", 2, "%s interactúa sin dar presente", concejal)
             return {
                 "aceptada": False,
                 "motivo": "concejal_ausente",
@@ -172,7 +167,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
         # Debe haber votación abierta
         votacion = votacion_service.obtener_votacion_actual()
         if votacion is None or (votacion.estado != EstadosVotacion.EN_CURSO):
-            logging.log_internal("INPUT",2,concejal.print_corto() + " votó sin votación en curso")
+            logging.log_internal("INPUT", 2, "%s votó sin votación en curso", concejal)
             return {
                 "aceptada": False,
                 "motivo": "no_hay_votacion_abierta",
@@ -183,7 +178,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
 
         # Concejal debe estar presente
         if not concejal.presente:
-            logging.log_internal("INPUT",2,concejal.print_corto() + " interactúa sin dar presente")
+            logging.log_internal("INPUT", 2, "%s interactúa sin dar presente", concejal)
             return {
                 "aceptada": False,
                 "motivo": "concejal_ausente",
@@ -204,7 +199,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
         try:
             votacion_service.registrar_voto(voto)
         except ValueError as e:
-            logging.log_internal("INPUT",2,concejal.print_corto() + " ERROR en registro voto: " + str(e))
+            logging.log_internal("INPUT", 2, "%s ERROR en registro voto: %s", concejal, e)
             return {
                 "aceptada": False,
                 "motivo": str(e),
@@ -215,7 +210,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
 
         # Si llegó hasta acá, el voto se registró correctamente
         
-        logging.log_internal("INPUT",2,concejal.print_corto() + " votó: " + voto.valor_voto.value)
+        logging.log_internal("INPUT", 2, "%s votó: %s", concejal, voto.valor_voto.value)
 
         return {
             "aceptada": True,
@@ -227,7 +222,7 @@ def procesar_pulsacion(dispositivo: str, tecla: str) -> Dict[str, Any]:
         }
 
     # 8) Cualquier otra tecla: de momento la ignoramos a nivel de negocio
-    logging.log_internal("INPUT",2,concejal.print_corto() + " presiono tecla: " + tecla + " y no tiene función asignada")
+    logging.log_internal("INPUT", 2, "%s presiono tecla: %s y no tiene función asignada", concejal, tecla)
     return {
         "aceptada": False,
         "motivo": "tecla_no_soportada",
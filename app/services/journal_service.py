@@ -0,0 +1,530 @@
+"""
+Journal (write-ahead log) de comandos de dominio y recuperación ante caídas.
+
+Cada comando que modifica el estado (abrir/cerrar sesión, presente/ausente,
+voto, uso de la palabra, apertura/cierre forzado/desempate de votación,
+carga del orden del día) se agrega como una línea JSON a:
+
+    <journal_dir>/journal.jsonl
+        {"seq": 17, "tipo": "voto", "datos": {...}}
+
+y periódicamente se guarda el estado completo (ver snapshot_service.py) en:
+
+    <journal_dir>/snapshot.json
+        {"seq": 500, "estado": {...}}
+
+Al arrancar el backend se carga el snapshot y se reaplican, en orden, los
+eventos del journal con seq mayor al del snapshot. Los eventos se reaplican
+llamando a los mismos métodos de los servicios (con el log suspendido) y
+luego se corrigen horas e ids con los valores grabados, así el estado
+reconstruido es idéntico al que había antes de la caída.
+
+Escritura (group commit):
+    registrar() solo encola la línea; un hilo de fondo escribe todo lo
+    encolado y hace UN fsync por tanda. confirmar() espera a que lo
+    registrado hasta ese momento esté en disco. Los endpoints confirman
+    después de soltar el lock de dominio (ver SesionService.comando), así
+    varias pulsaciones simultáneas comparten el mismo fsync.
+
+    Si la escritura o el fsync fallan, lo que no llegó al disco no cuenta
+    como bajado: el archivo se recorta al último fsync bueno, los items
+    vuelven a la cola para reintentar y confirmar() levanta
+    JournalNoConfirmado (también si vence la espera). El comando ya se
+    aplicó en memoria: el endpoint responde 503 (ver main.py) en lugar de
+    confirmarlo.
+
+Orden: registrar() se llama siempre con el lock de dominio tomado, justo
+después de aplicar el cambio, por lo que el orden del journal es el orden
+real en que se aplicaron los comandos.
+
+Suscriptores: otros servicios (p. ej. historial_service) pueden recibir
+cada comando registrado con suscribir(). El callback corre en el hilo del
+request, con el lock de dominio tomado: debe ser rápido (encolar y volver).
+También se llama al reaplicar el journal, así que debe ser idempotente.
+Se notifica aunque el journal esté desactivado (journal_dir = null).
+Dentro de sin_suscriptores() no se notifica (comandos que ya notificó
+otro worker, ver estado_compartido_service).
+
+Salas: cada sala adicional tiene su propio JournalService (en
+<journal_dir>/salas/<id>/) vinculado a sus servicios con vincular(); el
+journal_service de este módulo es el de la sala principal.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.services import snapshot_service
+from app.utils import logging
+
+if TYPE_CHECKING:
+    from app.services.sesion_service import SesionService
+    from app.services.votacion_service import VotacionService
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+JOURNAL_NAME = "journal.jsonl"
+SNAPSHOT_NAME = "snapshot.json"
+
+# Cada cuántos eventos se guarda un snapshot nuevo (y se trunca el journal)
+SNAPSHOT_CADA_EVENTOS = 500
+
+# Después de estos comandos siempre se guarda snapshot
+_TIPOS_CON_SNAPSHOT = ("abrir_sesion", "cerrar_sesion")
+
+# Espera máxima de confirmar() (si el disco no responde, no colgamos el request)
+CONFIRMAR_TIMEOUT_S = 5.0
+
+# Espera antes de reintentar una escritura que falló
+REINTENTO_S = 0.5
+
+Suscriptor = Callable[[str, Dict[str, Any]], None]
+
+
+class JournalNoConfirmado(Exception):
+    """Lo registrado no llegó al disco (error de escritura o fsync, o timeout)."""
+
+
+class JournalService:
+    """
+    Journal de comandos de dominio con group commit y snapshots.
+
+    - Inactivo hasta iniciar(): registrar() no hace nada (herramientas, scripts).
+    - Un solo proceso escribe el journal (el backend).
+    - Sin vincular() trabaja sobre los servicios de la sala principal.
+    """
+
+    def __init__(self) -> None:
+        self.directorio: Optional[str] = None
+        self._sesion_service: Optional["SesionService"] = None
+        self._votacion_service: Optional["VotacionService"] = None
+        self._activo = False
+        self._reproduciendo = False
+        self._silenciado = False
+
+        self._cond = threading.Condition()
+        # Cola del writer: líneas de texto o tuplas ("snapshot", seq, estado)
+        self._pendientes: List[Any] = []
+        self._seq = 0              # último seq asignado a un evento
+        self._encolados = 0        # items (eventos o snapshots) encolados
+        self._bajados = 0          # items ya escritos con fsync
+        self._fallos = 0           # tandas cuya escritura falló
+        self._eventos_desde_snapshot = 0
+
+        self._archivo = None
+        self._tamano = 0           # bytes del journal hasta el último fsync bueno
+        self._hilo: Optional[threading.Thread] = None
+        self._suscriptores: List[Suscriptor] = []
+
+    # ------------------------------------------------------------------
+    # Servicios
+    # ------------------------------------------------------------------
+
+    def vincular(self, sesion_service: "SesionService", votacion_service: "VotacionService") -> None:
+        """Asocia el journal a los servicios de una sala."""
+        self._sesion_service = sesion_service
+        self._votacion_service = votacion_service
+
+    def _servicios(self) -> Tuple["SesionService", "VotacionService"]:
+        if self._sesion_service is not None:
+            return self._sesion_service, self._votacion_service
+        from app.services.sesion_service import sesion_service
+        from app.services.votacion_service import votacion_service
+        return sesion_service, votacion_service
+
+    # ------------------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------------------
+
+    def _ruta_journal(self) -> str:
+        return os.path.join(self.directorio, JOURNAL_NAME)
+
+    def _ruta_snapshot(self) -> str:
+        return os.path.join(self.directorio, SNAPSHOT_NAME)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def registrar(self, tipo: str, datos: Dict[str, Any]) -> None:
+        """
+        Agrega un comando al journal (no espera el fsync: ver confirmar()).
+
+        Se llama con el lock de dominio tomado, después de aplicar el cambio.
+        """
+        for callback in () if self._silenciado else self._suscriptores:
+            try:
+                callback(tipo, datos)
+            except Exception as e:
+                logging.log_internal("JOURNAL", 2, "Error en suscriptor del journal: %s", e)
+
+        if not self._activo or self._reproduciendo:
+            return
+
+        with self._cond:
+            self._seq += 1
+            self._pendientes.append(json.dumps(
+                {"seq": self._seq, "tipo": tipo, "datos": datos},
+                ensure_ascii=False,
+                separators=(",", ":"),
+            ))
+            self._eventos_desde_snapshot += 1
+            self._encolados += 1
+            self._cond.notify()
+
+        if tipo in _TIPOS_CON_SNAPSHOT or self._eventos_desde_snapshot >= SNAPSHOT_CADA_EVENTOS:
+            self._encolar_snapshot()
+
+    def suscribir(self, callback: Suscriptor) -> None:
+        """Registra un callback(tipo, datos) que recibe cada comando aplicado."""
+        if callback not in self._suscriptores:
+            self._suscriptores.append(callback)
+
+    @contextmanager
+    def sin_suscriptores(self) -> Iterator[None]:
+        """Los comandos registrados en el bloque no se notifican (con el lock de dominio tomado)."""
+        anterior = self._silenciado
+        self._silenciado = True
+        try:
+            yield
+        finally:
+            self._silenciado = anterior
+
+    def confirmar(self) -> None:
+        """
+        Espera a que todo lo registrado hasta ahora esté en disco.
+
+        JournalNoConfirmado si falla la escritura de alguna tanda mientras
+        espera o si vence CONFIRMAR_TIMEOUT_S.
+        """
+        if not self._activo:
+            return
+        with self._cond:
+            objetivo = self._encolados
+            fallos = self._fallos
+            self._cond.wait_for(
+                lambda: self._bajados >= objetivo or self._fallos != fallos or not self._activo,
+                timeout=CONFIRMAR_TIMEOUT_S,
+            )
+            if self._bajados >= objetivo or not self._activo:
+                return
+            motivo = "error de escritura" if self._fallos != fallos else "timeout"
+        raise JournalNoConfirmado(motivo)
+
+    def _encolar_snapshot(self) -> None:
+        sesion_service, votacion_service = self._servicios()
+        estado = snapshot_service.capturar_estado(sesion_service, votacion_service)
+        with self._cond:
+            self._pendientes.append(("snapshot", self._seq, estado))
+            self._eventos_desde_snapshot = 0
+            self._encolados += 1
+            self._cond.notify()
+
+    def _escribir_snapshot(self, seq: int, estado: Dict[str, Any]) -> None:
+        ruta = self._ruta_snapshot()
+        tmp = ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "estado": estado}, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, ruta)
+
+        # Todo lo anterior a seq ya está en el snapshot: empezamos journal nuevo.
+        # Si caemos entre el replace y el truncado, al recuperar se saltean
+        # los eventos con seq <= seq del snapshot.
+        self._archivo.close()
+        self._archivo = open(self._ruta_journal(), "wb")
+        os.fsync(self._archivo.fileno())
+        self._tamano = 0
+
+    def _loop_escritura(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pendientes or not self._activo)
+                if not self._pendientes and not self._activo:
+                    return
+                tanda, self._pendientes = self._pendientes, []
+
+            # Items de la tanda ya en disco (en orden)
+            hechos = 0
+            error = None
+            try:
+                lineas: List[str] = []
+                for item in tanda:
+                    if isinstance(item, str):
+                        lineas.append(item)
+                        continue
+                    # Snapshot: primero bajamos las líneas previas, después el snapshot
+                    self._bajar_lineas(lineas)
+                    hechos += len(lineas)
+                    lineas = []
+                    _, seq, estado = item
+                    self._escribir_snapshot(seq, estado)
+                    hechos += 1
+                self._bajar_lineas(lineas)
+                hechos += len(lineas)
+            except Exception as e:
+                error = e
+                logging.log_internal("JOURNAL", 3, "Error escribiendo el journal: %s", e)
+                self._descartar_parcial()
+
+            with self._cond:
+                self._bajados += hechos
+                if error is not None:
+                    # Lo que no bajó vuelve al principio de la cola
+                    self._pendientes[:0] = tanda[hechos:]
+                    self._fallos += 1
+                self._cond.notify_all()
+                if error is not None and not self._activo:
+                    return
+
+            if error is not None:
+                time.sleep(REINTENTO_S)
+
+    def _bajar_lineas(self, lineas: List[str]) -> None:
+        if not lineas:
+            return
+        data = ("\n".join(lineas) + "\n").encode("utf-8")
+        self._archivo.write(data)
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._tamano += len(data)
+
+    def _descartar_parcial(self) -> None:
+        """Recorta el journal al último fsync bueno (una línea a medias rompería la recuperación)."""
+        try:
+            if self._archivo.closed:
+                self._archivo = open(self._ruta_journal(), "ab")
+            self._archivo.truncate(self._tamano)
+            # Después del snapshot el archivo no está en modo append
+            self._archivo.seek(self._tamano)
+        except Exception as e:
+            logging.log_internal("JOURNAL", 3, "No se pudo recortar el journal: %s", e)
+
+    # ------------------------------------------------------------------
+    # Recuperación
+    # ------------------------------------------------------------------
+
+    def _leer_snapshot(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        try:
+            with open(self._ruta_snapshot(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0, None
+        return data["seq"], data["estado"]
+
+    def _leer_journal(self) -> List[Dict[str, Any]]:
+        eventos = []
+        try:
+            with open(self._ruta_journal(), "r", encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        eventos.append(json.loads(linea))
+                    except ValueError:
+                        # Última línea cortada por la caída: se descarta
+                        break
+        except FileNotFoundError:
+            pass
+        return eventos
+
+    def recuperar(self) -> int:
+        """
+        Reconstruye el estado en memoria desde snapshot + journal.
+
+        Devuelve la cantidad de eventos reaplicados.
+        """
+        sesion_service, votacion_service = self._servicios()
+
+        seq_snapshot, estado = self._leer_snapshot()
+        eventos = [e for e in self._leer_journal() if e["seq"] > seq_snapshot]
+
+        self._reproduciendo = True
+        try:
+            with sesion_service.lock, logging.en_sala(sesion_service.log), logging.suspendido():
+                if estado is not None:
+                    snapshot_service.restaurar_estado(estado, sesion_service, votacion_service)
+                for evento in eventos:
+                    try:
+                        aplicar_evento(evento["tipo"], evento["datos"], sesion_service, votacion_service)
+                    except (ValueError, KeyError) as e:
+                        raise RuntimeError(f"Journal: no se pudo reaplicar el evento {evento['seq']}: {e}")
+        finally:
+            self._reproduciendo = False
+
+        self._seq = eventos[-1]["seq"] if eventos else seq_snapshot
+        return len(eventos)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self, directorio: str) -> None:
+        """Recupera el estado y arranca el hilo de escritura."""
+        if self._activo:
+            return
+
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+        inicio = datetime.now()
+        n = self.recuperar()
+        ms = (datetime.now() - inicio).total_seconds() * 1000
+
+        self._archivo = open(self._ruta_journal(), "ab")
+        self._tamano = self._archivo.seek(0, os.SEEK_END)
+        self._activo = True
+        self._hilo = threading.Thread(target=self._loop_escritura, name="journal-writer", daemon=True)
+        self._hilo.start()
+
+        # Con el journal ya activo: si la votación o el turno de la palabra
+        # recuperados tienen tiempo límite, su fin (aunque ya haya vencido)
+        # queda registrado
+        sesion_service, _ = self._servicios()
+        with sesion_service.lock:
+            sesion_service.programar_vencimientos()
+
+        if n:
+            sesion_service, _ = self._servicios()
+            with logging.en_sala(sesion_service.log):
+                logging.log_internal("JOURNAL", 3, "Estado recuperado: %s eventos reaplicados en %.0f ms", n, ms)
+            # Dejamos un snapshot al día para que el próximo arranque no reaplique de nuevo
+            with sesion_service.lock:
+                self._encolar_snapshot()
+            self.confirmar()
+
+    def detener(self) -> None:
+        """Baja lo pendiente a disco y detiene el hilo de escritura."""
+        if not self._activo:
+            return
+        with self._cond:
+            self._activo = False
+            self._cond.notify_all()
+        if self._hilo is not None:
+            self._hilo.join(timeout=CONFIRMAR_TIMEOUT_S)
+        self._archivo.close()
+
+
+# ---------------------------------------------------------------------------
+# Reaplicación de eventos
+# ---------------------------------------------------------------------------
+
+def _fecha(valor: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def aplicar_evento(tipo: str, datos: Dict[str, Any], sesion_service: "SesionService",
+                   votacion_service: "VotacionService", efimeros: bool = False) -> None:
+    """
+    Reaplica un evento del journal sobre el estado en memoria.
+
+    Usa los métodos de los servicios (misma lógica que en vivo) y después
+    pisa horas e ids con los valores grabados.
+
+    efimeros=True también reaplica el indicador de test (tecla 8): para
+    comandos recién aplicados por otro worker, no al recuperar una caída.
+    """
+    from app.models.concejal import Concejal
+    from app.models.orden_del_dia import OrdenDelDia
+    from app.models.sesion import Sesion
+    from app.models.votacion import Votacion
+    from app.models.voto import ValorVoto, Voto
+
+    sesion = sesion_service.sesion_actual
+    por_dni: Dict[str, Concejal] = {c.dni: c for c in sesion.concejales} if sesion else {}
+    votacion = votacion_service.votacion_actual
+
+    if tipo == "abrir_sesion":
+        # El padrón se toma del evento, no del archivo (pudo cambiar después)
+        nueva = Sesion(numero_sesion=datos["numero_sesion"])
+        nueva.hora_inicio = _fecha(datos["hora_inicio"])
+        nueva.quorum = datos["quorum"]
+        nueva.disposicion_bancas = datos["disposicion_bancas"]
+        nueva.concejales = [snapshot_service.concejal_desde_dict(c) for c in datos["concejales"]]
+        sesion_service.sesion_actual = nueva
+
+    elif tipo == "cerrar_sesion":
+        sesion_service.cerrar_sesion()
+
+    elif tipo == "presencia":
+        sesion_service.alternar_presencia(por_dni[datos["dni"]])
+
+    elif tipo == "encolar_palabra":
+        sesion_service.encolar_uso_palabra(por_dni[datos["dni"]], hora=_fecha(datos.get("hora")))
+
+    elif tipo == "otorgar_palabra":
+        sesion_service.otorgar_uso_palabra(duracion_s=datos.get("duracion_s"), hora=_fecha(datos.get("hora")))
+
+    elif tipo == "quitar_palabra":
+        sesion_service.quitar_uso_palabra(hora=_fecha(datos.get("hora")))
+
+    elif tipo == "abrir_votacion":
+        v = votacion_service.abrir_votacion(
+            numero=datos["numero"],
+            tipo=datos["tipo"],
+            tema=datos["tema"],
+            computa_sobre_los_presentes=datos["computa_sobre_los_presentes"],
+            factor_mayoria_especial=datos["factor_mayoria_especial"],
+            duracion_s=datos.get("duracion_s"),
+        )
+        v.id = datos["id"]
+        v.hora_inicio = _fecha(datos["hora_inicio"])
+        Votacion._next_id = max(Votacion._next_id, v.id + 1)
+
+    elif tipo in ("voto", "desempate"):
+        voto = Voto(
+            concejal=por_dni[datos["dni"]] if tipo == "voto" else None,
+            valor_voto=ValorVoto(datos["valor"]),
+            hora_emision=_fecha(datos["hora"]),
+            id=datos["id"],
+        )
+        Voto._next_id = max(Voto._next_id, voto.id + 1)
+        if tipo == "voto":
+            votacion_service.registrar_voto(voto)
+        else:
+            votacion_service.voto_desempate(voto)
+
+    elif tipo == "cierre_forzado":
+        votacion_service.cierre_forzado()
+
+    elif tipo == "configurar":
+        sesion.quorum = datos["quorum"]
+        sesion.disposicion_bancas = datos["disposicion_bancas"]
+
+    elif tipo == "cargar_orden_del_dia":
+        sesion_service.cargar_orden_del_dia(OrdenDelDia.desde_dict(datos))
+
+    elif tipo == "limpiar_orden_del_dia":
+        sesion_service.limpiar_orden_del_dia()
+
+    elif tipo == "test":
+        # Indicador efímero de test (tecla 8) de journals y bases anteriores,
+        # que lo registraban: solo lo que le quede de duración
+        hora = _fecha(datos.get("hora"))
+        if efimeros and hora is not None:
+            restante = datos["duracion_s"] - (datetime.now() - hora).total_seconds()
+            if restante > 0:
+                por_dni[datos["dni"]].activar_test_temporal(restante)
+
+    else:
+        raise ValueError(f"tipo_evento_desconocido: {tipo}")
+
+    # Hora de cierre real de la votación, si este comando la cerró
+    if votacion is not None and datos.get("hora_fin"):
+        votacion.hora_fin = _fecha(datos["hora_fin"])
+
+    # Hora de cierre real de la sesión (queda en el objeto ya descartado)
+    if tipo == "cerrar_sesion" and sesion is not None:
+        sesion.hora_fin = _fecha(datos["hora_fin"])
+
+
+# Instancia única
+journal_service = JournalService()
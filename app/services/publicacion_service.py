@@ -0,0 +1,220 @@
+"""
+Publicación del estado global ya serializado en memoria compartida.
+
+La mayor parte del tráfico son lecturas de /estados/estado_global (las
+pantallas consultan varias veces por segundo) y muy pocas escrituras.
+Con settings.estado_mmap configurado:
+
+    - Al terminar cada comando (SesionService.comando), el proceso que lo
+      ejecutó arma el JSON de estado_global UNA vez y lo publica en un
+      archivo mapeado en memoria (ver app/utils/mmap_publicador.py).
+    - Cualquier worker responde estado_global copiando esos bytes tal
+      cual: sin tomar el lock de dominio, sin consultar la base compartida
+      y sin volver a serializar.
+
+Con varios workers (estado_compartido_service) se publica dentro de la
+transacción de escritura, con su número de revisión: nunca se pisa una
+revisión con otra más vieja.
+
+El indicador de test (tecla 8) vence solo, sin que haya un comando: al
+publicar se programa una re-publicación para cuando vence.
+
+Las líneas de log que se generan fuera de un comando (hilos de fondo)
+aparecen en "eventos" recién en la siguiente publicación.
+
+"orden_del_dia" es solo el resumen del orden cargado (versión, cantidad y
+próximo punto); el documento completo está en /estados/orden_del_dia.
+
+"poll_ms" es el intervalo sugerido para el próximo poll (settings.poll_ms):
+corto con una votación en curso o empatada, más largo con la sesión
+abierta sin votación y largo sin sesión. Los frontends lo respetan (ver
+app/web/static/comun/worker_estado.js).
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+from app.models.votacion import EstadosVotacion
+from app.services.estado_compartido_service import estado_compartido_service
+from app.utils import codificacion_binaria
+from app.utils.logging import get_log_tail
+from app.utils.mmap_publicador import PublicadorMmap
+
+if TYPE_CHECKING:
+    from app.models.sesion import Sesion
+    from app.services.sesion_service import SesionService
+
+
+# Fases en las que las pantallas tienen que seguir la votación de cerca
+_FASES_VOTACION = (EstadosVotacion.EN_CURSO, EstadosVotacion.EMPATADA)
+
+
+def poll_ms(sesion: Optional["Sesion"]) -> int:
+    """Intervalo de polling sugerido (ms) para el estado de esta sesión."""
+    intervalos = settings.poll_ms
+    if sesion is None:
+        return intervalos.sin_sesion
+    if sesion.votaciones and sesion.votaciones[-1].estado in _FASES_VOTACION:
+        return intervalos.votacion
+    return intervalos.sesion
+
+
+def codificar(documento: Dict[str, Any], binario: bool = False) -> bytes:
+    """
+    JSON compacto en UTF-8: el mismo que generaría FastAPI para el dict.
+    Con binario=True, MessagePack con claves numéricas (ver
+    app/utils/codificacion_binaria.py).
+    """
+    datos = jsonable_encoder(documento)
+    if binario:
+        return codificacion_binaria.codificar(datos)
+    return json.dumps(
+        datos,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class PublicacionService:
+    """
+    Publicación de estado_global en un archivo mapeado.
+
+    - Inactivo hasta iniciar(): publicar() no hace nada y leer() devuelve None.
+    """
+
+    def __init__(self) -> None:
+        self._publicador: Optional[PublicadorMmap] = None
+        self._revision = 0
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def activo(self) -> bool:
+        return self._publicador is not None
+
+    # ------------------------------------------------------------------
+    # Armado del documento
+    # ------------------------------------------------------------------
+
+    def estado_global(self, sesion_service: Optional["SesionService"] = None) -> Dict[str, Any]:
+        """
+        Documento de /estados/estado_global de una sala (por defecto la principal).
+
+        Debe llamarse con el lock de dominio tomado (sesion_service.lectura()).
+        """
+        if sesion_service is None:
+            from app.services.sesion_service import sesion_service
+
+        sesion = sesion_service.obtener_sesion_actual()
+        orden = sesion_service.orden_del_dia
+        orden_del_dia = orden.resumen(sesion.votaciones if sesion is not None else []) if orden is not None else None
+
+        if sesion is None:
+            return {
+                "hay_sesion": False,
+                "poll_ms": poll_ms(None),
+                "sesion": None,
+                "orden_del_dia": orden_del_dia,
+                "eventos": get_log_tail(),
+            }
+
+        return {
+            "hay_sesion": True,
+            "poll_ms": poll_ms(sesion),
+            "sesion": sesion.to_dict(),
+            "orden_del_dia": orden_del_dia,
+            "eventos": get_log_tail(),
+        }
+
+    # ------------------------------------------------------------------
+    # Publicación
+    # ------------------------------------------------------------------
+
+    def _programar_vencimiento_test(self) -> None:
+        from app.services.sesion_service import sesion_service
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        sesion = sesion_service.sesion_actual
+        if sesion is None:
+            return
+
+        ahora = time.monotonic()
+        restantes = [hasta - ahora for hasta in sesion.bancada.test_hasta if hasta > ahora]
+        if not restantes:
+            return
+
+        self._timer = threading.Timer(min(restantes) + 0.01, self._al_vencer_test)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _al_vencer_test(self) -> None:
+        from app.services.sesion_service import sesion_service
+
+        with sesion_service.lectura():
+            self.publicar()
+
+    def publicar(self) -> None:
+        """
+        Arma y publica estado_global.
+
+        Se llama con el lock de dominio tomado (y, con varios workers, dentro
+        de la transacción de escritura).
+        """
+        if not self.activo:
+            return
+
+        data = codificar(self.estado_global())
+
+        if estado_compartido_service.activo:
+            revision = estado_compartido_service.revision
+        else:
+            self._revision += 1
+            revision = self._revision
+
+        if revision >= 0:
+            self._publicador.publicar(data, revision)
+        self._programar_vencimiento_test()
+
+    def leer(self) -> Optional[bytes]:
+        """Último estado_global publicado (bytes JSON), o None si no hay."""
+        if not self.activo:
+            return None
+        return self._publicador.leer()
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self, ruta: str) -> None:
+        """Abre el archivo mapeado y publica el estado actual."""
+        from app.services.sesion_service import sesion_service
+
+        if self.activo:
+            return
+
+        self._publicador = PublicadorMmap(ruta)
+        if not estado_compartido_service.activo:
+            # Único proceso escritor: lo publicado antes de reiniciar no vale
+            self._publicador.reiniciar()
+
+        with sesion_service.lectura():
+            self.publicar()
+
+    def detener(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+# Instancia única
+publicacion_service = PublicacionService()
@@ -0,0 +1,121 @@
+"""
+Salas: varias sesiones simultáneas en un mismo backend.
+
+La sala principal (el recinto del Concejo) es la de siempre: usa el padrón,
+quórum y bancas de settings y los singletons sesion_service /
+votacion_service / journal_service. Sus endpoints siguen en /moderacion,
+/estados y /entradas.
+
+Cada sala adicional (comisiones) se declara en settings.salas:
+
+    "salas": {
+        "hacienda": {
+            "nombre": "Comisión de Hacienda",
+            "concejales_file": "data/hacienda.csv",
+            "quorum": 3,
+            "disposicion_bancas": { "filas": [ { "fila": 1, "columnas": 5 } ] }
+        }
+    }
+
+y tiene sus propios servicios de dominio (sesión, votación, padrón y mapa
+de dispositivos), su propio lock (las salas nunca se esperan entre sí),
+su journal en <journal_dir>/salas/<id>/ y su buffer de eventos de log.
+Sus endpoints son los mismos bajo /salas/<id>/..., por ejemplo:
+
+    POST /salas/hacienda/moderacion/abrir_sesion
+    GET  /salas/hacienda/estados/estado_global
+    POST /salas/hacienda/entradas/tecla
+
+Las salas adicionales viven en memoria de un solo proceso: no se combinan
+con estado_compartido_db (varios workers), y no usan estado_mmap ni el
+historial, que son de la sala principal.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.config.settings import SalaConfig
+from app.services.journal_service import JournalService, journal_service
+from app.services.sesion_service import SesionService, sesion_service
+from app.services.votacion_service import VotacionService, votacion_service
+
+
+class Sala:
+    """Servicios de dominio de una sala."""
+
+    def __init__(self, id: Optional[str], nombre: str, sesion_service: SesionService,
+                 votacion_service: VotacionService, journal: JournalService) -> None:
+        self.id = id                    # None = sala principal
+        self.nombre = nombre
+        self.sesion_service = sesion_service
+        self.votacion_service = votacion_service
+        self.journal = journal
+
+    @property
+    def principal(self) -> bool:
+        return self.id is None
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "nombre": self.nombre}
+
+
+class SalaService:
+    """
+    Registro de salas.
+
+    - La principal existe siempre; las adicionales se crean en iniciar().
+    """
+
+    def __init__(self) -> None:
+        self.principal = Sala(None, "Recinto", sesion_service, votacion_service, journal_service)
+        self._salas: Dict[str, Sala] = {}
+
+    def obtener(self, sala_id: Optional[str]) -> Sala:
+        """Sala por id (None = principal). ValueError si no existe."""
+        if sala_id is None:
+            return self.principal
+        sala = self._salas.get(sala_id)
+        if sala is None:
+            raise ValueError("sala_inexistente")
+        return sala
+
+    def listar(self) -> List[Sala]:
+        return [self.principal] + list(self._salas.values())
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def _crear(self, sala_id: str, config: SalaConfig) -> Sala:
+        journal = JournalService()
+        ss = SesionService(
+            sala=sala_id,
+            concejales_file=config.concejales_file,
+            quorum=config.quorum,
+            disposicion_bancas=config.disposicion_bancas.model_dump(),
+            journal=journal,
+        )
+        vs = VotacionService(ss)
+        journal.vincular(ss, vs)
+        return Sala(sala_id, config.nombre or sala_id, ss, vs, journal)
+
+    def iniciar(self) -> None:
+        """Crea las salas de settings.salas y recupera su estado del journal."""
+        for sala_id, config in settings.salas.items():
+            if sala_id in self._salas:
+                continue
+            sala = self._crear(sala_id, config)
+            if settings.journal_dir:
+                sala.journal.iniciar(os.path.join(settings.journal_dir, "salas", sala_id))
+            self._salas[sala_id] = sala
+
+    def detener(self) -> None:
+        for sala in self._salas.values():
+            sala.journal.detener()
+
+
+# Instancia única
+sala_service = SalaService()
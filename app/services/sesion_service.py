@@ -1,20 +1,31 @@
 import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 
-from typing import List, Optional, TYPE_CHECKING
+from typing import Any, Dict, Iterator, List, Optional, TYPE_CHECKING
 
 from app.config import settings
 from app.utils import logging
+from app.utils.vencimiento import Vencimiento
 from app.models.sesion import Sesion
 from app.models.concejal import Concejal
-from app.services.concejal_service import cargar_concejales_desde_archivo
+from app.models.orden_del_dia import OrdenDelDia
+from app.services.concejal_service import concejal_service
+from app.services.estado_compartido_service import estado_compartido_service
+from app.services.journal_service import JournalService, journal_service
+from app.services.snapshot_service import concejal_a_dict
 
 if TYPE_CHECKING:
     from app.models.votacion import Votacion, EstadosVotacion
+    from app.services.votacion_service import VotacionService
 from app.models.votacion import EstadosVotacion
 
 
-
-
+def _minutos(segundos: float) -> str:
+    """Duración como m:ss (para el log)."""
+    m, s = divmod(round(segundos), 60)
+    return f"{m}:{s:02d}"
 
 
 class SesionService:
@@ -24,10 +35,121 @@ class SesionService:
     - Mantiene una ÚNICA sesión en memoria (sesion_actual).
     - Abre/cierra sesión.
     - Registra en log aperturas, cierres y aperturas fallidas.
+    - Registra en el journal cada comando aplicado (ver journal_service).
+    - Guarda el orden del día cargado en la sala (independiente de la
+      sesión: se puede cargar antes de abrirla y sigue al cerrarla).
+    - Uso de la palabra: cola, turnos (con tiempo límite opcional, que
+      vence solo) y tiempos por concejal; el resumen queda en el log y en
+      el journal al cerrar la sesión.
+
+    Concurrencia: los endpoints corren en un threadpool. Todo acceso al
+    estado (comandos y lecturas) se hace con `lock` tomado; para comandos
+    usar comando(), que además espera a que el journal esté en disco, y
+    para lecturas lectura(). Con varios workers ambos sincronizan además
+    con el estado compartido (ver estado_compartido_service).
+
+    Salas: la instancia de este módulo es la de la sala principal (padrón,
+    quórum y bancas de settings). Cada sala adicional crea la suya con su
+    propia configuración, lock, journal y buffer de log (ver sala_service);
+    el estado compartido entre workers y la publicación en memoria
+    compartida son solo de la sala principal.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        sala: Optional[str] = None,
+        concejales_file: Optional[str] = None,
+        quorum: Optional[int] = None,
+        disposicion_bancas: Optional[Dict[str, Any]] = None,
+        journal: Optional[JournalService] = None,
+    ) -> None:
         self.sesion_actual: Optional[Sesion] = None
+        self.orden_del_dia: Optional[OrdenDelDia] = None
+        self.lock = threading.RLock()
+
+        # Sala adicional (None = principal) y su configuración (None = settings)
+        self.sala = sala
+        self.concejales_file = concejales_file
+        self.quorum = quorum
+        self.disposicion_bancas = disposicion_bancas
+        self.journal = journal or journal_service
+        self.log = logging.BufferSala(sala) if sala else None
+
+        # Lo asigna VotacionService al crearse
+        self.votacion_service: Optional["VotacionService"] = None
+        # Fin por tiempo límite del turno de uso de la palabra en curso
+        self._fin_turno = Vencimiento(self._al_vencer_turno, "palabra", self.lock)
+        # Revisión del estado en memoria de este proceso: sube al salir de
+        # cada comando y al traer otra revisión de la base compartida
+        # (clave de caché de vistas_service)
+        self.revision = 0
+
+    @property
+    def principal(self) -> bool:
+        return self.sala is None
+
+    @contextmanager
+    def comando(self) -> Iterator[None]:
+        """
+        Ejecuta un comando de dominio: exclusión mutua y, al salir, espera
+        el fsync del journal (fuera del lock, para agrupar escrituras).
+
+        Al salir (con el lock) sube la revisión y reprograma los tiempos
+        límite, por si el comando abrió o cerró una votación o un turno de
+        la palabra.
+        """
+        from app.services.publicacion_service import publicacion_service
+
+        if not self.principal:
+            with self.lock, logging.en_sala(self.log):
+                try:
+                    yield
+                finally:
+                    self.revision += 1
+                    self.programar_vencimientos()
+            self.journal.confirmar()
+            return
+
+        with self.lock, estado_compartido_service.escritura():
+            try:
+                yield
+            finally:
+                self.revision += 1
+                self.programar_vencimientos()
+                # También si el comando fue rechazado: cambió el log de eventos
+                publicacion_service.publicar()
+        self.journal.confirmar()
+
+    def programar_vencimientos(self) -> None:
+        """
+        Arma (o cancela) los timers de tiempo límite: votación en curso y
+        turno de la palabra. Con el lock tomado: al salir de cada comando,
+        después de recuperar el journal y al traer el estado de la base
+        compartida. Si no cambió ninguna hora no hace nada.
+        """
+        self.votacion_service.programar_vencimiento()
+        sesion = self.sesion_actual
+        self._fin_turno.programar(sesion.palabra.vence if sesion is not None else None)
+
+    def _al_vencer_turno(self) -> None:
+        """Timer del turno: quita la palabra si sigue el mismo turno y venció."""
+        with self.comando():
+            sesion = self.sesion_actual
+            vence = sesion.palabra.vence if sesion is not None else None
+            if vence is None or vence > datetime.now():
+                return
+            logging.log_internal("PALABRA", 3, "Venció el tiempo de uso de la palabra (%s s)",
+                                 f"{sesion.palabra.duracion_s:g}")
+            # El turno termina a la hora límite (no cuando corrió el timer)
+            self.quitar_uso_palabra(hora=vence)
+
+    @contextmanager
+    def lectura(self) -> Iterator[None]:
+        """Lectura consistente del estado (última revisión si hay varios workers)."""
+        with self.lock, logging.en_sala(self.log):
+            if self.principal:
+                estado_compartido_service.refrescar()
+            yield
 
     def abrir_sesion(self, numero_sesion: int) -> Sesion:
         """
@@ -36,6 +158,7 @@ class SesionService:
         Reglas:
         - Si ya hay sesión abierta -> ValueError + log de APERTURA_FALLIDA.
         - Si falta archivo de concejales -> ValueError + log de APERTURA_FALLIDA.
+        - Si el padrón es inválido (repetidos, banca no numérica) -> ValueError + log.
         - Si la lista de concejales está vacía -> ValueError + log de APERTURA_FALLIDA.
         """
 
@@ -44,12 +167,18 @@ class SesionService:
             logging.log_internal("SESION",2, "Rechazo de apertura de sesión porque ya hay sesión abierta")
             raise ValueError("ya_hay_sesión_abierta")
 
+        # Una sola versión de la configuración para toda la apertura
+        cfg = settings.actual
+
         # Cargamos concejales ANTES de crear la sesión
         try:
-            concejales: List[Concejal] = cargar_concejales_desde_archivo(settings.concejales_file)
+            concejales: List[Concejal] = concejal_service.concejales(self.concejales_file or cfg.concejales_file)
         except FileNotFoundError:
             logging.log_internal("SESION",2, "Rechazo de apertura de sesión porque no hay archivo de concejales")
             raise ValueError("no_hay_archivo_concejales")
+        except ValueError as e:
+            logging.log_internal("SESION",2, "Rechazo de apertura de sesión por padrón inválido: %s", e)
+            raise ValueError("padron_invalido")
 
         if not concejales:
             logging.log_internal("SESION",2, "Rechazo de apertura de sesión porque no hay concejales en el archivo")
@@ -59,14 +188,21 @@ class SesionService:
         sesion = Sesion(numero_sesion=numero_sesion)
         sesion.concejales = concejales
         sesion.presentes
-        sesion.quorum = settings.quorum
-        sesion.disposicion_bancas = json.dumps(settings.disposicion_bancas, indent=2)
+        sesion.quorum = cfg.quorum if self.quorum is None else self.quorum
+        sesion.disposicion_bancas = json.dumps(self.disposicion_bancas or cfg.disposicion_bancas.model_dump(), indent=2)
         
 
         self.sesion_actual = sesion
 
         # Log de apertura exitosa
         logging.log_internal("SESION",3, "Apertura de sesión Nº" + str(self.sesion_actual.numero_sesion))
+        self.journal.registrar("abrir_sesion", {
+            "numero_sesion": sesion.numero_sesion,
+            "hora_inicio": sesion.hora_inicio.isoformat(),
+            "quorum": sesion.quorum,
+            "disposicion_bancas": sesion.disposicion_bancas,
+            "concejales": [concejal_a_dict(c) for c in concejales],
+        })
         return sesion
 
     def cerrar_sesion(self) -> Sesion:
@@ -79,7 +215,7 @@ class SesionService:
         - Si se cierra correctamente -> log de CIERRE_OK.
         """
 
-        from app.services.votacion_service import votacion_service
+        votacion_service = self.votacion_service
 
         if self.sesion_actual is None:
             logging.log_internal("SESION",2, "Cierre de sesión fallido porque no hay sesión abierta")
@@ -98,51 +234,179 @@ class SesionService:
                 votacion_service.cierre_forzado()
 
         sesion.cerrar() 
+        sesion.palabra.cerrar(sesion.hora_fin)
+        uso_de_palabra = self._resumir_uso_palabra(sesion)
  
         # Log de cierre exitoso
         logging.log_internal("SESION",3, "Cierre de sesión Nº" + str(self.sesion_actual.numero_sesion))
 
         # Dejamos la referencia en None (o podríamos solo dejar la Sesion cerrada)
         self.sesion_actual = None
+        self.journal.registrar("cerrar_sesion", {
+            "numero_sesion": sesion.numero_sesion,
+            "hora_inicio": sesion.hora_inicio.isoformat(),
+            "hora_fin": sesion.hora_fin.isoformat(),
+            "uso_de_palabra": uso_de_palabra,
+        })
 
         return sesion
 
 
+    def aplicar_configuracion(self) -> None:
+        """
+        Aplica a la sesión abierta el quórum y las bancas vigentes de settings
+        (recarga de config.json). Solo sala principal; las salas adicionales
+        toman su configuración al arrancar.
+        """
+        sesion = self.sesion_actual
+        if not self.principal or sesion is None or not sesion.abierta:
+            return
+
+        cfg = settings.actual
+        disposicion = json.dumps(cfg.disposicion_bancas.model_dump(), indent=2)
+        if sesion.quorum == cfg.quorum and sesion.disposicion_bancas == disposicion:
+            return
+
+        sesion.quorum = cfg.quorum
+        sesion.disposicion_bancas = disposicion
+        logging.log_internal("SESION", 3, "Configuración aplicada a la sesión Nº%s: quórum %s", sesion.numero_sesion, sesion.quorum)
+        self.journal.registrar("configurar", {"quorum": sesion.quorum, "disposicion_bancas": disposicion})
+
     def obtener_sesion_actual(self) -> Optional[Sesion]:
         """Devuelve la sesión actual (o None si no hay)."""
         return self.sesion_actual
 
+# metodos de orden del día
+
+    def cargar_orden_del_dia(self, orden: OrdenDelDia) -> None:
+        """Reemplaza el orden del día de la sala (ya parseado y validado)."""
+        self.orden_del_dia = orden
+        logging.log_internal("ORDEN_DIA", 3, "Orden del día cargado: %s (%s puntos)", orden.nombre or "sin nombre", len(orden))
+        self.journal.registrar("cargar_orden_del_dia", {
+            "nombre": orden.nombre,
+            "items": orden.to_dict()["items"],
+        })
+
+    def limpiar_orden_del_dia(self) -> None:
+        if self.orden_del_dia is None:
+            return
+        self.orden_del_dia = None
+        logging.log_internal("ORDEN_DIA", 2, "Orden del día descartado")
+        self.journal.registrar("limpiar_orden_del_dia", {})
+
 #metodos de uso de la palabra
 
-    def encolar_uso_palabra(self, concejal: Concejal) -> None:
+    def encolar_uso_palabra(self, concejal: Concejal, hora: Optional[datetime] = None) -> None:
         """Encola o Desencola un concejal"""
-        if concejal not in self.sesion_actual.pedidos_uso_de_palabra:
-            self.sesion_actual.pedidos_uso_de_palabra.append(concejal)
-            logging.log_internal("PALABRA",3, concejal.print_corto() + " pidió la palabra")
+        hora = hora or datetime.now()
+        palabra = self.sesion_actual.palabra
+        if concejal not in palabra:
+            palabra.encolar(concejal, hora)
+            logging.log_internal("PALABRA",3, concejal.print_corto() + " pidió la palabra (lugar " + str(palabra.posicion(concejal)) + ")")
         else:
-            self.sesion_actual.pedidos_uso_de_palabra.remove(concejal)
+            palabra.retirar(concejal, hora)
             logging.log_internal("PALABRA",3, concejal.print_corto() + " retiró el pedido la palabra")
+        self.journal.registrar("encolar_palabra", {"dni": concejal.dni, "hora": hora.isoformat()})
 
-    def otorgar_uso_palabra(self) -> None:
-        if self.sesion_actual.pedidos_uso_de_palabra:
-            self.sesion_actual.en_uso_de_palabra=self.sesion_actual.pedidos_uso_de_palabra.popleft()
-            logging.log_internal("PALABRA",3, "Se otorgó uso de la palabra a "+ self.sesion_actual.en_uso_de_palabra.print_corto())
-        else:
-            self.sesion_actual.en_uso_de_palabra=None
-            logging.log_internal("PALABRA",2, "Fallo dar uso de la palabra, porque no hay solicitudes en cola")
-
-    def quitar_uso_palabra(self) -> None:
-            if self.sesion_actual.en_uso_de_palabra is not None:
-                s = self.sesion_actual.en_uso_de_palabra.print_corto()
-                self.sesion_actual.en_uso_de_palabra=None
-                logging.log_internal("PALABRA",3, "Dejó el uso de la palabra "+ s)
+    def otorgar_uso_palabra(self, duracion_s: Optional[float] = None, hora: Optional[datetime] = None) -> None:
+        """
+        Da la palabra al primero de la cola (termina el turno anterior).
+
+        duracion_s: tiempo límite del turno (0 < duracion_s <= 3600); al
+        vencer se quita la palabra sola.
+        """
+        if duracion_s is not None and not 0 < duracion_s <= 3600:
+            logging.log_internal("PALABRA",2, "Fallo dar uso de la palabra: tiempo límite inválido (%s)", duracion_s)
+            raise ValueError("duracion_invalida")
+
+        hora = hora or datetime.now()
+        palabra = self.sesion_actual.palabra
+        if not len(palabra):
+            # Sin pedidos en cola termina el turno en curso (si lo hay); una
+            # sola línea de log (no pasa por quitar_uso_palabra)
+            concejal = palabra.terminar_turno(hora)
+            if concejal is not None:
+                self.journal.registrar("quitar_palabra", {"hora": hora.isoformat()})
+                logging.log_internal("PALABRA",2, "Fallo dar uso de la palabra, porque no hay solicitudes en cola (dejó la palabra %s)", concejal.print_corto())
+            else:
+                logging.log_internal("PALABRA",2, "Fallo dar uso de la palabra, porque no hay solicitudes en cola")
+            return
+
+        concejal = palabra.otorgar(hora, duracion_s)
+        texto = "Se otorgó uso de la palabra a " + concejal.print_corto()
+        if duracion_s is not None:
+            texto += " (" + f"{duracion_s:g}" + " s)"
+        logging.log_internal("PALABRA",3, texto)
+        self.journal.registrar("otorgar_palabra", {"hora": hora.isoformat(), "duracion_s": duracion_s})
+
+    def quitar_uso_palabra(self, hora: Optional[datetime] = None) -> None:
+            hora = hora or datetime.now()
+            concejal = self.sesion_actual.palabra.terminar_turno(hora)
+            if concejal is not None:
+                logging.log_internal("PALABRA",3, "Dejó el uso de la palabra "+ concejal.print_corto())
+                self.journal.registrar("quitar_palabra", {"hora": hora.isoformat()})
             else:
                 logging.log_internal("PALABRA",2, "Nadie a quien quitarle la palabra") 
 
+    def _resumir_uso_palabra(self, sesion: Sesion) -> List[Dict[str, Any]]:
+        """
+        Resumen de uso de la palabra de la sesión (ya cerrada): una fila por
+        concejal que pidió la palabra, de más a menos tiempo hablado. Queda
+        en el log y en el evento cerrar_sesion del journal (el historial lo guarda).
+        """
+        palabra = sesion.palabra
+        por_dni = {c.dni: c for c in sesion.concejales}
+        filas = sorted(
+            ({"dni": dni, **t.to_dict()} for dni, t in palabra.tiempos.items()),
+            key=lambda f: (-f["hablado_s"], f["dni"]),
+        )
+        for f in filas:
+            c = por_dni.get(f["dni"])
+            logging.log_internal("PALABRA", 3, "Resumen: %s - %s turnos, habló %s, esperó %s (%s pedidos)",
+                                 c.print_corto() if c else f["dni"], f["turnos"],
+                                 _minutos(f["hablado_s"]), _minutos(f["espera_s"]), f["pedidos"])
+        if filas:
+            logging.log_internal("PALABRA", 3, "Resumen: total hablado %s, espera total %s",
+                                 _minutos(palabra.total_hablado_s), _minutos(palabra.total_espera_s))
+        return filas
+
 # metodos de concejales:
 
+    def alternar_presencia(self, concejal: Concejal) -> None:
+        """
+        Alterna presente/ausente de un concejal y, si hay votación en curso,
+        recalcula si corresponde el cierre automático.
+        """
+        votacion_service = self.votacion_service
+
+        concejal.presente = not concejal.presente
+        self.sesion_actual.presentes = self.cantidad_concejales_presentes()
+        if concejal.presente:
+            logging.log_internal("INPUT", 3, "%s se PRESENTÓ", concejal)
+        else:
+            logging.log_internal("INPUT", 3, "%s se AUSENTÓ", concejal)
+
+        votacion = votacion_service.votacion_actual
+        if (votacion is not None) and (votacion.estado is EstadosVotacion.EN_CURSO):
+            votacion_service.recalcular_cierre_por_cambio_en_presencia()
+
+        self.journal.registrar("presencia", {
+            "dni": concejal.dni,
+            "hora_fin": votacion.hora_fin.isoformat() if votacion is not None and votacion.hora_fin else None,
+        })
+
+    def mostrar_test(self, concejal: Concejal, duracion_s: float) -> None:
+        """
+        Indicador de test (tecla 8). Efímero: no va al journal ni sube la
+        revisión compartida; con varios workers los demás lo toman de la
+        base (estado_compartido_service.publicar_test).
+        """
+        concejal.activar_test_temporal(duracion_s)
+        if self.principal:
+            estado_compartido_service.publicar_test(concejal.dni, duracion_s)
+
     def cantidad_concejales_presentes(self) -> int:
-            return sum(1 for c in self.sesion_actual.concejales if c.presente)
+            return self.sesion_actual.bancada.cantidad_presentes()
     
     def cantidad_concejales_totales(self) -> int:
             return len(self.sesion_actual.concejales)
@@ -0,0 +1,264 @@
+"""
+Captura y restauración del estado de dominio en memoria.
+
+El estado completo vive en sesion_service.sesion_actual,
+sesion_service.orden_del_dia y votacion_service.votacion_actual. Este módulo lo convierte a un dict
+JSON-friendly (y de vuelta a objetos) con TODO lo necesario para
+reconstruirlo exactamente: horas, ids, cola, turno y tiempos de uso de
+la palabra y los contadores de ids de Votacion y Voto.
+
+No confundir con los to_dict() de los modelos: esos son la vista para
+el frontend; esto es el formato de persistencia.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+from app.models.concejal import Concejal
+from app.models.orden_del_dia import OrdenDelDia
+from app.models.sesion import Sesion
+from app.models.uso_de_palabra import TiempoPalabra, UsoDePalabra
+from app.models.votacion import EstadosVotacion, Votacion
+from app.models.voto import ValorVoto, Voto
+
+if TYPE_CHECKING:
+    from app.services.sesion_service import SesionService
+    from app.services.votacion_service import VotacionService
+
+
+SNAPSHOT_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Funciones internas (helpers)
+# ---------------------------------------------------------------------------
+
+def _fecha(valor: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def concejal_a_dict(c: Concejal) -> Dict[str, Any]:
+    """Datos persistentes de un concejal."""
+    return {
+        "dni": c.dni,
+        "nombre": c.nombre,
+        "apellido": c.apellido,
+        "bloque": c.bloque,
+        "presente": c.presente,
+        "banca": c.banca,
+        "dispositivo_votacion": c.dispositivo_votacion,
+    }
+
+
+def concejal_desde_dict(d: Dict[str, Any]) -> Concejal:
+    c = Concejal(
+        dni=d["dni"],
+        nombre=d["nombre"],
+        apellido=d["apellido"],
+        bloque=d["bloque"],
+        presente=d["presente"],
+        banca=d["banca"],
+        dispositivo_votacion=d["dispositivo_votacion"],
+    )
+    # Indicador de test (tecla 8): se guarda como segundos restantes porque
+    # time.monotonic() no sirve entre reinicios
+    restante = d.get("mostrar_test_s", 0.0)
+    if restante > 0:
+        c.activar_test_temporal(restante)
+    return c
+
+
+def _concejal_con_test(c: Concejal, ahora: float) -> Dict[str, Any]:
+    d = concejal_a_dict(c)
+    restante = c._mostrar_test_hasta - ahora
+    if restante > 0:
+        d["mostrar_test_s"] = round(restante, 3)
+    return d
+
+
+def _votacion_a_dict(v: Votacion) -> Dict[str, Any]:
+    return {
+        "id": v.id,
+        "numero": v.numero,
+        "tipo": v.tipo,
+        "tema": v.tema,
+        "estado": v.estado.value,
+        "computa_sobre_los_presentes": v.computa_sobre_los_presentes,
+        "factor_mayoria_especial": v.factor_mayoria_especial,
+        "hora_inicio": v.hora_inicio.isoformat(),
+        "hora_fin": v.hora_fin.isoformat() if v.hora_fin else None,
+        "duracion_s": v.duracion_s,
+        "votos": [
+            {
+                "id": voto.id,
+                "dni": voto.concejal.dni if voto.concejal else None,
+                "valor": voto.valor_voto.value,
+                "hora": voto.hora_emision.isoformat(),
+            }
+            for voto in v.votos
+        ],
+    }
+
+
+def _votacion_desde_dict(d: Dict[str, Any], sesion_service: "SesionService",
+                         por_dni: Dict[str, Concejal]) -> Votacion:
+    v = Votacion(
+        sesion_service=sesion_service,
+        numero=d["numero"],
+        tipo=d["tipo"],
+        tema=d["tema"],
+        computa_sobre_los_presentes=d["computa_sobre_los_presentes"],
+        factor_mayoria_especial=d["factor_mayoria_especial"],
+        id=d["id"],
+        duracion_s=d.get("duracion_s"),
+    )
+    v.estado = EstadosVotacion(d["estado"])
+    v.hora_inicio = _fecha(d["hora_inicio"])
+    v.hora_fin = _fecha(d["hora_fin"])
+    v.votos = [
+        Voto(
+            concejal=por_dni.get(x["dni"]) if x["dni"] is not None else None,
+            valor_voto=ValorVoto(x["valor"]),
+            hora_emision=_fecha(x["hora"]),
+            id=x["id"],
+        )
+        for x in d["votos"]
+    ]
+    return v
+
+
+# ---------------------------------------------------------------------------
+# FUNCIONES PÚBLICAS
+# ---------------------------------------------------------------------------
+
+def _palabra_a_dict(p: UsoDePalabra) -> Dict[str, Any]:
+    return {
+        "cola": [{"dni": c.dni, "desde": desde.isoformat()} for c, desde in p.pedidos()],
+        "en_uso": p.en_uso.dni if p.en_uso else None,
+        "en_uso_desde": p.en_uso_desde.isoformat() if p.en_uso_desde else None,
+        "duracion_s": p.duracion_s,
+        "tiempos": {dni: [t.pedidos, t.turnos, t.hablado_s, t.espera_s] for dni, t in p.tiempos.items()},
+        "total_hablado_s": p.total_hablado_s,
+        "total_espera_s": p.total_espera_s,
+    }
+
+
+def _palabra_desde_dict(s: Dict[str, Any], por_dni: Dict[str, Concejal]) -> UsoDePalabra:
+    p = UsoDePalabra()
+    d = s.get("uso_de_palabra")
+    if d is None:
+        # Snapshots anteriores a los tiempos: solo la cola y quién habla
+        ahora = datetime.now()
+        for dni in s["pedidos_uso_de_palabra"]:
+            p.encolar(por_dni[dni], ahora)
+        if s["en_uso_de_palabra"]:
+            p.en_uso = por_dni[s["en_uso_de_palabra"]]
+            p.en_uso_desde = ahora
+        return p
+
+    for pedido in d["cola"]:
+        p.encolar(por_dni[pedido["dni"]], _fecha(pedido["desde"]))
+    p.en_uso = por_dni[d["en_uso"]] if d["en_uso"] else None
+    p.en_uso_desde = _fecha(d["en_uso_desde"])
+    p.duracion_s = d["duracion_s"]
+    # Después de encolar (que suma pedidos): los totales grabados mandan
+    p.tiempos = {dni: TiempoPalabra(*t) for dni, t in d["tiempos"].items()}
+    p.total_hablado_s = d["total_hablado_s"]
+    p.total_espera_s = d["total_espera_s"]
+    return p
+
+
+def capturar_estado(sesion_service: "SesionService", votacion_service: "VotacionService") -> Dict[str, Any]:
+    """
+    Devuelve el estado completo del dominio como dict JSON-friendly.
+
+    Debe llamarse con el lock de dominio tomado (sesion_service.lock).
+    """
+    sesion = sesion_service.sesion_actual
+    ahora = time.monotonic()
+    data: Dict[str, Any] = {
+        "version": SNAPSHOT_VERSION,
+        "next_id_votacion": Votacion._next_id,
+        "next_id_voto": Voto._next_id,
+        "sesion": None,
+        "votacion_actual": None,
+        "orden_del_dia": None,
+    }
+
+    orden = sesion_service.orden_del_dia
+    if orden is not None:
+        data["orden_del_dia"] = orden.to_dict()
+
+    if sesion is None:
+        return data
+
+    data["sesion"] = {
+        "numero_sesion": sesion.numero_sesion,
+        "abierta": sesion.abierta,
+        "hora_inicio": sesion.hora_inicio.isoformat(),
+        "hora_fin": sesion.hora_fin.isoformat() if sesion.hora_fin else None,
+        "presentes": sesion.presentes,
+        "quorum": sesion.quorum,
+        "disposicion_bancas": sesion.disposicion_bancas,
+        "concejales": [_concejal_con_test(c, ahora) for c in sesion.concejales],
+        "votaciones": [_votacion_a_dict(v) for v in sesion.votaciones],
+        "uso_de_palabra": _palabra_a_dict(sesion.palabra),
+    }
+
+    actual = votacion_service.votacion_actual
+    for i, v in enumerate(sesion.votaciones):
+        if v is actual:
+            data["votacion_actual"] = i
+            break
+
+    return data
+
+
+def restaurar_estado(data: Dict[str, Any], sesion_service: "SesionService",
+                     votacion_service: "VotacionService") -> None:
+    """
+    Reemplaza el estado en memoria por el capturado en `data`.
+
+    Debe llamarse con el lock de dominio tomado (sesion_service.lock).
+    """
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError("version_snapshot_no_soportada")
+
+    Votacion._next_id = max(Votacion._next_id, data["next_id_votacion"])
+    Voto._next_id = max(Voto._next_id, data["next_id_voto"])
+
+    # Snapshots anteriores al orden del día no traen la clave. Si es el
+    # mismo que ya está en memoria (misma versión) no se vuelve a armar
+    orden = data.get("orden_del_dia")
+    actual = sesion_service.orden_del_dia
+    if orden is None:
+        sesion_service.orden_del_dia = None
+    elif actual is None or actual.version != orden["version"]:
+        sesion_service.orden_del_dia = OrdenDelDia.desde_dict(orden)
+
+    s = data["sesion"]
+    if s is None:
+        sesion_service.sesion_actual = None
+        votacion_service.votacion_actual = None
+        return
+
+    sesion = Sesion(numero_sesion=s["numero_sesion"])
+    sesion.abierta = s["abierta"]
+    sesion.hora_inicio = _fecha(s["hora_inicio"])
+    sesion.hora_fin = _fecha(s["hora_fin"])
+    sesion.presentes = s["presentes"]
+    sesion.quorum = s["quorum"]
+    sesion.disposicion_bancas = s["disposicion_bancas"]
+    sesion.concejales = [concejal_desde_dict(c) for c in s["concejales"]]
+
+    por_dni = {c.dni: c for c in sesion.concejales}
+    sesion.votaciones = [_votacion_desde_dict(v, sesion_service, por_dni) for v in s["votaciones"]]
+    sesion.palabra = _palabra_desde_dict(s, por_dni)
+
+    sesion_service.sesion_actual = sesion
+
+    idx = data["votacion_actual"]
+    votacion_service.votacion_actual = sesion.votaciones[idx] if idx is not None else None
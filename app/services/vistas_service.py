@@ -0,0 +1,156 @@
+"""
+Vistas del estado por cliente: /estados/vista/{nombre}.
+
+estado_global es el documento completo (padrón, TODAS las votaciones de
+la sesión con sus votos, eventos) y crece con la sesión. Cada frontend
+usa solo una parte; las vistas son esa parte, ya serializada:
+
+    pantalla     sesión con solo la última votación, bancas, cola de la
+                 palabra y el turno en curso (sin tiempos por concejal);
+                 eventos. No crece con la cantidad de votaciones.
+    moderacion   como estado_global, pero con solo la última votación.
+    monitor      resumen: sesión sin padrón ni layout, última votación,
+                 uso de la palabra, orden del día y eventos.
+
+Caché: cada vista se arma y codifica a lo sumo una vez por estado (y por
+formato: JSON o MessagePack, ver app/utils/codificacion_binaria.py). La
+clave es (sesion_service.revision, logging.version_eventos()): la
+revisión sube al salir de cada comando y al traer otra revisión de la
+base compartida, y la versión de eventos con cada línea nueva de la cola
+de eventos. Lo único que cambia sin un comando es el indicador de test
+(tecla 8), que vence solo: la entrada guarda el primer vencimiento
+pendiente y después de esa hora se vuelve a armar.
+
+Las horas límite van como horas absolutas (vence_ms) y no como tiempo
+restante, así el documento no cambia entre comandos.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+from app.services.publicacion_service import codificar, poll_ms
+from app.utils import logging
+
+if TYPE_CHECKING:
+    from app.models.sesion import Sesion
+    from app.services.sesion_service import SesionService
+
+
+# ---------------------------------------------------------------------------
+# Armado de cada vista (con el lock de dominio tomado)
+# ---------------------------------------------------------------------------
+
+def _orden_del_dia(sesion_service: "SesionService", sesion: Optional["Sesion"]) -> Optional[Dict[str, Any]]:
+    orden = sesion_service.orden_del_dia
+    if orden is None:
+        return None
+    return orden.resumen(sesion.votaciones if sesion is not None else [])
+
+
+def _pantalla(sesion_service: "SesionService") -> Dict[str, Any]:
+    sesion = sesion_service.obtener_sesion_actual()
+    datos = None
+    if sesion is not None:
+        datos = sesion.to_dict(ultimas_votaciones=1)
+        uso = datos["uso_de_palabra"]
+        datos["uso_de_palabra"] = {
+            "en_uso_desde_ms": uso["en_uso_desde_ms"],
+            "duracion_s": uso["duracion_s"],
+            "vence_ms": uso["vence_ms"],
+        }
+    return {
+        "hay_sesion": sesion is not None,
+        "poll_ms": poll_ms(sesion),
+        "sesion": datos,
+        "eventos": logging.get_log_tail(),
+    }
+
+
+def _moderacion(sesion_service: "SesionService") -> Dict[str, Any]:
+    sesion = sesion_service.obtener_sesion_actual()
+    return {
+        "hay_sesion": sesion is not None,
+        "poll_ms": poll_ms(sesion),
+        "sesion": sesion.to_dict(ultimas_votaciones=1) if sesion is not None else None,
+        "orden_del_dia": _orden_del_dia(sesion_service, sesion),
+        "eventos": logging.get_log_tail(),
+    }
+
+
+def _monitor(sesion_service: "SesionService") -> Dict[str, Any]:
+    sesion = sesion_service.obtener_sesion_actual()
+    datos = None
+    if sesion is not None:
+        datos = sesion.to_dict(ultimas_votaciones=1)
+        del datos["concejales"], datos["layout_version"]
+    return {
+        "hay_sesion": sesion is not None,
+        "poll_ms": poll_ms(sesion),
+        "sesion": datos,
+        "orden_del_dia": _orden_del_dia(sesion_service, sesion),
+        "eventos": logging.get_log_tail(),
+    }
+
+
+VISTAS: Dict[str, Callable[["SesionService"], Dict[str, Any]]] = {
+    "pantalla": _pantalla,
+    "moderacion": _moderacion,
+    "monitor": _monitor,
+}
+
+
+def _proximo_vencimiento_test(sesion: Optional["Sesion"], ahora: float) -> float:
+    """Primer vencimiento (time.monotonic()) de un indicador de test activo; inf si no hay."""
+    if sesion is None:
+        return math.inf
+    return min((hasta for hasta in sesion.bancada.test_hasta if hasta > ahora), default=math.inf)
+
+
+class _Entrada:
+    __slots__ = ("clave", "valida_hasta", "data")
+
+    def __init__(self, clave: Tuple[int, int], valida_hasta: float, data: bytes) -> None:
+        self.clave = clave
+        self.valida_hasta = valida_hasta
+        self.data = data
+
+
+class VistasService:
+    """
+    Vistas por cliente, cacheadas ya codificadas.
+
+    - Una entrada por (sala, vista, formato): la última armada.
+    """
+
+    def __init__(self) -> None:
+        self._cache: Dict[Tuple[Optional[str], str, bool], _Entrada] = {}
+
+    def obtener(self, nombre: str, sesion_service: "SesionService", binario: bool = False) -> bytes:
+        """
+        Vista `nombre` de la sala de sesion_service (bytes JSON, o
+        MessagePack con binario=True).
+
+        Debe llamarse dentro de sesion_service.lectura(). ValueError si la
+        vista no existe.
+        """
+        armar = VISTAS.get(nombre)
+        if armar is None:
+            raise ValueError("vista_inexistente")
+
+        clave = (sesion_service.revision, logging.version_eventos())
+        ahora = time.monotonic()
+        entrada = self._cache.get((sesion_service.sala, nombre, binario))
+        if entrada is not None and entrada.clave == clave and ahora < entrada.valida_hasta:
+            return entrada.data
+
+        data = codificar(armar(sesion_service), binario)
+        valida_hasta = _proximo_vencimiento_test(sesion_service.obtener_sesion_actual(), ahora)
+        self._cache[(sesion_service.sala, nombre, binario)] = _Entrada(clave, valida_hasta, data)
+        return data
+
+
+# Instancia única
+vistas_service = VistasService()
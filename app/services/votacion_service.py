@@ -1,24 +1,36 @@
 from __future__ import annotations
 
 
+from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 
-from app.services.sesion_service import sesion_service
+from app.services.sesion_service import SesionService, sesion_service
 from app.models.votacion import Votacion, EstadosVotacion
 from app.models.voto import Voto, ValorVoto
 
 from app.utils import logging
+from app.utils.vencimiento import Vencimiento
+
+# Tope del tiempo límite de una votación (segundos)
+DURACION_MAXIMA_S = 3600
+
 
 class VotacionService:
     """
     Servicio para manejar la votación actual dentro de la sesión.
 
     - Solo puede haber una votación abierta por sesión.
-    - Usa sesion_service para acceder a la sesión actual.
+    - Usa su sesion_service (el de su sala) para acceder a la sesión actual.
+    - Si la votación en curso tiene tiempo límite, un timer la cierra al
+      vencer (ver programar_vencimiento()).
     """
 
-    def __init__(self) -> None:
+    def __init__(self, sesion_service: SesionService) -> None:
         self.votacion_actual: Optional[Votacion] = None
+        self.sesion_service = sesion_service
+        sesion_service.votacion_service = self
+        # Cierre por tiempo límite de la votación en curso
+        self._vencimiento = Vencimiento(self._al_vencer, "votacion", sesion_service.lock)
 
     # ------------------------------------------------------------------
     # Métodos privados de apoyo
@@ -54,22 +66,76 @@ class VotacionService:
     #     else:
     #         logging.log_internal("VOTACION",3,"Resultado: "+ self.votacion_actual.estado.value+" - Se espera voto de desempate")
 
+    def _avisar_resultado_proyectado(self, votacion: Votacion) -> None:
+        """
+        Loguea cuando el resultado de la votación en curso, si votan todos
+        los presentes que faltan, ya no depende de qué voten (ver
+        Votacion.en_vivo: no es el resultado oficial).
+        """
+        en_vivo = votacion.en_vivo()
+        proyectado = en_vivo["resultado_proyectado"] if en_vivo else None
+        if proyectado == votacion.proyectado_avisado:
+            return
+        votacion.proyectado_avisado = proyectado
+        if proyectado is not None:
+            logging.log_internal("VOTACION", 3, "Votacion Nº%s: si votan los presentes que faltan (%s) resulta %s",
+                                 votacion.numero, en_vivo["faltan_votar"], proyectado)
+
+    def _al_vencer(self) -> None:
+        """Timer del tiempo límite: cierra la votación si sigue en curso y venció."""
+        with self.sesion_service.comando():
+            votacion = self.votacion_actual
+            if votacion is None or votacion.estado is not EstadosVotacion.EN_CURSO:
+                return
+            vence = votacion.vence
+            if vence is None or vence > datetime.now():
+                # Cambió la votación o el timer se adelantó: al salir del comando se reprograma
+                return
+            logging.log_internal("VOTACION", 3, "Votacion Nº%s: venció el tiempo límite (%s s)",
+                                 votacion.numero, f"{votacion.duracion_s:g}")
+            try:
+                self.cierre_forzado()
+            except ValueError as e:
+                logging.log_internal("VOTACION", 2, "Fallo cierre por tiempo: %s", e)
+
     # ------------------------------------------------------------------
     # API pública del servicio
     # ------------------------------------------------------------------
 
-    def abrir_votacion(self, numero: int, tipo: str, tema: str, computa_sobre_los_presentes: bool, factor_mayoria_especial: float) -> Votacion:
+    def programar_vencimiento(self) -> None:
+        """
+        Arma (o cancela) el timer del tiempo límite según la votación actual.
+
+        Se llama con el lock de dominio tomado (ver
+        SesionService.programar_vencimientos). Con varios workers cada uno
+        arma su timer; el primero que vence cierra la votación y los demás
+        la encuentran cerrada.
+        """
+        votacion = self.votacion_actual
+        vence = None
+        if votacion is not None and votacion.estado is EstadosVotacion.EN_CURSO:
+            vence = votacion.vence
+        self._vencimiento.programar(vence)
+
+    def abrir_votacion(self, numero: int, tipo: str, tema: str, computa_sobre_los_presentes: bool, factor_mayoria_especial: float,
+                       duracion_s: Optional[float] = None) -> Votacion:
         """
         Abre una nueva votación en la sesión actual.
+
+        duracion_s: tiempo límite opcional (0 < duracion_s <= DURACION_MAXIMA_S);
+        al vencer se fuerza el cierre.
         """
 
+        if duracion_s is not None and not 0 < duracion_s <= DURACION_MAXIMA_S:
+            logging.log_internal("VOTACION",2,"Fallo apertura de votación: tiempo límite inválido (%s)", duracion_s)
+            raise ValueError("duracion_invalida")
 
-        sesion = sesion_service.obtener_sesion_actual()
+        sesion = self.sesion_service.obtener_sesion_actual()
         if sesion is None or not sesion.abierta:
             logging.log_internal("VOTACION",2,"Fallo apertura de votación al no haber sesión activa")
             raise ValueError("No_hay_sesion_abierta")
 
-        if sesion_service.cantidad_concejales_presentes() < sesion.quorum:
+        if self.sesion_service.cantidad_concejales_presentes() < sesion.quorum:
             logging.log_internal("VOTACION",2,"Falta quórum para abrir votación")
             raise ValueError("No_hay_quorum")
 
@@ -77,14 +143,60 @@ class VotacionService:
             logging.log_internal("VOTACION",2,"Fallo apertura de votación al ya haber una votación activa")
             raise ValueError("hay_una_votación_abierta")
 
-        votacion = Votacion(sesion_service=sesion_service ,numero=numero, tipo=tipo, tema=tema, computa_sobre_los_presentes=computa_sobre_los_presentes, factor_mayoria_especial=factor_mayoria_especial)
+        votacion = Votacion(sesion_service=self.sesion_service ,numero=numero, tipo=tipo, tema=tema, computa_sobre_los_presentes=computa_sobre_los_presentes, factor_mayoria_especial=factor_mayoria_especial, duracion_s=duracion_s)
+        votacion.preparar()
         sesion.votaciones.append(votacion)
         self.votacion_actual = votacion
 
         logging.log_internal("VOTACION",3,"Apertura de votación de tipo " + votacion.tipo + " Nº" + str(votacion.numero) +" con tema: " + votacion.tema)
+        if duracion_s is not None:
+            logging.log_internal("VOTACION", 3, "Votacion Nº%s con tiempo límite de %s s", votacion.numero, f"{duracion_s:g}")
+        self.sesion_service.journal.registrar("abrir_votacion", {
+            "id": votacion.id,
+            "numero": numero,
+            "tipo": tipo,
+            "tema": tema,
+            "computa_sobre_los_presentes": computa_sobre_los_presentes,
+            "factor_mayoria_especial": factor_mayoria_especial,
+            "hora_inicio": votacion.hora_inicio.isoformat(),
+            "duracion_s": duracion_s,
+        })
 
         return votacion
 
+    def abrir_votacion_orden_del_dia(self, id: Optional[int] = None, duracion_s: Optional[float] = None) -> Votacion:
+        """
+        Abre la votación de un punto del orden del día cargado: el de ese id
+        o, sin id, el siguiente (ver OrdenDelDia.siguiente). Número, tipo,
+        tema, respecto y factor salen del punto; duracion_s como en
+        abrir_votacion.
+        """
+        orden = self.sesion_service.orden_del_dia
+        if orden is None:
+            logging.log_internal("VOTACION", 2, "Fallo apertura de votación: no hay orden del día cargado")
+            raise ValueError("no_hay_orden_del_dia")
+
+        if id is not None:
+            item = orden.item(id)
+            if item is None:
+                logging.log_internal("VOTACION", 2, "Fallo apertura de votación: no existe el punto %s del orden del día", id)
+                raise ValueError("punto_inexistente")
+        else:
+            sesion = self.sesion_service.obtener_sesion_actual()
+            item = orden.siguiente(sesion.votaciones if sesion is not None else [])
+            if item is None:
+                logging.log_internal("VOTACION", 2, "Fallo apertura de votación: ya se votaron todos los puntos del orden del día")
+                raise ValueError("orden_del_dia_completo")
+
+        return self.abrir_votacion(
+            numero=item.nro_votacion,
+            tipo=item.tipo,
+            tema=item.tema,
+            computa_sobre_los_presentes=item.computa_sobre_los_presentes,
+            factor_mayoria_especial=item.factor_de_mayoria,
+            duracion_s=duracion_s,
+        )
+
     def registrar_voto(self, voto: Voto):
         """
         Registra el voto de un concejal en la votación actual.
@@ -100,7 +212,7 @@ class VotacionService:
         """
 
 
-        sesion = sesion_service.obtener_sesion_actual()
+        sesion = self.sesion_service.obtener_sesion_actual()
         if sesion is None or not sesion.abierta:
             logging.log_internal("VOTO",2,"Fallo registro de voto al no haber sesión  activa")
             raise ValueError("no_hay_sesion_abierta")
@@ -111,15 +223,32 @@ class VotacionService:
 
         votacion = self.votacion_actual
 
+        # Vencido el tiempo límite no se aceptan votos aunque el timer no haya
+        # cerrado todavía (se compara la hora del voto: igual al reaplicar el journal)
+        vence = votacion.vence
+        if vence is not None and voto.hora_emision >= vence:
+            logging.log_internal("VOTO",2,"Fallo registro de voto: venció el tiempo límite de la votación")
+            raise ValueError("votacion_vencida")
+
         # Puede levantar ValueError("votacion_cerrada" o "concejal_ya_voto")
         votacion.registrar_voto(voto)
-        logging.log_internal("VOTO",3,voto.concejal.print_corto() + " voto: "+voto.valor_voto.value)
+        logging.log_internal("VOTO", 3, "%s voto: %s", voto.concejal, voto.valor_voto.value)
+        self.sesion_service.journal.registrar("voto", {
+            "id": voto.id,
+            "dni": voto.concejal.dni,
+            "valor": voto.valor_voto.value,
+            "hora": voto.hora_emision.isoformat(),
+            "hora_fin": votacion.hora_fin.isoformat() if votacion.hora_fin else None,
+        })
 
         # Si corresponde, cerrar y loguear el cierre automático
         if (votacion.estado is not EstadosVotacion.EN_CURSO):
-            logging.log_internal("VOTACION",3, "Votacion Nº"+str(votacion.numero)+" completada. Resultado: "+votacion.estado.value+" - Votos: "+str(len(votacion.votos))+" de "+str(len(sesion.concejales))+" - "+str(votacion.contar_votos_por_tipo(ValorVoto.POSITIVO))+" Positivos, "+str(votacion.contar_votos_por_tipo(ValorVoto.NEGATIVO))+" Negativos y "+str(votacion.contar_votos_por_tipo(ValorVoto.ABSTENCION))+ " Abstenciones")
+            logging.log_internal("VOTACION", 3, lambda: "Votacion Nº%s completada. %s" % (
+                votacion.numero, votacion.resumen_resultado(len(sesion.concejales))))
             if (votacion.estado is not EstadosVotacion.EMPATADA):
                 self.votacion_actual=None
+        else:
+            self._avisar_resultado_proyectado(votacion)
 
         return
 
@@ -133,6 +262,8 @@ class VotacionService:
 
         votacion = self.votacion_actual
         votacion.recalcular_estado_por_cambio_ausencias()
+        if votacion.estado is EstadosVotacion.EN_CURSO:
+            self._avisar_resultado_proyectado(votacion)
 
 
     def cierre_forzado(self) -> Votacion:
@@ -140,7 +271,7 @@ class VotacionService:
         Fuerza el cierre de la votación actual.
         """
 
-        sesion = sesion_service.obtener_sesion_actual()
+        sesion = self.sesion_service.obtener_sesion_actual()
         if sesion is None or not sesion.abierta:
             raise ValueError("No hay sesión abierta.")
 
@@ -155,6 +286,7 @@ class VotacionService:
 
         votacion.cerrar()
         logging.log_internal("VOTACION",3, "Cierre forzado - sin votar: "+str(concejales_sin_voto))
+        self.sesion_service.journal.registrar("cierre_forzado", {"hora_fin": votacion.hora_fin.isoformat()})
 
         self.votacion_actual = None
 
@@ -177,7 +309,7 @@ class VotacionService:
         Esas validaciones se hacen en la capa de entrada (input_service).
         """
 
-        sesion = sesion_service.obtener_sesion_actual()
+        sesion = self.sesion_service.obtener_sesion_actual()
         if sesion is None or not sesion.abierta:
             logging.log_internal("VOTO",2,"Desempate fallo registro de voto al no haber sesión activa")
             raise ValueError("no_hay_sesion_abierta")
@@ -189,10 +321,18 @@ class VotacionService:
         votacion = self.votacion_actual
 
         votacion.desempatar_y_cerrar(voto)
-        logging.log_internal("VOTACION",3, "Votacion Nº"+str(votacion.numero)+" DESEMPATADA. Resultado: "+votacion.estado.value+" - Votos: "+str(len(votacion.votos))+" de "+str(len(sesion.concejales))+" - "+str(votacion.contar_votos_por_tipo(ValorVoto.POSITIVO))+" Positivos, "+str(votacion.contar_votos_por_tipo(ValorVoto.NEGATIVO))+" Negativos y "+str(votacion.contar_votos_por_tipo(ValorVoto.ABSTENCION))+ " Abstenciones")
+        logging.log_internal("VOTACION", 3, lambda: "Votacion Nº%s DESEMPATADA. %s" % (
+            votacion.numero, votacion.resumen_resultado(len(sesion.concejales))))
+        self.sesion_service.journal.registrar("desempate", {
+            "id": voto.id,
+            "dni": None,
+            "valor": voto.valor_voto.value,
+            "hora": voto.hora_emision.isoformat(),
+            "hora_fin": votacion.hora_fin.isoformat(),
+        })
         self.votacion_actual = None
 
         return votacion
 
 # Instancia única del servicio a importar desde otras partes
-votacion_service = VotacionService()
+votacion_service = VotacionService(sesion_service)
@@ -0,0 +1,162 @@
+"""
+Codificación binaria (MessagePack) del estado para los frontends.
+
+El estado en JSON repite claves largas ("computa_sobre_los_presentes",
+"dispositivo_votacion", ...) por cada concejal, voto y evento. Con
+`Accept: application/msgpack` estado_global y las vistas se devuelven en
+MessagePack (https://msgpack.org/) y las claves conocidas van como
+enteros: su posición en CLAVES.
+
+    CLAVES           diccionario de claves de esta versión del esquema
+    CLAVES_VERSION   huella de CLAVES: va en la cabecera X-Claves-Version
+                     de cada respuesta binaria; el cliente pide la lista
+                     a /estados/claves?version=... (inmutable) una vez
+
+Las claves que no están en CLAVES (p. ej. los dni de uso_de_palabra.tiempos)
+van como texto: un cliente con el diccionario de otra versión solo
+decodificaría mal las claves numéricas, por eso la versión viaja en
+cada respuesta. Agregar o mover una clave cambia la versión.
+
+Se codifica lo que devuelve jsonable_encoder (mismos valores que el
+JSON): None, bool, int, float (siempre float 64), str, listas y dicts.
+Sin dependencias: el decodificador para los frontends está en
+app/web/static/comun/msgpack.js.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+MEDIA_TYPE = "application/msgpack"
+# También se acepta el nombre no registrado que usan algunas bibliotecas
+_MEDIA_TYPES = (MEDIA_TYPE, "application/x-msgpack")
+
+# Claves de los documentos de estado (estado_global, vistas). El orden es
+# el número con el que viajan: las más repetidas primero (caben en un byte
+# igual, pero así quedan juntas las del padrón y los votos).
+CLAVES: Tuple[str, ...] = (
+    # eventos
+    "seq", "level", "line",
+    # concejal
+    "dni", "nombre", "apellido", "bloque", "presente", "banca",
+    "dispositivo_votacion", "mostrar_test",
+    # voto
+    "concejal", "valor_voto", "hora_emision",
+    # votación
+    "id", "numero", "tipo", "tema", "estado", "computa_sobre_los_presentes",
+    "factor_mayoria_especial", "hora_inicio", "hora_fin", "duracion_s",
+    "vence_ms", "votos", "en_vivo", "presentes", "emitidos", "faltan_votar",
+    "positivos_necesarios", "faltan_para_aprobar", "faltan_para_rechazar",
+    "resultado_proyectado",
+    # uso de la palabra
+    "pedidos_uso_de_palabra", "en_uso_de_palabra", "uso_de_palabra",
+    "en_uso_desde_ms", "cola", "desde_ms", "tiempos", "pedidos", "turnos",
+    "hablado_s", "espera_s", "total_hablado_s", "total_espera_s",
+    # sesión y documento
+    "hay_sesion", "poll_ms", "sesion", "numero_sesion", "abierta",
+    "cantidad_concejales", "cantidad_presentes", "quorum", "layout_version",
+    "concejales", "votaciones", "eventos",
+    # orden del día (resumen y punto)
+    "orden_del_dia", "version", "cantidad", "siguiente", "nro_votacion",
+    "factor_de_mayoria", "respecto",
+)
+
+CLAVES_VERSION = hashlib.sha256("\n".join(CLAVES).encode("utf-8")).hexdigest()[:12]
+
+
+def acepta_msgpack(accept: Optional[str]) -> bool:
+    """True si la cabecera Accept pide MessagePack."""
+    if not accept:
+        return False
+    return any(tipo.split(";", 1)[0].strip() in _MEDIA_TYPES for tipo in accept.split(","))
+
+
+# ---------------------------------------------------------------------------
+# Codificador
+# ---------------------------------------------------------------------------
+
+_F64 = struct.Struct(">d")
+
+
+def _entero(n: int) -> bytes:
+    if 0 <= n < 0x80:
+        return bytes((n,))
+    if -32 <= n < 0:
+        return bytes((n & 0xFF,))
+    if n >= 0:
+        if n <= 0xFF:
+            return b"\xcc" + bytes((n,))
+        if n <= 0xFFFF:
+            return b"\xcd" + n.to_bytes(2, "big")
+        if n <= 0xFFFFFFFF:
+            return b"\xce" + n.to_bytes(4, "big")
+        return b"\xcf" + n.to_bytes(8, "big")
+    if n >= -0x80:
+        return b"\xd0" + n.to_bytes(1, "big", signed=True)
+    if n >= -0x8000:
+        return b"\xd1" + n.to_bytes(2, "big", signed=True)
+    if n >= -0x80000000:
+        return b"\xd2" + n.to_bytes(4, "big", signed=True)
+    return b"\xd3" + n.to_bytes(8, "big", signed=True)
+
+
+def _texto(s: str) -> bytes:
+    b = s.encode("utf-8")
+    n = len(b)
+    if n < 32:
+        return bytes((0xA0 | n,)) + b
+    if n <= 0xFF:
+        return b"\xd9" + bytes((n,)) + b
+    if n <= 0xFFFF:
+        return b"\xda" + n.to_bytes(2, "big") + b
+    return b"\xdb" + n.to_bytes(4, "big") + b
+
+
+def _cabecera(n: int, fijo: int, c16: bytes, c32: bytes) -> bytes:
+    if n < 16:
+        return bytes((fijo | n,))
+    if n <= 0xFFFF:
+        return c16 + n.to_bytes(2, "big")
+    return c32 + n.to_bytes(4, "big")
+
+
+# Clave -> bytes ya codificados (su número en CLAVES)
+_CLAVES_BYTES: Dict[str, bytes] = {clave: _entero(i) for i, clave in enumerate(CLAVES)}
+
+
+def codificar(valor: Any) -> bytes:
+    """MessagePack de `valor` (ya pasado por jsonable_encoder), con las claves de CLAVES como enteros."""
+    partes = []
+    agregar = partes.append
+    claves = _CLAVES_BYTES
+
+    def cod(v: Any) -> None:
+        # bool antes que int (bool es subclase de int)
+        if v is None:
+            agregar(b"\xc0")
+        elif v is True:
+            agregar(b"\xc3")
+        elif v is False:
+            agregar(b"\xc2")
+        elif isinstance(v, str):
+            agregar(_texto(v))
+        elif isinstance(v, int):
+            agregar(_entero(v))
+        elif isinstance(v, float):
+            agregar(b"\xcb" + _F64.pack(v))
+        elif isinstance(v, dict):
+            agregar(_cabecera(len(v), 0x80, b"\xde", b"\xdf"))
+            for k, x in v.items():
+                agregar(claves.get(k) or _texto(k))
+                cod(x)
+        elif isinstance(v, (list, tuple)):
+            agregar(_cabecera(len(v), 0x90, b"\xdc", b"\xdd"))
+            for x in v:
+                cod(x)
+        else:
+            raise TypeError(f"tipo no codificable: {type(v).__name__}")
+
+    cod(valor)
+    return b"".join(partes)
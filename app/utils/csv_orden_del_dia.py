@@ -0,0 +1,277 @@
+"""
+Parser del CSV de orden del día (el que antes se parseaba en el navegador).
+
+    nro_votacion;tipo;tema;factor_de_mayoria;respecto
+
+Formato:
+    - Header obligatorio con esas 5 columnas, en ese orden (se toleran
+      mayúsculas, acentos y espacios). El separador es el del header: ';'
+      o ','. Se acepta BOM de UTF-8.
+    - Datos con las reglas de RFC 4180: un campo puede ir entre comillas
+      dobles y adentro puede tener separadores, saltos de línea y comillas
+      escritas como "". Fuera de las comillas de un campo solo se admiten
+      espacios. Saltos de línea CRLF, LF o CR; las líneas vacías se ignoran.
+
+Validación por fila (si una falla se rechaza el archivo completo):
+    - exactamente 5 columnas; se recortan espacios al inicio y al final
+    - nro_votacion: solo dígitos (puede repetirse: la numeración suele
+      reiniciarse en cada sección)
+    - tema: no vacío
+    - tipo: se compara sin mayúsculas, acentos ni espacios extra contra
+      TIPOS; si no coincide con ninguno queda "Otro"
+    - respecto: "Presentes" o "Cuerpo" (sin distinguir mayúsculas)
+    - factor_de_mayoria: vacío o "0" (mayoría simple) o decimal con punto
+      entre 0 y 1 (".66", "0.66", "1", "1.0"); sin coma decimal ni "%"
+
+Se parsea a medida que llegan los bytes (LectorOrdenDelDia.alimentar), sin
+juntar el archivo entero: el endpoint de carga lo usa sobre el stream del
+request y corta apenas encuentra un error o se pasa de LIMITE_BYTES.
+"""
+
+from __future__ import annotations
+
+import codecs
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from app.models.orden_del_dia import ItemOrdenDelDia, OrdenDelDia
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+COLUMNAS = ("nro_votacion", "tipo", "tema", "factor_de_mayoria", "respecto")
+
+# Valores canónicos (los del selector de tipo de la pantalla de moderación)
+TIPOS = (
+    "Ratificación",
+    "Despacho OP",
+    "Despacho Gob",
+    "Despacho AS",
+    "Despacho HA",
+    "Despacho Eco",
+    "Mocion",
+    "P. Sobre Tabla",
+    "Otro",
+)
+RESPECTOS = ("Presentes", "Cuerpo")
+
+# Tamaño máximo del archivo (un orden del día de cientos de puntos ocupa decenas de KB)
+LIMITE_BYTES = 1024 * 1024
+
+# Largo máximo del header sin salto de línea
+_LIMITE_HEADER = 1000
+
+_RE_NRO = re.compile(r"[0-9]+")
+_RE_FACTOR = re.compile(r"0?\.[0-9]+|1(?:\.0+)?")
+_RE_ESPACIOS = re.compile(r"\s+")
+_RE_MARCAS = re.compile("[\u0300-\u036f]")
+
+
+def normalizar(texto: str) -> str:
+    """Clave de comparación: sin acentos ni mayúsculas, espacios colapsados."""
+    sin_acentos = _RE_MARCAS.sub("", unicodedata.normalize("NFD", texto))
+    return _RE_ESPACIOS.sub(" ", sin_acentos.lower()).strip()
+
+
+_TIPOS_POR_CLAVE: Dict[str, str] = {normalizar(t): t for t in TIPOS}
+_RESPECTOS_POR_CLAVE: Dict[str, str] = {r.lower(): r for r in RESPECTOS}
+_COLUMNAS_CLAVE = [normalizar(c) for c in COLUMNAS]
+
+
+# ---------------------------------------------------------------------------
+# Validación de filas
+# ---------------------------------------------------------------------------
+
+def _item(fila: int, campos: List[str]) -> ItemOrdenDelDia:
+    if len(campos) != len(COLUMNAS):
+        raise ValueError(f"fila {fila} debe tener {len(COLUMNAS)} columnas (tiene {len(campos)})")
+
+    nro, tipo, tema, factor, respecto = (c.strip() for c in campos)
+
+    if not _RE_NRO.fullmatch(nro):
+        raise ValueError(f'nro_votacion inválido en fila {fila} ("{nro}")')
+
+    if not tema:
+        raise ValueError(f"tema vacío en fila {fila}")
+
+    respecto_canonico = _RESPECTOS_POR_CLAVE.get(respecto.lower())
+    if respecto_canonico is None:
+        raise ValueError(f'respecto inválido en fila {fila} ("{respecto}"). Permitidos: {", ".join(RESPECTOS)}')
+
+    if factor in ("", "0"):
+        valor_factor = 0.0
+    else:
+        if "," in factor or "%" in factor or not _RE_FACTOR.fullmatch(factor):
+            raise ValueError(f'factor_de_mayoria inválido en fila {fila} ("{factor}")')
+        valor_factor = float(factor)
+        if not 0 <= valor_factor <= 1:
+            raise ValueError(f'factor_de_mayoria fuera de rango 0..1 en fila {fila} ("{factor}")')
+
+    return ItemOrdenDelDia(
+        nro_votacion=int(nro),
+        tipo=_TIPOS_POR_CLAVE.get(normalizar(tipo), "Otro"),
+        tema=tema,
+        factor_de_mayoria=valor_factor,
+        respecto=respecto_canonico,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Lector incremental
+# ---------------------------------------------------------------------------
+
+class LectorOrdenDelDia:
+    """
+    Parser incremental: alimentar(bytes) por cada pedazo, terminar() al final.
+
+    ValueError (con el motivo) apenas el contenido es inválido.
+    """
+
+    def __init__(self, limite_bytes: int = LIMITE_BYTES) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._limite = limite_bytes
+        self._bytes = 0
+
+        self._separador: Optional[str] = None    # se fija al leer el header
+        self._re_especial: Optional["re.Pattern[str]"] = None
+        self._header = ""
+        self._resto = ""            # final ambiguo del pedazo anterior ('"' o '\r')
+
+        self._campo: List[str] = []
+        self._registro: List[str] = []
+        self._en_comillas = False   # dentro de un campo entre comillas
+        self._citado = False        # el campo en curso fue entre comillas (ya cerradas)
+
+        self._filas = 0
+        self.items: List[ItemOrdenDelDia] = []
+
+    # ---- Entrada ----
+
+    def alimentar(self, datos: bytes) -> None:
+        self._bytes += len(datos)
+        if self._bytes > self._limite:
+            raise ValueError(f"archivo demasiado grande (máximo {self._limite // 1024} KB)")
+        try:
+            texto = self._decoder.decode(datos)
+        except UnicodeDecodeError:
+            raise ValueError("el archivo no está en UTF-8")
+        self._procesar(texto, final=False)
+
+    def terminar(self, nombre: str = "") -> OrdenDelDia:
+        try:
+            texto = self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise ValueError("el archivo no está en UTF-8")
+        self._procesar(texto, final=True)
+
+        if self._separador is None:
+            self._leer_header(self._header)
+        if self._en_comillas:
+            raise ValueError("comillas sin cerrar")
+        if self._campo or self._registro or self._citado:
+            self._fin_campo()
+            self._fin_registro()
+        return OrdenDelDia(self.items, nombre)
+
+    # ---- Header ----
+
+    def _leer_header(self, linea: str) -> None:
+        separador = ";" if ";" in linea else ","
+        if [normalizar(c) for c in linea.split(separador)] != _COLUMNAS_CLAVE:
+            raise ValueError(f"header incorrecto. Esperado: {';'.join(COLUMNAS)} - Recibido: {linea.strip()}")
+        self._separador = separador
+        self._re_especial = re.compile('["\r\n' + re.escape(separador) + "]")
+
+    # ---- Datos ----
+
+    def _procesar(self, texto: str, final: bool) -> None:
+        texto = self._resto + texto
+        self._resto = ""
+
+        if self._separador is None:
+            self._header += texto
+            fin = min((i for i in (self._header.find("\n"), self._header.find("\r")) if i >= 0), default=-1)
+            if fin < 0 or (self._header[fin] == "\r" and fin + 1 == len(self._header) and not final):
+                if len(self._header) > _LIMITE_HEADER:
+                    raise ValueError("header incorrecto (sin salto de línea)")
+                return
+            linea, texto = self._header[:fin], self._header[fin + 1:]
+            if self._header[fin] == "\r" and texto.startswith("\n"):
+                texto = texto[1:]
+            self._leer_header(linea)
+
+        i, n = 0, len(texto)
+        while i < n:
+            if self._en_comillas:
+                j = texto.find('"', i)
+                if j < 0:
+                    self._campo.append(texto[i:])
+                    return
+                self._campo.append(texto[i:j])
+                if j + 1 == n and not final:
+                    # ¿Fin de comillas o comilla escapada ("")? Lo decide el próximo pedazo
+                    self._resto = '"'
+                    return
+                if j + 1 < n and texto[j + 1] == '"':
+                    self._campo.append('"')
+                    i = j + 2
+                else:
+                    self._en_comillas = False
+                    i = j + 1
+                continue
+
+            m = self._re_especial.search(texto, i)
+            fin = m.start() if m else n
+            if fin > i:
+                self._texto_suelto(texto[i:fin])
+            if m is None:
+                return
+            ch = m.group()
+            i = m.end()
+
+            if ch == '"':
+                if self._citado or "".join(self._campo).strip():
+                    raise ValueError(f"comillas fuera de lugar en fila {self._filas + 1}")
+                self._campo = []
+                self._en_comillas = True
+                self._citado = True
+            elif ch == self._separador:
+                self._fin_campo()
+            else:
+                if ch == "\r":
+                    if i == n and not final:
+                        self._resto = "\r"    # puede venir "\n" en el próximo pedazo
+                        return
+                    if i < n and texto[i] == "\n":
+                        i += 1
+                self._fin_campo()
+                self._fin_registro()
+
+    def _texto_suelto(self, texto: str) -> None:
+        if self._citado:
+            if texto.strip():
+                raise ValueError(f"carácter fuera de comillas en fila {self._filas + 1}: '{texto.strip()[0]}'")
+            return
+        self._campo.append(texto)
+
+    def _fin_campo(self) -> None:
+        self._registro.append("".join(self._campo))
+        self._campo = []
+        self._citado = False
+
+    def _fin_registro(self) -> None:
+        registro, self._registro = self._registro, []
+        if len(registro) == 1 and not registro[0].strip():
+            return    # línea vacía
+        self._filas += 1
+        self.items.append(_item(self._filas, registro))
+
+
+def parsear_orden_del_dia(datos: bytes, nombre: str = "") -> OrdenDelDia:
+    """Parsea y valida el CSV completo. ValueError si es inválido."""
+    lector = LectorOrdenDelDia()
+    lector.alimentar(datos)
+    return lector.terminar(nombre)
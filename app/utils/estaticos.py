@@ -0,0 +1,465 @@
+"""
+Recursos estáticos de los frontends: build con huella de contenido y
+precompresión, y el handler que los sirve.
+
+Build (paso de despliegue, desde la raíz del proyecto; después reiniciar
+el backend):
+    python -m app.utils.estaticos [--destino app/web/build]
+
+    Por cada sitio (SITIOS) y archivo:
+      - nombre con la huella del contenido: app.js -> app.3f2a9c0d41be.js
+      - variantes precomprimidas .gz (y .br si está instalado el paquete
+        `brotli`) de los tipos de texto, cuando achican
+      - imágenes PNG: variante .webp si está instalado Pillow y achica
+      - los index.html se reescriben para pedir los nombres con huella
+    y un manifest.json con todo lo anterior. Se arma en un directorio
+    aparte y recién al final reemplaza al build anterior.
+
+Servido (Estaticos, montado en main.py por sitio):
+    - Nombre con huella: Cache-Control inmutable (un año); el navegador no
+      lo vuelve a pedir.
+    - Nombre lógico (index.html, imágenes de bancas que arma el JS, el
+      SharedWorker): no-cache + ETag (huella del contenido) -> 304.
+    - Variante según Accept-Encoding (br, gzip) y Accept (image/webp), con
+      Vary.
+    - FileResponse con el stat hecho al cargar el manifest; si el servidor
+      ASGI soporta "http.response.pathsend" el archivo va por sendfile.
+
+    Sin build, o si algún archivo fuente cambió después del build, el
+    sitio se sirve como antes con StaticFiles (y se loguea).
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import URL, Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, RedirectResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+# (prefijo, directorio fuente, html): cada sitio se monta en /<prefijo>
+SITIOS: Tuple[Tuple[str, str, bool], ...] = (
+    ("monitor-simple", "app/web/static/monitor_simple", True),   # monitor simple
+    ("moderacion", "app/web/static/moderacion", True),           # pantalla de moderación
+    ("pantalla", "app/web/static/pantalla", True),               # pantalla de recinto
+    ("comun", "app/web/static/comun", False),                    # scripts compartidos
+    ("bancas", "app/web/static/bancas", False),                  # SOLO imágenes de bancas
+)
+
+DESTINO = "app/web/build"
+MANIFIESTO = "manifest.json"
+MANIFIESTO_VERSION = 1
+
+# Tipos que se precomprimen
+_COMPRIMIBLES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+# Una variante comprimida se guarda solo si achica al menos un 10 %
+_MINIMO_AHORRO = 0.9
+
+_CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+_CACHE_REVALIDAR = "no-cache"
+
+# src="..." / href="..." en los index.html
+_RE_REFERENCIA = re.compile(r'\b(src|href)="([^"?#]+)"')
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _huella(datos: bytes) -> str:
+    return hashlib.sha1(datos).hexdigest()[:12]
+
+
+def _con_huella(nombre: str, huella: str) -> str:
+    base, ext = os.path.splitext(nombre)
+    return f"{base}.{huella}{ext}"
+
+
+def _tipo(nombre: str) -> str:
+    return mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+
+
+def _escribir(ruta: str, datos: bytes) -> None:
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "wb") as f:
+        f.write(datos)
+
+
+def _listar(fuente: str) -> List[str]:
+    """Archivos del sitio (rutas relativas con '/'), sin ocultos."""
+    archivos = []
+    for raiz, dirs, nombres in os.walk(fuente):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for nombre in sorted(nombres):
+            if not nombre.startswith("."):
+                archivos.append(os.path.relpath(os.path.join(raiz, nombre), fuente).replace(os.sep, "/"))
+    return archivos
+
+
+def _brotli() -> Any:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _webp(datos: bytes) -> Optional[bytes]:
+    """Versión WebP de una imagen (si está Pillow y achica), o None."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    with Image.open(io.BytesIO(datos)) as img:
+        buf = io.BytesIO()
+        img.save(buf, "WEBP", quality=85, method=6)
+    webp = buf.getvalue()
+    return webp if len(webp) < len(datos) else None
+
+
+def _comprimir(ruta: str, datos: bytes, tipo: str, brotli: Any) -> List[str]:
+    """Escribe <ruta>.br / <ruta>.gz si achican. Devuelve las codificaciones."""
+    if not tipo.startswith(_COMPRIMIBLES):
+        return []
+    codificaciones = []
+    if brotli is not None:
+        br = brotli.compress(datos, quality=11)
+        if len(br) < len(datos) * _MINIMO_AHORRO:
+            _escribir(ruta + ".br", br)
+            codificaciones.append("br")
+    gz = gzip.compress(datos, 9, mtime=0)
+    if len(gz) < len(datos) * _MINIMO_AHORRO:
+        _escribir(ruta + ".gz", gz)
+        codificaciones.append("gzip")
+    return codificaciones
+
+
+def _agregar(dir_sitio: str, logico: str, datos: bytes, huella_en_nombre: bool, brotli: Any) -> Dict[str, Any]:
+    """Escribe un archivo (y sus variantes) en el build. Devuelve su entrada del manifest."""
+    huella = _huella(datos)
+    archivo = _con_huella(logico, huella) if huella_en_nombre else logico
+    tipo = _tipo(logico)
+    ruta = os.path.join(dir_sitio, archivo)
+    _escribir(ruta, datos)
+
+    entrada: Dict[str, Any] = {
+        "archivo": archivo,
+        "huella": huella,
+        "tipo": tipo,
+        "bytes": len(datos),
+        "codificaciones": _comprimir(ruta, datos, tipo, brotli),
+        "webp": None,
+    }
+    if tipo == "image/png":
+        webp = _webp(datos)
+        if webp is not None:
+            _escribir(ruta + ".webp", webp)
+            entrada["webp"] = archivo + ".webp"
+    return entrada
+
+
+def _reescribir_html(texto: str, prefijo: str, huellas: Dict[str, Dict[str, str]]) -> str:
+    """src / href a archivos del build -> nombre con huella (misma forma de ruta)."""
+
+    def reemplazo(m: "re.Match[str]") -> str:
+        attr, ref = m.group(1), m.group(2)
+        if "://" in ref or ref.startswith("//"):
+            return m.group(0)
+        if ref.startswith("/"):
+            sitio, _, archivo = ref[1:].partition("/")
+            base = f"/{sitio}/"
+        else:
+            sitio = prefijo
+            archivo = ref[2:] if ref.startswith("./") else ref
+            base = ref[:len(ref) - len(archivo)]
+        nuevo = huellas.get(sitio, {}).get(archivo)
+        return f'{attr}="{base}{nuevo}"' if nuevo else m.group(0)
+
+    return _RE_REFERENCIA.sub(reemplazo, texto)
+
+
+def construir(destino: str = DESTINO) -> Dict[str, Any]:
+    """Arma el build de todos los SITIOS en `destino`. Devuelve el manifest."""
+    brotli = _brotli()
+    destino = destino.rstrip("/\\")
+    nuevo = destino + ".nuevo"
+    shutil.rmtree(nuevo, ignore_errors=True)
+
+    sitios: Dict[str, Any] = {}
+    huellas: Dict[str, Dict[str, str]] = {}
+    html_pendientes = []
+
+    # 1) Todo menos los .html, con huella en el nombre
+    for prefijo, fuente, _html in SITIOS:
+        sitios[prefijo] = {"fuente": fuente, "archivos": {}}
+        huellas[prefijo] = {}
+        for logico in _listar(fuente):
+            with open(os.path.join(fuente, logico), "rb") as f:
+                datos = f.read()
+            if logico.endswith(".html"):
+                html_pendientes.append((prefijo, logico, datos))
+                continue
+            entrada = _agregar(os.path.join(nuevo, prefijo), logico, datos, True, brotli)
+            sitios[prefijo]["archivos"][logico] = entrada
+            huellas[prefijo][logico] = entrada["archivo"]
+
+    # 2) Los .html (puntos de entrada: mismo nombre), apuntando a los nombres con huella
+    for prefijo, logico, datos in html_pendientes:
+        texto = _reescribir_html(datos.decode("utf-8"), prefijo, huellas)
+        sitios[prefijo]["archivos"][logico] = _agregar(
+            os.path.join(nuevo, prefijo), logico, texto.encode("utf-8"), False, brotli
+        )
+
+    manifiesto = {
+        "version": MANIFIESTO_VERSION,
+        "construido": time.time(),
+        "brotli": brotli is not None,
+        "sitios": sitios,
+    }
+    _escribir(os.path.join(nuevo, MANIFIESTO),
+              json.dumps(manifiesto, ensure_ascii=False, indent=1).encode("utf-8"))
+
+    # Reemplazo del build anterior
+    viejo = destino + ".viejo"
+    shutil.rmtree(viejo, ignore_errors=True)
+    if os.path.isdir(destino):
+        os.replace(destino, viejo)
+    os.replace(nuevo, destino)
+    shutil.rmtree(viejo, ignore_errors=True)
+    return manifiesto
+
+
+# ---------------------------------------------------------------------------
+# Servido
+# ---------------------------------------------------------------------------
+
+class _Archivo:
+    """Archivo del build con sus variantes resueltas: (ruta, stat) de cada una."""
+
+    __slots__ = ("tipo", "huella", "original", "codificaciones", "webp", "vary")
+
+    def __init__(self, dir_sitio: str, entrada: Dict[str, Any]) -> None:
+        def variante(nombre: str) -> Tuple[str, os.stat_result]:
+            ruta = os.path.join(dir_sitio, nombre)
+            return ruta, os.stat(ruta)
+
+        self.tipo: str = entrada["tipo"]
+        self.huella: str = entrada["huella"]
+        self.original = variante(entrada["archivo"])
+        self.codificaciones = {c: variante(entrada["archivo"] + (".br" if c == "br" else ".gz"))
+                               for c in entrada["codificaciones"]}
+        self.webp = variante(entrada["webp"]) if entrada.get("webp") else None
+
+        vary = []
+        if self.webp is not None:
+            vary.append("Accept")
+        if self.codificaciones:
+            vary.append("Accept-Encoding")
+        self.vary = ", ".join(vary)
+
+    def elegir(self, accept: str, aceptadas: set) -> Tuple[str, os.stat_result, str, Optional[str], str]:
+        """(ruta, stat, tipo, content-encoding, sufijo del ETag) de la variante a servir."""
+        if self.webp is not None and "image/webp" in accept:
+            return self.webp[0], self.webp[1], "image/webp", None, "-webp"
+        for codificacion in ("br", "gzip"):
+            v = self.codificaciones.get(codificacion)
+            if v is not None and codificacion in aceptadas:
+                return v[0], v[1], self.tipo, codificacion, "-" + codificacion
+        return self.original[0], self.original[1], self.tipo, None, ""
+
+
+def _codificaciones_aceptadas(accept_encoding: str) -> set:
+    aceptadas = set()
+    for parte in accept_encoding.split(","):
+        codificacion, _, params = parte.partition(";")
+        q = params.replace(" ", "").lower()
+        if q.startswith("q=") and q[2:].strip("0.") == "":
+            continue  # q=0: no aceptada
+        aceptadas.add(codificacion.strip().lower())
+    return aceptadas
+
+
+def _coincide_etag(if_none_match: str, etag: str) -> bool:
+    for parte in if_none_match.split(","):
+        parte = parte.strip()
+        if parte == "*" or parte.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _ruta_relativa(scope: Scope) -> str:
+    """Ruta pedida dentro del montaje (como StaticFiles)."""
+    path: str = scope["path"]
+    root_path: str = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        return path[len(root_path):]
+    return path
+
+
+def _sitio_vigente(destino: str, prefijo: str, fuente: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Entrada del manifest del sitio si el build existe y está al día con la
+    fuente; si no (None, motivo).
+    """
+    try:
+        with open(os.path.join(destino, MANIFIESTO), "r", encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except FileNotFoundError:
+        return None, "sin build"
+    except ValueError:
+        return None, "manifest inválido"
+    if manifiesto.get("version") != MANIFIESTO_VERSION:
+        return None, "manifest de otra versión"
+
+    sitio = manifiesto.get("sitios", {}).get(prefijo)
+    if sitio is None:
+        return None, "sitio fuera del build"
+    fuentes = _listar(fuente)
+    if set(fuentes) != set(sitio["archivos"]):
+        return None, "cambiaron los archivos de la fuente"
+    construido = manifiesto.get("construido", 0)
+    if any(os.stat(os.path.join(fuente, f)).st_mtime > construido for f in fuentes):
+        return None, "la fuente es más nueva que el build"
+    return sitio, ""
+
+
+class Estaticos:
+    """
+    Sitio estático (app ASGI para app.mount) servido desde el build.
+
+    El manifest se lee en el primer pedido. Sin build vigente delega en
+    StaticFiles sobre el directorio fuente.
+    """
+
+    def __init__(self, prefijo: str, fuente: str, html: bool = False, destino: str = DESTINO) -> None:
+        self.prefijo = prefijo
+        self.fuente = fuente
+        self.html = html
+        self.destino = destino
+        self._cargado = False
+        # nombre pedido -> (archivo, inmutable)
+        self._rutas: Dict[str, Tuple[_Archivo, bool]] = {}
+        self._respaldo: Optional[StaticFiles] = None
+
+    def _cargar(self) -> None:
+        from app.utils import logging
+
+        self._cargado = True
+        sitio, motivo = _sitio_vigente(self.destino, self.prefijo, self.fuente)
+        if sitio is None:
+            self._respaldo = StaticFiles(directory=self.fuente, html=self.html)
+            logging.log_internal("BACKEND", 2, "Estáticos /%s: desde %s (%s)", self.prefijo, self.fuente, motivo)
+            return
+
+        dir_sitio = os.path.join(self.destino, self.prefijo)
+        for logico, entrada in sitio["archivos"].items():
+            archivo = _Archivo(dir_sitio, entrada)
+            self._rutas[logico] = (archivo, False)
+            if entrada["archivo"] != logico:
+                self._rutas[entrada["archivo"]] = (archivo, True)
+        logging.log_internal("BACKEND", 1, "Estáticos /%s: build con %s archivos", self.prefijo, len(sitio["archivos"]))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self._cargado:
+            self._cargar()
+        if self._respaldo is not None:
+            await self._respaldo(scope, receive, send)
+            return
+        response = self._responder(scope)
+        await response(scope, receive, send)
+
+    def _responder(self, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        ruta = _ruta_relativa(scope)
+        if ruta == "" and self.html:
+            # /pantalla -> /pantalla/ (las páginas usan rutas relativas)
+            url = URL(scope=scope)
+            return RedirectResponse(url=url.replace(path=url.path + "/"))
+
+        nombre = ruta.lstrip("/")
+        if self.html and (nombre == "" or nombre.endswith("/")):
+            nombre += "index.html"
+        encontrado = self._rutas.get(nombre)
+        if encontrado is None:
+            raise HTTPException(status_code=404)
+        archivo, inmutable = encontrado
+
+        pedido = Headers(scope=scope)
+        # Con Range se sirve el original: el rango es sobre los bytes sin comprimir
+        aceptadas = set() if "range" in pedido else _codificaciones_aceptadas(pedido.get("accept-encoding", ""))
+        ruta_disco, stat, tipo, codificacion, sufijo = archivo.elegir(pedido.get("accept", ""), aceptadas)
+
+        etag = '"' + archivo.huella + sufijo + '"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": _CACHE_INMUTABLE if inmutable else _CACHE_REVALIDAR,
+        }
+        if archivo.vary:
+            headers["Vary"] = archivo.vary
+
+        if _coincide_etag(pedido.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+
+        if codificacion is not None:
+            headers["Content-Encoding"] = codificacion
+        return FileResponse(ruta_disco, headers=headers, media_type=tipo, stat_result=stat)
+
+
+# ---------------------------------------------------------------------------
+# Línea de comandos
+# ---------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build de los estáticos de los frontends.")
+    parser.add_argument("--destino", default=DESTINO,
+                        help=f"Directorio del build (por defecto {DESTINO}).")
+    args = parser.parse_args(argv)
+
+    manifiesto = construir(args.destino)
+    if not manifiesto["brotli"]:
+        print("Aviso: sin el paquete 'brotli' no se generan variantes .br (solo gzip).")
+
+    print(f"  {'sitio':<15} {'archivos':>8} {'original':>10} {'br':>10} {'gzip':>10} {'webp':>10}")
+    for prefijo, sitio in manifiesto["sitios"].items():
+        archivos = sitio["archivos"].values()
+        destino_sitio = os.path.join(args.destino, prefijo)
+
+        def total(sufijo: str, clave: Optional[str] = None) -> int:
+            suma = 0
+            for e in archivos:
+                if clave == "webp":
+                    nombre = e["webp"] or e["archivo"]
+                elif clave in e["codificaciones"]:
+                    nombre = e["archivo"] + sufijo
+                else:
+                    nombre = e["archivo"]
+                suma += os.path.getsize(os.path.join(destino_sitio, nombre))
+            return suma
+
+        print(f"  {prefijo:<15} {len(archivos):>8} {total(''):>10} {total('.br', 'br'):>10} "
+              f"{total('.gz', 'gzip'):>10} {total('', 'webp'):>10}")
+    print(f"Build en {args.destino}/ (reiniciar el backend para usarlo)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+"""
+Geometría del recinto (grilla de bancas) calculada en el backend.
+
+A partir de disposicion_bancas (JSON con las filas y sus columnas) y del
+padrón de la sesión se arma, una vez, el documento que sirve
+/estados/layout:
+
+    {
+        "version": "3f2a9c0d41be",       hash del contenido
+        "error": null,                    o el motivo si no se puede dibujar
+        "total_bancas": 22,
+        "max_columnas": 8,
+        "filas": [ {"fila": 1, "columnas": 8, "banca_inicial": 1}, ... ],
+        "bancas": [ {"banca": 1, "fila": 1, "columna": 1, "dni": "..."}, ... ]
+    }
+
+Numeración de bancas (REGLA): banca 1 = abajo-izquierda, luego
+izquierda→derecha, completa la fila y sigue en la fila de arriba. "filas"
+va ordenado de abajo hacia arriba (fila asc); columna empieza en 1.
+
+La versión depende solo del contenido: es la misma en todos los workers y
+entre reinicios, y sirve de ETag.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def _filas(disposicion: Optional[str]) -> Optional[List[Tuple[int, int]]]:
+    """Filas válidas (fila, columnas) ordenadas por fila asc, o None."""
+    try:
+        parsed = json.loads(disposicion or "")
+    except ValueError:
+        return None
+    filas = parsed.get("filas") if isinstance(parsed, dict) else None
+    if not isinstance(filas, list):
+        return None
+
+    normalizadas = []
+    for f in filas:
+        if not isinstance(f, dict):
+            continue
+        fila, columnas = f.get("fila"), f.get("columnas")
+        if isinstance(fila, int) and isinstance(columnas, int) and columnas > 0:
+            normalizadas.append((fila, columnas))
+    if not normalizadas:
+        return None
+    normalizadas.sort(key=lambda f: f[0])
+    return normalizadas
+
+
+def calcular_layout(disposicion: Optional[str], bancas_dni: Iterable[Tuple[int, str]]) -> Dict[str, Any]:
+    """
+    Documento de layout para una disposición y un padrón.
+
+    bancas_dni: pares (banca, dni) de los concejales de la sesión.
+    """
+    asignados = list(bancas_dni)
+    por_banca = {banca: dni for banca, dni in asignados}
+    filas = _filas(disposicion)
+
+    doc: Dict[str, Any] = {
+        "error": None,
+        "total_bancas": 0,
+        "max_columnas": 0,
+        "filas": [],
+        "bancas": [],
+    }
+
+    if filas is None:
+        doc["error"] = "disposicion_bancas inválida o sin filas."
+    else:
+        total = sum(columnas for _fila, columnas in filas)
+        doc["total_bancas"] = total
+        doc["max_columnas"] = max(columnas for _fila, columnas in filas)
+        if total != len(asignados):
+            doc["error"] = (
+                f"sum(columnas)={total} no coincide con cantidad de concejales={len(asignados)}."
+            )
+
+        banca = 1
+        for fila, columnas in filas:
+            doc["filas"].append({"fila": fila, "columnas": columnas, "banca_inicial": banca})
+            for columna in range(1, columnas + 1):
+                doc["bancas"].append({
+                    "banca": banca,
+                    "fila": fila,
+                    "columna": columna,
+                    "dni": por_banca.get(banca),
+                })
+                banca += 1
+
+    contenido = json.dumps(doc, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    doc["version"] = hashlib.sha1(contenido).hexdigest()[:12]
+    return doc
@@ -0,0 +1,463 @@
+"""
+Análisis estadístico de los logs diarios (herramienta de línea de comandos).
+
+Recorre todo el árbol de logs (ver log_reader.py) y genera reportes por día
+y por sesión:
+    - pulsaciones por dispositivo
+    - cambios de presencia por concejal
+    - votaciones y sus resultados
+    - intervalos entre pulsaciones consecutivas
+    - duración de las sesiones
+
+Las salas adicionales (comisiones) escriben en los mismos archivos del día
+con el tag "<TAG>@<sala>": cada sala lleva sus propias sesiones, que en
+los reportes se identifican por (sala, número de sesión).
+
+Cada día se procesa en un proceso aparte (ProcessPoolExecutor, un día por
+tarea). Los resultados por día se guardan en una caché junto a los reportes,
+indexada por (tamaño, mtime) del archivo del día: al volver a correr la
+herramienta solo se procesan los días nuevos o modificados.
+
+Uso:
+    python -m app.utils.log_analytics [--log-dir logs/] [--salida reportes/]
+                                      [--procesos N] [--sin-cache]
+
+Salida (en --salida):
+    dias.csv, sesiones.csv, pulsaciones.csv, presencias.csv,
+    votaciones.csv y reporte.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import re
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.utils.log_reader import LineaLog, firma_dia, iterar_lineas_dia, listar_dias
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+# Si cambia el formato de los resultados por día, subir la versión invalida la caché
+CACHE_VERSION = 2
+CACHE_FILE = "cache_dias.json"
+
+# Los mensajes cambiaron de redacción (con y sin acentos) a lo largo del tiempo,
+# por eso las expresiones toleran ambas variantes.
+_RE_PULSACION = re.compile(r"^Pulsaci[oó]n registrada: Tecla \[(?P<tecla>.*?)\] del dispositivo \[(?P<dispositivo>.*?)\]")
+_RE_PRESENCIA = re.compile(r"^(?P<concejal>.+?)\s*se (?P<accion>PRESENT|AUSENT)[OÓ]$")
+_RE_APERTURA_SESION = re.compile(r"^Apertura de sesi[oó]n(?: N[º°o]\s*(?P<numero>\d+))?$")
+_RE_CIERRE_SESION = re.compile(r"^Cierre de sesi[oó]n(?: N[º°o]\s*(?P<numero>\d+))?$")
+_RE_APERTURA_VOTACION = re.compile(r"^Apertura de votaci[oó]n de tipo (?P<tipo>.*?) N[º°](?P<numero>\d+) con tema: (?P<tema>.*)$")
+_RE_RESULTADO_VOTACION = re.compile(
+    r"^Votaci[oó]n N[º°](?P<numero>\d+) (?:completada|DESEMPATADA)"
+    r"(?:\. Resultado: (?P<resultado>\w+)"
+    r"(?: - Votos: \d+ de \d+ - (?P<pos>\d+) Positivos, (?P<neg>\d+) Negativos y (?P<abs>\d+) Abstenciones)?)?"
+)
+_RE_VOTACION_COMPLETADA = re.compile(r"^Votaci[oó]n completada$")
+_RE_VOTO = re.compile(r"voto: (?P<valor>Positivo|Negativo|Abstenci[oó]n)$")
+
+
+# ---------------------------------------------------------------------------
+# Funciones internas (helpers)
+# ---------------------------------------------------------------------------
+
+def _nueva_sesion(sala: Optional[str], numero: Optional[str], hora: str, segundos: int) -> Dict[str, Any]:
+    return {
+        "sala": sala,
+        "numero_sesion": int(numero) if numero else None,
+        "hora_inicio": hora,
+        "hora_fin": None,
+        "duracion_s": None,
+        "cerrada": False,
+        "pulsaciones_por_dispositivo": {},
+        "presencias_por_concejal": {},
+        "votaciones": [],
+        "_seg_inicio": segundos,
+        "_seg_ultima": segundos,
+        "_intervalos": [],
+        "_seg_ultima_pulsacion": None,
+    }
+
+
+def _resumen_intervalos(intervalos: List[int]) -> Dict[str, Any]:
+    """Resumen estadístico de los intervalos entre pulsaciones (en segundos)."""
+    if not intervalos:
+        return {"cantidad": 0, "min_s": None, "media_s": None, "mediana_s": None, "p95_s": None, "max_s": None}
+
+    ordenados = sorted(intervalos)
+    p95 = ordenados[min(len(ordenados) - 1, int(round(0.95 * (len(ordenados) - 1))))]
+
+    return {
+        "cantidad": len(ordenados),
+        "min_s": ordenados[0],
+        "media_s": round(statistics.fmean(ordenados), 3),
+        "mediana_s": statistics.median(ordenados),
+        "p95_s": p95,
+        "max_s": ordenados[-1],
+    }
+
+
+def _cerrar_votacion_pendiente(sesion: Dict[str, Any], resultado: str, hora: str) -> None:
+    for v in reversed(sesion["votaciones"]):
+        if v["resultado"] is None:
+            v["resultado"] = resultado
+            v["hora_cierre"] = hora
+            return
+
+
+def _finalizar_sesion(sesion: Dict[str, Any], intervalos_dia: List[int]) -> Dict[str, Any]:
+    """
+    Calcula duración e intervalos y quita los campos de trabajo internos.
+    Los intervalos de la sesión se agregan también a intervalos_dia.
+    """
+    intervalos_dia.extend(sesion["_intervalos"])
+    fin = sesion["_seg_ultima"]
+    sesion["duracion_s"] = max(0, fin - sesion["_seg_inicio"])
+    sesion["intervalos_pulsaciones"] = _resumen_intervalos(sesion["_intervalos"])
+
+    for campo in [k for k in sesion if k.startswith("_")]:
+        del sesion[campo]
+    return sesion
+
+
+def _procesar_linea(sesion: Dict[str, Any], linea: LineaLog) -> None:
+    """Acumula en la sesión lo que aporte una línea de log."""
+    msg = linea.mensaje
+    sesion["_seg_ultima"] = linea.segundos
+
+    m = _RE_PULSACION.match(msg)
+    if m:
+        disp = m.group("dispositivo")
+        conteo = sesion["pulsaciones_por_dispositivo"]
+        conteo[disp] = conteo.get(disp, 0) + 1
+
+        previa = sesion["_seg_ultima_pulsacion"]
+        if previa is not None and linea.segundos >= previa:
+            sesion["_intervalos"].append(linea.segundos - previa)
+        sesion["_seg_ultima_pulsacion"] = linea.segundos
+        return
+
+    m = _RE_PRESENCIA.match(msg)
+    if m:
+        por_concejal = sesion["presencias_por_concejal"].setdefault(
+            m.group("concejal").strip(), {"presente": 0, "ausente": 0}
+        )
+        por_concejal["presente" if m.group("accion") == "PRESENT" else "ausente"] += 1
+        return
+
+    if linea.tag == "VOTACION":
+        m = _RE_APERTURA_VOTACION.match(msg)
+        if m:
+            sesion["votaciones"].append({
+                "numero": int(m.group("numero")),
+                "tipo": m.group("tipo"),
+                "tema": m.group("tema"),
+                "hora_apertura": linea.hora,
+                "hora_cierre": None,
+                "resultado": None,
+                "positivos": 0,
+                "negativos": 0,
+                "abstenciones": 0,
+            })
+            return
+
+        m = _RE_RESULTADO_VOTACION.match(msg)
+        if m:
+            numero = int(m.group("numero"))
+            for v in reversed(sesion["votaciones"]):
+                if v["numero"] == numero:
+                    v["resultado"] = m.group("resultado") or "COMPLETADA"
+                    v["hora_cierre"] = linea.hora
+                    if m.group("pos") is not None:
+                        v["positivos"] = int(m.group("pos"))
+                        v["negativos"] = int(m.group("neg"))
+                        v["abstenciones"] = int(m.group("abs"))
+                    break
+            return
+
+        if msg.startswith("Cierre forzado"):
+            _cerrar_votacion_pendiente(sesion, "CIERRE_FORZADO", linea.hora)
+            return
+
+        # Formato viejo, sin número ni resultado
+        if _RE_VOTACION_COMPLETADA.match(msg):
+            _cerrar_votacion_pendiente(sesion, "COMPLETADA", linea.hora)
+            return
+
+    if linea.tag == "VOTO":
+        m = _RE_VOTO.search(msg)
+        if m and sesion["votaciones"] and sesion["votaciones"][-1]["resultado"] is None:
+            v = sesion["votaciones"][-1]
+            valor = m.group("valor")
+            if valor == "Positivo":
+                v["positivos"] += 1
+            elif valor == "Negativo":
+                v["negativos"] += 1
+            else:
+                v["abstenciones"] += 1
+
+
+# ---------------------------------------------------------------------------
+# Análisis de un día (se ejecuta en un proceso del pool)
+# ---------------------------------------------------------------------------
+
+def _fuera_de_sesion(sala: Optional[str], hora: str, segundos: int) -> Dict[str, Any]:
+    sesion = _nueva_sesion(sala, None, hora, segundos)
+    sesion["_fuera_de_sesion"] = True
+    return sesion
+
+
+def _con_actividad(sesion: Dict[str, Any]) -> bool:
+    return bool(sesion["pulsaciones_por_dispositivo"] or sesion["presencias_por_concejal"])
+
+
+def analizar_dia(log_root_dir: str, day_str: str) -> Dict[str, Any]:
+    """
+    Analiza un día completo y devuelve un dict JSON-friendly con el reporte
+    del día y el de cada una de sus sesiones.
+
+    Cada sala (la principal, sala None, y cada comisión) tiene su propia
+    sesión en curso: las líneas de una sala nunca se suman a la sesión de
+    otra. Las sesiones se devuelven ordenadas por sala (la principal
+    primero) y hora de inicio.
+
+    Las líneas de una sala previas a su primera apertura de sesión se
+    agrupan en una pseudo-sesión "fuera de sesión" (numero_sesion None) que
+    solo se incluye si tiene actividad.
+
+    En los totales del día, los dispositivos y concejales de una comisión
+    llevan el sufijo "@<sala>", igual que los tags del log.
+    """
+    sesiones: List[Dict[str, Any]] = []
+    intervalos_dia: List[int] = []
+    actuales: Dict[Optional[str], Dict[str, Any]] = {}
+    lineas = 0
+
+    for linea in iterar_lineas_dia(log_root_dir, day_str):
+        lineas += 1
+
+        actual = actuales.get(linea.sala)
+        if actual is None:
+            actual = actuales[linea.sala] = _fuera_de_sesion(linea.sala, "00:00:00", 0)
+
+        if linea.tag == "SESION":
+            m = _RE_APERTURA_SESION.match(linea.mensaje)
+            if m:
+                # Apertura sin cierre previo (reinicio del backend): cortamos acá
+                if not actual.get("_fuera_de_sesion") or _con_actividad(actual):
+                    sesiones.append(_finalizar_sesion(actual, intervalos_dia))
+                actuales[linea.sala] = _nueva_sesion(linea.sala, m.group("numero"), linea.hora, linea.segundos)
+                continue
+
+            m = _RE_CIERRE_SESION.match(linea.mensaje)
+            if m and not actual.get("_fuera_de_sesion"):
+                actual["_seg_ultima"] = linea.segundos
+                actual["hora_fin"] = linea.hora
+                actual["cerrada"] = True
+                sesiones.append(_finalizar_sesion(actual, intervalos_dia))
+                actuales[linea.sala] = _fuera_de_sesion(linea.sala, linea.hora, linea.segundos)
+                continue
+
+        _procesar_linea(actual, linea)
+
+    for actual in actuales.values():
+        if not actual.get("_fuera_de_sesion") or _con_actividad(actual):
+            sesiones.append(_finalizar_sesion(actual, intervalos_dia))
+
+    sesiones.sort(key=lambda s: (s["sala"] is not None, s["sala"] or "", s["hora_inicio"]))
+
+    # Totales del día
+    pulsaciones: Dict[str, int] = {}
+    presencias: Dict[str, Dict[str, int]] = {}
+    votaciones = 0
+
+    for i, s in enumerate(sesiones):
+        s["indice"] = i
+        sufijo = f"@{s['sala']}" if s["sala"] else ""
+        for disp, n in s["pulsaciones_por_dispositivo"].items():
+            pulsaciones[disp + sufijo] = pulsaciones.get(disp + sufijo, 0) + n
+        for concejal, c in s["presencias_por_concejal"].items():
+            acc = presencias.setdefault(concejal + sufijo, {"presente": 0, "ausente": 0})
+            acc["presente"] += c["presente"]
+            acc["ausente"] += c["ausente"]
+        votaciones += len(s["votaciones"])
+
+    return {
+        "dia": day_str,
+        "lineas": lineas,
+        "pulsaciones_por_dispositivo": pulsaciones,
+        "presencias_por_concejal": presencias,
+        "cantidad_votaciones": votaciones,
+        "intervalos_pulsaciones": _resumen_intervalos(intervalos_dia),
+        "sesiones": sesiones,
+    }
+
+
+def _analizar_dia_tarea(args: tuple) -> Dict[str, Any]:
+    """Adaptador para ProcessPoolExecutor.map (recibe una tupla)."""
+    return analizar_dia(*args)
+
+
+# ---------------------------------------------------------------------------
+# Caché por día
+# ---------------------------------------------------------------------------
+
+def _leer_cache(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("dias", {})
+
+
+def _escribir_cache(path: str, dias: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "dias": dias}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Escritura de reportes
+# ---------------------------------------------------------------------------
+
+def _escribir_csv(path: str, encabezado: List[str], filas: List[list]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(encabezado)
+        w.writerows(filas)
+
+
+def escribir_reportes(resultados: List[Dict[str, Any]], salida_dir: str) -> None:
+    """Escribe los CSV y el JSON consolidado a partir de los resultados por día."""
+    os.makedirs(salida_dir, exist_ok=True)
+
+    dias, sesiones, pulsaciones, presencias, votaciones = [], [], [], [], []
+
+    for r in resultados:
+        dia = r["dia"]
+        iv = r["intervalos_pulsaciones"]
+        dias.append([
+            dia, r["lineas"], len(r["sesiones"]),
+            sum(r["pulsaciones_por_dispositivo"].values()),
+            sum(c["presente"] + c["ausente"] for c in r["presencias_por_concejal"].values()),
+            r["cantidad_votaciones"], iv["media_s"], iv["p95_s"],
+        ])
+
+        for s in r["sesiones"]:
+            iv = s["intervalos_pulsaciones"]
+            sesiones.append([
+                dia, s["indice"], s["sala"] or "", s["numero_sesion"], s["hora_inicio"], s["hora_fin"],
+                s["duracion_s"], s["cerrada"],
+                sum(s["pulsaciones_por_dispositivo"].values()),
+                sum(c["presente"] + c["ausente"] for c in s["presencias_por_concejal"].values()),
+                len(s["votaciones"]), iv["media_s"], iv["p95_s"],
+            ])
+            for disp, n in sorted(s["pulsaciones_por_dispositivo"].items()):
+                pulsaciones.append([dia, s["indice"], disp, n])
+            for concejal, c in sorted(s["presencias_por_concejal"].items()):
+                presencias.append([dia, s["indice"], concejal, c["presente"], c["ausente"]])
+            for v in s["votaciones"]:
+                votaciones.append([
+                    dia, s["indice"], s["sala"] or "", s["numero_sesion"], v["numero"], v["tipo"], v["tema"],
+                    v["hora_apertura"], v["hora_cierre"], v["resultado"],
+                    v["positivos"], v["negativos"], v["abstenciones"],
+                ])
+
+    _escribir_csv(os.path.join(salida_dir, "dias.csv"),
+                  ["dia", "lineas", "sesiones", "pulsaciones", "cambios_presencia",
+                   "votaciones", "intervalo_medio_s", "intervalo_p95_s"], dias)
+    _escribir_csv(os.path.join(salida_dir, "sesiones.csv"),
+                  ["dia", "indice", "sala", "numero_sesion", "hora_inicio", "hora_fin", "duracion_s",
+                   "cerrada", "pulsaciones", "cambios_presencia", "votaciones",
+                   "intervalo_medio_s", "intervalo_p95_s"], sesiones)
+    _escribir_csv(os.path.join(salida_dir, "pulsaciones.csv"),
+                  ["dia", "sesion", "dispositivo", "cantidad"], pulsaciones)
+    _escribir_csv(os.path.join(salida_dir, "presencias.csv"),
+                  ["dia", "sesion", "concejal", "presente", "ausente"], presencias)
+    _escribir_csv(os.path.join(salida_dir, "votaciones.csv"),
+                  ["dia", "sesion", "sala", "numero_sesion", "numero", "tipo", "tema", "hora_apertura",
+                   "hora_cierre", "resultado", "positivos", "negativos", "abstenciones"], votaciones)
+
+    with open(os.path.join(salida_dir, "reporte.json"), "w", encoding="utf-8") as f:
+        json.dump({"dias": resultados}, f, ensure_ascii=False, indent=2)
+
+
+# ---------------------------------------------------------------------------
+# FUNCIÓN PÚBLICA
+# ---------------------------------------------------------------------------
+
+def analizar_logs(
+    log_root_dir: str,
+    salida_dir: str,
+    procesos: Optional[int] = None,
+    usar_cache: bool = True,
+) -> Dict[str, int]:
+    """
+    Analiza todos los días del directorio de logs y escribe los reportes.
+
+    Devuelve un pequeño resumen: {"dias": N, "procesados": M, "desde_cache": K}.
+    """
+    os.makedirs(salida_dir, exist_ok=True)
+    cache_path = os.path.join(salida_dir, CACHE_FILE)
+    cache = _leer_cache(cache_path) if usar_cache else {}
+
+    dias = listar_dias(log_root_dir)
+    firmas = {d: firma_dia(log_root_dir, d) for d in dias}
+    dias = [d for d in dias if firmas[d] is not None]
+
+    pendientes = [d for d in dias if cache.get(d, {}).get("firma") != list(firmas[d])]
+
+    if pendientes:
+        tareas = [(log_root_dir, d) for d in pendientes]
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for d, resultado in zip(pendientes, pool.map(_analizar_dia_tarea, tareas)):
+                cache[d] = {"firma": list(firmas[d]), "resultado": resultado}
+
+    # Descartamos de la caché los días que ya no existen
+    cache = {d: cache[d] for d in dias}
+    _escribir_cache(cache_path, cache)
+
+    escribir_reportes([cache[d]["resultado"] for d in dias], salida_dir)
+
+    return {"dias": len(dias), "procesados": len(pendientes), "desde_cache": len(dias) - len(pendientes)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reportes estadísticos a partir de los logs diarios.")
+    parser.add_argument("--log-dir", default=None,
+                        help="Directorio raíz de logs (por defecto, log_dir de config.json).")
+    parser.add_argument("--salida", default="reportes",
+                        help="Directorio donde se escriben los reportes y la caché.")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Cantidad de procesos (por defecto, uno por CPU).")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="Ignora la caché y vuelve a procesar todos los días.")
+    args = parser.parse_args(argv)
+
+    log_dir = args.log_dir
+    if log_dir is None:
+        from app.config import settings
+        log_dir = settings.log_dir
+
+    resumen = analizar_logs(log_dir, args.salida, procesos=args.procesos, usar_cache=not args.sin_cache)
+    print(
+        f"Días: {resumen['dias']} - procesados: {resumen['procesados']} - "
+        f"desde caché: {resumen['desde_cache']} - reportes en '{args.salida}'"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
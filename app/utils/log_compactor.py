@@ -0,0 +1,229 @@
+"""
+Compactación de días de log ya cerrados.
+
+Un día queda "cerrado" cuando es anterior a la fecha actual: logging.py ya
+no escribe en él. Para esos días se genera (ver log_reader.py):
+
+    AAAA-MM-DD.log.gz   -> gzip multi-miembro: cada bloque de ~64 KiB
+                           (sin comprimir) es un miembro gzip independiente,
+                           así se puede descomprimir un bloque suelto.
+                           El archivo entero sigue siendo un gzip válido
+                           (zcat/zless funcionan).
+    AAAA-MM-DD.log.idx  -> índice JSON: offset y largo comprimido de cada
+                           bloque, primera línea, rango horario y nivel máximo.
+
+Solo se comprime el -1.txt (contiene todos los niveles); los -2 y -3 son
+subconjuntos y se reconstruyen filtrando por nivel al leer. Una vez
+verificada la copia comprimida se borran los tres .txt del día.
+
+El compactador corre en un hilo de fondo iniciado por el backend. Si hay
+varios procesos (workers), un archivo de lock por día evita que dos
+compacten el mismo día a la vez.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import List, Optional
+
+from app.utils.log_reader import (
+    BLOQUE_BYTES,
+    GZIP_WBITS,
+    INDICE_VERSION,
+    dia_compactado,
+    listar_dias,
+    ruta_archivo_dia,
+    ruta_comprimido_dia,
+)
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+# Cada cuánto revisa el hilo de fondo si hay días para compactar
+INTERVALO_COMPACTACION_S = 3600.0
+
+# Nivel de compresión zlib (9: máximo; los días cerrados se escriben una sola vez)
+NIVEL_COMPRESION = 9
+
+# Un lock más viejo que esto se considera abandonado (proceso que murió)
+LOCK_VENCIDO_S = 600.0
+
+_LOCK_NAME = ".compactando"
+
+_hilo: Optional[threading.Thread] = None
+_detener = threading.Event()
+
+
+# ---------------------------------------------------------------------------
+# Funciones internas (helpers)
+# ---------------------------------------------------------------------------
+
+def _tomar_lock(day_dir: str) -> Optional[str]:
+    path = os.path.join(day_dir, _LOCK_NAME)
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            if time.time() - os.stat(path).st_mtime < LOCK_VENCIDO_S:
+                return None
+            os.remove(path)
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except (FileNotFoundError, FileExistsError):
+            return None
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    return path
+
+
+def _comprimir_miembro(data: bytes) -> bytes:
+    c = zlib.compressobj(NIVEL_COMPRESION, zlib.DEFLATED, GZIP_WBITS)
+    return c.compress(data) + c.flush()
+
+
+def _escribir_atomico(path: str, data: bytes) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# FUNCIONES PÚBLICAS
+# ---------------------------------------------------------------------------
+
+def compactar_dia(log_root_dir: str, day_str: str) -> bool:
+    """
+    Compacta un día. Devuelve True si lo compactó, False si no había nada
+    que hacer (ya compactado, sin archivos o tomado por otro proceso).
+    """
+    day_dir = os.path.join(log_root_dir, day_str)
+    origen = ruta_archivo_dia(log_root_dir, day_str, 1)
+
+    if dia_compactado(log_root_dir, day_str) or not os.path.exists(origen):
+        return False
+
+    lock = _tomar_lock(day_dir)
+    if lock is None:
+        return False
+
+    try:
+        ruta_datos, ruta_indice = ruta_comprimido_dia(log_root_dir, day_str)
+
+        comprimido = bytearray()
+        bloques: List[dict] = []
+        total_lineas = 0
+
+        def cerrar_bloque(lineas: List[bytes]) -> None:
+            nonlocal total_lineas
+            raw = b"".join(lineas)
+            miembro = _comprimir_miembro(raw)
+            niveles = [int(l[12:13]) for l in lineas if l[11:12] == b"L" and l[12:13].isdigit()]
+            bloques.append({
+                "offset": len(comprimido),
+                "largo": len(miembro),
+                "linea_inicial": total_lineas,
+                "lineas": len(lineas),
+                "hora_inicial": lineas[0][:8].decode("utf-8", "replace"),
+                "hora_final": lineas[-1][:8].decode("utf-8", "replace"),
+                "nivel_max": max(niveles, default=0),
+            })
+            comprimido.extend(miembro)
+            total_lineas += len(lineas)
+
+        actual: List[bytes] = []
+        tam = 0
+        with open(origen, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    raw += b"\n"
+                actual.append(raw)
+                tam += len(raw)
+                if tam >= BLOQUE_BYTES:
+                    cerrar_bloque(actual)
+                    actual, tam = [], 0
+        if actual:
+            cerrar_bloque(actual)
+
+        # Verificación: lo comprimido tiene que descomprimir a la misma cantidad de líneas
+        verificadas = 0
+        for b in bloques:
+            miembro = bytes(comprimido[b["offset"]:b["offset"] + b["largo"]])
+            verificadas += zlib.decompress(miembro, GZIP_WBITS).count(b"\n")
+        if verificadas != total_lineas:
+            raise RuntimeError(f"Verificación fallida compactando {day_str}")
+
+        indice = {"version": INDICE_VERSION, "dia": day_str, "lineas": total_lineas, "bloques": bloques}
+
+        # Orden: primero datos, después índice (el índice "publica" el día compactado)
+        _escribir_atomico(ruta_datos, bytes(comprimido))
+        _escribir_atomico(ruta_indice, json.dumps(indice).encode("utf-8"))
+
+        for nivel in (1, 2, 3):
+            try:
+                os.remove(ruta_archivo_dia(log_root_dir, day_str, nivel))
+            except FileNotFoundError:
+                pass
+
+        return True
+    finally:
+        try:
+            os.remove(lock)
+        except FileNotFoundError:
+            pass
+
+
+def compactar_dias_cerrados(log_root_dir: str, hoy: Optional[str] = None) -> List[str]:
+    """
+    Compacta todos los días anteriores a `hoy` (por defecto, la fecha local).
+    Devuelve la lista de días compactados en esta pasada.
+    """
+    hoy = hoy or datetime.now().strftime("%Y-%m-%d")
+    hechos = []
+    for day_str in listar_dias(log_root_dir):
+        if day_str >= hoy:
+            continue
+        if compactar_dia(log_root_dir, day_str):
+            hechos.append(day_str)
+    return hechos
+
+
+def iniciar_compactador(log_root_dir: str, intervalo_s: float = INTERVALO_COMPACTACION_S) -> None:
+    """
+    Inicia (una sola vez por proceso) el hilo de fondo que compacta los
+    días cerrados cada `intervalo_s` segundos.
+    """
+    global _hilo
+
+    if _hilo is not None and _hilo.is_alive():
+        return
+
+    _detener.clear()
+
+    def _loop() -> None:
+        from app.utils import logging
+
+        while not _detener.is_set():
+            try:
+                hechos = compactar_dias_cerrados(log_root_dir)
+                if hechos:
+                    logging.log_internal("LOGS", 1, "Días de log compactados: " + ", ".join(hechos))
+            except Exception as e:
+                logging.log_internal("LOGS", 2, "Error compactando logs: " + str(e))
+            _detener.wait(intervalo_s)
+
+    _hilo = threading.Thread(target=_loop, name="log-compactor", daemon=True)
+    _hilo.start()
+
+
+def detener_compactador() -> None:
+    """Pide al hilo de fondo que termine (no espera a que termine)."""
+    _detener.set()
@@ -0,0 +1,325 @@
+"""
+Lectura de los logs diarios generados por app.utils.logging.
+
+Estructura de un día "abierto" (el que se está escribiendo, ver logging.py):
+    <log_dir>/AAAA-MM-DD/AAAA-MM-DD-1.txt   -> niveles 1, 2 y 3
+    <log_dir>/AAAA-MM-DD/AAAA-MM-DD-2.txt   -> niveles 2 y 3
+    <log_dir>/AAAA-MM-DD/AAAA-MM-DD-3.txt   -> solo nivel 3
+
+Estructura de un día "compactado" (ver log_compactor.py):
+    <log_dir>/AAAA-MM-DD/AAAA-MM-DD.log.gz  -> gzip multi-miembro, un miembro por bloque
+    <log_dir>/AAAA-MM-DD/AAAA-MM-DD.log.idx -> índice JSON de bloques
+
+Como los archivos -2 y -3 son subconjuntos del -1, el día compactado guarda
+solo el contenido del -1; los niveles se filtran al leer.
+
+Cada línea tiene el formato de _format_line:
+    HH:MM:SS | L<level> | <tag> | <mensaje>
+
+Las líneas de una sala adicional (comisión) van a los mismos archivos, con
+el tag "<TAG>@<sala>"; parsear_linea lo separa en tag y sala.
+
+Todos los lectores (herramientas, endpoints) deben pasar por este módulo,
+que resuelve de forma transparente si el día está compactado o no, e
+incluye acceso aleatorio por bloque en ambos casos.
+
+Este módulo NO importa settings: lo usan también herramientas de línea
+de comandos que corren fuera del backend.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+_DIA_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+_SEPARADOR = " | "
+
+# Tamaño (sin comprimir) de cada bloque. Es la unidad mínima de lectura:
+# una búsqueda puntual descomprime a lo sumo un bloque de este tamaño.
+BLOQUE_BYTES = 64 * 1024
+
+INDICE_VERSION = 1
+
+# wbits para que zlib lea/escriba miembros gzip
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+# ---------------------------------------------------------------------------
+# Tipos
+# ---------------------------------------------------------------------------
+
+class LineaLog(NamedTuple):
+    """Una línea de log ya separada en sus campos."""
+
+    hora: str        # "HH:MM:SS"
+    segundos: int    # segundos desde la medianoche (para calcular intervalos)
+    nivel: int       # 1, 2 o 3
+    tag: str         # sin el sufijo de sala
+    mensaje: str
+    sala: Optional[str] = None   # id de la sala ("TAG@<sala>"); None = sala principal
+
+
+class BloqueLog(NamedTuple):
+    """
+    Entrada del índice de bloques de un día.
+
+    offset/largo son bytes dentro de `ruta`: el .log.gz si el día está
+    compactado (largo = bytes comprimidos) o el -1.txt si no lo está.
+    """
+
+    ruta: str
+    comprimido: bool
+    offset: int
+    largo: int
+    linea_inicial: int
+    lineas: int
+    hora_inicial: str
+    hora_final: str
+    nivel_max: int
+
+
+# ---------------------------------------------------------------------------
+# Rutas
+# ---------------------------------------------------------------------------
+
+def ruta_archivo_dia(log_root_dir: str, day_str: str, nivel: int = 1) -> str:
+    """Ruta del archivo de texto de un día para el nivel indicado (1, 2 o 3)."""
+    return os.path.join(log_root_dir, day_str, f"{day_str}-{nivel}.txt")
+
+
+def ruta_comprimido_dia(log_root_dir: str, day_str: str) -> Tuple[str, str]:
+    """Rutas (datos, índice) del día compactado."""
+    base = os.path.join(log_root_dir, day_str, f"{day_str}.log")
+    return base + ".gz", base + ".idx"
+
+
+def dia_compactado(log_root_dir: str, day_str: str) -> bool:
+    """True si el día ya tiene su versión compactada completa (datos + índice)."""
+    datos, indice = ruta_comprimido_dia(log_root_dir, day_str)
+    return os.path.exists(indice) and os.path.exists(datos)
+
+
+# ---------------------------------------------------------------------------
+# Funciones internas (helpers)
+# ---------------------------------------------------------------------------
+
+def _nivel_de_linea(linea: str) -> int:
+    # "HH:MM:SS | L<n> | ..." -> el dígito está en la posición 12
+    if len(linea) > 12 and linea[11] == "L" and linea[12].isdigit():
+        return int(linea[12])
+    return 0
+
+
+@lru_cache(maxsize=64)
+def _leer_indice_comprimido(ruta_datos: str, ruta_indice: str, _mtime_ns: int) -> Tuple[BloqueLog, ...]:
+    # _mtime_ns forma parte de la clave de caché: si el índice cambia, se relee
+    with open(ruta_indice, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if data.get("version") != INDICE_VERSION:
+        raise ValueError(f"Versión de índice no soportada en {ruta_indice}")
+
+    return tuple(
+        BloqueLog(
+            ruta=ruta_datos,
+            comprimido=True,
+            offset=b["offset"],
+            largo=b["largo"],
+            linea_inicial=b["linea_inicial"],
+            lineas=b["lineas"],
+            hora_inicial=b["hora_inicial"],
+            hora_final=b["hora_final"],
+            nivel_max=b["nivel_max"],
+        )
+        for b in data["bloques"]
+    )
+
+
+def _indexar_texto(ruta: str) -> List[BloqueLog]:
+    """Arma el índice de bloques de un archivo de texto sin comprimir."""
+    bloques: List[BloqueLog] = []
+
+    offset = 0
+    inicio = 0
+    linea_inicial = 0
+    lineas = 0
+    hora_inicial = hora_final = ""
+    nivel_max = 0
+
+    with open(ruta, "rb") as f:
+        for raw in f:
+            if lineas == 0:
+                inicio = offset
+                hora_inicial = raw[:8].decode("utf-8", "replace")
+            hora_final = raw[:8].decode("utf-8", "replace")
+            nivel_max = max(nivel_max, _nivel_de_linea(raw[:13].decode("utf-8", "replace")))
+            lineas += 1
+            offset += len(raw)
+
+            if offset - inicio >= BLOQUE_BYTES:
+                bloques.append(BloqueLog(ruta, False, inicio, offset - inicio, linea_inicial,
+                                         lineas, hora_inicial, hora_final, nivel_max))
+                linea_inicial += lineas
+                lineas = 0
+                nivel_max = 0
+
+    if lineas:
+        bloques.append(BloqueLog(ruta, False, inicio, offset - inicio, linea_inicial,
+                                 lineas, hora_inicial, hora_final, nivel_max))
+    return bloques
+
+
+# ---------------------------------------------------------------------------
+# FUNCIONES PÚBLICAS
+# ---------------------------------------------------------------------------
+
+def parsear_linea(linea: str) -> Optional[LineaLog]:
+    """
+    Separa una línea de log en sus campos.
+
+    Devuelve None si la línea no respeta el formato (líneas vacías,
+    restos de versiones anteriores del logger, etc.).
+    """
+    partes = linea.rstrip("\n").split(_SEPARADOR, 3)
+    if len(partes) != 4:
+        return None
+
+    hora, nivel_str, tag, mensaje = partes
+    tag, _, sala = tag.partition("@")
+
+    if len(nivel_str) != 2 or nivel_str[0] != "L" or not nivel_str[1].isdigit():
+        return None
+
+    try:
+        hh, mm, ss = hora.split(":")
+        segundos = int(hh) * 3600 + int(mm) * 60 + int(ss)
+    except ValueError:
+        return None
+
+    return LineaLog(hora, segundos, int(nivel_str[1]), tag, mensaje, sala or None)
+
+
+def listar_dias(log_root_dir: str) -> List[str]:
+    """
+    Devuelve los días (AAAA-MM-DD) presentes en el directorio de logs,
+    ordenados cronológicamente.
+    """
+    if not os.path.isdir(log_root_dir):
+        return []
+
+    return sorted(
+        nombre for nombre in os.listdir(log_root_dir)
+        if _DIA_RE.match(nombre) and os.path.isdir(os.path.join(log_root_dir, nombre))
+    )
+
+
+def firma_dia(log_root_dir: str, day_str: str) -> Optional[Tuple[int, int]]:
+    """
+    Devuelve (tamaño, mtime_ns) del archivo con el contenido completo del día
+    (el .log.gz si está compactado, si no el -1.txt).
+
+    Sirve como clave de caché: si no cambió, el contenido del día tampoco.
+    Devuelve None si el día no tiene contenido.
+    """
+    if dia_compactado(log_root_dir, day_str):
+        ruta = ruta_comprimido_dia(log_root_dir, day_str)[0]
+    else:
+        ruta = ruta_archivo_dia(log_root_dir, day_str, 1)
+
+    try:
+        st = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def indice_dia(log_root_dir: str, day_str: str) -> List[BloqueLog]:
+    """
+    Índice de bloques de un día, compactado o no.
+
+    Para un día compactado se lee el .idx (cacheado en memoria); para uno
+    sin compactar se arma recorriendo el -1.txt.
+    """
+    if dia_compactado(log_root_dir, day_str):
+        datos, indice = ruta_comprimido_dia(log_root_dir, day_str)
+        return list(_leer_indice_comprimido(datos, indice, os.stat(indice).st_mtime_ns))
+
+    ruta = ruta_archivo_dia(log_root_dir, day_str, 1)
+    if not os.path.exists(ruta):
+        return []
+    return _indexar_texto(ruta)
+
+
+def leer_bloque(bloque: BloqueLog) -> List[str]:
+    """
+    Devuelve las líneas (sin '\\n') de un único bloque.
+
+    Solo se lee y descomprime ese bloque, nunca el día entero.
+    """
+    with open(bloque.ruta, "rb") as f:
+        f.seek(bloque.offset)
+        data = f.read(bloque.largo)
+
+    if bloque.comprimido:
+        data = zlib.decompress(data, GZIP_WBITS)
+
+    return data.decode("utf-8", "replace").splitlines()
+
+
+def iterar_lineas_dia(
+    log_root_dir: str,
+    day_str: str,
+    nivel_minimo: int = 1,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+) -> Iterator[LineaLog]:
+    """
+    Recorre las líneas de un día con nivel >= nivel_minimo.
+
+    desde / hasta ("HH:MM:SS", inclusivos) limitan el rango horario; los
+    bloques que quedan fuera del rango, o que no tienen ninguna línea del
+    nivel pedido, no se leen.
+    """
+    compactado = dia_compactado(log_root_dir, day_str)
+
+    # Camino rápido: día abierto leído completo, sin armar índice
+    if not compactado and desde is None and hasta is None:
+        ruta = ruta_archivo_dia(log_root_dir, day_str, 1)
+        if not os.path.exists(ruta):
+            return
+        with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+            for linea in f:
+                parsed = parsear_linea(linea)
+                if parsed is None or parsed.nivel < nivel_minimo:
+                    continue
+                yield parsed
+        return
+
+    for bloque in indice_dia(log_root_dir, day_str):
+        if bloque.nivel_max < nivel_minimo:
+            continue
+        if desde is not None and bloque.hora_final < desde:
+            continue
+        if hasta is not None and bloque.hora_inicial > hasta:
+            break
+
+        for linea in leer_bloque(bloque):
+            parsed = parsear_linea(linea)
+            if parsed is None or parsed.nivel < nivel_minimo:
+                continue
+            if desde is not None and parsed.hora < desde:
+                continue
+            if hasta is not None and parsed.hora > hasta:
+                return
+            yield parsed
@@ -11,14 +11,32 @@ Y escribe en 3 archivos .txt con nombre:
     AAAA-MM-DD-1.txt   -> nivel 1 (1, 2 y 3)
     AAAA-MM-DD-2.txt   -> nivel 2 (2 y 3)
     AAAA-MM-DD-3.txt   -> nivel 3 (solo 3)
+
+Los días anteriores al actual los compacta log_compactor.py; para leer
+logs (compactados o no) usar log_reader.py.
+
+Salas (ver sala_service.py): dentro de en_sala(buffer) el tag se escribe
+como "<TAG>@<sala>" y el evento va al buffer RAM de esa sala en lugar del
+general, así cada sala tiene su propio flujo de eventos para el frontend.
+
+Nivel mínimo (settings.log_nivel_minimo, opcional en config.json):
+    Los mensajes con nivel menor NO se formatean ni se escriben en archivo.
+    Igual se guardan en el buffer RAM, pero "sin armar": la línea se
+    arma recién cuando alguien la lee con get_log_tail() (con _lock
+    tomado). Para que muestre el estado del momento del evento, los args
+    que no son valores simples se pasan a texto al loguear y los mensajes
+    callable se arman en el momento.
 """
 
 from __future__ import annotations
 
 import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from threading import Lock
-from typing import Final
+from typing import Any, Callable, Final, Iterator, Optional, Union
 from collections import deque
 
 from app.config import settings
@@ -42,10 +60,27 @@ _lock = Lock()
 _log_seq: int = 0
 
 # Buffer circular de últimos eventos en RAM
-# Cada elemento será un dict:
-#   {"seq": <int>, "line": <str>}
+# Cada elemento es un _EventoRAM; get_log_tail() lo entrega como dict:
+#   {"seq": <int>, "level": <1..3>, "line": <str>}
 _log_ram_tail = deque(maxlen=LOG_RAM_MAXLEN)
 
+# Último directorio de día creado (evita os.makedirs en cada llamada)
+_dia_asegurado: Optional[str] = None
+
+# Buffer compartido entre procesos (ver usar_tail_compartido); None = buffer RAM local
+_tail_agregar: Optional[Callable[[str], None]] = None
+_tail_leer: Optional[Callable[[int], list]] = None
+
+# True mientras se reaplican comandos ya logueados (ver suspendido()); por
+# contexto: no silencia lo que loguean otros hilos mientras tanto
+_suspendido: ContextVar[bool] = ContextVar("suspendido", default=False)
+
+# Buffer de la sala del request en curso (ver en_sala()); None = sala principal
+_sala_actual: ContextVar[Optional["BufferSala"]] = ContextVar("sala_actual", default=None)
+
+# Un mensaje puede ser texto, plantilla estilo "%s" (con args) o callable sin args
+Mensaje = Union[str, Callable[[], str]]
+
 
 # ---------------------------------------------------------------------------
 # Funciones internas (helpers)
@@ -88,14 +123,19 @@ def _build_log_paths(log_root_dir: str, day_str: str) -> tuple[str, str, str, st
     return day_dir, path_1, path_2, path_3
 
 
-def _format_line(tag: str, level: int, message: str) -> str:
+def _format_line(tag: str, level: int, message: str, ts: Optional[float] = None) -> str:
     """
     Arma una línea de log con formato fijo.
 
     Formato:
         HH:MM:SS | L<level> | <tag> | <mensaje>
+
+    ts: instante del evento (time.time()); si no se pasa, se usa "ahora".
     """
-    timestamp = datetime.now().strftime("%H:%M:%S")
+    if ts is None:
+        timestamp = datetime.now().strftime("%H:%M:%S")
+    else:
+        timestamp = time.strftime("%H:%M:%S", time.localtime(ts))
 
     safe_tag = (tag or "").strip()
     safe_message = (message or "").rstrip("\n")
@@ -103,6 +143,91 @@ def _format_line(tag: str, level: int, message: str) -> str:
     return f"{timestamp} | L{level} | {safe_tag} | {safe_message}"
 
 
+def nivel_de_linea(line: str) -> int:
+    """
+    Nivel de una línea armada por _format_line ("HH:MM:SS | L<level> | ...").
+
+    Para líneas que ya no tienen el evento original (buffer compartido).
+    """
+    nivel = line[12:13]
+    return int(nivel) if nivel in ("1", "2", "3") else LOG_MIN_LEVEL
+
+
+# Args que se guardan tal cual en un evento sin armar (inmutables)
+_ARGS_SIMPLES = (str, int, float, bool, type(None))
+
+
+def _congelar(message: Mensaje, args: tuple) -> tuple:
+    """
+    (message, args) para guardar sin armar: sin referencias a objetos de
+    dominio que pueden cambiar antes de que se lea la línea.
+    """
+    if callable(message):
+        return _render_message(message, args), ()
+    return message, tuple(a if isinstance(a, _ARGS_SIMPLES) else str(a) for a in args)
+
+
+def _render_message(message: Mensaje, args: tuple) -> str:
+    """Arma el texto final del mensaje (plantilla + args, o callable)."""
+    if callable(message):
+        return message()
+    if args:
+        return message % args
+    return message
+
+
+class _EventoRAM:
+    """
+    Evento del buffer RAM. La línea se arma a demanda (y se guarda):
+    los eventos bajo el nivel mínimo solo se formatean si alguien los lee.
+
+    Una vez en el buffer, line() se llama con _lock tomado.
+    """
+
+    __slots__ = ("seq", "ts", "tag", "level", "message", "args", "_line")
+
+    def __init__(self, seq: int, ts: float, tag: str, level: int, message: Mensaje, args: tuple) -> None:
+        self.seq = seq
+        self.ts = ts
+        self.tag = tag
+        self.level = level
+        self.message = message
+        self.args = args
+        self._line: Optional[str] = None
+
+    def line(self) -> str:
+        if self._line is None:
+            self._line = _format_line(self.tag, self.level, _render_message(self.message, self.args), self.ts)
+            # ya no hacen falta: liberamos las referencias a objetos de dominio
+            self.message = None
+            self.args = ()
+        return self._line
+
+    def to_dict(self) -> dict:
+        return {"seq": self.seq, "level": self.level, "line": self.line()}
+
+
+class BufferSala:
+    """Buffer RAM de eventos de una sala, con su propio contador de seq."""
+
+    __slots__ = ("nombre", "seq", "eventos")
+
+    def __init__(self, nombre: str) -> None:
+        self.nombre = nombre
+        self.seq = 0
+        self.eventos = deque(maxlen=LOG_RAM_MAXLEN)
+
+    def agregar(self, evento: _EventoRAM) -> None:
+        """Se llama con _lock tomado."""
+        self.seq += 1
+        evento.seq = self.seq
+        self.eventos.append(evento)
+
+
+def _nivel_minimo_archivo() -> int:
+    return getattr(settings, "log_nivel_minimo", LOG_MIN_LEVEL)
+
+
 # ---------------------------------------------------------------------------
 # FUNCIÓNES PÚBLICAS
 # ---------------------------------------------------------------------------
@@ -114,25 +239,109 @@ def get_log_tail() -> list[dict]:
     Se devuelve lista (no deque) porque:
     - es JSON-friendly
     - evita exponer la deque interna
+
+    Con varios workers (usar_tail_compartido) se leen los últimos eventos
+    del buffer compartido. Dentro de en_sala() se leen los de esa sala.
     """
+    sala = _sala_actual.get()
+    if sala is not None:
+        with _lock:
+            return [e.to_dict() for e in sala.eventos]
+    if _tail_leer is not None:
+        return _tail_leer(LOG_RAM_MAXLEN)
     with _lock:
-        return list(_log_ram_tail)
+        return [e.to_dict() for e in _log_ram_tail]
+
+
+def version_eventos() -> int:
+    """
+    seq del último evento que devolvería get_log_tail() (0 si no hay).
+
+    Cambia si y solo si cambió la cola de eventos: sirve de clave de caché
+    para los documentos que la incluyen (ver vistas_service).
+    """
+    sala = _sala_actual.get()
+    if sala is not None:
+        return sala.seq
+    if _tail_leer is not None:
+        ultimo = _tail_leer(1)
+        return ultimo[-1]["seq"] if ultimo else 0
+    return _log_seq
 
 
-def log_internal(tag: str, level: int, message: str) -> None:
+def log_enabled(level: int) -> bool:
+    """True si un mensaje de este nivel se escribe en archivo."""
+    return level >= _nivel_minimo_archivo()
+
+
+def usar_tail_compartido(agregar: Callable[[str], None], leer: Callable[[int], list]) -> None:
+    """
+    Reemplaza el buffer RAM por uno compartido entre procesos.
+
+    agregar(line) guarda una línea ya formateada; leer(n) devuelve los
+    últimos n eventos como [{"seq", "level", "line"}] (level: nivel_de_linea). En este modo las líneas se
+    formatean siempre (también las de nivel menor al mínimo).
+    """
+    global _tail_agregar, _tail_leer
+    _tail_agregar = agregar
+    _tail_leer = leer
+
+
+@contextmanager
+def en_sala(buffer: Optional[BufferSala]) -> Iterator[None]:
+    """
+    Los logs del bloque (en este hilo) son de la sala dueña de `buffer`.
+
+    Con None no cambia nada: sala principal.
+    """
+    if buffer is None:
+        yield
+        return
+    token = _sala_actual.set(buffer)
+    try:
+        yield
+    finally:
+        _sala_actual.reset(token)
+
+
+@contextmanager
+def suspendido() -> Iterator[None]:
+    """
+    Suspende el log mientras dura el bloque.
+
+    Lo usan journal_service y estado_compartido_service al reaplicar
+    comandos ya logueados en su momento: así no se duplican líneas en los
+    archivos del día. Solo afecta al hilo (contexto) que lo llama.
+    """
+    token = _suspendido.set(True)
+    try:
+        yield
+    finally:
+        _suspendido.reset(token)
+
+
+def log_internal(tag: str, level: int, message: Mensaje, *args: Any) -> None:
     """
     Logger interno del sistema.
 
     Parámetros:
         tag     -> identificador del subsistema ("SESION", "VOTO", etc.)
         level   -> 1 (detalle), 2 (normal), 3 (importante)
-        message -> mensaje libre
+        message -> mensaje libre, plantilla "%s" (con args) o callable sin args
+        args    -> argumentos de la plantilla
+
+    Ejemplos:
+        log_internal("INPUT", 2, "Tecla [%s] del dispositivo [%s]", tecla, dispositivo)
+        log_internal("VOTACION", 3, lambda: votacion.to_linea_votos())
 
     Escritura:
         level 1 -> archivo -1.txt
         level 2 -> archivos -1.txt y -2.txt
         level 3 -> archivos -1.txt, -2.txt y -3.txt
 
+    Si level < settings.log_nivel_minimo no se escribe en archivo ni se
+    arma el texto: solo queda en el buffer RAM, sin formatear.
+
     Los archivos se escriben dentro del directorio del día:
         <settings.log_dir>/AAAA-MM-DD/
     """
@@ -141,6 +350,37 @@ def log_internal(tag: str, level: int, message: str) -> None:
     if not isinstance(level, int) or not (LOG_MIN_LEVEL <= level <= LOG_MAX_LEVEL):
         raise ValueError(f"Nivel de log inválido: {level}. Debe ser 1, 2 o 3.")
 
+    global _log_seq
+
+    if _suspendido.get():
+        return
+
+    ts = time.time()
+
+    evento: Optional[_EventoRAM] = None
+
+    sala = _sala_actual.get()
+    if sala is not None:
+        tag = f"{tag}@{sala.nombre}"
+
+    # Buffer compartido entre procesos: la línea se arma acá
+    if sala is None and _tail_agregar is not None:
+        evento = _EventoRAM(0, ts, tag, level, message, args)
+        _tail_agregar(evento.line())
+        if level < _nivel_minimo_archivo():
+            return
+
+    # Bajo el nivel mínimo: solo buffer RAM, sin formatear
+    elif level < _nivel_minimo_archivo():
+        message, args = _congelar(message, args)
+        with _lock:
+            if sala is not None:
+                sala.agregar(_EventoRAM(0, ts, tag, level, message, args))
+            else:
+                _log_seq += 1
+                _log_ram_tail.append(_EventoRAM(_log_seq, ts, tag, level, message, args))
+        return
+
     # Obtener el directorio raíz de logs desde settings
     log_root_dir = getattr(settings, "log_dir", None)
     if not log_root_dir or not isinstance(log_root_dir, str):
@@ -152,22 +392,27 @@ def log_internal(tag: str, level: int, message: str) -> None:
     # Construir rutas del día
     day_dir, log_1, log_2, log_3 = _build_log_paths(log_root_dir, day_str)
 
-    # Asegurar que existan el root y el subdirectorio del día
-    _ensure_dir_exists(log_root_dir)
-    _ensure_dir_exists(day_dir)
+    # Asegurar que existan el root y el subdirectorio del día (una vez por día)
+    global _dia_asegurado
+    if _dia_asegurado != day_dir:
+        _ensure_dir_exists(log_root_dir)
+        _ensure_dir_exists(day_dir)
+        _dia_asegurado = day_dir
 
     # Formatear línea (sin '\n')
-    line_no_nl = _format_line(tag, level, message)
+    if evento is None:
+        evento = _EventoRAM(0, ts, tag, level, message, args)
+    line_no_nl = evento.line()
 
-    global _log_seq
     # Escritura protegida (mutex)
     with _lock:
 
-        _log_seq += 1
-        _log_ram_tail.append({
-            "seq": _log_seq,
-            "line": line_no_nl,
-        })
+        if sala is not None:
+            sala.agregar(evento)
+        elif _tail_agregar is None:
+            _log_seq += 1
+            evento.seq = _log_seq
+            _log_ram_tail.append(evento)
 
         # al escribir a archivos (agregamos '\n')
         line = line_no_nl + "\n"
@@ -0,0 +1,151 @@
+"""
+Publicación de un documento (bytes) en un archivo mapeado en memoria.
+
+Un proceso escribe y cualquier cantidad de procesos leen, sin locks del
+lado de los lectores. Doble buffer con encabezado estilo seqlock:
+
+    offset 0   encabezado (64 bytes, little endian)
+                 seq       u64   impar mientras se cambia el encabezado
+                 slot      u64   slot activo (0 o 1)
+                 revision  u64   revisión publicada (no se publica una menor)
+                 largo0    u64   bytes válidos en el slot 0 (0 = sin datos)
+                 largo1    u64   bytes válidos en el slot 1
+    offset 64                 slot 0 (capacidad bytes)
+    offset 64 + capacidad     slot 1 (capacidad bytes)
+
+Escritura: seq pasa a impar, se copian los datos al slot INACTIVO y se
+cambia el encabezado (slot/largo, seq par). Los lectores del slot activo
+nunca ven datos a medio escribir; si seq cambió mientras copiaban (hubo
+una publicación en el medio), reintentan.
+
+Entre procesos escritores la exclusión la da un flock sobre el archivo.
+
+Este módulo NO importa settings ni servicios.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import mmap
+import os
+import struct
+from typing import Optional
+
+
+# ---------------------------------------------------------------------------
+# Constantes
+# ---------------------------------------------------------------------------
+
+_ENCABEZADO = struct.Struct("<QQQQQ")
+ENCABEZADO_BYTES = 64
+
+# Capacidad por defecto de cada slot
+CAPACIDAD_DEFAULT = 8 * 1024 * 1024
+
+# Reintentos de lectura antes de rendirse (el escritor está muy activo)
+_REINTENTOS = 100
+
+
+class PublicadorMmap:
+    """
+    Documento publicado en un archivo mapeado (ver docstring del módulo).
+
+    Todos los procesos abren el mismo archivo; el que lo crea lo dimensiona.
+    """
+
+    def __init__(self, ruta: str, capacidad: int = CAPACIDAD_DEFAULT) -> None:
+        self.ruta = ruta
+        self.capacidad = capacidad
+        tamanio = ENCABEZADO_BYTES + 2 * capacidad
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != tamanio:
+                # Archivo nuevo (o de otra capacidad): queda vacío, sin datos publicados
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, tamanio)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        self._mm = mmap.mmap(self._fd, tamanio)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _offset_slot(self, slot: int) -> int:
+        return ENCABEZADO_BYTES + slot * self.capacidad
+
+    def _encabezado(self):
+        return _ENCABEZADO.unpack_from(self._mm, 0)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def publicar(self, data: bytes, revision: int) -> bool:
+        """
+        Publica `data` como revisión `revision`.
+
+        Devuelve False si no se publicó: ya hay publicada una revisión
+        mayor, o `data` no entra en un slot (en ese caso el documento queda
+        marcado sin datos y los lectores usan su camino normal).
+        """
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            seq, slot, rev_actual, largo0, largo1 = self._encabezado()
+            if revision < rev_actual:
+                return False
+
+            nuevo = 1 - slot
+            entra = len(data) <= self.capacidad
+            largos = [largo0, largo1]
+            largos[nuevo] = len(data) if entra else 0
+
+            # seq impar ANTES de tocar datos: un lector que estuviera copiando
+            # el slot inactivo (publicado dos veces atrás) lo nota y reintenta
+            _ENCABEZADO.pack_into(self._mm, 0, seq + 1, slot, rev_actual, largo0, largo1)
+            if entra:
+                inicio = self._offset_slot(nuevo)
+                self._mm[inicio:inicio + len(data)] = data
+            _ENCABEZADO.pack_into(self._mm, 0, seq + 2, nuevo, revision, largos[0], largos[1])
+            return entra
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def reiniciar(self) -> None:
+        """Descarta lo publicado (y su revisión), p. ej. al arrancar el único escritor."""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            seq = self._encabezado()[0]
+            _ENCABEZADO.pack_into(self._mm, 0, (seq | 1) + 1, 0, 0, 0, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def leer(self) -> Optional[bytes]:
+        """
+        Devuelve el último documento publicado, o None si no hay.
+
+        Una sola copia: del mapeo al objeto bytes que se envía.
+        """
+        for _ in range(_REINTENTOS):
+            seq, slot, _rev, largo0, largo1 = self._encabezado()
+            if seq & 1:
+                continue
+            largo = largo1 if slot else largo0
+            if largo == 0:
+                return None
+            inicio = self._offset_slot(slot)
+            data = self._mm[inicio:inicio + largo]
+            if _ENCABEZADO.unpack_from(self._mm, 0)[0] == seq:
+                return data
+        return None
+
+    def cerrar(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
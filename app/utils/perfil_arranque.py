@@ -0,0 +1,174 @@
+"""
+Perfil de arranque del backend (herramienta de línea de comandos).
+
+Mide lo que tarda el backend en servir su primer poll después de un
+reinicio (p. ej. systemctl restart):
+
+    1. Tiempo de importación de app.main, con el detalle de
+       `python -X importtime` (módulos más caros, propio y acumulado).
+    2. Arranque real: lanza uvicorn en un puerto libre y mide el tiempo
+       desde el lanzamiento hasta la primera respuesta de
+       /estados/estado_global, y la latencia de los primeros polls.
+
+Con --max-import-ms / --max-primer-poll-ms sirve de control: si se supera
+algún límite termina con código 1.
+
+Uso (desde la raíz del proyecto, con el config.json a medir):
+    python -m app.utils.perfil_arranque [--top 15] [--polls 5]
+                                        [--max-import-ms N] [--max-primer-poll-ms N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import re
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+
+# ---------------------------------------------------------------------------
+# Importación
+# ---------------------------------------------------------------------------
+
+# "import time:       309 |     129013 |             fastapi.security"
+_RE_IMPORTTIME = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+def perfil_importacion(modulo: str = "app.main") -> List[Tuple[str, int, int, int]]:
+    """
+    Importa `modulo` en un proceso nuevo con -X importtime.
+
+    Devuelve (modulo, propio_us, acumulado_us, profundidad) por cada import.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proc.stderr[-2000:]}")
+
+    filas = []
+    for linea in proc.stderr.splitlines():
+        m = _RE_IMPORTTIME.match(linea)
+        if m:
+            propio, acumulado, sangria, nombre = m.groups()
+            filas.append((nombre, int(propio), int(acumulado), (len(sangria) - 1) // 2))
+    return filas
+
+
+def _tabla(titulo: str, filas: List[Tuple[str, int, int, int]]) -> None:
+    print(titulo)
+    print(f"  {'propio ms':>10} {'acum. ms':>10}  módulo")
+    for nombre, propio, acumulado, _prof in filas:
+        print(f"  {propio / 1000:10.1f} {acumulado / 1000:10.1f}  {nombre}")
+
+
+# ---------------------------------------------------------------------------
+# Arranque real
+# ---------------------------------------------------------------------------
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(puerto: int, path: str) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=5)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+
+def medir_arranque(polls: int = 5, timeout_s: float = 30.0) -> Tuple[float, List[float]]:
+    """
+    Lanza uvicorn y mide el primer poll.
+
+    Devuelve (ms desde el lanzamiento hasta la primera respuesta,
+    latencias en ms de los primeros `polls` polls).
+    """
+    puerto = _puerto_libre()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        latencias: List[float] = []
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"El backend terminó al arrancar:\n{proc.stderr.read()[-2000:]}")
+            if time.perf_counter() - t0 > timeout_s:
+                raise RuntimeError(f"El backend no respondió en {timeout_s:.0f} s")
+            t = time.perf_counter()
+            try:
+                status = _get(puerto, "/estados/estado_global")
+            except OSError:
+                time.sleep(0.005)
+                continue
+            latencias.append((time.perf_counter() - t) * 1000)
+            if status != 200:
+                raise RuntimeError(f"estado_global respondió HTTP {status}")
+            break
+        primera = (time.perf_counter() - t0) * 1000
+
+        for _ in range(polls - 1):
+            t = time.perf_counter()
+            _get(puerto, "/estados/estado_global")
+            latencias.append((time.perf_counter() - t) * 1000)
+        return primera, latencias
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+# ---------------------------------------------------------------------------
+# Línea de comandos
+# ---------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Perfil de importación y arranque del backend.")
+    parser.add_argument("--top", type=int, default=15,
+                        help="Cantidad de módulos a listar (por defecto 15).")
+    parser.add_argument("--polls", type=int, default=5,
+                        help="Polls a medir después de arrancar (por defecto 5).")
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="Falla (código 1) si importar app.main tarda más.")
+    parser.add_argument("--max-primer-poll-ms", type=float, default=None,
+                        help="Falla (código 1) si el primer poll llega más tarde (desde el lanzamiento).")
+    args = parser.parse_args(argv)
+
+    filas = perfil_importacion()
+    total_ms = next((acum for nombre, _p, acum, prof in filas if nombre == "app.main" and prof == 0), 0) / 1000
+    print(f"Importación de app.main: {total_ms:.1f} ms ({len(filas)} módulos)\n")
+    _tabla("Más caros (tiempo propio):", sorted(filas, key=lambda f: f[1], reverse=True)[:args.top])
+    print()
+    _tabla("Paquetes de primer nivel (acumulado):",
+           sorted((f for f in filas if f[3] <= 1), key=lambda f: f[2], reverse=True)[:args.top])
+    print()
+
+    primera, latencias = medir_arranque(max(1, args.polls))
+    print(f"Primer poll servido a los {primera:.0f} ms del lanzamiento")
+    print("Latencia de los primeros polls (ms): " + ", ".join(f"{x:.1f}" for x in latencias))
+
+    fallas = []
+    if args.max_import_ms is not None and total_ms > args.max_import_ms:
+        fallas.append(f"importación {total_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+    if args.max_primer_poll_ms is not None and primera > args.max_primer_poll_ms:
+        fallas.append(f"primer poll {primera:.0f} ms > {args.max_primer_poll_ms:.0f} ms")
+    if fallas:
+        print("FALLA: " + "; ".join(fallas))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
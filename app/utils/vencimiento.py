@@ -0,0 +1,81 @@
+"""
+Timer de un vencimiento (tiempo límite de una votación o de un turno de
+uso de la palabra).
+
+    fin = Vencimiento(al_vencer, "votacion", sesion_service.lock)
+    fin.programar(hora)     # datetime o None (cancela)
+
+programar() se llama con el lock de dominio tomado cada vez que pudo
+cambiar la hora (al salir de cada comando, al recuperar o traer el
+estado); si es la misma que ya está armada no hace nada.
+
+El timer también toma ese lock para desarmarse, y solo si sigue siendo el
+armado: si se volvió a programar (o se canceló) mientras disparaba, no
+pisa la hora nueva ni llama a al_vencer.
+
+al_vencer() corre en el hilo del timer: debe tomar el lock de dominio
+(SesionService.comando()) y volver a verificar que sigue vencido, porque
+el estado pudo cambiar entre tanto (o lo pudo cerrar otro worker).
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Callable, ContextManager, Optional
+
+from app.utils import logging
+
+# Margen para que el timer no dispare antes de la hora (reloj de pared vs monotónico)
+_MARGEN_S = 0.01
+
+
+class Vencimiento:
+    __slots__ = ("_al_vencer", "_nombre", "_lock", "_timer", "_armado", "hora")
+
+    def __init__(self, al_vencer: Callable[[], None], nombre: str, lock: ContextManager) -> None:
+        self._al_vencer = al_vencer
+        self._nombre = nombre
+        self._lock = lock
+        self._timer: Optional[threading.Timer] = None
+        # Sube con cada cancelación: identifica al timer armado
+        self._armado = 0
+        # Hora para la que está armado (None = sin timer)
+        self.hora: Optional[datetime] = None
+
+    def programar(self, hora: Optional[datetime]) -> None:
+        if hora == self.hora:
+            return
+        self.cancelar()
+        self.hora = hora
+        if hora is None:
+            return
+
+        espera = max(0.0, (hora - datetime.now()).total_seconds())
+        self._timer = threading.Timer(espera + _MARGEN_S, self._disparar, args=(self._armado,))
+        self._timer.name = "vencimiento-" + self._nombre
+        self._timer.daemon = True
+        self._timer.start()
+
+    def cancelar(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._armado += 1
+        self.hora = None
+
+    def _disparar(self, armado: int) -> None:
+        with self._lock:
+            if armado != self._armado:
+                # Se volvió a programar o se canceló mientras el timer disparaba
+                return
+            # Ya no está armado: si al_vencer no cierra nada (se adelantó, cambió
+            # la hora) el próximo programar() lo vuelve a armar
+            self._timer = None
+            self.hora = None
+        try:
+            self._al_vencer()
+        except Exception as e:
+            # P. ej. journal_service.JournalNoConfirmado: el cierre ya se
+            # aplicó y el journal lo reintenta; no hay request a quien avisar
+            logging.log_internal("BACKEND", 2, "Error al vencer %s: %s", self._nombre, e)
@@ -0,0 +1,55 @@
+"""
+Vigilancia de archivos sueltos (config.json, padrones) con watchfiles.
+
+    vigilar_archivos(["config.json"], parar, al_cambiar)   # bloquea: correr en un hilo
+
+Se vigila cada archivo, no su directorio: en la raíz del proyecto y en
+data/ se escriben logs, journal y bases SQLite todo el tiempo, y vigilar el
+directorio despertaría el hilo con cada escritura solo para descartarla.
+
+Un editor que guarda escribiendo otro archivo y renombrándolo encima deja
+la vigilancia sobre el archivo viejo (llega como borrado): se avisa el
+cambio y se vuelve a armar sobre el nuevo. Los archivos que no existen se
+buscan cada REINTENTO_S segundos y se avisan cuando aparecen.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Callable, Iterable, Optional, Set
+
+REINTENTO_S = 1.0
+
+
+def vigilar_archivos(rutas: Iterable[str], parar: threading.Event, al_cambiar: Callable[[str], None]) -> None:
+    """Llama al_cambiar(ruta absoluta) cada vez que cambia uno de los archivos, hasta que se setee `parar`."""
+    from watchfiles import Change, watch
+
+    rutas = sorted({os.path.abspath(r) for r in rutas})
+    existian: Optional[Set[str]] = None
+
+    while not parar.is_set():
+        existentes = {r for r in rutas if os.path.exists(r)}
+        if existian is not None:
+            for ruta in sorted(existentes - existian):
+                al_cambiar(ruta)
+        existian = existentes
+        if not existentes:
+            parar.wait(REINTENTO_S)
+            continue
+
+        faltan = len(existentes) < len(rutas)
+        try:
+            for cambios in watch(*sorted(existentes), stop_event=parar, debounce=200,
+                                 rust_timeout=int(REINTENTO_S * 1000), yield_on_timeout=faltan):
+                for ruta in sorted({os.path.abspath(r) for _cambio, r in cambios} & existentes):
+                    al_cambiar(ruta)
+                # Reemplazado o borrado: hay que vigilar el archivo nuevo
+                if any(cambio == Change.deleted for cambio, _r in cambios):
+                    break
+                if faltan and any(os.path.exists(r) for r in rutas if r not in existentes):
+                    break
+        except FileNotFoundError:
+            # Se borró entre el exists() y el watch()
+            parar.wait(REINTENTO_S)
@@ -0,0 +1,302 @@
+/*
+  conexion_estado.js
+  ==================
+  Conexión compartida al estado del backend (la vista de cada cliente,
+  /estados/vista/{pantalla|moderacion|monitor}, o /estados/estado_global).
+
+  Con varias pestañas abiertas en la misma PC (moderación, pantalla,
+  monitor) cada una hacía su propio polling. Ahora todas se suscriben a
+  un SharedWorker (worker_estado.js) que consulta UNA vez por intervalo y
+  reparte la respuesta: la carga sobre el backend es la de una pestaña.
+
+  Si el navegador no tiene SharedWorker (o no se puede crear) la pestaña
+  consulta por su cuenta, como antes.
+
+  Intervalo: el que sugiere el backend en cada respuesta ("poll_ms",
+  según la fase de la sesión); sin sugerencia, el pedido por la pestaña.
+  Ante errores se espera cada vez más (exponencial con jitter, hasta 10 s)
+  para que las pantallas no se amontonen cuando el backend reinicia.
+
+  Hora del servidor: cada respuesta trae X-Hora-Servidor (epoch ms); con
+  ella se estima la diferencia con el reloj local, para que las cuentas
+  regresivas (votacion.vence_ms) no dependan de la hora de cada PC.
+
+  Formato: suscribir() pide JSON y entrega el texto tal cual.
+  suscribirDatos() pide MessagePack (Accept: application/msgpack, ver
+  msgpack.js) y entrega el documento ya decodificado; las claves vienen
+  como números y el diccionario se pide una vez por versión
+  (/estados/claves?version=<X-Claves-Version>). Si el backend contesta
+  JSON igual se entrega decodificado. Una respuesta idéntica a la anterior
+  no se decodifica: se entrega null.
+
+  Uso:
+    ConexionEstado.suscribir(url, pollMs, onTexto, onError)
+      onTexto(texto)  cuerpo de la respuesta (JSON sin parsear)
+      onError(error)
+    ConexionEstado.suscribirDatos(url, pollMs, onDatos, onError)
+      onDatos(datos)  documento decodificado, o null si no cambió
+    ConexionEstado.refrescar()   consultar ya (p. ej. después de un comando)
+    ConexionEstado.ahora()       hora del servidor estimada (epoch ms)
+
+  Requiere msgpack.js cargado antes. El worker carga los dos archivos
+  (importScripts) y usa SondeoEstado.
+*/
+
+///////////////////////////////
+// Loop de polling de una URL
+///////////////////////////////
+const SondeoEstado = (() => {
+  const TIMEOUT_MS = 1500;
+  // Límites para el intervalo sugerido por el backend
+  const MIN_MS = 50;
+  const MAX_MS = 60000;
+  // Tope de la espera tras errores seguidos
+  const BACKOFF_MAX_MS = 10000;
+
+  const ACCEPT_JSON = "application/json";
+  const ACCEPT_BINARIO = "application/msgpack, application/json;q=0.5";
+
+  // Diccionarios de claves ya pedidos: versión -> Promise<array>
+  const diccionarios = new Map();
+
+  function claves(url, version){
+    let p = diccionarios.get(version);
+    if (!p){
+      const base = url.slice(0, url.indexOf("/estados/"));
+      p = fetch(`${base}/estados/claves?version=${encodeURIComponent(version)}`)
+        .then((res) => {
+          if (!res.ok) throw new Error(`HTTP ${res.status}`);
+          return res.json();
+        })
+        .then((doc) => doc.claves);
+      // Si falla se vuelve a pedir en el próximo poll
+      p.catch(() => diccionarios.delete(version));
+      diccionarios.set(version, p);
+    }
+    return p;
+  }
+
+  // { texto, desfaseMs } o, en binario y si el backend contestó MessagePack,
+  // { bytes, claves, desfaseMs }. desfaseMs = hora del servidor - hora local
+  // (tomando la mitad del viaje), o null si no vino X-Hora-Servidor
+  async function fetchEstado(url, binario){
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), TIMEOUT_MS);
+    try{
+      const t0 = Date.now();
+      const res = await fetch(url, {
+        method: "GET",
+        headers: { "Accept": binario ? ACCEPT_BINARIO : ACCEPT_JSON },
+        signal: controller.signal,
+      });
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const hora = Number(res.headers.get("X-Hora-Servidor"));
+      const desfaseMs = hora > 0 ? hora - (t0 + Date.now()) / 2 : null;
+      const version = res.headers.get("X-Claves-Version");
+      if (binario && version){
+        const bytes = new Uint8Array(await res.arrayBuffer());
+        return { bytes, claves: await claves(url, version), desfaseMs };
+      }
+      return { texto: await res.text(), desfaseMs };
+    } finally {
+      clearTimeout(timer);
+    }
+  }
+
+  function acotar(n){
+    n = Number(n);
+    return Number.isFinite(n) && n > 0 ? Math.min(MAX_MS, Math.max(MIN_MS, n)) : null;
+  }
+
+  function pollMsSugerido(texto){
+    try{
+      return acotar(JSON.parse(texto)?.poll_ms);
+    } catch (_e){
+      return null;
+    }
+  }
+
+  function mismosBytes(a, b){
+    if (!a || !b || a.length !== b.length) return false;
+    for (let i = 0; i < a.length; i++) if (a[i] !== b[i]) return false;
+    return true;
+  }
+
+  // Espera tras `errores` errores seguidos: tope exponencial, valor al azar
+  // entre la mitad y el tope (jitter)
+  function esperaTrasError(base, errores){
+    const tope = Math.min(BACKOFF_MAX_MS, base * 2 ** Math.min(errores - 1, 10));
+    return tope / 2 + Math.random() * tope / 2;
+  }
+
+  /*
+    Arranca el loop de `url`. entregar(msg) recibe cada resultado:
+      { tipo: "estado", texto, desfaseMs }  |  { tipo: "error", mensaje }
+    Con binario, en lugar de texto: { datos } (null si no cambió).
+    Devuelve { refrescar(), detener(), setPollMs(ms) }.
+  */
+  function crear(url, pollMs, entregar, binario = false){
+    let defecto = pollMs;
+    // Binario: última respuesta (bytes o texto) y su poll_ms
+    let previo = null;
+    let sugerido = null;
+
+    // Respuesta -> { datos } (null si es igual a la anterior)
+    function decodificar(r){
+      if (r.bytes ? mismosBytes(r.bytes, previo) : r.texto === previo) return null;
+      const datos = r.bytes ? Msgpack.decodificar(r.bytes, r.claves) : JSON.parse(r.texto);
+      previo = r.bytes || r.texto;
+      sugerido = acotar(datos?.poll_ms);
+      return datos;
+    }
+    let errores = 0;
+    let timer = null;
+    let enCurso = false;
+    let otraVez = false;
+    let activo = true;
+
+    async function tick(){
+      timer = null;
+      enCurso = true;
+      otraVez = false;
+
+      let msg;
+      let espera;
+      try{
+        const r = await fetchEstado(url, binario);
+        if (binario){
+          msg = { tipo: "estado", datos: decodificar(r), desfaseMs: r.desfaseMs };
+          espera = sugerido ?? defecto;
+        } else {
+          msg = { tipo: "estado", texto: r.texto, desfaseMs: r.desfaseMs };
+          espera = pollMsSugerido(r.texto) ?? defecto;
+        }
+        errores = 0;
+      } catch (e){
+        errores += 1;
+        msg = { tipo: "error", mensaje: String(e?.message || e) };
+        espera = esperaTrasError(defecto, errores);
+      }
+      enCurso = false;
+      if (!activo) return;
+
+      entregar(msg);
+      timer = setTimeout(tick, otraVez ? 0 : espera);
+    }
+
+    function refrescar(){
+      if (!activo) return;
+      if (enCurso){
+        otraVez = true;
+        return;
+      }
+      clearTimeout(timer);
+      tick();
+    }
+
+    function detener(){
+      activo = false;
+      clearTimeout(timer);
+      timer = null;
+    }
+
+    function setPollMs(ms){ defecto = ms; }
+
+    tick();
+    return { refrescar, detener, setPollMs };
+  }
+
+  return { crear };
+})();
+
+///////////////////////////////
+// Suscripción desde una pestaña
+///////////////////////////////
+const ConexionEstado = (() => {
+  const WORKER_URL = "/comun/worker_estado.js";
+
+  // Suscripción de esta pestaña: { refrescar() }
+  let actual = null;
+  // Hora del servidor - hora local (ms), según la última respuesta
+  let desfaseMs = 0;
+
+  // onEstado recibe msg.texto o, en binario, msg.datos
+  function recibir(msg, onEstado, onError){
+    if (msg.tipo === "estado"){
+      if (Number.isFinite(msg.desfaseMs)) desfaseMs = msg.desfaseMs;
+      onEstado("datos" in msg ? msg.datos : msg.texto);
+    } else if (msg.tipo === "error"){
+      onError(new Error(msg.mensaje));
+    }
+  }
+
+  function directo(url, pollMs, binario, onEstado, onError){
+    const sondeo = SondeoEstado.crear(url, pollMs, (msg) => recibir(msg, onEstado, onError), binario);
+    actual = { refrescar: sondeo.refrescar };
+  }
+
+  function conectar(url, pollMs, binario, onEstado, onError){
+    // URL absoluta: el worker es compartido entre páginas
+    const abs = new URL(url, window.location.href).href;
+
+    if (typeof SharedWorker === "undefined"){
+      directo(abs, pollMs, binario, onEstado, onError);
+      return;
+    }
+
+    let worker;
+    try{
+      worker = new SharedWorker(WORKER_URL, { name: "botonera-estado" });
+    } catch (_e){
+      directo(abs, pollMs, binario, onEstado, onError);
+      return;
+    }
+
+    const port = worker.port;
+    let enWorker = true;
+
+    port.onmessage = (m) => {
+      const d = m.data || {};
+      if (d.url !== abs || !!d.binario !== binario) return;
+      recibir(d, onEstado, onError);
+    };
+
+    // No se pudo cargar el worker: la pestaña sigue por su cuenta
+    worker.addEventListener("error", () => {
+      if (!enWorker) return;
+      enWorker = false;
+      port.close();
+      directo(abs, pollMs, binario, onEstado, onError);
+    });
+
+    port.start();
+    port.postMessage({ tipo: "suscribir", url: abs, pollMs, binario });
+    actual = { refrescar: () => port.postMessage({ tipo: "refrescar", url: abs }) };
+
+    // Al irse la pestaña deja de recibir; si vuelve del bfcache se re-suscribe
+    window.addEventListener("pagehide", () => {
+      if (enWorker) port.postMessage({ tipo: "baja" });
+    });
+    window.addEventListener("pageshow", (ev) => {
+      if (enWorker && ev.persisted) port.postMessage({ tipo: "suscribir", url: abs, pollMs, binario });
+    });
+  }
+
+  function suscribir(url, pollMs, onTexto, onError){
+    conectar(url, pollMs, false, onTexto, onError);
+  }
+
+  function suscribirDatos(url, pollMs, onDatos, onError){
+    conectar(url, pollMs, true, onDatos, onError);
+  }
+
+  function refrescar(){
+    if (actual) actual.refrescar();
+  }
+
+  function ahora(){
+    return Date.now() + desfaseMs;
+  }
+
+  return { suscribir, suscribirDatos, refrescar, ahora };
+})();
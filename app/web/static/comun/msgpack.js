@@ -0,0 +1,105 @@
+/*
+  msgpack.js
+  ==========
+  Decodificador MessagePack (https://msgpack.org/) para las respuestas
+  binarias del estado (Accept: application/msgpack; ver
+  app/utils/codificacion_binaria.py).
+
+  Las claves de los mapas que vienen como enteros son posiciones en el
+  diccionario de claves (/estados/claves?version=<X-Claves-Version>).
+
+  Uso:
+    Msgpack.decodificar(bytes, claves)   bytes: Uint8Array | ArrayBuffer
+                                         claves: array del diccionario
+
+  Solo los tipos que genera el backend: nil, bool, enteros, float 32/64,
+  str, array y map (no bin ni ext).
+*/
+
+const Msgpack = (() => {
+  const utf8 = new TextDecoder();
+
+  function decodificar(entrada, claves){
+    const buf = entrada instanceof Uint8Array ? entrada : new Uint8Array(entrada);
+    const vista = new DataView(buf.buffer, buf.byteOffset, buf.byteLength);
+    let pos = 0;
+
+    function texto(n){
+      const fin = pos + n;
+      if (fin > buf.length) throw new Error("msgpack: fin inesperado");
+      // Textos cortos ASCII (la mayoría): sin pasar por TextDecoder
+      if (n < 32){
+        let s = "";
+        for (let i = pos; i < fin; i++){
+          const c = buf[i];
+          if (c > 0x7f){
+            s = utf8.decode(buf.subarray(pos, fin));
+            break;
+          }
+          s += String.fromCharCode(c);
+        }
+        pos = fin;
+        return s;
+      }
+      const s = utf8.decode(buf.subarray(pos, fin));
+      pos = fin;
+      return s;
+    }
+
+    function lista(n){
+      const a = new Array(n);
+      for (let i = 0; i < n; i++) a[i] = valor();
+      return a;
+    }
+
+    function mapa(n){
+      const o = {};
+      for (let i = 0; i < n; i++){
+        const k = valor();
+        o[typeof k === "number" ? (claves[k] ?? k) : k] = valor();
+      }
+      return o;
+    }
+
+    function valor(){
+      if (pos >= buf.length) throw new Error("msgpack: fin inesperado");
+      const t = buf[pos++];
+      if (t < 0x80) return t;
+      if (t < 0x90) return mapa(t & 0x0f);
+      if (t < 0xa0) return lista(t & 0x0f);
+      if (t < 0xc0) return texto(t & 0x1f);
+      if (t >= 0xe0) return t - 0x100;
+
+      let v;
+      switch (t){
+        case 0xc0: return null;
+        case 0xc2: return false;
+        case 0xc3: return true;
+        case 0xca: v = vista.getFloat32(pos); pos += 4; return v;
+        case 0xcb: v = vista.getFloat64(pos); pos += 8; return v;
+        case 0xcc: return buf[pos++];
+        case 0xcd: v = vista.getUint16(pos); pos += 2; return v;
+        case 0xce: v = vista.getUint32(pos); pos += 4; return v;
+        case 0xcf: v = vista.getUint32(pos) * 0x100000000 + vista.getUint32(pos + 4); pos += 8; return v;
+        case 0xd0: v = vista.getInt8(pos); pos += 1; return v;
+        case 0xd1: v = vista.getInt16(pos); pos += 2; return v;
+        case 0xd2: v = vista.getInt32(pos); pos += 4; return v;
+        case 0xd3: v = vista.getInt32(pos) * 0x100000000 + vista.getUint32(pos + 4); pos += 8; return v;
+        case 0xd9: v = buf[pos]; pos += 1; return texto(v);
+        case 0xda: v = vista.getUint16(pos); pos += 2; return texto(v);
+        case 0xdb: v = vista.getUint32(pos); pos += 4; return texto(v);
+        case 0xdc: v = vista.getUint16(pos); pos += 2; return lista(v);
+        case 0xdd: v = vista.getUint32(pos); pos += 4; return lista(v);
+        case 0xde: v = vista.getUint16(pos); pos += 2; return mapa(v);
+        case 0xdf: v = vista.getUint32(pos); pos += 4; return mapa(v);
+      }
+      throw new Error(`msgpack: tipo 0x${t.toString(16)} no soportado`);
+    }
+
+    const resultado = valor();
+    if (pos !== buf.length) throw new Error("msgpack: bytes de más");
+    return resultado;
+  }
+
+  return { decodificar };
+})();
@@ -0,0 +1,93 @@
+/*
+  worker_estado.js
+  ================
+  SharedWorker: UNA conexión al estado del backend por navegador.
+
+  Todas las pestañas del mismo navegador (moderación, pantalla, monitor)
+  comparten esta instancia (ver conexion_estado.js). Por cada URL de
+  estado con suscriptores (cada cliente pide su vista, /estados/vista/...)
+  y formato (JSON o MessagePack, ver conexion_estado.js) corre un solo
+  loop de polling (SondeoEstado: intervalo sugerido por el backend,
+  backoff con jitter ante errores), y cada respuesta se reparte a todas
+  las pestañas suscriptas.
+
+  - Intervalo sin sugerencia del backend: el menor pedido por los
+    suscriptores de esa URL.
+  - Una pestaña nueva recibe enseguida la última respuesta (en binario,
+    el último documento decodificado; no el "sin cambios").
+  - El worker vive mientras quede alguna pestaña conectada: al cerrar la
+    que abrió la conexión no hay que elegir otra, el loop sigue.
+
+  Mensajes (pestaña -> worker):
+    { tipo: "suscribir", url, pollMs, binario }
+    { tipo: "refrescar", url }            consultar ya (todas las URL: un
+                                          comando cambia todas las vistas)
+    { tipo: "baja" }                      la pestaña se va (pagehide)
+  Mensajes (worker -> pestaña):
+    { tipo: "estado", url, binario, texto, desfaseMs }
+                                          cuerpo de la respuesta, tal cual, y
+                                          diferencia de reloj con el servidor
+                                          (binario: datos en lugar de texto,
+                                          ya decodificados; null = sin cambios)
+    { tipo: "error", url, binario, mensaje }
+*/
+
+importScripts("msgpack.js", "conexion_estado.js");
+
+// formato + url -> { puertos: Map<MessagePort, pollMs>, sondeo, ultimo }
+const pollers = new Map();
+
+function intervalo(p){
+  let ms = Infinity;
+  for (const pollMs of p.puertos.values()) ms = Math.min(ms, pollMs);
+  return ms;
+}
+
+function suscribir(port, url, pollMs, binario){
+  const clave = (binario ? "msgpack " : "json ") + url;
+  let p = pollers.get(clave);
+  if (!p){
+    p = { puertos: new Map([[port, pollMs]]), sondeo: null, ultimo: null };
+    pollers.set(clave, p);
+    p.sondeo = SondeoEstado.crear(url, pollMs, (msg) => {
+      const salida = { ...msg, url, binario };
+      // "Sin cambios" no reemplaza al último documento
+      if (!(msg.tipo === "estado" && msg.datos === null)) p.ultimo = salida;
+      for (const destino of p.puertos.keys()) destino.postMessage(salida);
+    }, binario);
+    return;
+  }
+  p.puertos.set(port, pollMs);
+  p.sondeo.setPollMs(intervalo(p));
+  if (p.ultimo) port.postMessage(p.ultimo);
+}
+
+function baja(port){
+  for (const [clave, p] of pollers){
+    if (!p.puertos.delete(port)) continue;
+    if (p.puertos.size === 0){
+      p.sondeo.detener();
+      pollers.delete(clave);
+    } else {
+      p.sondeo.setPollMs(intervalo(p));
+    }
+  }
+}
+
+onconnect = (ev) => {
+  const port = ev.ports[0];
+
+  port.onmessage = (m) => {
+    const d = m.data || {};
+    if (d.tipo === "suscribir"){
+      const pollMs = Number(d.pollMs);
+      suscribir(port, String(d.url), Number.isFinite(pollMs) && pollMs > 0 ? pollMs : 300, !!d.binario);
+    } else if (d.tipo === "refrescar"){
+      for (const p of pollers.values()) p.sondeo.refrescar();
+    } else if (d.tipo === "baja"){
+      baja(port);
+    }
+  };
+
+  port.start();
+};
@@ -1,24 +1,13 @@
 /*
   app.js
   ======
-  Base estable por cuadrantes (Q1..Q4), polling a /estados/estado_global.
-
-  ✅ Cambios en ESTA versión (solo Q2: Orden del día):
-  --------------------------------------------------
-  1) CSV con comillas dobles (estilo RFC4180) para permitir comas en "tema".
-  2) Header obligatorio y exacto:
-       nro_votacion,tipo,tema,factor_de_mayoria,respecto
-     - sin comillas
-     - sin espacios
-     - sin columnas extra/faltantes
-  3) tipo y respecto NO son case-sensitive:
-     - acepta "despacho", "DESPACHO", "Despacho" etc.
-     - acepta "presentes"/"cuerpo" en cualquier combinación de mayúsculas.
-  4) factor_de_mayoria:
-     - "" o "0" => se considera 0
-     - ".66", "0.66", "1", "1.0" => permitido (decimal con punto)
-     - NO se permite "%" ni coma decimal.
-  5) Si el CSV es inválido: se rechaza el archivo completo y la tabla queda vacía.
+  Base estable por cuadrantes (Q1..Q4), polling a /estados/vista/moderacion
+  (la parte de estado_global que usa esta consola).
+
+  Q2 (Orden del día): el CSV se sube al backend, que lo parsea, valida y
+  guarda en la sala (formato y reglas en app/utils/csv_orden_del_dia.py).
+  Todas las consolas muestran el mismo orden del día y pueden abrir la
+  votación del siguiente punto sin reenviar sus datos.
 
   ⚠ Nota sobre el selector de archivos:
   - Por seguridad, JS no puede elegir la carpeta inicial.
@@ -28,8 +17,10 @@
 ///////////////////////////////
 // 1) CONFIG
 ///////////////////////////////
-const API_BASE_URL = "";
-const STATE_ENDPOINT = "/estados/estado_global";
+// ?sala=<id> apunta a una sala adicional (/salas/<id>/...); sin parámetro, la principal
+const SALA = new URLSearchParams(window.location.search).get("sala");
+const API_BASE_URL = SALA ? "/salas/" + encodeURIComponent(SALA) : "";
+const STATE_ENDPOINT = "/estados/vista/moderacion";
 const POLL_MS = 250;
 const TIMEOUT_MS = 1500;
 
@@ -146,6 +137,10 @@ async function postJson(url, body){
   const text = await res.text();
   if (!res.ok) throw new Error(`HTTP ${res.status} - ${text}`);
 
+  // El comando cambió el estado: no esperar al próximo poll (que fuera de
+  // votación puede tardar un segundo)
+  ConexionEstado.refrescar();
+
   try { return JSON.parse(text); }
   catch { return { ok:true, raw:text }; }
 }
@@ -174,11 +169,6 @@ function normKey(str){
     .trim();
 }
 
-function splitSemicolonLine(line){
-  // split simple por ';' (mantiene vacíos)
-  return String(line ?? "").split(";");
-}
-
 function getSesion(state){
   const ses = state?.sesion;
   return ses && typeof ses === "object" ? ses : null;
@@ -206,10 +196,17 @@ function getEventosFromState(raw){
 }
 
 ///////////////////////////////
-// 8) UI MODEL (toggle respecto)
+// 8) UI MODEL (toggle respecto, tiempo límite)
 ///////////////////////////////
 const uiModel = { respectoPresentes: true };
 
+// Tiempo límite para la próxima votación (campo "Tiempo (s)" de Q1, lo usa
+// también Q2): segundos, o null si está vacío (sin límite)
+function duracionPedida(){
+  const raw = String(document.getElementById("inVotTiempo")?.value ?? "").trim().replace(",", ".");
+  return raw === "" ? null : raw;
+}
+
 ///////////////////////////////
 // 9) Q1 (Comandos)
 ///////////////////////////////
@@ -225,6 +222,7 @@ const Q1 = (() => {
   const inVotNumero = document.getElementById("inVotNumero");
   const selVotTipo = document.getElementById("selVotTipo");
   const inVotFactor = document.getElementById("inVotFactor");
+  const inVotTiempo = document.getElementById("inVotTiempo");
   const togRespectoPresentes = document.getElementById("togRespectoPresentes");
   const togRespectoCuerpo = document.getElementById("togRespectoCuerpo");
   const inVotTema = document.getElementById("inVotTema");
@@ -239,6 +237,13 @@ const Q1 = (() => {
 
   let lastVotRef = null;
 
+  // Votación en curso con tiempo límite: vence_ms (hora del servidor) y
+  // timer que repinta lo que falta en el estado de votación
+  let venceMs = null;
+  let tiempoTimer = null;
+  let textoEstado = "";
+  let textoEstadoPintado = null;
+
   function paintToggleRespecto(){
     const pres = uiModel.respectoPresentes === true;
     togRespectoPresentes?.classList.toggle("toggle__btn--active", pres);
@@ -296,6 +301,21 @@ const Q1 = (() => {
   }
 
 
+  // Estado en vivo que calcula el backend (votacion.en_vivo)
+  function textoEnVivo(enVivo){
+    if (!enVivo) return "";
+    // Proyección: si se cierra antes de que voten todos, queda inconclusa
+    const proyectado = enVivo.resultado_proyectado;
+    if (proyectado){
+      return ` - si votan los ${enVivo.faltan_votar} que faltan: ${textoResultadoHumano(proyectado)}`;
+    }
+    const fa = enVivo.faltan_para_aprobar;
+    const fr = enVivo.faltan_para_rechazar;
+    return ` - faltan votar ${enVivo.faltan_votar}` +
+      ` - para aprobar: ${fa === null || fa === undefined ? "no alcanza" : fa + " positivos"}` +
+      ` - para rechazar: ${fr === null || fr === undefined ? "no alcanza" : fr + " no positivos"}`;
+  }
+
   function construirTextoEstadoVotacion(state){
     const ultima = getUltimaVotacion(state);
 
@@ -310,7 +330,7 @@ const Q1 = (() => {
 
     if (estado === "EN_CURSO"){
       const texto =
-        `Votacion ${numero} en curso: ${x} votos`;
+        `Votacion ${numero} en curso: ${x} votos` + textoEnVivo(ultima?.en_vivo);
       return { modoEmpate: false, textoNormal: texto, textoEmpate: texto };
     }
 
@@ -414,6 +434,7 @@ const Q1 = (() => {
         const f = (ultima?.factor_mayoria_especial ?? "");
         inVotFactor.value = String(f);
       }
+      if (inVotTiempo) inVotTiempo.value = String(ultima?.duracion_s ?? "");
 
       // Respecto: sincronizamos uiModel y pintamos el toggle
       if (typeof ultima?.computa_sobre_los_presentes === "boolean"){
@@ -425,6 +446,7 @@ const Q1 = (() => {
       if (inVotNumero) inVotNumero.disabled = true;
       if (selVotTipo)  selVotTipo.disabled  = true;
       if (inVotFactor) inVotFactor.disabled = true;
+      if (inVotTiempo) inVotTiempo.disabled = true;
       if (inVotTema)   inVotTema.disabled   = true;
 
       // 3) Bloquear toggle por clase
@@ -436,6 +458,7 @@ const Q1 = (() => {
       if (inVotNumero) inVotNumero.disabled = false;
       if (selVotTipo)  selVotTipo.disabled  = false;
       if (inVotFactor) inVotFactor.disabled = false;
+      if (inVotTiempo) inVotTiempo.disabled = false;
       if (inVotTema)   inVotTema.disabled   = false;
 
       const toggleWrap = togRespectoPresentes?.closest(".toggle");
@@ -444,8 +467,29 @@ const Q1 = (() => {
 
     const out = construirTextoEstadoVotacion(state);
     setModoEmpate(out.modoEmpate);
-    if (votacionEstado) votacionEstado.textContent = out.textoNormal;
+    textoEstado = out.textoNormal;
+    venceMs = (estadoUlt === "EN_CURSO" && typeof ultima?.vence_ms === "number") ? ultima.vence_ms : null;
+    pintarEstadoVotacion();
     if (votacionEstadoEmpate) votacionEstadoEmpate.textContent = out.textoEmpate;
+
+    if (venceMs !== null && !tiempoTimer){
+      tiempoTimer = setInterval(pintarEstadoVotacion, 250);
+    } else if (venceMs === null && tiempoTimer){
+      clearInterval(tiempoTimer);
+      tiempoTimer = null;
+    }
+  }
+
+  // Estado de votación + lo que falta del tiempo límite (lo cierra el backend)
+  function pintarEstadoVotacion(){
+    let texto = textoEstado;
+    if (venceMs !== null){
+      const s = Math.max(0, Math.ceil((venceMs - ConexionEstado.ahora()) / 1000));
+      texto += ` - tiempo: ${s} s`;
+    }
+    if (texto === textoEstadoPintado) return;
+    textoEstadoPintado = texto;
+    if (votacionEstado) votacionEstado.textContent = texto;
   }
 
   function isEstadoAbiertoOVivo(estado){
@@ -595,6 +639,7 @@ const Q1 = (() => {
           tema,
           computa_sobre_los_presentes,
           factor_mayoria_especial: factorFinal,
+          duracion_s: duracionPedida(),
         };
 
         await postJson(API_BASE_URL + "/moderacion/abrir_votacion", body);
@@ -659,337 +704,117 @@ const Q1 = (() => {
 ///////////////////////////////
 // 10) Q2 (Orden del día)
 ///////////////////////////////
+/*
+  El CSV lo parsea y valida el backend (app/utils/csv_orden_del_dia.py):
+  el archivo se sube tal cual y queda guardado en la sala, así cualquier
+  consola lo ve sin volver a cargarlo. estado_global trae solo
+  orden_del_dia.version y el próximo punto; la tabla se pide a
+  /estados/orden_del_dia cuando cambia la versión.
+*/
 const Q2 = (() => {
   // Botones e input de archivo
   const btnOdCargar = document.getElementById("btnOdCargar");
   const btnOdLimpiar = document.getElementById("btnOdLimpiar");
+  const btnOdSiguiente = document.getElementById("btnOdSiguiente");
   const fileOdCsv = document.getElementById("fileOdCsv");
 
   // Tabla
   const odTbody = document.getElementById("odTbody");
   const odInfo = document.getElementById("odInfo");
 
-  // Estado interno del Q2
-  let rows = [];              // Array de filas parseadas del CSV
-  let selectedIndex = -1;     // Para marcar visualmente la fila seleccionada
-
-  // Header exacto requerido (case-sensitive, sin espacios)
-  const REQUIRED_HEADER = "nro_votacion;tipo;tema;factor_de_mayoria;respecto";
-
-  // Valores canónicos aceptados para tipo y respecto (case-insensitive)
-  const TIPO_ALLOWED_CANON = [
-    "Ratificación",
-    "Despacho OP",
-    "Despacho Gob",
-    "Despacho AS",
-    "Despacho HA",
-    "Despacho Eco",
-    "Mocion",
-    "P. Sobre Tabla",
-    "Otro",
-  ];
-  const RESPECTO_ALLOWED_CANON = ["Presentes", "Cuerpo"];
-
-  /*
-    --------------------------
-    CSV PARSER con comillas
-    --------------------------
-    Reglas que implementamos:
-    - Header NO va con comillas (línea exacta REQUIRED_HEADER)
-    - Datos: cada fila debe tener 5 campos, y TODOS los campos van entre comillas dobles:
-        "campo1","campo2","campo3","campo4","campo5"
-    - Dentro de un campo, una comilla doble se escribe como "" (doble comilla)
-    - Se permiten comas en el tema gracias a las comillas.
-    - También soporta saltos de línea dentro de campos (por seguridad),
-      aunque normalmente no los vas a usar.
-
-    Resultado:
-    - Devuelve Array de filas, donde cada fila es Array<string> de largo 5.
-    - Si detecta formato inválido => lanza Error (reject).
-  */
-
-  function readFirstLineAndRest(text){
-    // Normalizamos saltos de línea para facilitar
-    const s = String(text ?? "").replace(/\r\n/g, "\n").replace(/\r/g, "\n");
-    const idx = s.indexOf("\n");
-    if (idx === -1) {
-      return { firstLine: s, rest: "" };
-    }
-    return { firstLine: s.slice(0, idx), rest: s.slice(idx + 1) };
-  }
-
-  function parseQuotedCsvRecords(dataText){
-    const s = String(dataText ?? "");
-
-    const records = [];
-    let record = [];
-    let field = "";
-
-    // Estado del parser
-    let inQuotes = false;
-
-    // Recorremos carácter por carácter (parser simple pero robusto)
-    for (let i = 0; i < s.length; i++){
-      const ch = s[i];
-
-      if (inQuotes){
-        if (ch === '"'){
-          // Puede ser fin de campo, o una comilla escapada ("")
-          const next = s[i + 1];
-          if (next === '"'){
-            // Comilla escapada -> agregamos una comilla y saltamos el siguiente carácter
-            field += '"';
-            i++;
-          } else {
-            // Fin de comillas de este campo
-            inQuotes = false;
-          }
-        } else {
-          // Cualquier otro carácter dentro de comillas se agrega tal cual (incluye comas y \n)
-          field += ch;
-        }
-        continue;
-      }
-
-      // NO estamos enQuotes
-      if (ch === '"'){
-        // Inicio de un campo entre comillas
-        inQuotes = true;
-        continue;
-      }
-
-      if (ch === ','){
-        // Fin de campo
-        record.push(field);
-        field = "";
-        continue;
-      }
-
-      if (ch === '\n'){
-        // Fin de record (fila)
-        record.push(field);
-        field = "";
-
-        // Si la fila no está totalmente vacía, la agregamos
-        const isEmptyRow = record.length === 1 && record[0] === "";
-        if (!isEmptyRow) records.push(record);
-
-        record = [];
-        continue;
-      }
-
-      // Si hay caracteres fuera de comillas, el formato no es estrictamente válido.
-      // Permitimos SOLO espacios/tabs fuera para tolerar casos menores,
-      // pero como vos pediste estricto, lo rechazamos si aparece algo no whitespace.
-      if (ch !== ' ' && ch !== '\t'){
-        throw new Error(`CSV inválido: carácter fuera de comillas en datos: '${ch}'`);
-      }
-      // si es whitespace, lo ignoramos
-    }
-
-    // Flush final (último record si no termina en \n)
-    record.push(field);
-
-    const allEmpty = record.every(x => x === "");
-    if (!allEmpty){
-      records.push(record);
-    }
-
-    // Validación: no podemos terminar con comillas abiertas
-    if (inQuotes){
-      throw new Error("CSV inválido: comillas sin cerrar.");
-    }
-
-    return records;
-  }
-
-  function normalizeTrim(x){
-    return String(x ?? "").trim();
-  }
-
-  // Validación estricta (pero tipo/respecto case-insensitive)
-  function validateAndBuildRows(records){
-    const out = [];
+  // Subida de un archivo de cientos de puntos: más que el timeout de los comandos
+  const UPLOAD_TIMEOUT_MS = 10000;
 
-    for (let rowIndex = 0; rowIndex < records.length; rowIndex++){
-      const rec = records[rowIndex];
-
-      // Cada fila debe tener exactamente 5 campos
-      if (!Array.isArray(rec) || rec.length !== 5){
-        throw new Error(`CSV inválido: fila ${rowIndex + 1} debe tener 5 columnas (tiene ${rec.length}).`);
-      }
-
-      // Trim de cada campo (solo inicio/fin)
-      const nro = normalizeTrim(rec[0]);
-      const tipoRaw = normalizeTrim(rec[1]);
-      const tema = normalizeTrim(rec[2]);
-      const factorRaw = normalizeTrim(rec[3]);
-      const respectoRaw = normalizeTrim(rec[4]);
-
-      // nro_votacion: solo dígitos, no vacío
-      if (!/^[0-9]+$/.test(nro)){
-        throw new Error(`CSV inválido: nro_votacion inválido en fila ${rowIndex + 1} ("${nro}").`);
-      }
-
-      // tema: no vacío (puede tener comas y lo que sea)
-      if (tema.length === 0){
-        throw new Error(`CSV inválido: tema vacío en fila ${rowIndex + 1}.`);
-      }
-
-      // tipo: tolerante (ignora mayúsculas, acentos y espacios extra)
-      // si no matchea, por defecto "Otro"
-      const tipoCanon = TIPO_ALLOWED_CANON.find(v => normKey(v) === normKey(tipoRaw)) ?? "Otro";
-
-      // Si no coincide con ninguno → usar "Otro"
-      if (!tipoCanon){
-        tipoCanon = "Otro";
-      }
-
-      // respecto: case-insensitive, pero debe corresponder a un valor permitido
-      const respectoCanon = RESPECTO_ALLOWED_CANON.find(v => v.toLowerCase() === respectoRaw.toLowerCase());
-      if (!respectoCanon){
-        throw new Error(
-          `CSV inválido: respecto inválido en fila ${rowIndex + 1} ("${respectoRaw}"). ` +
-          `Permitidos: ${RESPECTO_ALLOWED_CANON.join(", ")}`
-        );
-      }
-
-      // factor_de_mayoria:
-      // - "" o "0" => ok
-      // - decimal 0..1 con punto => ok (".66", "0.66", "1", "1.0")
-      // - no se permite coma decimal ni "%"
-      let factorNormalized = factorRaw;
-
-      if (factorNormalized === "" || factorNormalized === "0"){
-        factorNormalized = ""; // mantenemos vacío en tabla (y Q1 lo transforma a 0 al enviar)
-      } else {
-        // Rechazamos coma decimal o %
-        if (factorNormalized.includes(",") || factorNormalized.includes("%")){
-          throw new Error(`CSV inválido: factor_de_mayoria inválido en fila ${rowIndex + 1} ("${factorRaw}").`);
-        }
-
-        // Permitimos ".66" o "0.66" o "1" o "1.0"
-        if (!/^(?:0?\.[0-9]+|1(?:\.0+)?)$/.test(factorNormalized)){
-          throw new Error(`CSV inválido: factor_de_mayoria inválido en fila ${rowIndex + 1} ("${factorRaw}").`);
-        }
-
-        // Validación numérica 0..1
-        const asNum = Number(factorNormalized);
-        if (!Number.isFinite(asNum) || asNum < 0 || asNum > 1){
-          throw new Error(`CSV inválido: factor_de_mayoria fuera de rango 0..1 en fila ${rowIndex + 1} ("${factorRaw}").`);
-        }
-      }
-
-      out.push({
-        nro_votacion: nro,
-        tipo: tipoCanon,                 // guardamos valor CANÓNICO
-        tema: tema,
-        factor_de_mayoria: factorNormalized, // "" o decimal
-        respecto: respectoCanon,          // guardamos valor CANÓNICO
-      });
+  // Estado interno del Q2
+  let version = null;         // versión del orden del día en la tabla
+  let pidiendo = null;        // versión que se está pidiendo al backend
+  let rows = [];              // puntos del orden del día (items del backend)
+  let trs = [];               // <tr> de cada punto (mismo índice que rows)
+  let selectedIndex = -1;     // fila seleccionada (copiada a Comandos)
+  let siguienteId = null;     // id del próximo punto a votar (según backend)
+  let resumen = null;
+
+  function setRowClass(idx, cls, on){
+    const tr = trs[idx];
+    if (tr) tr.classList.toggle(cls, on);
+  }
+
+  function paintInfo(){
+    if (!odInfo) return;
+    if (!resumen){
+      odInfo.textContent = "Sin archivo cargado.";
+      return;
     }
-
-    return out;
+    const sig = siguienteId !== null ? rows[siguienteId - 1] : null;
+    const base = `${resumen.nombre || "Orden del día"}: ${resumen.cantidad} puntos.`;
+    odInfo.textContent = sig
+      ? `${base} Siguiente: Nº ${sig.nro_votacion} (${sig.tipo}).`
+      : `${base} ${resumen.cantidad ? "Todos los puntos votados." : ""}`;
   }
 
-  /*
-    Parse principal: recibe el texto del archivo completo.
-    1) separa primera línea (header) + el resto (datos)
-    2) valida header EXACTO
-    3) parsea datos con comillas
-    4) valida y normaliza filas
-  */
-  function parseOrdenDelDiaCsvStrict(text){
-    const { firstLine, rest } = readFirstLineAndRest(text);
-
-    // 1) Header: debe ser exactamente esas 5 columnas, separadas por ';'
-    //    (toleramos espacios, mayúsculas y acentos SOLO en el header)
-    const expectedCols = splitSemicolonLine(REQUIRED_HEADER).map(normKey);
-    const gotCols = splitSemicolonLine(firstLine).map(normKey);
-
-    if (gotCols.length !== expectedCols.length || gotCols.some((c, i) => c !== expectedCols[i])){
-      throw new Error(
-        `CSV inválido: header incorrecto.\n` +
-        `Esperado: ${REQUIRED_HEADER}\n` +
-        `Recibido: ${firstLine}`
-      );
-    }
-
-    // 2) Parse filas: cada línea no vacía => 5 columnas separadas por ';'
-    const s = String(rest ?? "").replace(/\r\n/g, "\n").replace(/\r/g, "\n");
-    const lines = s.split("\n").filter(l => normKey(l).length > 0);
-
-    const records = lines.map((line, idx) => {
-      const cols = splitSemicolonLine(line);
-      if (cols.length !== 5){
-        throw new Error(`CSV inválido: fila ${idx + 1} debe tener 5 columnas (tiene ${cols.length}).`);
-      }
-      return cols;
-    });
-
-    // 3) Permitimos archivo con header pero sin filas (tabla vacía)
-    if (records.length === 0) return [];
-
-    // 4) Validación y normalización a objetos
-    return validateAndBuildRows(records);
+  function paintSiguiente(id){
+    if (siguienteId !== null) setRowClass(siguienteId - 1, "od__row--siguiente", false);
+    siguienteId = id ?? null;
+    if (siguienteId !== null) setRowClass(siguienteId - 1, "od__row--siguiente", true);
+    if (btnOdSiguiente) btnOdSiguiente.disabled = siguienteId === null;
+    paintInfo();
   }
 
   function clearTable(){
+    version = null;
+    pidiendo = null;
     rows = [];
+    trs = [];
     selectedIndex = -1;
+    siguienteId = null;
+    resumen = null;
 
-    if (odTbody) odTbody.innerHTML = "";
-    if (odInfo) odInfo.textContent = "Sin archivo cargado.";
-
-    // Reset del input: permite seleccionar el mismo archivo 2 veces seguidas
-    if (fileOdCsv) fileOdCsv.value = "";
+    if (odTbody) odTbody.textContent = "";
+    if (btnOdSiguiente) btnOdSiguiente.disabled = true;
+    paintInfo();
   }
 
   function renderTable(){
     if (!odTbody) return;
 
-    odTbody.innerHTML = "";
-
-    for (let i = 0; i < rows.length; i++){
-      const r = rows[i];
-
+    // Una sola inserción en el DOM para todo el orden del día
+    const frag = document.createDocumentFragment();
+    trs = rows.map((r, i) => {
       const tr = document.createElement("tr");
-
-      // Marcado visual si está seleccionada
-      if (i === selectedIndex) tr.classList.add("od__row--selected");
-
-      // Guardamos el índice para identificar click
       tr.dataset.idx = String(i);
 
-      // Celdas (en orden)
-      const tdNro = document.createElement("td");
-      tdNro.textContent = String(r.nro_votacion ?? "");
-
-      const tdTipo = document.createElement("td");
-      tdTipo.textContent = String(r.tipo ?? "");
-
-      const tdTema = document.createElement("td");
-      tdTema.textContent = String(r.tema ?? "");
-
-      const tdFactor = document.createElement("td");
-      tdFactor.textContent = String(r.factor_de_mayoria ?? "");
+      for (const val of [r.nro_votacion, r.tipo, r.tema, r.factor_de_mayoria || "", r.respecto]){
+        const td = document.createElement("td");
+        td.textContent = String(val ?? "");
+        tr.appendChild(td);
+      }
 
-      const tdRespecto = document.createElement("td");
-      tdRespecto.textContent = String(r.respecto ?? "");
+      frag.appendChild(tr);
+      return tr;
+    });
 
-      tr.appendChild(tdNro);
-      tr.appendChild(tdTipo);
-      tr.appendChild(tdTema);
-      tr.appendChild(tdFactor);
-      tr.appendChild(tdRespecto);
+    odTbody.textContent = "";
+    odTbody.appendChild(frag);
+  }
 
-      odTbody.appendChild(tr);
-    }
+  // od: resumen de estado_global con la versión nueva
+  async function pedirOrden(od){
+    const v = od.version;
+    pidiendo = v;
+    try{
+      const doc = await getJson(API_BASE_URL + "/estados/orden_del_dia?version=" + encodeURIComponent(v));
+      if (pidiendo !== v) return;   // cambió (o se limpió) mientras tanto
 
-    if (odInfo){
-      odInfo.textContent = rows.length
-        ? `Filas cargadas: ${rows.length}. Click en una fila para copiar a Comandos.`
-        : "Archivo válido, pero sin filas.";
+      clearTable();
+      version = doc.version;
+      rows = Array.isArray(doc.items) ? doc.items : [];
+      renderTable();
+      resumen = od;
+      paintSiguiente(od.siguiente);
+    } catch (_e){
+      // Se reintenta con el próximo estado
+    } finally {
+      if (pidiendo === v) pidiendo = null;
     }
   }
 
@@ -1001,11 +826,30 @@ const Q2 = (() => {
     if (!Number.isFinite(idx)) return;
     if (idx < 0 || idx >= rows.length) return;
 
+    if (selectedIndex >= 0) setRowClass(selectedIndex, "od__row--selected", false);
     selectedIndex = idx;
-    renderTable(); // re-render para marcar selección
-
-    // Emitimos hacia Q1 (sin acoplar Q2 con Q1)
-    bus.emit("od:row_selected", rows[idx]);
+    setRowClass(selectedIndex, "od__row--selected", true);
+
+    // Emitimos hacia Q1 (sin acoplar Q2 con Q1); factor 0 = vacío (mayoría simple)
+    const r = rows[idx];
+    bus.emit("od:row_selected", { ...r, factor_de_mayoria: r.factor_de_mayoria ? String(r.factor_de_mayoria) : "" });
+  }
+
+  async function subir(f){
+    const url = API_BASE_URL + "/moderacion/orden_del_dia?nombre=" + encodeURIComponent(f.name);
+    const res = await fetchWithTimeout(url, {
+      method: "POST",
+      headers: { "Content-Type":"text/csv", "Accept":"application/json" },
+      body: f,
+    }, UPLOAD_TIMEOUT_MS);
+
+    const text = await res.text();
+    if (!res.ok){
+      let detail = text;
+      try { detail = JSON.parse(text)?.detail ?? text; } catch (_e){}
+      throw new Error(String(detail));
+    }
+    ConexionEstado.refrescar();
   }
 
   function init(){
@@ -1019,49 +863,64 @@ const Q2 = (() => {
     });
 
     // Limpiar
-    btnOdLimpiar?.addEventListener("click", () => {
-      clearTable();
-      toast("ok", "Orden del día: tabla limpia.", 1200);
+    btnOdLimpiar?.addEventListener("click", async () => {
+      try{
+        await postJson(API_BASE_URL + "/moderacion/limpiar_orden_del_dia", undefined);
+        clearTable();
+        toast("ok", "Orden del día: tabla limpia.", 1200);
+      } catch (e){
+        toast("err", `ERROR limpiar orden del día: ${e?.message || String(e)}`, 4500);
+      }
+    });
+
+    // Abrir la votación del punto marcado como siguiente
+    btnOdSiguiente?.addEventListener("click", async () => {
+      if (siguienteId === null) return;
+      toast("warn", "Enviando: abrir votación del orden del día…");
+      try{
+        const v = await postJson(API_BASE_URL + "/moderacion/abrir_votacion_orden_del_dia", { id: siguienteId, duracion_s: duracionPedida() });
+        toast("ok", `OK: votación Nº ${v?.numero ?? ""} abierta.`);
+      } catch (e){
+        toast("err", `ERROR abrir votación: ${e?.message || String(e)}`, 4500);
+      }
     });
 
-    // Archivo seleccionado
-    fileOdCsv?.addEventListener("change", () => {
+    // Archivo seleccionado: se sube tal cual (reemplaza al orden anterior)
+    fileOdCsv?.addEventListener("change", async () => {
       const f = fileOdCsv.files && fileOdCsv.files[0];
+      // Reset del input: permite seleccionar el mismo archivo 2 veces seguidas
+      fileOdCsv.value = "";
       if (!f) return;
 
-      // Reemplaza TODO el contenido (como pediste)
-      clearTable();
-
-      const reader = new FileReader();
-
-      reader.onload = () => {
-        try{
-          const text = String(reader.result ?? "");
-          rows = parseOrdenDelDiaCsvStrict(text);
-          selectedIndex = -1;
-          renderTable();
-          toast("ok", `CSV cargado: ${f.name}`, 1500);
-        } catch (e){
-          // Rechazo estricto: tabla queda vacía
-          clearTable();
-          toast("err", `CSV inválido: ${e?.message || String(e)}`, 6000);
-        }
-      };
-
-      reader.onerror = () => {
-        clearTable();
-        toast("err", "No se pudo leer el archivo CSV.", 3000);
-      };
-
-      reader.readAsText(f, "utf-8");
+      try{
+        await subir(f);
+        toast("ok", `CSV cargado: ${f.name}`, 1500);
+      } catch (e){
+        // Rechazo estricto: queda el orden anterior
+        toast("err", `CSV inválido: ${e?.message || String(e)}`, 6000);
+      }
     });
 
     // Click en filas (delegación)
     odTbody?.addEventListener("click", onRowClick);
   }
 
-  function onState(_raw){
-    // Q2 no depende del backend (solo CSV local)
+  function onState(raw){
+    const od = normalizeState(raw)?.orden_del_dia;
+
+    if (!od){
+      if (version !== null || resumen !== null) clearTable();
+      return;
+    }
+
+    if (od.version !== version){
+      if (pidiendo !== od.version) pedirOrden(od);
+      return;
+    }
+
+    resumen = od;
+    if ((od.siguiente ?? null) !== siguienteId) paintSiguiente(od.siguiente);
+    else paintInfo();
   }
 
   function onError(_e){}
@@ -1083,11 +942,22 @@ const Q3 = (() => {
 
   const btnOtorgarPalabra = document.getElementById("btnOtorgarPalabra");
   const btnQuitarPalabra  = document.getElementById("btnQuitarPalabra");
+  const inPalabraTiempo   = document.getElementById("inPalabraTiempo");
+  const oradorEl      = document.getElementById("oradorUsoPalabra");
+  const oradorNombre  = document.getElementById("oradorNombre");
+  const oradorTiempo  = document.getElementById("oradorTiempo");
+
+  // Turno de la palabra pintado ("dni|desde|vence"); null = nadie
+  let oradorPintado = null;
+  let oradorTimer = null;
 
   // Cache de layout (disposición no cambia durante la sesión)
   let cachedSesionKey = null;
-  let cachedDispoStr = null;
-  let cachedLayout = null; // { filasSorted, maxCols, sumCols }
+  // Layout del backend (/estados/layout): se pide solo cuando cambia sesion.layout_version
+  let cachedLayout = null; // { version, error, max_columnas, filas, bancas }
+  let builtLayoutVersion = null;
+  let layoutPending = null;
+  let lastRaw = null;
 
   // Bancas renderizadas: Map<bancaNro, { voteEl }>
   let bancaEls = new Map();
@@ -1130,8 +1000,7 @@ const Q3 = (() => {
 
   function resetCache(){
     cachedSesionKey = null;
-    cachedDispoStr = null;
-    cachedLayout = null;
+    builtLayoutVersion = null;
     bancaEls = new Map();
 
     activeVotRef = null;
@@ -1151,6 +1020,7 @@ const Q3 = (() => {
 
   function clearRight(){
     if (ulUsoPalabra) ulUsoPalabra.innerHTML = "";
+    stopOrador();
   }
 
   function hideCountdown(){
@@ -1186,35 +1056,20 @@ const Q3 = (() => {
     if (recintoError) recintoError.style.display = "none";
   }
 
-  function safeJsonParse(str){
-    try{
-      return JSON.parse(String(str ?? ""));
-    } catch(_e){
-      return null;
-    }
-  }
-
-  function computeLayout(dispoStr){
-    const parsed = safeJsonParse(dispoStr);
-    const filas = Array.isArray(parsed?.filas) ? parsed.filas : null;
-    if (!filas) return null;
-
-    // Normalizamos y ordenamos por "fila" asc (fila 1 es la más baja)
-    const filasNorm = filas
-      .map(f => ({
-        fila: Number(f?.fila),
-        columnas: Number(f?.columnas),
-      }))
-      .filter(f => Number.isFinite(f.fila) && Number.isFinite(f.columnas) && f.columnas > 0);
-
-    if (!filasNorm.length) return null;
-
-    filasNorm.sort((a,b) => a.fila - b.fila);
-
-    const sumCols = filasNorm.reduce((acc, f) => acc + f.columnas, 0);
-    const maxCols = filasNorm.reduce((acc, f) => Math.max(acc, f.columnas), 0);
+  function requestLayout(version){
+    // Un pedido a la vez por versión; si falla, se reintenta en el próximo poll
+    if (layoutPending === version) return;
+    layoutPending = version;
 
-    return { filasSorted: filasNorm, sumCols, maxCols };
+    getJson(API_BASE_URL + "/estados/layout?version=" + encodeURIComponent(version))
+      .then(doc => {
+        layoutPending = null;
+        cachedLayout = doc;
+        if (lastRaw) onState(lastRaw);
+      })
+      .catch(_e => {
+        layoutPending = null;
+      });
   }
 
   function setInnerWidthPx(maxCols){
@@ -1233,72 +1088,42 @@ const Q3 = (() => {
     recintoCanvas.style.setProperty("--bancaInnerW", `${innerW}px`);
   }
 
-  function buildLeft(sesion){
+  function buildLeft(layout){
     if (!recintoCanvas) return;
 
-    const dispoStr = String(sesion?.disposicion_bancas ?? "");
-    const layout = computeLayout(dispoStr);
-    if (!layout){
-      showLeftError("Error: disposicion_bancas inválida o sin filas.");
+    // La validación (filas, sum(columnas) vs concejales) la hace el backend
+    if (layout?.error){
+      showLeftError(`Error: ${layout.error}`);
       return;
     }
-
-    const concejales = Array.isArray(sesion?.concejales) ? sesion.concejales : [];
-    if (layout.sumCols !== concejales.length){
-      showLeftError(
-        `Error: sum(columnas)=${layout.sumCols} no coincide con cantidad de concejales=${concejales.length}.`
-      );
+    const filas = Array.isArray(layout?.filas) ? layout.filas : [];
+    if (!filas.length){
+      showLeftError("Error: disposicion_bancas inválida o sin filas.");
       return;
     }
 
-    // Cacheamos
-    cachedDispoStr = dispoStr;
-    cachedLayout = layout;
-
     // Render
     recintoCanvas.innerHTML = "";
     bancaEls = new Map();
     hideLeftError();
 
-    // Armamos una lista ordenada de concejales según banca (1..N)
-    const concejalesByBanca = new Map();
-    for (const c of concejales){
-      const b = Number(c?.banca);
-      if (Number.isFinite(b)) concejalesByBanca.set(b, c);
-    }
-
-    const totalBancas = concejales.length;
+    setInnerWidthPx(layout.max_columnas);
 
     // Numeración de bancas (REGLA): banca 1 = abajo-izquierda, luego izquierda→derecha,
     // completa la fila y continúa en la fila de arriba, de abajo hacia arriba.
+    // El backend manda filas ordenadas por fila asc (fila 1 = más baja) con su banca_inicial.
     //
-    // layout.filasSorted está ordenado por fila asc (fila 1 = más baja).
-    const filas = layout.filasSorted;
-    const maxCols = layout.maxCols;
-
-    setInnerWidthPx(maxCols);
-
-    // Prefijos: para cada fila i (en orden asc, de abajo→arriba), prefix[i] = cantidad de bancas en filas inferiores.
-    const prefix = [];
-    let acc = 0;
-    for (let i = 0; i < filas.length; i++){
-      prefix[i] = acc;
-      acc += filas[i].columnas;
-    }
-
-    // Render visual: apilamos en DOM de arriba→abajo (recorremos de la fila más alta a la más baja),
-    // pero la numeración se calcula con prefix para respetar abajo→arriba.
+    // Render visual: apilamos en DOM de arriba→abajo (recorremos de la fila más alta a la más baja).
     for (let i = filas.length - 1; i >= 0; i--){
       const f = filas[i];
       const row = document.createElement("div");
       row.className = "recintoRow";
       row.style.gridTemplateColumns = `repeat(${f.columnas}, 1fr)`;
 
-      const startBanca = 1 + prefix[i]; // primera banca de esta fila (según regla)
+      const startBanca = Number(f.banca_inicial); // primera banca de esta fila (según regla)
 
       for (let c = 0; c < f.columnas; c++){
         const bancaNro = startBanca + c;
-        const concejal = concejalesByBanca.get(bancaNro) || null;
 
         const cell = document.createElement("div");
         cell.className = "recintoBanca";
@@ -1333,17 +1158,74 @@ const Q3 = (() => {
 
     ulUsoPalabra.innerHTML = "";
     const cola = Array.isArray(sesion?.pedidos_uso_de_palabra) ? sesion.pedidos_uso_de_palabra : [];
+    const tiempos = sesion?.uso_de_palabra?.tiempos || {};
 
     for (const c of cola){
       const li = document.createElement("li");
       const ape = String(c?.apellido ?? "").trim();
       const nom = String(c?.nombre ?? "").trim();
       const banca = (c?.banca !== undefined && c?.banca !== null) ? ` (B${c.banca})` : "";
-      li.textContent = `${ape} ${nom}${banca}`.trim();
+      // Lo que ya habló en la sesión (turnos terminados)
+      const t = tiempos[c?.dni];
+      const hablo = t && t.turnos ? ` - habló ${minSeg(t.hablado_s * 1000)}` : "";
+      li.textContent = `${ape} ${nom}${banca}${hablo}`.trim();
       ulUsoPalabra.appendChild(li);
     }
   }
 
+  // Tiempo como m:ss
+  function minSeg(ms){
+    const s = Math.max(0, Math.floor(ms / 1000));
+    return `${Math.floor(s / 60)}:${String(s % 60).padStart(2, "0")}`;
+  }
+
+  function stopOrador(){
+    oradorPintado = null;
+    if (oradorTimer) clearInterval(oradorTimer);
+    oradorTimer = null;
+    if (oradorEl) oradorEl.hidden = true;
+  }
+
+  // Orador y tiempo de su turno: con tiempo límite (uso_de_palabra.vence_ms)
+  // cuenta regresiva, si no el transcurrido. Reloj del servidor; el backend
+  // quita la palabra al vencer.
+  function renderOrador(sesion){
+    if (!oradorEl) return;
+
+    const c = sesion?.en_uso_de_palabra;
+    const uso = sesion?.uso_de_palabra;
+    const desde = Number(uso?.en_uso_desde_ms);
+    if (!c || !Number.isFinite(desde)){
+      if (oradorPintado !== null) stopOrador();
+      return;
+    }
+
+    const vence = Number(uso?.vence_ms);
+    const limite = Number.isFinite(vence);
+    const key = `${c.dni}|${desde}|${limite ? vence : ""}`;
+    if (key === oradorPintado) return;
+    stopOrador();
+    oradorPintado = key;
+
+    const ape = String(c?.apellido ?? "").trim();
+    const nom = String(c?.nombre ?? "").trim();
+    if (oradorNombre) oradorNombre.textContent = `Habla: ${ape} ${nom}`.trim();
+    oradorEl.hidden = false;
+
+    let texto = null;
+    const tick = () => {
+      const ahora = ConexionEstado.ahora();
+      const ms = limite ? Math.ceil((vence - ahora) / 1000) * 1000 : ahora - desde;
+      const t = minSeg(ms);
+      if (t === texto || !oradorTiempo) return;
+      texto = t;
+      oradorTiempo.textContent = t;
+      oradorTiempo.classList.toggle("is-poco", limite && ms <= 10000);
+    };
+    tick();
+    oradorTimer = setInterval(tick, 250);
+  }
+
   function clearAllVoteTexts(){
     for (const [_b, els] of bancaEls){
       if (!els?.voteEl) continue;
@@ -1528,7 +1410,9 @@ function handleVotes(sesion){
     btnOtorgarPalabra?.addEventListener("click", async () => {
       toast("warn", "Enviando: otorgar uso de palabra…");
       try{
-        await postJson(API_BASE_URL + "/moderacion/otorgar_uso_palabra", undefined);
+        // Tiempo límite del turno: vacío = el de config.json
+        const raw = String(inPalabraTiempo?.value ?? "").trim().replace(",", ".");
+        await postJson(API_BASE_URL + "/moderacion/otorgar_uso_palabra", raw === "" ? undefined : { duracion_s: raw });
         toast("ok", "OK: Otorgar palabra enviado.", 1400);
       } catch (e){
         toast("err", `ERROR otorgar palabra: ${e?.message || String(e)}`, 4500);
@@ -1547,7 +1431,7 @@ function handleVotes(sesion){
 
     // Resize: recalcula ancho uniforme del inner (si hay layout cacheado)
     window.addEventListener("resize", () => {
-      if (cachedLayout?.maxCols) setInnerWidthPx(cachedLayout.maxCols);
+      if (builtLayoutVersion && cachedLayout?.max_columnas) setInnerWidthPx(cachedLayout.max_columnas);
     });
 
     resetCache();
@@ -1556,6 +1440,7 @@ function handleVotes(sesion){
   function onState(raw){
     const state = normalizeState(raw);
     const ses = getSesion(state);
+    lastRaw = raw;
 
     // Si no hay sesión abierta: vacío total (sin placeholder)
     if (!ses || ses.abierta === false){
@@ -1572,29 +1457,37 @@ function handleVotes(sesion){
 
     // Render derecho siempre (cola)
     renderRight(ses);
+    renderOrador(ses);
+
+    // Render izquierdo: cache por layout_version. Si el layout cacheado no es
+    // el vigente se pide al backend y se dibuja cuando llega (vuelve a onState).
+    const version = String(ses.layout_version ?? "");
+    if (!cachedLayout || cachedLayout.version !== version){
+      requestLayout(version);
+      return;
+    }
 
-    // Render izquierdo: cache por disposicion_bancas
-    const dispoStr = String(ses.disposicion_bancas ?? "");
-    if (!cachedLayout || cachedDispoStr !== dispoStr){
+    if (builtLayoutVersion !== version){
       // Rebuild
       clearLeft();
-      buildLeft(ses);
+      buildLeft(cachedLayout);
 
       // Si buildLeft falló y dejó error en canvas, no seguimos
       // (pero el panel derecho ya está OK)
       if (recintoCanvas && recintoCanvas.querySelector(".recintoCanvasError")){
         return;
       }
+      builtLayoutVersion = version;
     } else {
       // Asegura que el ancho uniforme se mantenga si el canvas cambió de tamaño
-      setInnerWidthPx(cachedLayout.maxCols);
+      setInnerWidthPx(cachedLayout.max_columnas);
     }
 
     // Si el canvas quedó en estado de error (por ejemplo, múltiples EN_CURSO),
     // y tenemos un layout válido cacheado, reconstruimos la grilla.
-    if (recintoCanvas && recintoCanvas.querySelector(".recintoCanvasError") && cachedLayout && cachedDispoStr === String(ses.disposicion_bancas ?? "")){
+    if (recintoCanvas && recintoCanvas.querySelector(".recintoCanvasError") && !cachedLayout.error){
       clearLeft();
-      buildLeft(ses);
+      buildLeft(cachedLayout);
       if (recintoCanvas.querySelector(".recintoCanvasError")){
         return;
       }
@@ -1619,71 +1512,152 @@ function handleVotes(sesion){
 ///////////////////////////////
 const Q4 = (() => {
   const selEventosNivel = document.getElementById("selEventosNivel");
-  const preEventos = document.getElementById("preEventos");
+  const preEventos = document.getElementById("preEventos"); // contenedor con scroll
 
+  // Historial acotado e indexado por nivel: buckets[n] = últimos eventos de nivel n
+  const MAX_EVENTOS = 2000;
+  const buckets = { 1: [], 2: [], 3: [] }; // {seq, line, level}
   let lastSeqSeen = -1;
-  const history = []; // {seq, line, level}
   let selectedLevel = 3;
 
-  function parseLevelFromLine(line){
-    const s = String(line ?? "");
-    if (s.includes("L3")) return 3;
-    if (s.includes("L2")) return 2;
-    if (s.includes("L1")) return 1;
-    return 1;
+  // Eventos que pasan el filtro (últimos MAX_EVENTOS). El índice "global" g
+  // de un evento es base + su posición: no cambia al recortar por delante.
+  let visibles = [];
+  let base = 0;
+
+  // Viewport virtualizado: un spacer con la altura total y solo las filas
+  // visibles (más OVERSCAN) dentro de rowsEl. Filas renderizadas: [renderIni, renderFin)
+  const OVERSCAN = 10;
+  let spacer = null;
+  let rowsEl = null;
+  let rowHeight = 14;
+  let renderIni = 0;
+  let renderFin = 0;
+
+  function levelOf(e){
+    const n = Number(e?.level);
+    return (n === 1 || n === 2 || n === 3) ? n : 1;
+  }
+
+  function recortar(lista){
+    // Recorte en bloque (no un shift por evento)
+    if (lista.length > MAX_EVENTOS + 200){
+      const sobran = lista.length - MAX_EVENTOS;
+      lista.splice(0, sobran);
+      return sobran;
+    }
+    return 0;
   }
 
-  function passesFilter(evt){
-    if (selectedLevel === 1) return true;
-    if (selectedLevel === 2) return evt.level >= 2;
-    if (selectedLevel === 3) return evt.level >= 3;
-    return true;
+  // Últimos `max` eventos de varias listas ordenadas por seq (merge desde el final)
+  function mergeUltimos(listas, max){
+    const idx = listas.map(l => l.length - 1);
+    const out = [];
+    while (out.length < max){
+      let best = -1;
+      for (let k = 0; k < listas.length; k++){
+        if (idx[k] < 0) continue;
+        if (best < 0 || listas[k][idx[k]].seq > listas[best][idx[best]].seq) best = k;
+      }
+      if (best < 0) break;
+      out.push(listas[best][idx[best]--]);
+    }
+    return out.reverse();
   }
 
-  function autoScrollToBottom(){
-    if (!preEventos) return;
-    preEventos.scrollTop = preEventos.scrollHeight;
+  function crearFila(g){
+    const div = document.createElement("div");
+    div.className = "events__line";
+    div.textContent = visibles[g - base].line;
+    return div;
   }
 
-  function renderAll(){
-    if (!preEventos) return;
+  function estaAbajo(){
+    return preEventos.scrollTop + preEventos.clientHeight >= preEventos.scrollHeight - rowHeight;
+  }
 
-    const lines = [];
-    for (const evt of history){
-      if (!passesFilter(evt)) continue;
-      lines.push(evt.line);
-    }
+  function renderViewport(){
+    if (!rowsEl) return;
+    const total = visibles.length;
+    spacer.style.height = `${total * rowHeight}px`;
 
-    preEventos.textContent = lines.join("\n");
-    autoScrollToBottom();
+    const top = preEventos.scrollTop;
+    const alto = preEventos.clientHeight;
+    const ini = base + Math.max(0, Math.floor(top / rowHeight) - OVERSCAN);
+    const fin = base + Math.min(total, Math.ceil((top + alto) / rowHeight) + OVERSCAN);
+
+    // Sin solape con lo ya renderizado: se vacía
+    if (fin <= renderIni || ini >= renderFin){
+      rowsEl.textContent = "";
+      renderIni = renderFin = ini;
+    }
+    // Por arriba
+    while (renderIni < ini){ rowsEl.firstChild.remove(); renderIni++; }
+    while (renderIni > ini){ renderIni--; rowsEl.insertBefore(crearFila(renderIni), rowsEl.firstChild); }
+    // Por abajo (al seguir el final, lo normal es solo agregar filas nuevas)
+    while (renderFin > fin){ rowsEl.lastChild.remove(); renderFin--; }
+    while (renderFin < fin){ rowsEl.appendChild(crearFila(renderFin)); renderFin++; }
+
+    rowsEl.style.transform = `translateY(${(ini - base) * rowHeight}px)`;
+  }
+
+  function rebuildVisibles(){
+    const listas = [];
+    for (let n = selectedLevel; n <= 3; n++) listas.push(buckets[n]);
+    visibles = mergeUltimos(listas, MAX_EVENTOS);
+    base = 0;
+    renderIni = renderFin = 0;
+    rowsEl.textContent = "";
+    spacer.style.height = `${visibles.length * rowHeight}px`;
+    preEventos.scrollTop = preEventos.scrollHeight;
+    renderViewport();
   }
 
   function ingestEventos(raw){
     const evts = getEventosFromState(raw);
     if (!Array.isArray(evts) || evts.length === 0) return;
 
-    const sorted = [...evts].sort((a,b) => {
-      const sa = Number(a?.seq ?? -1);
-      const sb = Number(b?.seq ?? -1);
-      return sa - sb;
-    });
-
+    // Vienen ordenados por seq (buffer del backend)
+    const seguirFinal = estaAbajo();
     let addedAny = false;
 
-    for (const e of sorted){
+    for (const e of evts){
       const seq = Number(e?.seq);
       if (!Number.isFinite(seq)) continue;
       if (seq <= lastSeqSeen) continue;
 
-      const line = String(e?.line ?? "");
-      const level = parseLevelFromLine(line);
-
-      history.push({ seq, line, level });
+      const evt = { seq, line: String(e?.line ?? ""), level: levelOf(e) };
+      buckets[evt.level].push(evt);
+      recortar(buckets[evt.level]);
+      if (evt.level >= selectedLevel){
+        visibles.push(evt);
+        addedAny = true;
+      }
       lastSeqSeen = seq;
-      addedAny = true;
     }
 
-    if (addedAny) renderAll();
+    if (!addedAny) return;
+
+    const sobran = recortar(visibles);
+    base += sobran;
+    spacer.style.height = `${visibles.length * rowHeight}px`;
+    if (seguirFinal){
+      preEventos.scrollTop = preEventos.scrollHeight;
+    } else if (sobran){
+      // Mantiene quieto lo que se está leyendo
+      preEventos.scrollTop = Math.max(0, preEventos.scrollTop - sobran * rowHeight);
+    }
+    renderViewport();
+  }
+
+  function medirFila(){
+    const probe = document.createElement("div");
+    probe.className = "events__line";
+    probe.textContent = "X";
+    rowsEl.appendChild(probe);
+    const h = probe.offsetHeight;
+    probe.remove();
+    if (h > 0) rowHeight = h;
   }
 
   function init(){
@@ -1691,7 +1665,16 @@ const Q4 = (() => {
 
     selectedLevel = 3;
     selEventosNivel.value = "L3";
+
     preEventos.textContent = "";
+    spacer = document.createElement("div");
+    rowsEl = document.createElement("div");
+    rowsEl.className = "events__lines";
+    preEventos.append(spacer, rowsEl);
+    medirFila();
+
+    preEventos.addEventListener("scroll", renderViewport, { passive: true });
+    window.addEventListener("resize", renderViewport);
 
     selEventosNivel.addEventListener("change", () => {
       const v = String(selEventosNivel.value || "L3");
@@ -1700,7 +1683,7 @@ const Q4 = (() => {
       else if (v === "L3") selectedLevel = 3;
       else selectedLevel = 3;
 
-      renderAll();
+      rebuildVisibles();
     });
   }
 
@@ -1720,29 +1703,31 @@ const Quadrants = [Q1, Q2, Q3, Q4];
 ///////////////////////////////
 let pollingRunning = false;
 
-async function pollOnce(){
-  const url = API_BASE_URL + STATE_ENDPOINT;
+// El estado llega en MessagePack ya decodificado (ver
+// /comun/conexion_estado.js); null = mismo documento que la vez anterior.
+// Se repinta igual en cada poll: la ventana de revelado de votos del
+// recinto depende de la hora, no solo del estado.
+let lastStateData = null;
+
+function onStateData(data){
+  setConn("ok", "Conectado");
+  if (data !== null) lastStateData = data;
+  if (lastStateData === null) return;
+  for (const q of Quadrants) q.onState(lastStateData);
+}
 
-  try{
-    const data = await getJson(url);
-    setConn("ok", "Conectado");
-    for (const q of Quadrants) q.onState(data);
-  } catch (e){
-    setConn("err", "Sin conexión");
-    for (const q of Quadrants) q.onError(e);
-  }
+function onStateError(e){
+  setConn("err", "Sin conexión");
+  for (const q of Quadrants) q.onError(e);
 }
 
 function startPollLoop(){
   if (pollingRunning) return;
   pollingRunning = true;
 
-  const tick = async () => {
-    await pollOnce();
-    setTimeout(tick, POLL_MS);
-  };
-
-  tick();
+  // Una sola conexión por navegador, compartida con las otras pestañas
+  // (ver /comun/conexion_estado.js)
+  ConexionEstado.suscribirDatos(API_BASE_URL + STATE_ENDPOINT, POLL_MS, onStateData, onStateError);
 }
 
 ///////////////////////////////
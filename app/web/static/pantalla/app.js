@@ -1,7 +1,8 @@
 /*
   app.js
   ======
-  Base estable por cuadrantes (Q1..Q4), polling a /estados/estado_global.
+  Base estable por cuadrantes (Q1..Q4), polling a /estados/vista/pantalla
+  (la parte de estado_global que usa la pantalla).
 
   ✅ Cambios en ESTA versión (solo Q2: Orden del día):
   --------------------------------------------------
@@ -28,12 +29,14 @@
 ///////////////////////////////
 // 1) CONFIG
 ///////////////////////////////
-const API_BASE_URL = "";
-const STATE_ENDPOINT = "/estados/estado_global";
+// ?sala=<id> apunta a una sala adicional (/salas/<id>/...); sin parámetro, la principal
+const SALA = new URLSearchParams(window.location.search).get("sala");
+const API_BASE_URL = SALA ? "/salas/" + encodeURIComponent(SALA) : "";
+const STATE_ENDPOINT = "/estados/vista/pantalla";
 const POLL_MS = 300;
 const TIMEOUT_MS = 1500;
 const VOTACION_RESULT_MS = 6000; // tiempo visible del resultado tras cierre
-const VOTACION_COUNTDOWN_SEC = 4; // cuenta regresiva al iniciar votación (Q3)
+const VOTACION_COUNTDOWN_SEC = 4; // cuenta regresiva al iniciar votación sin tiempo límite (Q3)
 
 ///////////////////////////////
 // 2) BUS SIMPLE (desacople)
@@ -88,8 +91,12 @@ setInterval(updateClock, 250);
 ///////////////////////////////
 // 5) UI: CONEXION + TOAST
 ///////////////////////////////
+let connKind = null;
+
 function setConn(kind, text){
   if (!connText) return;
+  if (connKind === kind && connText.textContent === text) return;
+  connKind = kind;
 
   connText.classList.remove("conn-ok","conn-err","conn-warn");
   if (kind === "ok") connText.classList.add("conn-ok");
@@ -99,6 +106,11 @@ function setConn(kind, text){
   connText.textContent = text;
 }
 
+// Solo toca el DOM si el texto cambió (la mayoría de los polls no cambia nada)
+function setText(el, text){
+  if (el && el.textContent !== text) el.textContent = text;
+}
+
 let toastTimer = null;
 
 function toast(kind, msg, ms = 2500){
@@ -206,7 +218,7 @@ function updateHeaderSesionInfo(raw){
   const ses = getSesion(state);
 
   if (!ses || ses.abierta === false){
-    hdrSesionInfo.textContent = "";
+    setText(hdrSesionInfo, "");
     return;
   }
 
@@ -227,8 +239,7 @@ function updateHeaderSesionInfo(raw){
   }
 
   // Texto base (MISMO estilo que el título)
-  hdrSesionInfo.textContent =
-    ` · Sesión Nº ${nro} - Concejales ${presentes} de ${total} totales`;
+  setText(hdrSesionInfo, ` · Sesión Nº ${nro} - Concejales ${presentes} de ${total} totales`);
 }
 
 
@@ -342,7 +353,7 @@ const Q1 = (() => {
 
   function renderResumenVotacion(raw){
     if (!q1VotacionResumen) return;
-    q1VotacionResumen.textContent = buildTextoResumenVotacion(raw);
+    setText(q1VotacionResumen, buildTextoResumenVotacion(raw));
   }
 
   function renderQuorum(raw){
@@ -351,29 +362,21 @@ const Q1 = (() => {
     const state = normalizeState(raw);
     const ses = getSesion(state);
 
-    // siempre arrancar limpio
-    q1QuorumValue.classList.remove("num-good","num-bad","num-neutral");
+    let texto = "–";
+    let cls = "num-neutral";
 
-    if (!ses || ses.abierta === false){
-      q1QuorumValue.textContent = "–";
-      q1QuorumValue.classList.add("num-neutral");
-      return;
+    const quorumMin = Number.isInteger(ses?.quorum) ? ses.quorum : null;
+    if (ses && ses.abierta !== false && quorumMin !== null){
+      const presentes = Number.isInteger(ses.cantidad_presentes) ? ses.cantidad_presentes : 0;
+      const delta = presentes - quorumMin;
+      texto = (delta > 0) ? `+${delta}` : String(delta);
+      cls = (delta >= 0) ? "num-good" : "num-bad";
     }
 
-    const presentes = Number.isInteger(ses.cantidad_presentes) ? ses.cantidad_presentes : 0;
-    const quorumMin = Number.isInteger(ses.quorum) ? ses.quorum : null;
-
-    if (quorumMin === null){
-      q1QuorumValue.textContent = "–";
-      q1QuorumValue.classList.add("num-neutral");
-      return;
+    setText(q1QuorumValue, texto);
+    for (const c of ["num-good","num-bad","num-neutral"]){
+      q1QuorumValue.classList.toggle(c, c === cls);
     }
-
-    const delta = presentes - quorumMin;
-    q1QuorumValue.textContent = (delta > 0) ? `+${delta}` : String(delta);
-
-    if (delta >= 0) q1QuorumValue.classList.add("num-good");
-    else q1QuorumValue.classList.add("num-bad");
   }
 
   function construirTextoEstadoVotacion(state){
@@ -389,8 +392,13 @@ const Q1 = (() => {
     const estado = ultima?.estado;
 
     if (estado === "EN_CURSO"){
+      // Voto secreto: solo se anticipa el resultado cuando ya no depende de
+      // lo que voten los que faltan. Es una proyección: si se cierra antes
+      // de que voten todos los presentes, queda inconclusa
+      const proyectado = ultima?.en_vivo?.resultado_proyectado;
       const texto =
-        `Votacion Nº${numero} en curso: ${x} votos emitidos`;
+        `Votacion Nº${numero} en curso: ${x} votos emitidos` +
+        (proyectado ? ` - si votan los presentes que faltan: "${textoResultadoHumano(proyectado)}"` : "");
       return { modoEmpate: false, textoNormal: texto, textoEmpate: texto };
     }
 
@@ -417,11 +425,6 @@ const Q1 = (() => {
     // const estadoUlt = String(ultima?.estado ?? "");
     // const votAbierta = isEstadoAbiertoOVivo(estadoUlt);
 
-      // Tema (solo display)
-    if (inVotTema){
-      inVotTema.textContent = String(ultima?.tema ?? "-");
-    }
-
     // Si ya blanqueamos la última votación cerrada, NO repintar sus textos
     //const ultima = getUltimaVotacion(state);
     if (ultima){
@@ -433,12 +436,11 @@ const Q1 = (() => {
 
       // Si es la misma votación que blanqueamos y ya NO está en curso/empatada -> mantener en blanco
       if (blankedVotId && blankedVotId === idLike && !isEstadoAbiertoOVivo(est)){
-        if (votacionEstado) votacionEstado.textContent = "-";
-        const resumen = document.getElementById("q1VotacionResumen");
-        if (resumen) resumen.textContent = "-";
-        if (inVotTema) inVotTema.textContent = "-";
+        setText(votacionEstado, "-");
+        setText(q1VotacionResumen, "-");
+        setText(inVotTema, "-");
 
-        return; // MUY importante: corta acá para que no repinte con construirTextoEstadoVotacion()
+        return false; // MUY importante: corta acá para que no repinte con construirTextoEstadoVotacion()
       }
 
       // Si aparece una votación nueva o vuelve a “viva”, destrabamos
@@ -451,9 +453,13 @@ const Q1 = (() => {
     }
 
 
+    // Tema (solo display)
+    setText(inVotTema, String(ultima?.tema ?? "-"));
+
     const out = construirTextoEstadoVotacion(state);
     // setModoEmpate(out.modoEmpate);
-    if (votacionEstado) votacionEstado.textContent = out.textoNormal;
+    setText(votacionEstado, out.textoNormal);
+    return true;
   }
 
   function isEstadoAbiertoOVivo(estado){
@@ -519,8 +525,8 @@ const Q1 = (() => {
     const norm = normalizeState(raw);
     renderQuorum(raw);
     detectAndHandleVotacionFinalizada(raw);
-    renderResumenVotacion(raw);
-    renderVotacionEstado(raw);
+    // El resumen solo si la votación no quedó blanqueada (evita pintar y despintar)
+    if (renderVotacionEstado(raw)) renderResumenVotacion(raw);
   }
 
   function onError(_e){}
@@ -536,19 +542,36 @@ const Q3 = (() => {
   const recintoCanvas = document.getElementById("recintoCanvas");
   const recintoError  = document.getElementById("recintoError");
   const ulUsoPalabra  = document.getElementById("ulUsoPalabra");
+  const oradorEl      = document.getElementById("oradorUsoPalabra");
+  const oradorNombre  = document.getElementById("oradorNombre");
+  const oradorTiempo  = document.getElementById("oradorTiempo");
   // Contador superpuesto (Q3)
   const q3Countdown = document.getElementById("q3Countdown");
   let countdownTimer = null;
   let countdownRef = null;
+  // La cuenta en curso es la del tiempo límite del backend (votacion.vence_ms)
+  let countdownLimite = false;
 
   // Cache de layout (disposición no cambia durante la sesión)
   let cachedSesionKey = null;
-  let cachedDispoStr = null;
-  let cachedLayout = null; // { filasSorted, maxCols, sumCols }
-
-  // Bancas renderizadas: Map<bancaNro, { voteEl }>
+  // Layout del backend (/estados/layout): se pide solo cuando cambia sesion.layout_version
+  let cachedLayout = null; // { version, error, max_columnas, filas, bancas }
+  let builtLayoutVersion = null;
+  let layoutPending = null;
+  let lastRaw = null;
+
+  // Bancas renderizadas: Map<bancaNro, { voteEl, imgEl, innerEl, presencia, voto }>
+  // presencia / voto: lo último pintado en la banca; solo se toca el DOM si cambia
   let bancaEls = new Map();
 
+  // Cola de uso de la palabra pintada (textos unidos); null = sin pintar
+  let colaPintada = null;
+  // Turno de la palabra pintado ("dni|desde|vence"); null = nadie
+  let oradorPintado = null;
+  let oradorTimer = null;
+  // Último --bancaInnerW aplicado
+  let innerWPintado = null;
+
   // Estado de votación para lógica de “blanqueo”
   let activeVotRef = null;
   let clearVotesTimer = null;
@@ -562,8 +585,7 @@ const Q3 = (() => {
 
   function resetCache(){
     cachedSesionKey = null;
-    cachedDispoStr = null;
-    cachedLayout = null;
+    builtLayoutVersion = null;
     bancaEls = new Map();
 
     activeVotRef = null;
@@ -574,10 +596,7 @@ const Q3 = (() => {
     clearRight();
     hideLeftError();
     
-    countdownRef = null;
-    if (countdownTimer) clearInterval(countdownTimer);
-    countdownTimer = null;
-    hideCountdown();
+    stopCountdown();
   }
 
   function clearLeft(){
@@ -587,6 +606,8 @@ const Q3 = (() => {
 
   function clearRight(){
     if (ulUsoPalabra) ulUsoPalabra.innerHTML = "";
+    colaPintada = null;
+    stopOrador();
   }
 
   function showLeftError(msg){
@@ -608,35 +629,20 @@ const Q3 = (() => {
     if (recintoError) recintoError.style.display = "none";
   }
 
-  function safeJsonParse(str){
-    try{
-      return JSON.parse(String(str ?? ""));
-    } catch(_e){
-      return null;
-    }
-  }
-
-  function computeLayout(dispoStr){
-    const parsed = safeJsonParse(dispoStr);
-    const filas = Array.isArray(parsed?.filas) ? parsed.filas : null;
-    if (!filas) return null;
-
-    // Normalizamos y ordenamos por "fila" asc (fila 1 es la más baja)
-    const filasNorm = filas
-      .map(f => ({
-        fila: Number(f?.fila),
-        columnas: Number(f?.columnas),
-      }))
-      .filter(f => Number.isFinite(f.fila) && Number.isFinite(f.columnas) && f.columnas > 0);
-
-    if (!filasNorm.length) return null;
-
-    filasNorm.sort((a,b) => a.fila - b.fila);
-
-    const sumCols = filasNorm.reduce((acc, f) => acc + f.columnas, 0);
-    const maxCols = filasNorm.reduce((acc, f) => Math.max(acc, f.columnas), 0);
-
-    return { filasSorted: filasNorm, sumCols, maxCols };
+  function requestLayout(version){
+    // Un pedido a la vez por versión; si falla, se reintenta en el próximo poll
+    if (layoutPending === version) return;
+    layoutPending = version;
+
+    getJson(API_BASE_URL + "/estados/layout?version=" + encodeURIComponent(version))
+      .then(doc => {
+        layoutPending = null;
+        cachedLayout = doc;
+        if (lastRaw) onState(lastRaw);
+      })
+      .catch(_e => {
+        layoutPending = null;
+      });
   }
 
   function setInnerWidthPx(maxCols){
@@ -651,76 +657,48 @@ const Q3 = (() => {
     const totalGaps = (maxCols - 1) * gap;
     const cellW = (w - totalGaps) / maxCols;
     const innerW = Math.max(20, Math.floor(cellW * 0.92));
+    if (innerW === innerWPintado) return;
+    innerWPintado = innerW;
 
     recintoCanvas.style.setProperty("--bancaInnerW", `${innerW}px`);
   }
 
-  function buildLeft(sesion){
+  function buildLeft(layout){
     if (!recintoCanvas) return;
 
-    const dispoStr = String(sesion?.disposicion_bancas ?? "");
-    const layout = computeLayout(dispoStr);
-    if (!layout){
-      showLeftError("Error: disposicion_bancas inválida o sin filas.");
+    // La validación (filas, sum(columnas) vs concejales) la hace el backend
+    if (layout?.error){
+      showLeftError(`Error: ${layout.error}`);
       return;
     }
-
-    const concejales = Array.isArray(sesion?.concejales) ? sesion.concejales : [];
-    if (layout.sumCols !== concejales.length){
-      showLeftError(
-        `Error: sum(columnas)=${layout.sumCols} no coincide con cantidad de concejales=${concejales.length}.`
-      );
+    const filas = Array.isArray(layout?.filas) ? layout.filas : [];
+    if (!filas.length){
+      showLeftError("Error: disposicion_bancas inválida o sin filas.");
       return;
     }
 
-    // Cacheamos
-    cachedDispoStr = dispoStr;
-    cachedLayout = layout;
-
     // Render
     recintoCanvas.innerHTML = "";
     bancaEls = new Map();
     hideLeftError();
 
-    // Armamos una lista ordenada de concejales según banca (1..N)
-    const concejalesByBanca = new Map();
-    for (const c of concejales){
-      const b = Number(c?.banca);
-      if (Number.isFinite(b)) concejalesByBanca.set(b, c);
-    }
-
-    const totalBancas = concejales.length;
+    setInnerWidthPx(layout.max_columnas);
 
     // Numeración de bancas (REGLA): banca 1 = abajo-izquierda, luego izquierda→derecha,
     // completa la fila y continúa en la fila de arriba, de abajo hacia arriba.
+    // El backend manda filas ordenadas por fila asc (fila 1 = más baja) con su banca_inicial.
     //
-    // layout.filasSorted está ordenado por fila asc (fila 1 = más baja).
-    const filas = layout.filasSorted;
-    const maxCols = layout.maxCols;
-
-    setInnerWidthPx(maxCols);
-
-    // Prefijos: para cada fila i (en orden asc, de abajo→arriba), prefix[i] = cantidad de bancas en filas inferiores.
-    const prefix = [];
-    let acc = 0;
-    for (let i = 0; i < filas.length; i++){
-      prefix[i] = acc;
-      acc += filas[i].columnas;
-    }
-
-    // Render visual: apilamos en DOM de arriba→abajo (recorremos de la fila más alta a la más baja),
-    // pero la numeración se calcula con prefix para respetar abajo→arriba.
+    // Render visual: apilamos en DOM de arriba→abajo (recorremos de la fila más alta a la más baja).
     for (let i = filas.length - 1; i >= 0; i--){
       const f = filas[i];
       const row = document.createElement("div");
       row.className = "recintoRow";
       row.style.gridTemplateColumns = `repeat(${f.columnas}, 1fr)`;
 
-      const startBanca = 1 + prefix[i]; // primera banca de esta fila (según regla)
+      const startBanca = Number(f.banca_inicial); // primera banca de esta fila (según regla)
 
       for (let c = 0; c < f.columnas; c++){
         const bancaNro = startBanca + c;
-        const concejal = concejalesByBanca.get(bancaNro) || null;
 
         const cell = document.createElement("div");
         cell.className = "recintoBanca";
@@ -742,7 +720,7 @@ const Q3 = (() => {
         cell.appendChild(inner);
         row.appendChild(cell);
 
-        bancaEls.set(Number(bancaNro), { voteEl: vote, imgEl: img, innerEl: inner });
+        bancaEls.set(Number(bancaNro), { voteEl: vote, imgEl: img, innerEl: inner, presencia: "", voto: "" });
       }
 
       recintoCanvas.appendChild(row);
@@ -753,28 +731,104 @@ const Q3 = (() => {
   function renderRight(sesion){
     if (!ulUsoPalabra) return;
 
-    ulUsoPalabra.innerHTML = "";
     const cola = Array.isArray(sesion?.pedidos_uso_de_palabra) ? sesion.pedidos_uso_de_palabra : [];
-
-    for (const c of cola){
-      const li = document.createElement("li");
+    const textos = cola.map(c => {
       const ape = String(c?.apellido ?? "").trim();
       const nom = String(c?.nombre ?? "").trim();
       const inicial = nom ? nom.charAt(0) + "." : "";
-      li.textContent = `${ape} ${inicial}`.trim();
+      return `${ape} ${inicial}`.trim();
+    });
+
+    // Misma cola que la pintada: no se toca
+    const key = textos.join("\n");
+    if (key === colaPintada) return;
+    colaPintada = key;
+
+    ulUsoPalabra.innerHTML = "";
+    for (const t of textos){
+      const li = document.createElement("li");
+      li.textContent = t;
       ulUsoPalabra.appendChild(li);
     }
   }
 
-  function clearAllVoteTexts(){
-    for (const [_b, els] of bancaEls){
-      if (!els?.voteEl) continue;
-      els.voteEl.textContent = "";
-      els.voteEl.classList.remove("is-voto", "voto-pos", "voto-neg", "voto-abs");
+  // Tiempo como m:ss
+  function minSeg(ms){
+    const s = Math.max(0, Math.floor(ms / 1000));
+    return `${Math.floor(s / 60)}:${String(s % 60).padStart(2, "0")}`;
+  }
+
+  function stopOrador(){
+    oradorPintado = null;
+    if (oradorTimer) clearInterval(oradorTimer);
+    oradorTimer = null;
+    if (oradorEl) oradorEl.hidden = true;
+  }
+
+  // Orador y tiempo de su turno: con tiempo límite (uso_de_palabra.vence_ms)
+  // cuenta regresiva, si no el transcurrido desde en_uso_desde_ms. Con el
+  // reloj del servidor; el backend quita la palabra al vencer, acá solo se muestra.
+  function renderOrador(sesion){
+    if (!oradorEl) return;
+
+    const c = sesion?.en_uso_de_palabra;
+    const uso = sesion?.uso_de_palabra;
+    const desde = Number(uso?.en_uso_desde_ms);
+    if (!c || !Number.isFinite(desde)){
+      if (oradorPintado !== null) stopOrador();
+      return;
+    }
+
+    const vence = Number(uso?.vence_ms);
+    const limite = Number.isFinite(vence);
+    const key = `${c.dni}|${desde}|${limite ? vence : ""}`;
+    if (key === oradorPintado) return;
+    stopOrador();
+    oradorPintado = key;
+
+    const ape = String(c?.apellido ?? "").trim();
+    const nom = String(c?.nombre ?? "").trim();
+    if (oradorNombre) oradorNombre.textContent = `${ape} ${nom ? nom.charAt(0) + "." : ""}`.trim();
+    oradorEl.hidden = false;
+
+    let texto = null;
+    const tick = () => {
+      const ahora = ConexionEstado.ahora();
+      const ms = limite ? Math.ceil((vence - ahora) / 1000) * 1000 : ahora - desde;
+      const t = minSeg(ms);
+      if (t === texto || !oradorTiempo) return;
+      texto = t;
+      oradorTiempo.textContent = t;
+      oradorTiempo.classList.toggle("is-poco", limite && ms <= 10000);
+    };
+    tick();
+    oradorTimer = setInterval(tick, 250);
+  }
+
+  // Pinta el voto de una banca ("" = en blanco) solo si cambió
+  function setVotoBanca(els, val){
+    if (!els?.voteEl || els.voto === val) return;
+    els.voto = val;
 
-      if (els.innerEl){
+    els.voteEl.textContent = val;
+    els.voteEl.classList.remove("is-voto", "voto-pos", "voto-neg", "voto-abs");
+    if (els.innerEl){
       els.innerEl.classList.remove("voto-pos-bg","voto-neg-bg","voto-abs-bg");
-      }
+    }
+    if (!val) return;
+
+    els.voteEl.classList.add("is-voto");
+    const cls = voteClassFor(val);
+    if (cls){
+      els.voteEl.classList.add(cls);
+      // fondo claro en el inner
+      if (els.innerEl) els.innerEl.classList.add(`${cls}-bg`);
+    }
+  }
+
+  function clearAllVoteTexts(){
+    for (const [_b, els] of bancaEls){
+      setVotoBanca(els, "");
     }
   }
 
@@ -794,7 +848,18 @@ const Q3 = (() => {
     `;
   }
 
-  function startCountdownFor(ref){
+  function stopCountdown(){
+    countdownRef = null;
+    countdownLimite = false;
+    if (countdownTimer) clearInterval(countdownTimer);
+    countdownTimer = null;
+    hideCountdown();
+  }
+
+  // Cuenta regresiva al iniciar una votación. Con tiempo límite cuenta
+  // hasta votacion.vence_ms según la hora del servidor (la cierra el
+  // backend); sin él, VOTACION_COUNTDOWN_SEC segundos.
+  function startCountdownFor(ref, venceMs){
     if (!q3Countdown) return;
 
     // Si ya está corriendo para esta misma votación, no reiniciar
@@ -805,27 +870,29 @@ const Q3 = (() => {
     if (countdownTimer) clearInterval(countdownTimer);
     countdownTimer = null;
 
-    let remaining = Number(VOTACION_COUNTDOWN_SEC) || 0;
-    if (remaining <= 0){
-      hideCountdown();
-      return;
-    }
-
-    q3Countdown.classList.add("is-show");
-    renderCountdownNum(remaining);
-
-    countdownTimer = setInterval(() => {
-      remaining -= 1;
+    countdownLimite = Number.isFinite(venceMs);
+    const hasta = countdownLimite
+      ? venceMs
+      : ConexionEstado.ahora() + (Number(VOTACION_COUNTDOWN_SEC) || 0) * 1000;
+    let mostrado = null;
 
+    function tick(){
+      const remaining = Math.ceil((hasta - ConexionEstado.ahora()) / 1000);
       if (remaining <= 0){
-        clearInterval(countdownTimer);
+        if (countdownTimer) clearInterval(countdownTimer);
         countdownTimer = null;
         hideCountdown();
-        return;
+        return false;
       }
+      if (remaining !== mostrado){
+        mostrado = remaining;
+        renderCountdownNum(remaining);
+      }
+      return true;
+    }
 
-      renderCountdownNum(remaining);
-    }, 1000);
+    q3Countdown.classList.add("is-show");
+    if (tick()) countdownTimer = setInterval(tick, 250);
   }
 
   function currentEnCursoVotaciones(sesion){
@@ -850,39 +917,16 @@ const Q3 = (() => {
   }
 
   function applyVotesFromVotacion(votacion){
-    if (!votacion){
-      clearAllVoteTexts();
-      return;
-    }
-
-    // blank first
-    clearAllVoteTexts();
-
+    // Voto de cada banca; las que no votaron quedan en blanco
+    const porBanca = new Map();
     const votos = Array.isArray(votacion?.votos) ? votacion.votos : [];
     for (const v of votos){
       const banca = Number(v?.concejal?.banca);
-      if (!Number.isFinite(banca)) continue;
-
-      const val = String(v?.valor_voto ?? "").trim();
-      const els = bancaEls.get(banca);
-      if (els?.voteEl){
-        els.voteEl.textContent = val;
-        els.voteEl.classList.add("is-voto");
-
-        const cls = voteClassFor(val);
-        if (cls) {
-          els.voteEl.classList.add(cls);
-
-          // NUEVO: fondo claro en el inner
-          if (els.innerEl){
-            els.innerEl.classList.remove("voto-pos-bg","voto-neg-bg","voto-abs-bg");
-
-            if (cls === "voto-pos") els.innerEl.classList.add("voto-pos-bg");
-            if (cls === "voto-neg") els.innerEl.classList.add("voto-neg-bg");
-            if (cls === "voto-abs") els.innerEl.classList.add("voto-abs-bg");
-          }
-        }
-      }
+      if (Number.isFinite(banca)) porBanca.set(banca, String(v?.valor_voto ?? "").trim());
+    }
+
+    for (const [banca, els] of bancaEls){
+      setVotoBanca(els, porBanca.get(banca) ?? "");
     }
   }
   
@@ -900,21 +944,23 @@ const Q3 = (() => {
 
     for (const [banca, els] of bancaEls){
       const c = byBanca.get(banca) || null;
+      const ausente = !!(c && c.presente === false);
+      const hablando = hasSpeaking && banca === speakingBanca;
+      const test = !!(c && c.mostrar_test === true);
+
+      // Versión de la banca: si no cambió no se toca
+      const presencia = `${+ausente}${+hablando}${+test}`;
+      if (els.presencia === presencia) continue;
+      els.presencia = presencia;
 
       if (els?.imgEl){
-        const ausente = (c && c.presente === false);
-        els.imgEl.classList.toggle("is-ausente", !!ausente);
+        els.imgEl.classList.toggle("is-ausente", ausente);
       }
 
       if (els?.innerEl){
-        const ausente = (c && c.presente === false);
-        els.innerEl.classList.toggle("is-ausente", !!ausente);
-
-        const hablando = hasSpeaking && banca === speakingBanca;
-        els.innerEl.classList.toggle("is-hablando", !!hablando);
-
-        const test = (c && c.mostrar_test === true);
-        els.innerEl.classList.toggle("is-test", !!test);
+        els.innerEl.classList.toggle("is-ausente", ausente);
+        els.innerEl.classList.toggle("is-hablando", hablando);
+        els.innerEl.classList.toggle("is-test", test);
       }
     }
   }
@@ -963,7 +1009,7 @@ function handleVotes(sesion){
       clearVotesTimer = null;
       clearAllVoteTexts();
       // Al iniciar una votación nueva, mostramos el contador superpuesto
-      startCountdownFor(ref);
+      startCountdownFor(ref, typeof v.vence_ms === "number" ? v.vence_ms : null);
     }
 
     // EN_CURSO: voto secreto -> no mostrar nada
@@ -971,7 +1017,8 @@ function handleVotes(sesion){
     return;
   }
 
-  // No hay votación EN_CURSO
+  // No hay votación EN_CURSO: la cuenta del tiempo límite termina con ella
+  if (countdownLimite) stopCountdown();
   if (!activeVotRef){
     // No hay referencia activa: aseguramos blanco
     clearAllVoteTexts();
@@ -1006,7 +1053,7 @@ function handleVotes(sesion){
 
     // Resize: recalcula ancho uniforme del inner (si hay layout cacheado)
     window.addEventListener("resize", () => {
-      if (cachedLayout?.maxCols) setInnerWidthPx(cachedLayout.maxCols);
+      if (builtLayoutVersion && cachedLayout?.max_columnas) setInnerWidthPx(cachedLayout.max_columnas);
     });
 
     resetCache();
@@ -1015,6 +1062,7 @@ function handleVotes(sesion){
   function onState(raw){
     const state = normalizeState(raw);
     const ses = getSesion(state);
+    lastRaw = raw;
 
     // Si no hay sesión abierta: vacío total (sin placeholder)
     if (!ses || ses.abierta === false){
@@ -1029,31 +1077,39 @@ function handleVotes(sesion){
       cachedSesionKey = sk;
     }
 
-    // Render derecho siempre (cola)
+    // Render derecho siempre (cola y orador)
     renderRight(ses);
+    renderOrador(ses);
 
-    // Render izquierdo: cache por disposicion_bancas
-    const dispoStr = String(ses.disposicion_bancas ?? "");
-    if (!cachedLayout || cachedDispoStr !== dispoStr){
+    // Render izquierdo: cache por layout_version. Si el layout cacheado no es
+    // el vigente se pide al backend y se dibuja cuando llega (vuelve a onState).
+    const version = String(ses.layout_version ?? "");
+    if (!cachedLayout || cachedLayout.version !== version){
+      requestLayout(version);
+      return;
+    }
+
+    if (builtLayoutVersion !== version){
       // Rebuild
       clearLeft();
-      buildLeft(ses);
+      buildLeft(cachedLayout);
 
       // Si buildLeft falló y dejó error en canvas, no seguimos
       // (pero el panel derecho ya está OK)
       if (recintoCanvas && recintoCanvas.querySelector(".recintoCanvasError")){
         return;
       }
+      builtLayoutVersion = version;
     } else {
       // Asegura que el ancho uniforme se mantenga si el canvas cambió de tamaño
-      setInnerWidthPx(cachedLayout.maxCols);
+      setInnerWidthPx(cachedLayout.max_columnas);
     }
 
     // Si el canvas quedó en estado de error (por ejemplo, múltiples EN_CURSO),
     // y tenemos un layout válido cacheado, reconstruimos la grilla.
-    if (recintoCanvas && recintoCanvas.querySelector(".recintoCanvasError") && cachedLayout && cachedDispoStr === String(ses.disposicion_bancas ?? "")){
+    if (recintoCanvas && recintoCanvas.querySelector(".recintoCanvasError") && !cachedLayout.error){
       clearLeft();
-      buildLeft(ses);
+      buildLeft(cachedLayout);
       if (recintoCanvas.querySelector(".recintoCanvasError")){
         return;
       }
@@ -1083,13 +1139,12 @@ const Q4 = (() => {
   let lastSeqSeen = -1;
   const history = []; // {seq, line, level}
   let selectedLevel = 3;
+  // Historial acotado: al pasarse se recorta y se rearma la consola
+  const MAX_EVENTOS = 500;
 
-  function parseLevelFromLine(line){
-    const s = String(line ?? "");
-    if (s.includes("L3")) return 3;
-    if (s.includes("L2")) return 2;
-    if (s.includes("L1")) return 1;
-    return 1;
+  function levelOf(e){
+    const n = Number(e?.level);
+    return (n === 1 || n === 2 || n === 3) ? n : 1;
   }
 
   function passesFilter(evt){
@@ -1117,32 +1172,38 @@ const Q4 = (() => {
     autoScrollToBottom();
   }
 
+  // Agrega solo las líneas nuevas al final (sin rearmar la consola)
+  function appendLines(lines){
+    if (!preEventos) return;
+    const txt = lines.join("\n");
+    preEventos.append(preEventos.firstChild ? "\n" + txt : txt);
+    autoScrollToBottom();
+  }
+
   function ingestEventos(raw){
     const evts = getEventosFromState(raw);
     if (!Array.isArray(evts) || evts.length === 0) return;
 
-    const sorted = [...evts].sort((a,b) => {
-      const sa = Number(a?.seq ?? -1);
-      const sb = Number(b?.seq ?? -1);
-      return sa - sb;
-    });
-
-    let addedAny = false;
+    // Vienen ordenados por seq (buffer del backend)
+    const nuevas = [];
 
-    for (const e of sorted){
+    for (const e of evts){
       const seq = Number(e?.seq);
       if (!Number.isFinite(seq)) continue;
       if (seq <= lastSeqSeen) continue;
 
-      const line = String(e?.line ?? "");
-      const level = parseLevelFromLine(line);
-
-      history.push({ seq, line, level });
+      const evt = { seq, line: String(e?.line ?? ""), level: levelOf(e) };
+      history.push(evt);
       lastSeqSeen = seq;
-      addedAny = true;
+      if (passesFilter(evt)) nuevas.push(evt.line);
     }
 
-    if (addedAny) renderAll();
+    if (history.length > MAX_EVENTOS + 100){
+      history.splice(0, history.length - MAX_EVENTOS);
+      renderAll();
+      return;
+    }
+    if (nuevas.length) appendLines(nuevas);
   }
 
   function isVotacionEnCurso(raw){
@@ -1195,30 +1256,30 @@ const Quadrants = [Q1, Q3, Q4];
 ///////////////////////////////
 let pollingRunning = false;
 
-async function pollOnce(){
-  const url = API_BASE_URL + STATE_ENDPOINT;
+// El estado llega en MessagePack ya decodificado (ver
+// /comun/conexion_estado.js). data === null: el backend devolvió el mismo
+// documento que la vez anterior, no cambió nada (ni sesión, ni votos, ni
+// eventos) y no hay nada que repintar.
+function onStateData(data){
+  setConn("ok", "Conectado");
+  if (data === null) return;
 
-  try{
-    const data = await getJson(url);
-    setConn("ok", "Conectado");
-    updateHeaderSesionInfo(data);
-    for (const q of Quadrants) q.onState(data);
-  } catch (e){
-    setConn("err", "Sin conexión");
-    for (const q of Quadrants) q.onError(e);
-  }
+  updateHeaderSesionInfo(data);
+  for (const q of Quadrants) q.onState(data);
+}
+
+function onStateError(e){
+  setConn("err", "Sin conexión");
+  for (const q of Quadrants) q.onError(e);
 }
 
 function startPollLoop(){
   if (pollingRunning) return;
   pollingRunning = true;
 
-  const tick = async () => {
-    await pollOnce();
-    setTimeout(tick, POLL_MS);
-  };
-
-  tick();
+  // Una sola conexión por navegador, compartida con las otras pestañas
+  // (ver /comun/conexion_estado.js)
+  ConexionEstado.suscribirDatos(API_BASE_URL + STATE_ENDPOINT, POLL_MS, onStateData, onStateError);
 }
 
 ///////////////////////////////
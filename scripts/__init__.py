@@ -0,0 +1,16 @@
+"""
+Pruebas de consistencia y de rendimiento del backend (línea de comandos).
+
+Se corren desde la raíz del proyecto con `python -m scripts.<nombre>`;
+cada una trabaja sobre una copia del config.json y del padrón en un
+directorio temporal (ver _entorno.py), sin tocar data/ ni logs/.
+
+    analitica_salas        análisis de logs con varias salas intercaladas en el mismo día
+    carga_salas            varias salas (comisiones) votando a la vez
+    consistencia_workers   varios workers sobre una misma base (estado_compartido_db)
+    latencia_historial     latencia de las pulsaciones con y sin historial_db
+    memoria_bancada        memoria por sesión y pulsaciones/s (250 bancas, 300 votaciones)
+    mutaciones_pantalla    mutaciones del DOM por poll de la pantalla (node, sin navegador)
+    polls_mmap             polls/s de estado_global de 1 a N workers, con y sin estado_mmap
+    recuperacion_journal   recuperación del journal tras una caída (sesión de 6 horas)
+"""
@@ -0,0 +1,187 @@
+"""
+Entorno aislado para los scripts de prueba.
+
+entorno_aislado() crea un directorio temporal con una copia del config.json
+(con los cambios pedidos) y del padrón; el backend que se lance ahí (en este
+proceso con preparar_proceso(), o con Backend en otro) escribe logs,
+journal y bases en ese directorio y no en los del proyecto.
+
+Cliente habla HTTP con el backend lanzado (http.client, conexión
+persistente; uno por hilo).
+"""
+
+from __future__ import annotations
+
+import csv
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+# Raíz del proyecto (donde están app/ y config.json)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextmanager
+def entorno_aislado(**config: Any) -> Iterator[str]:
+    """
+    Directorio temporal con config.json (el del proyecto más `config`), el
+    padrón del proyecto (en la misma ruta relativa) y data/. Se borra al
+    salir.
+    """
+    with open(os.path.join(RAIZ, "config.json"), encoding="utf-8") as f:
+        datos = json.load(f)
+    padron_proyecto = datos.get("concejales_file", "data/concejales.csv")
+    datos.update(config)
+
+    directorio = tempfile.mkdtemp(prefix="botonera-")
+    try:
+        os.makedirs(os.path.join(directorio, "data"))
+        if not os.path.isabs(padron_proyecto):
+            destino = os.path.join(directorio, padron_proyecto)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.copyfile(os.path.join(RAIZ, padron_proyecto), destino)
+        with open(os.path.join(directorio, "config.json"), "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+        yield directorio
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def preparar_proceso(directorio: str) -> None:
+    """Deja el proceso listo para importar app con el config de `directorio`."""
+    os.chdir(directorio)
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+
+
+def entorno_subproceso() -> dict:
+    """Variables de entorno para lanzar el backend (uvicorn/gunicorn) en otro directorio."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (RAIZ, env.get("PYTHONPATH")) if p)
+    return env
+
+
+def padron(directorio: str) -> List[dict]:
+    """Filas del padrón del config.json de `directorio`."""
+    with open(os.path.join(directorio, "config.json"), encoding="utf-8") as f:
+        ruta = json.load(f).get("concejales_file", "data/concejales.csv")
+    with open(os.path.join(directorio, ruta), encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+# ---------------------------------------------------------------------------
+# Backend en otro proceso
+# ---------------------------------------------------------------------------
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Backend:
+    """
+    Backend lanzado en `directorio`: uvicorn (workers = 0) o gunicorn con
+    ese número de workers. Como context manager espera a que responda y lo
+    detiene al salir.
+    """
+
+    def __init__(self, directorio: str, workers: int = 0) -> None:
+        self.directorio = directorio
+        self.workers = workers
+        self.puerto = puerto_libre()
+        self._proc: Optional[subprocess.Popen] = None
+        self._errores = os.path.join(directorio, "backend.err")
+
+    def __enter__(self) -> "Backend":
+        self.iniciar()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.detener()
+
+    def iniciar(self, timeout_s: float = 60.0) -> None:
+        if self.workers:
+            comando = [sys.executable, "-m", "gunicorn", "-w", str(self.workers),
+                       "-k", "uvicorn.workers.UvicornWorker", "-b", f"127.0.0.1:{self.puerto}",
+                       "--log-level", "warning", "app.main:app"]
+        else:
+            comando = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.puerto),
+                       "--log-level", "warning"]
+        with open(self._errores, "w") as errores:
+            self._proc = subprocess.Popen(
+                comando, cwd=self.directorio, env=entorno_subproceso(),
+                stdout=subprocess.DEVNULL, stderr=errores,
+            )
+        limite = time.monotonic() + timeout_s
+        while True:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"El backend terminó al arrancar:\n{self.errores()[-2000:]}")
+            if time.monotonic() > limite:
+                self.detener()
+                raise RuntimeError(f"El backend no respondió en {timeout_s:.0f} s")
+            try:
+                Cliente(self.puerto).pedir("GET", "/estados/estado_global")
+                break
+            except OSError:
+                time.sleep(0.05)
+        if self.workers > 1:
+            # El primero que responde no es el último en arrancar
+            time.sleep(1.0)
+
+    def detener(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            self._proc.wait()
+
+    def errores(self) -> str:
+        """Lo que el backend escribió en stderr."""
+        with open(self._errores, encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+
+class Cliente:
+    """Conexión HTTP persistente con el backend (no compartir entre hilos)."""
+
+    def __init__(self, puerto: int, prefijo: str = "") -> None:
+        self.puerto = puerto
+        self.prefijo = prefijo
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def pedir(self, metodo: str, path: str, cuerpo: Any = None) -> Tuple[int, bytes]:
+        datos = None if cuerpo is None else json.dumps(cuerpo).encode()
+        encabezados = {"Content-Type": "application/json"} if datos is not None else {}
+        for intento in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection("127.0.0.1", self.puerto, timeout=30)
+            try:
+                self._conn.request(metodo, self.prefijo + path, body=datos, headers=encabezados)
+                resp = self._conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.HTTPException, ConnectionError):
+                # Conexión cerrada por el servidor entre pedidos: se reabre una vez
+                self._conn.close()
+                self._conn = None
+                if intento == 2:
+                    raise
+        raise AssertionError("inalcanzable")
+
+    def get(self, path: str) -> Any:
+        status, cuerpo = self.pedir("GET", path)
+        if status != 200:
+            raise RuntimeError(f"GET {self.prefijo}{path}: HTTP {status} {cuerpo[:200]!r}")
+        return json.loads(cuerpo)
+
+    def post(self, path: str, cuerpo: Any = None) -> Any:
+        status, respuesta = self.pedir("POST", path, cuerpo)
+        if status != 200:
+            raise RuntimeError(f"POST {self.prefijo}{path}: HTTP {status} {respuesta[:200]!r}")
+        return json.loads(respuesta)
@@ -0,0 +1,159 @@
+"""
+Análisis de logs (app.utils.log_analytics) con varias salas en el mismo día.
+
+Lanza el backend (uvicorn) en un entorno aislado con dos comisiones
+además de la sala principal y, intercalando los pedidos de las tres salas
+uno a uno, corre en cada una: apertura de sesión (la principal y la
+primera comisión con el mismo número), presentes, --votaciones votaciones
+con votos al azar según --semilla, y cierre de sesión (en otro orden que
+la apertura). Todas las líneas quedan mezcladas en el mismo archivo del día.
+
+Después analiza ese día con log_analytics.analizar_dia y comprueba, por
+(sala, número de sesión): una sola sesión cerrada, sus votaciones con los
+votos emitidos en esa sala, y las pulsaciones y presencias de esa sala
+solamente. Si algo no coincide termina con código 1.
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.analitica_salas [--votaciones 3] [--semilla 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from scripts._entorno import RAIZ, Backend, Cliente, entorno_aislado, padron
+
+# (sala, número de sesión); None = sala principal
+SALAS: List[Tuple[Optional[str], int]] = [(None, 7), ("com1", 7), ("com2", 3)]
+
+_NOMBRE_VOTO = {"1": "positivos", "2": "abstenciones", "3": "negativos"}
+
+
+def correr(directorio: str, votaciones: int, semilla: int) -> Dict[Optional[str], dict]:
+    """Corre el guion en las tres salas a la vez. Devuelve lo esperado por sala."""
+    dispositivos = [fila["dispositivo_votacion"] for fila in padron(directorio)]
+    azar = random.Random(semilla)
+    esperado: Dict[Optional[str], dict] = {
+        sala: {"numero": numero, "pulsaciones": Counter(), "votaciones": []} for sala, numero in SALAS
+    }
+
+    with Backend(directorio) as backend:
+        clientes = {sala: Cliente(backend.puerto, f"/salas/{sala}" if sala else "") for sala, _ in SALAS}
+
+        def en_todas(paso) -> None:
+            for sala, _ in SALAS:
+                paso(sala, clientes[sala])
+
+        def tecla(sala: Optional[str], dispositivo: str, valor: str) -> None:
+            clientes[sala].post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": valor})
+            esperado[sala]["pulsaciones"][dispositivo] += 1
+
+        en_todas(lambda sala, c: c.post("/moderacion/abrir_sesion", {"numero_sesion": esperado[sala]["numero"]}))
+        for dispositivo in dispositivos:
+            en_todas(lambda sala, c: tecla(sala, dispositivo, "9"))
+
+        for n in range(1, votaciones + 1):
+            def abrir(sala: Optional[str], c: Cliente) -> None:
+                c.post("/moderacion/abrir_votacion", {
+                    "numero": n, "tipo": "ordinaria", "tema": f"Tema {n} {sala or 'recinto'}",
+                    "computa_sobre_los_presentes": True, "factor_mayoria_especial": 0,
+                })
+                esperado[sala]["votaciones"].append(Counter())
+
+            def votar(sala: Optional[str], _c: Cliente) -> None:
+                valor = azar.choice("123")
+                tecla(sala, dispositivo, valor)
+                esperado[sala]["votaciones"][-1][_NOMBRE_VOTO[valor]] += 1
+
+            en_todas(abrir)
+            for dispositivo in dispositivos:
+                en_todas(votar)
+
+        for sala, _ in reversed(SALAS):
+            clientes[sala].post("/moderacion/cerrar_sesion")
+    return esperado
+
+
+def comprobar(reporte: dict, esperado: Dict[Optional[str], dict], presentes: int) -> List[str]:
+    """Devuelve la lista de diferencias encontradas (vacía si todo coincide)."""
+    problemas: List[str] = []
+    por_clave: Dict[Tuple[Optional[str], Optional[int]], List[dict]] = {}
+    for sesion in reporte["sesiones"]:
+        por_clave.setdefault((sesion["sala"], sesion["numero_sesion"]), []).append(sesion)
+
+    claves = {(sala, e["numero"]) for sala, e in esperado.items()}
+    if set(por_clave) != claves:
+        problemas.append(f"sesiones {sorted(por_clave, key=str)}, se esperaban {sorted(claves, key=str)}")
+
+    for sala, e in esperado.items():
+        nombre = f"{sala or 'principal'} N°{e['numero']}"
+        encontradas = por_clave.get((sala, e["numero"]), [])
+        if len(encontradas) != 1:
+            problemas.append(f"{nombre}: {len(encontradas)} sesiones")
+            continue
+        sesion = encontradas[0]
+        if not sesion["cerrada"]:
+            problemas.append(f"{nombre}: no quedó cerrada")
+        if sesion["pulsaciones_por_dispositivo"] != dict(e["pulsaciones"]):
+            problemas.append(f"{nombre}: pulsaciones {sesion['pulsaciones_por_dispositivo']}, "
+                             f"se esperaban {dict(e['pulsaciones'])}")
+        presencias = sum(c["presente"] for c in sesion["presencias_por_concejal"].values())
+        if presencias != presentes:
+            problemas.append(f"{nombre}: {presencias} presencias, se esperaban {presentes}")
+        votos = [{k: v[k] for k in _NOMBRE_VOTO.values()} for v in sesion["votaciones"]]
+        esperados = [{k: c[k] for k in _NOMBRE_VOTO.values()} for c in e["votaciones"]]
+        if votos != esperados:
+            problemas.append(f"{nombre}: votos {votos}, se esperaban {esperados}")
+    return problemas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Análisis de logs con varias salas en el mismo día.")
+    parser.add_argument("--votaciones", type=int, default=3,
+                        help="Votaciones por sala (por defecto 3).")
+    parser.add_argument("--semilla", type=int, default=5,
+                        help="Semilla de los votos al azar (por defecto 5).")
+    args = parser.parse_args(argv)
+
+    from app.utils.log_analytics import analizar_dia
+    from app.utils.log_reader import listar_dias
+
+    with open(os.path.join(RAIZ, "config.json"), encoding="utf-8") as f:
+        base = json.load(f)
+    salas = {
+        sala: {"nombre": f"Comisión {sala}", "concejales_file": base["concejales_file"],
+               "quorum": base["quorum"], "disposicion_bancas": base["disposicion_bancas"]}
+        for sala, _ in SALAS if sala
+    }
+    config = {"log_dir": "logs/", "log_nivel_minimo": 1, "journal_dir": None, "historial_db": None, "salas": salas}
+    with entorno_aislado(**config) as directorio:
+        esperado = correr(directorio, max(1, args.votaciones), args.semilla)
+        logs = os.path.join(directorio, "logs")
+        dias = listar_dias(logs)
+        if len(dias) != 1:
+            # Cambio de día en medio de la corrida: las sesiones quedan partidas
+            print(f"FALLA: la corrida quedó repartida en {len(dias)} días, volver a correr")
+            return 1
+        reporte = analizar_dia(logs, dias[0])
+        presentes = len(padron(directorio))
+
+    problemas = comprobar(reporte, esperado, presentes)
+    for sesion in reporte["sesiones"]:
+        print(f"  {sesion['sala'] or 'principal':<10} sesión {sesion['numero_sesion']}: "
+              f"{sum(sesion['pulsaciones_por_dispositivo'].values())} pulsaciones, "
+              f"{len(sesion['votaciones'])} votaciones, cerrada {sesion['cerrada']}")
+    if problemas:
+        for problema in problemas:
+            print("FALLA: " + problema)
+        return 1
+    print(f"OK: {reporte['lineas']} líneas de {len(SALAS)} salas intercaladas, cada sesión con lo suyo")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""
+Prueba de carga con varias salas votando a la vez (config "salas").
+
+Arma --salas comisiones, cada una con su propio padrón (el del proyecto
+con otros DNI), y lanza el backend (uvicorn, journal activado) en un
+entorno aislado. Cada sala, en su propio hilo: abre sesión, da presente a
+todos y corre --votaciones votaciones en las que todas las bancas votan a
+la vez (un hilo por banca). Mide la latencia de cada voto.
+
+Al final comprueba, por sala: todas las votaciones con todos los votos,
+solo sus propios DNI y solo sus propias líneas de eventos ("TAG@<id>");
+y que la sala principal no se tocó. Si algo no coincide termina con
+código 1.
+
+--salas 1 da la referencia de una sola sala con la misma carga por sala.
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.carga_salas [--salas 10] [--votaciones 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from scripts._entorno import RAIZ, Backend, Cliente, entorno_aislado, padron
+
+
+def _config_salas(cantidad: int, base: dict) -> Dict[str, dict]:
+    return {
+        f"com{i}": {
+            "nombre": f"Comisión {i}",
+            "concejales_file": f"data/com{i}.csv",
+            "quorum": base["quorum"],
+            "disposicion_bancas": base["disposicion_bancas"],
+        }
+        for i in range(cantidad)
+    }
+
+
+def _escribir_padrones(directorio: str, cantidad: int) -> None:
+    """Padrón de cada sala: el del proyecto con el número de sala delante de cada DNI."""
+    filas = padron(directorio)
+    for i in range(cantidad):
+        with open(os.path.join(directorio, "data", f"com{i}.csv"), "w", encoding="utf-8", newline="") as f:
+            escritor = csv.DictWriter(f, fieldnames=list(filas[0].keys()))
+            escritor.writeheader()
+            for fila in filas:
+                escritor.writerow({**fila, "dni": f"{i}{fila['dni']}"})
+
+
+def _sala(puerto: int, indice: int, dispositivos: List[str], votaciones: int,
+          latencias: List[float], rechazos: List[str], candado: threading.Lock) -> None:
+    prefijo = f"/salas/com{indice}"
+    moderacion = Cliente(puerto, prefijo)
+    bancas = {d: Cliente(puerto, prefijo) for d in dispositivos}
+    moderacion.post("/moderacion/abrir_sesion", {"numero_sesion": 100 + indice})
+    for dispositivo in dispositivos:
+        moderacion.post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": "9"})
+
+    def votar(dispositivo: str) -> None:
+        t = time.perf_counter()
+        respuesta = bancas[dispositivo].post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": "1"})
+        dt = (time.perf_counter() - t) * 1000
+        with candado:
+            latencias.append(dt)
+            if not respuesta["aceptada"]:
+                rechazos.append(f"com{indice} {dispositivo}: {respuesta['motivo']}")
+
+    for n in range(votaciones):
+        moderacion.post("/moderacion/abrir_votacion", {
+            "numero": n + 1, "tipo": "ordinaria", "tema": f"Tema {n + 1}",
+            "computa_sobre_los_presentes": True, "factor_mayoria_especial": 0,
+        })
+        hilos = [threading.Thread(target=votar, args=(d,)) for d in dispositivos]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+
+def _comprobar(cliente: Cliente, cantidad: int, votaciones: int, bancas: int) -> List[str]:
+    problemas = []
+    for i in range(cantidad):
+        estado = cliente.get(f"/salas/com{i}/estados/estado_global")
+        sesion = estado["sesion"]
+        votos = [len(v["votos"]) for v in sesion["votaciones"]]
+        if votos != [bancas] * votaciones:
+            problemas.append(f"com{i}: votos por votación {votos}")
+        if not all(c["dni"].startswith(str(i)) for c in sesion["concejales"]):
+            problemas.append(f"com{i}: padrón de otra sala")
+        ajenas = [e["line"] for e in estado["eventos"] if not e["line"].split(" | ")[2].endswith(f"@com{i}")]
+        if ajenas:
+            problemas.append(f"com{i}: eventos de otra sala ({ajenas[0]})")
+    principal = cliente.get("/estados/estado_global")
+    if principal["hay_sesion"]:
+        problemas.append("la sala principal tiene una sesión abierta")
+    return problemas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Varias salas votando a la vez en un backend.")
+    parser.add_argument("--salas", type=int, default=10,
+                        help="Comisiones votando a la vez (por defecto 10).")
+    parser.add_argument("--votaciones", type=int, default=10,
+                        help="Votaciones por sala (por defecto 10).")
+    args = parser.parse_args(argv)
+    cantidad, votaciones = max(1, args.salas), max(1, args.votaciones)
+
+    with open(os.path.join(RAIZ, "config.json"), encoding="utf-8") as f:
+        base = json.load(f)
+    with entorno_aislado(journal_dir="data/journal", salas=_config_salas(cantidad, base)) as directorio:
+        _escribir_padrones(directorio, cantidad)
+        dispositivos = [fila["dispositivo_votacion"] for fila in padron(directorio)]
+        with Backend(directorio) as backend:
+            cliente = Cliente(backend.puerto)
+            if len(cliente.get("/salas")) != cantidad + 1:
+                print("FALLA: el backend no levantó todas las salas")
+                return 1
+
+            latencias: List[float] = []
+            rechazos: List[str] = []
+            candado = threading.Lock()
+            hilos = [
+                threading.Thread(target=_sala, args=(backend.puerto, i, dispositivos, votaciones,
+                                                     latencias, rechazos, candado))
+                for i in range(cantidad)
+            ]
+            t0 = time.perf_counter()
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+            total = time.perf_counter() - t0
+            problemas = rechazos + _comprobar(cliente, cantidad, votaciones, len(dispositivos))
+
+    latencias.sort()
+    n = len(latencias)
+    print(f"{cantidad} salas x {votaciones} votaciones ({os.cpu_count()} CPU): {n} votos en {total:.1f} s "
+          f"({n / total:.0f} votos/s), p50 {latencias[n // 2]:.0f} ms, p99 {latencias[int(n * 0.99)]:.0f} ms")
+    if problemas:
+        for problema in problemas:
+            print("FALLA: " + problema)
+        return 1
+    print("OK: cada sala con sus votaciones, sus votos, su padrón y sus eventos; la principal intacta")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
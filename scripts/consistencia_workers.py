@@ -0,0 +1,240 @@
+"""
+Consistencia del estado compartido entre workers (estado_compartido_db).
+
+Lanza N procesos que abren la misma base SQLite, como los workers de
+gunicorn, y les hace aplicar comandos a la vez sobre la sala principal:
+
+    por ronda: abrir sesión, presentes, abrir votación, pulsaciones de
+    test y de palabra, votos (y algunos repetidos, que se rechazan),
+    cierre forzado si quedó abierta, cerrar sesión.
+
+Las fases se separan con una barrera; dentro de cada fase los comandos de
+los distintos procesos se intercalan libremente. Al final de cada fase
+cada proceso lee el estado (SesionService.lectura) y se compara:
+
+    - todos tienen la misma revisión y el mismo estado
+      (snapshot_service.capturar_estado, sin el indicador de test);
+    - no se perdió ningún comando (votos = presentes);
+    - un proceso nuevo que carga la base desde cero llega al mismo estado.
+
+--snapshot-cada baja SNAPSHOT_CADA_COMANDOS para que se ejerciten los dos
+caminos de carga (solo comandos nuevos, o snapshot + comandos). Si algo
+no coincide termina con código 1.
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.consistencia_workers [--workers 4] [--rondas 5]
+                                           [--snapshot-cada 7] [--semilla 1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from scripts._entorno import entorno_aislado, preparar_proceso
+
+# Lectura de un proceso: (fase, worker, revision, estado)
+Lectura = Tuple[str, int, int, Dict[str, Any]]
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def _sin_test(valor: Any) -> Any:
+    """El indicador de test depende de la hora de cada proceso: no se compara."""
+    if isinstance(valor, dict):
+        return {k: _sin_test(v) for k, v in valor.items() if k != "mostrar_test_s"}
+    if isinstance(valor, list):
+        return [_sin_test(v) for v in valor]
+    return valor
+
+
+def _iniciar(directorio: str, snapshot_cada: int):
+    preparar_proceso(directorio)
+    from app.config import settings
+    from app.services import estado_compartido_service as modulo
+    from app.services.sala_service import sala_service
+
+    settings.cargar()
+    modulo.SNAPSHOT_CADA_COMANDOS = snapshot_cada
+    modulo.estado_compartido_service.iniciar(settings.estado_compartido_db)
+    return sala_service.principal
+
+
+def _leer(sala) -> Tuple[int, Dict[str, Any]]:
+    from app.services import snapshot_service
+    from app.services.estado_compartido_service import estado_compartido_service
+
+    with sala.sesion_service.lectura():
+        estado = snapshot_service.capturar_estado(sala.sesion_service, sala.votacion_service)
+        return estado_compartido_service.revision, _sin_test(estado)
+
+
+def _worker(indice: int, cantidad: int, directorio: str, rondas: int, snapshot_cada: int,
+            semilla: int, barrera, cola) -> None:
+    sala = _iniciar(directorio, snapshot_cada)
+    from app.models.votacion import EstadosVotacion
+    from app.services.input_service import procesar_pulsacion
+
+    sesion_service = sala.sesion_service
+    votacion_service = sala.votacion_service
+    azar = random.Random(semilla * 1000 + indice)
+
+    def comando(funcion, *args, **kwargs):
+        try:
+            with sesion_service.comando():
+                return funcion(*args, **kwargs)
+        except ValueError:
+            return None
+
+    def fase(nombre: str) -> None:
+        barrera.wait()
+        revision, estado = _leer(sala)
+        cola.put((nombre, indice, revision, estado))
+        barrera.wait()
+
+    for ronda in range(1, rondas + 1):
+        if indice == 0:
+            comando(sesion_service.abrir_sesion, ronda)
+        fase(f"ronda {ronda}: sesión abierta")
+
+        with sesion_service.lectura():
+            dispositivos = [c.dispositivo_votacion for c in sesion_service.sesion_actual.concejales]
+        mios = dispositivos[indice::cantidad]
+        for dispositivo in mios:
+            comando(procesar_pulsacion, dispositivo, "9")
+        fase(f"ronda {ronda}: presentes")
+
+        if indice == 0:
+            comando(votacion_service.abrir_votacion, 1, "Prueba", f"Ronda {ronda}", True, 0.5)
+        fase(f"ronda {ronda}: votación abierta")
+
+        pulsaciones = [(d, azar.choice("123")) for d in mios]
+        pulsaciones += [(d, "8") for d in mios] + [(d, "7") for d in azar.sample(mios, len(mios) // 2)]
+        azar.shuffle(pulsaciones)
+        # Votos repetidos (se rechazan: concejal_ya_voto)
+        pulsaciones += [(d, azar.choice("123")) for d in azar.sample(mios, len(mios) // 3)]
+        for dispositivo, tecla in pulsaciones:
+            comando(procesar_pulsacion, dispositivo, tecla)
+        fase(f"ronda {ronda}: votos")
+
+        if indice == 0:
+            with sesion_service.lectura():
+                votacion = votacion_service.votacion_actual
+                abierta = votacion is not None and votacion.estado == EstadosVotacion.EN_CURSO
+            if abierta:
+                comando(votacion_service.cierre_forzado)
+            comando(sesion_service.cerrar_sesion)
+        fase(f"ronda {ronda}: sesión cerrada")
+
+
+def _cargar_de_cero(directorio: str, snapshot_cada: int, cola) -> None:
+    sala = _iniciar(directorio, snapshot_cada)
+    revision, estado = _leer(sala)
+    cola.put(("proceso nuevo", -1, revision, estado))
+
+
+# ---------------------------------------------------------------------------
+# Comprobación
+# ---------------------------------------------------------------------------
+
+def _votos_por_votacion(estado: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """(presentes, votos) de cada votación de la sesión."""
+    sesion = estado.get("sesion") or {}
+    presentes = sum(1 for c in sesion.get("concejales", []) if c.get("presente"))
+    return [(presentes, len(v.get("votos", []))) for v in sesion.get("votaciones", [])]
+
+
+def comprobar(lecturas: List[Lectura]) -> List[str]:
+    """Devuelve la lista de diferencias encontradas (vacía si todo coincide)."""
+    fallas: List[str] = []
+    por_fase: Dict[str, List[Lectura]] = {}
+    for lectura in lecturas:
+        por_fase.setdefault(lectura[0], []).append(lectura)
+
+    for nombre, grupo in por_fase.items():
+        _f, _w, revision, estado = grupo[0]
+        for _f, worker, otra_revision, otro_estado in grupo[1:]:
+            if otra_revision != revision:
+                fallas.append(f"{nombre}: worker {worker} en la revisión {otra_revision}, se esperaba {revision}")
+            elif otro_estado != estado:
+                fallas.append(f"{nombre}: worker {worker} tiene otro estado en la revisión {revision}")
+        if nombre.endswith("votos"):
+            for presentes, votos in _votos_por_votacion(estado):
+                if votos != presentes:
+                    fallas.append(f"{nombre}: {votos} votos con {presentes} presentes")
+    return fallas
+
+
+# ---------------------------------------------------------------------------
+# Línea de comandos
+# ---------------------------------------------------------------------------
+
+def correr(workers: int, rondas: int, snapshot_cada: int, semilla: int) -> Tuple[List[Lectura], float]:
+    """Corre la prueba en un entorno aislado. Devuelve (lecturas, segundos)."""
+    contexto = multiprocessing.get_context("spawn")
+    with entorno_aislado(estado_compartido_db="data/estado.sqlite3", journal_dir=None) as directorio:
+        barrera = contexto.Barrier(workers)
+        cola = contexto.Queue()
+        procesos = [
+            contexto.Process(target=_worker, args=(i, workers, directorio, rondas, snapshot_cada, semilla, barrera, cola))
+            for i in range(workers)
+        ]
+        t0 = time.perf_counter()
+        for p in procesos:
+            p.start()
+
+        lecturas: List[Lectura] = []
+        esperadas = workers * 5 * rondas
+        while len(lecturas) < esperadas:
+            if any(p.exitcode not in (None, 0) for p in procesos):
+                barrera.abort()
+                raise RuntimeError("un worker terminó con error")
+            try:
+                lecturas.append(cola.get(timeout=0.5))
+            except Exception:
+                continue
+        for p in procesos:
+            p.join()
+        segundos = time.perf_counter() - t0
+
+        nuevo = contexto.Process(target=_cargar_de_cero, args=(directorio, snapshot_cada, cola))
+        nuevo.start()
+        final = cola.get(timeout=60)
+        nuevo.join()
+        ultima = lecturas[-1]
+        lecturas.append((ultima[0], final[1], final[2], final[3]))
+    return lecturas, segundos
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Consistencia del estado compartido entre workers.")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Procesos sobre la misma base (por defecto 4).")
+    parser.add_argument("--rondas", type=int, default=5,
+                        help="Sesiones completas a correr (por defecto 5).")
+    parser.add_argument("--snapshot-cada", type=int, default=7,
+                        help="SNAPSHOT_CADA_COMANDOS durante la prueba (por defecto 7).")
+    parser.add_argument("--semilla", type=int, default=1,
+                        help="Semilla del orden de las pulsaciones (por defecto 1).")
+    args = parser.parse_args(argv)
+
+    lecturas, segundos = correr(max(2, args.workers), max(1, args.rondas), max(1, args.snapshot_cada), args.semilla)
+    revision = lecturas[-1][2]
+    print(f"{args.workers} workers, {args.rondas} rondas: revisión final {revision} en {segundos:.1f} s")
+
+    fallas = comprobar(lecturas)
+    if fallas:
+        for falla in fallas:
+            print("FALLA: " + falla)
+        return 1
+    print(f"OK: {len(lecturas)} lecturas coinciden (incluido un proceso nuevo que carga la base)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
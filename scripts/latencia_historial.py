@@ -0,0 +1,120 @@
+"""
+Latencia de las pulsaciones con y sin historial (historial_db).
+
+Lanza el backend (uvicorn, journal activado) en un entorno aislado, abre
+una sesión con todo el padrón presente y corre --votaciones votaciones en
+las que vota cada banca; mide cada POST /entradas/tecla de voto. Lo hace
+sin historial y con historial, alternando, --corridas veces.
+
+Con historial, al final cierra la sesión y comprueba que el historial
+tenga todas las votaciones y todos los votos.
+
+Con --max-regresion-p50 sirve de control: termina con código 1 si la
+mediana del p50 con historial supera a la de sin historial en más de ese
+porcentaje (o si el historial quedó incompleto).
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.latencia_historial [--votaciones 200] [--corridas 3]
+                                         [--max-regresion-p50 PORCENTAJE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+from scripts._entorno import Backend, Cliente, entorno_aislado, padron
+
+NUMERO_SESION = 77
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def corrida(historial: bool, votaciones: int) -> Tuple[List[float], Optional[str]]:
+    """
+    Una corrida completa. Devuelve (latencias de los votos en ms, problema
+    encontrado en el historial o None).
+    """
+    config = {"journal_dir": "data/journal", "historial_db": "data/historial.sqlite3" if historial else None}
+    with entorno_aislado(**config) as directorio, Backend(directorio) as backend:
+        dispositivos = [fila["dispositivo_votacion"] for fila in padron(directorio)]
+        cliente = Cliente(backend.puerto)
+        cliente.post("/moderacion/abrir_sesion", {"numero_sesion": NUMERO_SESION})
+        for dispositivo in dispositivos:
+            cliente.post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": "9"})
+
+        latencias: List[float] = []
+        for n in range(votaciones):
+            cliente.post("/moderacion/abrir_votacion", {
+                "numero": n + 1, "tipo": "ordinaria", "tema": f"Tema {n + 1}",
+                "computa_sobre_los_presentes": True, "factor_mayoria_especial": 0,
+            })
+            for i, dispositivo in enumerate(dispositivos):
+                t = time.perf_counter()
+                cliente.post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": "1" if i % 3 else "3"})
+                latencias.append((time.perf_counter() - t) * 1000)
+        cliente.post("/moderacion/cerrar_sesion")
+
+        if not historial:
+            return latencias, None
+
+        # El historial se escribe en segundo plano: se espera a que aparezca
+        limite = time.monotonic() + 10
+        while True:
+            sesiones = cliente.get(f"/estados/historial/sesion/{NUMERO_SESION}")
+            completa = bool(sesiones) and sesiones[0]["hora_fin"] is not None
+            if completa or time.monotonic() > limite:
+                break
+            time.sleep(0.2)
+        if not completa:
+            return latencias, "la sesión cerrada no llegó al historial"
+        guardadas = sesiones[0]["votaciones"]
+        votos = sum(len(v["votos"]) for v in guardadas)
+        if len(guardadas) != votaciones or votos != votaciones * len(dispositivos):
+            return latencias, (f"historial con {len(guardadas)} votaciones y {votos} votos "
+                               f"(se esperaban {votaciones} y {votaciones * len(dispositivos)})")
+        return latencias, None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Latencia de las pulsaciones con y sin historial.")
+    parser.add_argument("--votaciones", type=int, default=200,
+                        help="Votaciones por corrida (por defecto 200).")
+    parser.add_argument("--corridas", type=int, default=3,
+                        help="Corridas de cada modo, alternadas (por defecto 3).")
+    parser.add_argument("--max-regresion-p50", type=float, default=None,
+                        help="Falla (código 1) si el p50 con historial empeora más de este porcentaje.")
+    args = parser.parse_args(argv)
+
+    p50 = {False: [], True: []}
+    problemas = []
+    print(f"{args.votaciones} votaciones por corrida; latencia de POST /entradas/tecla (ms)")
+    for numero in range(1, max(1, args.corridas) + 1):
+        for historial in (False, True):
+            latencias, problema = corrida(historial, max(1, args.votaciones))
+            p50[historial].append(_percentil(latencias, 0.5))
+            print(f"  corrida {numero} {'con' if historial else 'sin'} historial: "
+                  f"p50 {_percentil(latencias, 0.5):.2f}  p99 {_percentil(latencias, 0.99):.2f}  "
+                  f"({len(latencias)} votos)")
+            if problema:
+                problemas.append(problema)
+
+    sin, con = statistics.median(p50[False]), statistics.median(p50[True])
+    print(f"Mediana del p50: sin historial {sin:.2f} ms, con historial {con:.2f} ms ({(con / sin - 1) * 100:+.0f}%)")
+
+    if args.max_regresion_p50 is not None and con > sin * (1 + args.max_regresion_p50 / 100):
+        problemas.append(f"p50 con historial {con:.2f} ms > {sin:.2f} ms + {args.max_regresion_p50:g}%")
+    if problemas:
+        for problema in problemas:
+            print("FALLA: " + problema)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""
+Memoria por sesión y pulsaciones por segundo con un padrón grande.
+
+Arma un padrón sintético de --bancas bancas (una sola fila de bancas),
+abre una sesión con todos presentes y corre --votaciones votaciones en las
+que vota cada banca, en este mismo proceso: cada pulsación pasa por
+input_service con el lock de la sesión (SesionService.comando), sin HTTP,
+journal ni historial, y con log_nivel_minimo 3.
+
+Informa:
+    - el tamaño del grafo de objetos de la sesión (concejales, bancada,
+      votaciones y votos: sys.getsizeof de todo lo alcanzable, sin clases
+      ni enums);
+    - pulsaciones de voto por segundo (y µs por pulsación);
+    - lo que tarda en armarse estado_global al final.
+
+Con --max-mb-sesion / --max-us-tecla sirve de control: si se supera algún
+límite termina con código 1.
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.memoria_bancada [--bancas 250] [--votaciones 300]
+                                      [--max-mb-sesion N] [--max-us-tecla N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gc
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, List, Optional, Set
+
+from scripts._entorno import RAIZ, entorno_aislado, preparar_proceso
+
+
+def _escribir_padron(ruta: str, bancas: int) -> None:
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["dni", "nombre", "apellido", "bloque", "presente", "banca", "dispositivo_votacion"])
+        for i in range(bancas):
+            escritor.writerow([f"{20000000 + i}", f"Nombre{i}", f"Apellido{i}", f"Bloque{i % 7}",
+                               "false", i + 1, f"dev{i}"])
+
+
+def tamano_grafo(raiz: Any, excluidos: Set[int]) -> int:
+    """Suma de sys.getsizeof de todo lo alcanzable desde `raiz` (sin clases ni `excluidos`)."""
+    total = 0
+    vistos = set(excluidos)
+    pila = [raiz]
+    while pila:
+        x = pila.pop()
+        if id(x) in vistos or isinstance(x, type):
+            continue
+        vistos.add(id(x))
+        total += sys.getsizeof(x)
+        if isinstance(x, dict):
+            pila.extend(x.keys())
+            pila.extend(x.values())
+        elif isinstance(x, (list, tuple, set, frozenset, deque)):
+            pila.extend(x)
+        else:
+            if hasattr(x, "__dict__"):
+                pila.append(x.__dict__)
+            for nombre in getattr(type(x), "__slots__", ()):
+                if hasattr(x, nombre):
+                    pila.append(getattr(x, nombre))
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Memoria por sesión y pulsaciones/s con un padrón grande.")
+    parser.add_argument("--bancas", type=int, default=250,
+                        help="Bancas del padrón sintético (por defecto 250).")
+    parser.add_argument("--votaciones", type=int, default=300,
+                        help="Votaciones a correr (por defecto 300).")
+    parser.add_argument("--max-mb-sesion", type=float, default=None,
+                        help="Falla (código 1) si el grafo de la sesión ocupa más.")
+    parser.add_argument("--max-us-tecla", type=float, default=None,
+                        help="Falla (código 1) si cada pulsación tarda más en promedio.")
+    args = parser.parse_args(argv)
+    bancas, votaciones = max(1, args.bancas), max(1, args.votaciones)
+
+    config = {
+        "concejales_file": "data/padron_grande.csv", "quorum": 1, "log_nivel_minimo": 3,
+        "journal_dir": None, "historial_db": None,
+        "disposicion_bancas": {"filas": [{"fila": 1, "columnas": bancas}]},
+    }
+    with entorno_aislado(**config) as directorio:
+        _escribir_padron(os.path.join(directorio, "data", "padron_grande.csv"), bancas)
+        preparar_proceso(directorio)
+        from app.config import settings
+        from app.models.votacion import EstadosVotacion
+        from app.models.voto import ValorVoto
+        from app.services.input_service import procesar_pulsacion
+        from app.services.publicacion_service import publicacion_service
+        from app.services.sesion_service import sesion_service
+        from app.services.votacion_service import votacion_service
+
+        settings.cargar()
+
+        def tecla(dispositivo: str, tecla: str) -> dict:
+            with sesion_service.comando():
+                return procesar_pulsacion(dispositivo, tecla)
+
+        with sesion_service.comando():
+            sesion_service.abrir_sesion(1)
+        for i in range(bancas):
+            tecla(f"dev{i}", "9")
+
+        segundos = 0.0
+        for n in range(votaciones):
+            with sesion_service.comando():
+                votacion_service.abrir_votacion(numero=n + 1, tipo="ordinaria", tema=f"Tema {n + 1}",
+                                                computa_sobre_los_presentes=True, factor_mayoria_especial=0)
+            t = time.perf_counter()
+            for i in range(bancas):
+                respuesta = tecla(f"dev{i}", "1")
+                if not respuesta["aceptada"]:
+                    print(f"FALLA: voto rechazado ({respuesta['motivo']})")
+                    return 1
+            segundos += time.perf_counter() - t
+
+        gc.collect()
+        excluidos = {id(x) for x in (*ValorVoto, *EstadosVotacion, sesion_service)}
+        megas = tamano_grafo(sesion_service.sesion_actual, excluidos) / 1e6
+        t = time.perf_counter()
+        with sesion_service.lectura():
+            publicacion_service.estado_global()
+        ms_estado = (time.perf_counter() - t) * 1000
+        # Salir del directorio antes de borrarlo
+        os.chdir(RAIZ)
+
+    pulsaciones = bancas * votaciones
+    us_tecla = segundos / pulsaciones * 1e6
+    print(f"{bancas} bancas, {votaciones} votaciones: sesión {megas:.1f} MB, "
+          f"{pulsaciones / segundos:.0f} pulsaciones/s ({us_tecla:.0f} µs/pulsación), "
+          f"estado_global {ms_estado:.0f} ms")
+
+    fallas = []
+    if args.max_mb_sesion is not None and megas > args.max_mb_sesion:
+        fallas.append(f"sesión {megas:.1f} MB > {args.max_mb_sesion:g} MB")
+    if args.max_us_tecla is not None and us_tecla > args.max_us_tecla:
+        fallas.append(f"{us_tecla:.0f} µs/pulsación > {args.max_us_tecla:g} µs")
+    if fallas:
+        print("FALLA: " + "; ".join(fallas))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,287 @@
+/*
+  mutaciones_pantalla.js
+  ======================
+  Mutaciones del DOM por poll de la pantalla del recinto, sin navegador.
+
+  Carga los scripts de la pantalla (en el orden de su index.html) en un
+  contexto de Node con un DOM mínimo que cuenta cada cambio visible
+  (texto, clases, estilos, atributos, nodos agregados o quitados) y un
+  reloj virtual. El fetch devuelve los documentos grabados por
+  mutaciones_pantalla.py: el estado vigente en cada paso de 300 ms.
+
+  Lo usa scripts/mutaciones_pantalla.py; a mano:
+    node scripts/mutaciones_pantalla.js <fixtures.json> <script1.js> [<script2.js> ...]
+
+  fixtures.json: { "layout": <texto>, "pasos": [{ "vista": <texto>, "estado": <texto> }, ...] }
+    vista   cuerpo de /estados/vista/pantalla en ese paso
+    estado  cuerpo de /estados/estado_global en ese paso
+
+  Escribe en stdout un JSON con el total de mutaciones, pedidos al backend,
+  mutaciones en pasos en los que el documento no cambió y el tiempo de CPU.
+*/
+
+"use strict";
+
+const fs = require("fs");
+const vm = require("vm");
+
+const PASO_MS = 300;
+
+let mutaciones = 0;
+
+///////////////////////////////
+// DOM mínimo
+///////////////////////////////
+class ListaClases {
+  constructor(){ this.s = new Set(); }
+  add(...cs){ for (const c of cs) if (!this.s.has(c)){ this.s.add(c); mutaciones++; } }
+  remove(...cs){ for (const c of cs) if (this.s.has(c)){ this.s.delete(c); mutaciones++; } }
+  toggle(c, forzar){
+    const poner = forzar === undefined ? !this.s.has(c) : !!forzar;
+    if (poner) this.add(c); else this.remove(c);
+    return poner;
+  }
+  contains(c){ return this.s.has(c); }
+}
+
+function estilo(){
+  const valores = {};
+  return new Proxy(valores, {
+    set(o, k, v){
+      if (o[k] !== v){ o[k] = v; mutaciones++; }
+      return true;
+    },
+    get(o, k){
+      if (k === "setProperty") return (p, v) => { if (o[p] !== v){ o[p] = v; mutaciones++; } };
+      return o[k] ?? "";
+    },
+  });
+}
+
+// Propiedades que, al cambiar de valor, son una mutación
+const PROPIEDADES = ["hidden", "src", "alt", "title", "value"];
+
+class Nodo {
+  constructor(tag){
+    this.tag = tag;
+    this.children = [];
+    this.parentNode = null;
+    this.classList = new ListaClases();
+    this.style = estilo();
+    this.atributos = {};
+    this.propiedades = {};
+    this._texto = "";
+    this.clientWidth = 1280;
+    this.clientHeight = 720;
+    this.scrollTop = 0;
+  }
+  get className(){ return [...this.classList.s].join(" "); }
+  set className(v){
+    if (v === this.className) return;
+    this.classList.s = new Set(String(v).split(/\s+/).filter(Boolean));
+    mutaciones++;
+  }
+  get textContent(){
+    return this.children.length ? this.children.map((c) => c.textContent).join("") : this._texto;
+  }
+  set textContent(v){
+    v = String(v);
+    if (!this.children.length && this._texto === v) return;
+    this.children = [];
+    this._texto = v;
+    mutaciones++;
+  }
+  get innerHTML(){ return this._texto; }
+  set innerHTML(v){
+    v = String(v);
+    if (!this.children.length && this._texto === v) return;
+    this.children = [];
+    this._texto = v.replace(/<[^>]*>/g, "");
+    mutaciones++;
+  }
+  appendChild(c){
+    if (c.parentNode) c.remove();
+    c.parentNode = this;
+    this.children.push(c);
+    mutaciones++;
+    return c;
+  }
+  append(...cs){
+    for (const c of cs) this.appendChild(typeof c === "string" ? Object.assign(new Nodo("#text"), { _texto: c }) : c);
+  }
+  insertBefore(c, ref){
+    if (c.parentNode) c.remove();
+    c.parentNode = this;
+    const k = this.children.indexOf(ref);
+    this.children.splice(k < 0 ? this.children.length : k, 0, c);
+    mutaciones++;
+    return c;
+  }
+  remove(){
+    if (!this.parentNode) return;
+    const p = this.parentNode;
+    p.children.splice(p.children.indexOf(this), 1);
+    this.parentNode = null;
+    mutaciones++;
+  }
+  get firstChild(){ return this.children[0] || null; }
+  get lastChild(){ return this.children[this.children.length - 1] || null; }
+  get childElementCount(){ return this.children.length; }
+  get scrollHeight(){ return 1000; }
+  querySelector(selector){
+    const clase = selector.replace(/^\./, "");
+    const buscar = (n) => {
+      for (const c of n.children){
+        if (c.classList.contains(clase)) return c;
+        const r = buscar(c);
+        if (r) return r;
+      }
+      return null;
+    };
+    return buscar(this);
+  }
+  querySelectorAll(){ return []; }
+  addEventListener(){}
+  setAttribute(k, v){ if (this.atributos[k] !== v){ this.atributos[k] = v; mutaciones++; } }
+  removeAttribute(k){ if (k in this.atributos){ delete this.atributos[k]; mutaciones++; } }
+}
+for (const p of PROPIEDADES){
+  Object.defineProperty(Nodo.prototype, p, {
+    get(){ return this.propiedades[p] ?? (p === "hidden" ? false : ""); },
+    set(v){ if (this.propiedades[p] !== v){ this.propiedades[p] = v; mutaciones++; } },
+  });
+}
+
+const porId = {};
+const document = {
+  getElementById: (id) => porId[id] || (porId[id] = new Nodo("div")),
+  createElement: (tag) => new Nodo(tag),
+  querySelector: () => null,
+  querySelectorAll: () => [],
+  addEventListener(){},
+};
+
+///////////////////////////////
+// Reloj virtual
+///////////////////////////////
+let ahora = 0;
+let proximoId = 0;
+const timers = [];
+
+function programar(f, ms, repetir){
+  const id = ++proximoId;
+  timers.push({ id, en: ahora + (Number(ms) || 0), f, cada: repetir ? Math.max(1, Number(ms) || 0) : 0 });
+  return id;
+}
+
+function cancelar(id){
+  const k = timers.findIndex((t) => t.id === id);
+  if (k >= 0) timers.splice(k, 1);
+}
+
+async function avanzar(ms){
+  const fin = ahora + ms;
+  for (;;){
+    timers.sort((a, b) => a.en - b.en);
+    const t = timers[0];
+    if (!t || t.en > fin) break;
+    ahora = t.en;
+    timers.shift();
+    if (t.cada) timers.push({ ...t, en: ahora + t.cada });
+    await t.f();
+    // Deja correr las promesas encadenadas (fetch -> json -> render)
+    for (let k = 0; k < 10; k++) await null;
+  }
+  ahora = fin;
+}
+
+///////////////////////////////
+// Backend grabado
+///////////////////////////////
+const fixtures = JSON.parse(fs.readFileSync(process.argv[2], "utf8"));
+const pasos = fixtures.pasos;
+let paso = 0;
+let pedidos = 0;
+const vistos = new Set();
+
+function documento(url){
+  const actual = pasos[Math.min(paso, pasos.length - 1)];
+  if (url.includes("/estados/layout")) return fixtures.layout;
+  if (url.includes("/estados/vista/")){ vistos.add("vista"); return actual.vista; }
+  if (url.includes("/estados/estado_global")){ vistos.add("estado"); return actual.estado; }
+  return null;
+}
+
+async function fetch(url){
+  pedidos++;
+  const cuerpo = documento(String(url));
+  const encabezados = { get: () => null };
+  if (cuerpo === null) return { ok: false, status: 404, headers: encabezados, json: async () => ({}), text: async () => "" };
+  return {
+    ok: true,
+    status: 200,
+    headers: encabezados,
+    json: async () => JSON.parse(cuerpo),
+    text: async () => cuerpo,
+    arrayBuffer: async () => new TextEncoder().encode(cuerpo).buffer,
+  };
+}
+
+class FechaVirtual extends Date {
+  constructor(...args){ if (args.length) super(...args); else super(1.7e12 + ahora); }
+  static now(){ return 1.7e12 + ahora; }
+}
+
+const contexto = vm.createContext({
+  document,
+  window: { location: { search: "", href: "http://127.0.0.1/pantalla/" }, addEventListener(){} },
+  fetch,
+  AbortController: class { constructor(){ this.signal = {}; } abort(){} },
+  setTimeout: (f, ms) => programar(f, ms, false),
+  clearTimeout: cancelar,
+  setInterval: (f, ms) => programar(f, ms, true),
+  clearInterval: cancelar,
+  requestAnimationFrame: (f) => programar(f, 16, false),
+  getComputedStyle: () => ({ backgroundColor: "" }),
+  performance: { now: () => ahora },
+  console,
+  Date: FechaVirtual,
+  URL,
+  URLSearchParams,
+  TextDecoder,
+  TextEncoder,
+});
+for (const archivo of process.argv.slice(3)){
+  vm.runInContext(fs.readFileSync(archivo, "utf8"), contexto, { filename: archivo });
+}
+
+(async () => {
+  // Primera carga (estado y layout)
+  await avanzar(50);
+  mutaciones = 0;
+  pedidos = 0;
+  const porPaso = [];
+  const t0 = process.cpuUsage();
+  for (paso = 0; paso < pasos.length; paso++){
+    const m0 = mutaciones;
+    await avanzar(PASO_MS);
+    porPaso.push(mutaciones - m0);
+  }
+  const cpu = process.cpuUsage(t0);
+
+  // Pasos en los que el documento que consulta la pantalla no cambió
+  const clave = vistos.has("vista") ? "vista" : "estado";
+  let sinCambio = 0;
+  for (let k = 1; k < pasos.length; k++){
+    if (pasos[k][clave] === pasos[k - 1][clave]) sinCambio += porPaso[k];
+  }
+  process.stdout.write(JSON.stringify({
+    endpoint: clave,
+    pasos: pasos.length,
+    pedidos,
+    mutaciones: porPaso.reduce((a, b) => a + b, 0),
+    max_por_paso: Math.max(...porPaso),
+    en_pasos_sin_cambio: sinCambio,
+    cpu_ms: Math.round((cpu.user + cpu.system) / 1000),
+  }) + "\n");
+})();
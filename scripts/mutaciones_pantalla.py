@@ -0,0 +1,174 @@
+"""
+Mutaciones del DOM por poll de la pantalla del recinto (sin navegador).
+
+1. Graba una sesión: lanza el backend (uvicorn) en un entorno aislado y
+   corre un guion fijo (presentes, pedidos de palabra, --votaciones
+   votaciones con votos al azar según --semilla, y ratos sin cambios).
+   En cada paso de 300 ms guarda lo que devuelven /estados/vista/pantalla
+   y /estados/estado_global, y el layout del recinto.
+2. Reproduce la grabación con node (mutaciones_pantalla.js): carga los
+   scripts de la pantalla en el orden de su index.html sobre un DOM mínimo
+   que cuenta cada cambio, con un reloj virtual.
+
+Con --comparar-con REV mide también la pantalla de esa revisión de git
+(por ejemplo la anterior al diff por banca) sobre la misma grabación.
+Con --max-por-poll sirve de control: termina con código 1 si la versión
+actual hace más mutaciones por pedido en promedio.
+
+Requiere node en el PATH.
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.mutaciones_pantalla [--votaciones 5] [--semilla 3]
+                                          [--comparar-con REV] [--max-por-poll N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+from typing import Callable, List, Optional
+
+from scripts._entorno import RAIZ, Backend, Cliente, entorno_aislado, padron
+
+ESTATICOS = "app/web/static"
+NODE_JS = os.path.join(RAIZ, "scripts", "mutaciones_pantalla.js")
+
+
+# ---------------------------------------------------------------------------
+# Grabación
+# ---------------------------------------------------------------------------
+
+def grabar(votaciones: int, semilla: int) -> dict:
+    """Corre el guion contra un backend real y devuelve las fixtures."""
+    with entorno_aislado(journal_dir=None, historial_db=None) as directorio, Backend(directorio) as backend:
+        dispositivos = [fila["dispositivo_votacion"] for fila in padron(directorio)]
+        cliente = Cliente(backend.puerto)
+        pasos: List[dict] = []
+        azar = random.Random(semilla)
+
+        def paso(cantidad: int = 1) -> None:
+            for _ in range(cantidad):
+                pasos.append({
+                    "vista": cliente.pedir("GET", "/estados/vista/pantalla")[1].decode(),
+                    "estado": cliente.pedir("GET", "/estados/estado_global")[1].decode(),
+                })
+
+        def tecla(dispositivo: str, valor: str) -> None:
+            cliente.post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": valor})
+
+        cliente.post("/moderacion/abrir_sesion", {"numero_sesion": 5})
+        paso(5)
+        for dispositivo in dispositivos:
+            tecla(dispositivo, "9")
+            paso(2)
+        for n in range(1, votaciones + 1):
+            paso(20)                                        # reposo
+            tecla(dispositivos[n % len(dispositivos)], "7")  # pedido de palabra
+            paso(3)
+            cliente.post("/moderacion/abrir_votacion", {
+                "numero": n, "tipo": "ordinaria", "tema": f"Tema {n}",
+                "computa_sobre_los_presentes": True, "factor_mayoria_especial": 0,
+            })
+            paso(3)
+            for dispositivo in dispositivos:
+                tecla(dispositivo, azar.choice("123"))
+                paso(2)
+            paso(30)                                        # resultado visible y reposo
+
+        version = json.loads(pasos[-1]["estado"])["sesion"]["layout_version"]
+        layout = cliente.pedir("GET", f"/estados/layout?version={version}")[1].decode()
+    return {"layout": layout, "pasos": pasos}
+
+
+# ---------------------------------------------------------------------------
+# Reproducción
+# ---------------------------------------------------------------------------
+
+def _lector(revision: Optional[str]) -> Callable[[str], str]:
+    """Lee un archivo del árbol de trabajo o, con revision, de esa revisión de git."""
+    def leer(ruta: str) -> str:
+        if revision is None:
+            with open(os.path.join(RAIZ, ruta), encoding="utf-8") as f:
+                return f.read()
+        return subprocess.run(["git", "show", f"{revision}:{ruta}"], cwd=RAIZ, check=True,
+                              capture_output=True, text=True).stdout
+    return leer
+
+
+def scripts_de_pantalla(revision: Optional[str], destino: str) -> List[str]:
+    """Copia a `destino` los scripts de pantalla/index.html, en orden. Devuelve las rutas."""
+    leer = _lector(revision)
+    html = leer(f"{ESTATICOS}/pantalla/index.html")
+    rutas = []
+    for i, src in enumerate(re.findall(r'<script\s+src="([^"]+)"', html)):
+        origen = f"{ESTATICOS}{src}" if src.startswith("/") else f"{ESTATICOS}/pantalla/{src.lstrip('./')}"
+        ruta = os.path.join(destino, f"{i:02d}_{os.path.basename(src)}")
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(leer(origen))
+        rutas.append(ruta)
+    return rutas
+
+
+def reproducir(fixtures: str, revision: Optional[str]) -> dict:
+    with tempfile.TemporaryDirectory(prefix="pantalla-") as destino:
+        archivos = scripts_de_pantalla(revision, destino)
+        proc = subprocess.run(["node", NODE_JS, fixtures, *archivos], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"node terminó con error:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ---------------------------------------------------------------------------
+# Línea de comandos
+# ---------------------------------------------------------------------------
+
+def _linea(nombre: str, r: dict) -> str:
+    return (f"  {nombre:<14} {r['mutaciones']:>7} mutaciones, {r['pedidos']:>4} pedidos a {r['endpoint']}, "
+            f"{r['mutaciones'] / max(1, r['pedidos']):6.1f} por pedido, "
+            f"{r['en_pasos_sin_cambio']:>6} en pasos sin cambios, CPU {r['cpu_ms']} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mutaciones del DOM por poll de la pantalla del recinto.")
+    parser.add_argument("--votaciones", type=int, default=5,
+                        help="Votaciones del guion (por defecto 5).")
+    parser.add_argument("--semilla", type=int, default=3,
+                        help="Semilla de los votos al azar (por defecto 3).")
+    parser.add_argument("--comparar-con", metavar="REV", default=None,
+                        help="Revisión de git cuya pantalla medir también (p. ej. 5a5e00d^).")
+    parser.add_argument("--max-por-poll", type=float, default=None,
+                        help="Falla (código 1) si la pantalla actual supera estas mutaciones por pedido.")
+    args = parser.parse_args(argv)
+
+    if shutil.which("node") is None:
+        print("FALLA: se necesita node en el PATH")
+        return 1
+
+    fixtures = grabar(max(1, args.votaciones), args.semilla)
+    with tempfile.TemporaryDirectory(prefix="fixtures-") as directorio:
+        ruta = os.path.join(directorio, "fixtures.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(fixtures, f)
+        cambios = sum(1 for a, b in zip(fixtures["pasos"], fixtures["pasos"][1:]) if a["vista"] != b["vista"])
+        print(f"Grabación: {len(fixtures['pasos'])} pasos de 300 ms, {cambios} con cambios en la vista")
+
+        actual = reproducir(ruta, None)
+        print(_linea("actual", actual))
+        if args.comparar_con:
+            print(_linea(args.comparar_con, reproducir(ruta, args.comparar_con)))
+
+    por_pedido = actual["mutaciones"] / max(1, actual["pedidos"])
+    if args.max_por_poll is not None and por_pedido > args.max_por_poll:
+        print(f"FALLA: {por_pedido:.1f} mutaciones por pedido > {args.max_por_poll:g}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
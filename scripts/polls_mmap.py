@@ -0,0 +1,156 @@
+"""
+Polls por segundo de /estados/estado_global según la cantidad de workers,
+con y sin estado publicado en memoria compartida (estado_mmap).
+
+Para cada cantidad de workers (gunicorn, estado_compartido_db) y cada
+modo: abre una sesión con todo el padrón presente, corre --votaciones
+votaciones para que el estado tenga un tamaño realista y después
+--clientes hilos piden estado_global sin pausa durante --segundos.
+
+Antes de medir, cada banca vota dos veces a la vez que las demás (la
+segunda debe rechazarse) y se comprueba que se aceptó exactamente un voto
+por banca y que todos los workers sirven el mismo documento. Si no,
+termina con código 1.
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.polls_mmap [--workers 1,2,4] [--votaciones 40]
+                                 [--clientes 8] [--segundos 5] [--solo-mmap]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from scripts._entorno import Backend, Cliente, entorno_aislado, padron
+
+
+def _abrir_votacion(cliente: Cliente, numero: int) -> None:
+    cliente.post("/moderacion/abrir_votacion", {
+        "numero": numero, "tipo": "ordinaria", "tema": f"Tema {numero}",
+        "computa_sobre_los_presentes": True, "factor_mayoria_especial": 0,
+    })
+
+
+def _votos_simultaneos(puerto: int, dispositivos: List[str]) -> Optional[str]:
+    """Cada banca vota dos veces a la vez; devuelve el problema encontrado o None."""
+    aceptados: List[bool] = []
+    candado = threading.Lock()
+
+    def votar(i: int, dispositivo: str) -> None:
+        cliente = Cliente(puerto)
+        for tecla in ("1" if i % 3 else "3", "2"):
+            respuesta = cliente.post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": tecla})
+            with candado:
+                aceptados.append(respuesta["aceptada"])
+
+    hilos = [threading.Thread(target=votar, args=(i, d)) for i, d in enumerate(dispositivos)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    if sum(aceptados) != len(dispositivos):
+        return f"{sum(aceptados)} votos aceptados con {len(dispositivos)} bancas"
+    return None
+
+
+def _documentos_distintos(puerto: int, pedidos: int) -> int:
+    """Cantidad de documentos distintos entre `pedidos` lecturas (cada una por su conexión)."""
+    vistos = set()
+    for _ in range(pedidos):
+        estado = Cliente(puerto).get("/estados/estado_global")
+        # El indicador de test depende de la hora de la lectura
+        for concejal in (estado.get("sesion") or {}).get("concejales", []):
+            concejal.pop("mostrar_test", None)
+        estado.pop("eventos", None)
+        vistos.add(json.dumps(estado, sort_keys=True))
+    return len(vistos)
+
+
+def medir(workers: int, mmap: bool, votaciones: int, clientes: int, segundos: float) -> Tuple[int, float, Optional[str]]:
+    """Devuelve (bytes de estado_global, polls/s, problema encontrado o None)."""
+    config = {
+        "estado_compartido_db": "data/estado.sqlite3",
+        "estado_mmap": "data/estado.mmap" if mmap else None,
+        "historial_db": None,
+    }
+    with entorno_aislado(**config) as directorio, Backend(directorio, workers=workers) as backend:
+        dispositivos = [fila["dispositivo_votacion"] for fila in padron(directorio)]
+        cliente = Cliente(backend.puerto)
+        cliente.post("/moderacion/abrir_sesion", {"numero_sesion": 1})
+        for dispositivo in dispositivos:
+            cliente.post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": "9"})
+
+        _abrir_votacion(cliente, 1)
+        problema = _votos_simultaneos(backend.puerto, dispositivos)
+        for n in range(2, votaciones + 1):
+            _abrir_votacion(cliente, n)
+            for i, dispositivo in enumerate(dispositivos):
+                cliente.post("/entradas/tecla", {"dispositivo": dispositivo, "tecla": "1" if i % 3 else "3"})
+        distintos = _documentos_distintos(backend.puerto, 4 * max(1, workers))
+        if problema is None and distintos != 1:
+            problema = f"los workers sirven {distintos} documentos distintos"
+
+        tamano = len(cliente.pedir("GET", "/estados/estado_global")[1])
+        cuentas: List[int] = []
+        fin = time.monotonic() + segundos
+
+        def sondear() -> None:
+            propio = Cliente(backend.puerto)
+            n = 0
+            while time.monotonic() < fin:
+                propio.pedir("GET", "/estados/estado_global")
+                n += 1
+            cuentas.append(n)
+
+        hilos = [threading.Thread(target=sondear) for _ in range(clientes)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        return tamano, sum(cuentas) / segundos, problema
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Polls por segundo según workers, con y sin estado_mmap.")
+    parser.add_argument("--workers", default="1,2,4",
+                        help="Cantidades de workers, separadas por coma (por defecto 1,2,4).")
+    parser.add_argument("--votaciones", type=int, default=40,
+                        help="Votaciones antes de medir (por defecto 40).")
+    parser.add_argument("--clientes", type=int, default=8,
+                        help="Hilos que piden estado_global (por defecto 8).")
+    parser.add_argument("--segundos", type=float, default=5.0,
+                        help="Duración de cada medición (por defecto 5).")
+    parser.add_argument("--solo-mmap", action="store_true",
+                        help="No medir sin estado_mmap.")
+    args = parser.parse_args(argv)
+
+    cantidades = [int(x) for x in args.workers.split(",") if x.strip()]
+    modos = (True,) if args.solo_mmap else (False, True)
+    print(f"{os.cpu_count()} CPU, {args.clientes} clientes, {args.segundos:g} s por medición")
+    resultados: Dict[bool, List[str]] = {modo: [] for modo in modos}
+    problemas = []
+    for mmap in modos:
+        for workers in cantidades:
+            tamano, por_segundo, problema = medir(workers, mmap, max(1, args.votaciones), args.clientes, args.segundos)
+            print(f"  estado_mmap {'sí' if mmap else 'no'}, {workers} workers: "
+                  f"{por_segundo:.0f} polls/s ({tamano // 1024} KB)")
+            resultados[mmap].append(f"w{workers} {por_segundo:.0f}")
+            if problema:
+                problemas.append(f"{workers} workers, estado_mmap {'sí' if mmap else 'no'}: {problema}")
+
+    for mmap in modos:
+        print(f"estado_mmap {'sí' if mmap else 'no'}: " + ", ".join(resultados[mmap]) + " polls/s")
+    if problemas:
+        for problema in problemas:
+            print("FALLA: " + problema)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,222 @@
+"""
+Tiempo de recuperación del journal después de una caída (journal_dir).
+
+En un entorno aislado, con el journal activado:
+
+1. Un proceso corre una sesión del volumen de 6 horas: --votaciones
+   votaciones (por defecto 150, una cada 2,4 minutos) con el padrón del
+   proyecto presente, votos al azar según --semilla (desempate si hay
+   empate, y cada tanto un cierre forzado con la mitad de los votos),
+   pedidos y turnos de uso de la palabra y algunas ausencias. Cada comando
+   pasa por input_service / los servicios con SesionService.comando(),
+   como en un request (un fsync del journal por comando). Termina con una
+   votación a medio votar y un pedido de palabra en cola, guarda su
+   estado (snapshot_service.capturar_estado) y se cae con os._exit, sin
+   detener el journal.
+2. Otro proceso arranca sobre el mismo directorio, mide
+   journal_service.iniciar() (carga del snapshot y reaplicación del
+   journal) y compara el estado recuperado con el guardado.
+
+Se hace dos veces: sin snapshots intermedios (se reaplica la sesión
+entera desde la apertura, el peor caso) y con SNAPSHOT_CADA_EVENTOS por
+defecto. Termina con código 1 si algún estado no coincide o si alguna
+recuperación tarda más de --max-ms (por defecto 1000).
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.recuperacion_journal [--votaciones 150] [--semilla 2]
+                                           [--max-ms 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from scripts._entorno import entorno_aislado, preparar_proceso
+
+ESTADO_ANTES = "estado_antes.json"
+ESTADO_DESPUES = "estado_despues.json"
+
+# Snapshot solo al abrir la sesión: se reaplica todo el journal
+SIN_SNAPSHOTS = 10 ** 9
+
+
+# ---------------------------------------------------------------------------
+# Procesos
+# ---------------------------------------------------------------------------
+
+def _iniciar(directorio: str, snapshot_cada: Optional[int]):
+    preparar_proceso(directorio)
+    from app.config import settings
+    from app.services import journal_service as modulo
+    from app.services.sala_service import sala_service
+
+    settings.cargar()
+    if snapshot_cada is not None:
+        modulo.SNAPSHOT_CADA_EVENTOS = snapshot_cada
+    return sala_service.principal, settings.journal_dir
+
+
+def _capturar(sala) -> Dict[str, Any]:
+    from app.services import snapshot_service
+
+    with sala.sesion_service.lectura():
+        estado = snapshot_service.capturar_estado(sala.sesion_service, sala.votacion_service)
+    # El indicador de test (tecla 8) es efímero: no se journaliza ni se compara
+    for concejal in (estado.get("sesion") or {}).get("concejales", []):
+        concejal.pop("mostrar_test_s", None)
+    return estado
+
+
+def _guardar(directorio: str, nombre: str, datos: Dict[str, Any]) -> None:
+    with open(os.path.join(directorio, nombre), "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _sesion(directorio: str, votaciones: int, semilla: int, snapshot_cada: Optional[int]) -> None:
+    """Corre la sesión, guarda el estado y se cae (os._exit)."""
+    sala, journal_dir = _iniciar(directorio, snapshot_cada)
+    from app.models.votacion import EstadosVotacion
+    from app.models.voto import ValorVoto, Voto
+    from app.services.input_service import procesar_pulsacion
+
+    sesion_service = sala.sesion_service
+    votacion_service = sala.votacion_service
+    sala.journal.iniciar(journal_dir)
+    azar = random.Random(semilla)
+
+    def comando(funcion, *args, **kwargs):
+        with sesion_service.comando():
+            return funcion(*args, **kwargs)
+
+    def tecla(dispositivo: str, valor: str) -> None:
+        comando(procesar_pulsacion, dispositivo, valor)
+
+    comando(sesion_service.abrir_sesion, 1)
+    with sesion_service.lectura():
+        dispositivos = [c.dispositivo_votacion for c in sesion_service.sesion_actual.concejales]
+    for dispositivo in dispositivos:
+        tecla(dispositivo, "9")
+
+    for n in range(1, votaciones + 1):
+        ultima = n == votaciones
+
+        # Uso de la palabra: dos pedidos, turno y fin del turno
+        oradores = azar.sample(dispositivos, 2)
+        for dispositivo in oradores:
+            tecla(dispositivo, "7")
+        comando(sesion_service.otorgar_uso_palabra)
+        tecla(oradores[0], "7")
+        if not ultima:
+            comando(sesion_service.otorgar_uso_palabra)
+            comando(sesion_service.quitar_uso_palabra)
+
+        # Cada tanto alguien sale y vuelve a entrar
+        if n % 10 == 0:
+            ausente = azar.choice(dispositivos)
+            tecla(ausente, "9")
+            tecla(ausente, "9")
+
+        comando(votacion_service.abrir_votacion, n, "ordinaria", f"Tema {n}", True, 0)
+        forzada = n % 15 == 0
+        votantes = dispositivos[: len(dispositivos) // 2] if forzada or ultima else dispositivos
+        for dispositivo in votantes:
+            tecla(dispositivo, azar.choice("123"))
+            if azar.random() < 0.05:
+                tecla(dispositivo, "8")
+        if ultima:
+            break
+        if forzada:
+            comando(votacion_service.cierre_forzado)
+        with sesion_service.lectura():
+            votacion = votacion_service.votacion_actual
+            empatada = votacion is not None and votacion.estado == EstadosVotacion.EMPATADA
+        if empatada:
+            comando(votacion_service.voto_desempate, Voto(concejal=None, valor_voto=ValorVoto.POSITIVO))
+
+    estado = _capturar(sala)
+    with open(os.path.join(journal_dir, "journal.jsonl"), encoding="utf-8") as f:
+        eventos = sum(1 for _ in f)
+    _guardar(directorio, ESTADO_ANTES, {"estado": estado, "eventos_journal": eventos})
+    # Caída: sin detener el journal ni cerrar nada
+    os._exit(0)
+
+
+def _recuperar(directorio: str, snapshot_cada: Optional[int]) -> None:
+    """Arranca sobre el journal que dejó _sesion, mide la recuperación y guarda el estado."""
+    sala, journal_dir = _iniciar(directorio, snapshot_cada)
+    t = time.perf_counter()
+    sala.journal.iniciar(journal_dir)
+    ms = (time.perf_counter() - t) * 1000
+    estado = _capturar(sala)
+    sala.journal.detener()
+    _guardar(directorio, ESTADO_DESPUES, {"estado": estado, "ms": ms})
+
+
+# ---------------------------------------------------------------------------
+# Línea de comandos
+# ---------------------------------------------------------------------------
+
+def _proceso(contexto, destino, *args) -> None:
+    proceso = contexto.Process(target=destino, args=args)
+    proceso.start()
+    proceso.join()
+    if proceso.exitcode != 0:
+        raise RuntimeError(f"{destino.__name__} terminó con código {proceso.exitcode}")
+
+
+def medir(votaciones: int, semilla: int, snapshot_cada: Optional[int]) -> Dict[str, Any]:
+    """Una caída y una recuperación. Devuelve eventos, ms y si el estado coincide."""
+    contexto = multiprocessing.get_context("spawn")
+    with entorno_aislado(journal_dir="data/journal", historial_db=None, estado_compartido_db=None) as directorio:
+        _proceso(contexto, _sesion, directorio, votaciones, semilla, snapshot_cada)
+        _proceso(contexto, _recuperar, directorio, snapshot_cada)
+        with open(os.path.join(directorio, ESTADO_ANTES), encoding="utf-8") as f:
+            antes = json.load(f)
+        with open(os.path.join(directorio, ESTADO_DESPUES), encoding="utf-8") as f:
+            despues = json.load(f)
+    return {
+        "eventos_journal": antes["eventos_journal"],
+        "ms": despues["ms"],
+        "igual": antes["estado"] == despues["estado"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de recuperación del journal después de una caída.")
+    parser.add_argument("--votaciones", type=int, default=150,
+                        help="Votaciones de la sesión (por defecto 150: 6 horas, una cada 2,4 minutos).")
+    parser.add_argument("--semilla", type=int, default=2,
+                        help="Semilla de los votos y pedidos al azar (por defecto 2).")
+    parser.add_argument("--max-ms", type=float, default=1000.0,
+                        help="Falla (código 1) si alguna recuperación tarda más (por defecto 1000).")
+    args = parser.parse_args(argv)
+    votaciones = max(1, args.votaciones)
+
+    fallas = []
+    for nombre, snapshot_cada in (("sin snapshots", SIN_SNAPSHOTS), ("snapshot por defecto", None)):
+        r = medir(votaciones, args.semilla, snapshot_cada)
+        print(f"  {nombre:<21} {r['eventos_journal']:>6} eventos en el journal, recuperación {r['ms']:6.0f} ms, "
+              f"estado {'igual' if r['igual'] else 'DISTINTO'}")
+        if not r["igual"]:
+            fallas.append(f"{nombre}: el estado recuperado no coincide")
+        if r["ms"] > args.max_ms:
+            fallas.append(f"{nombre}: {r['ms']:.0f} ms > {args.max_ms:g} ms")
+
+    if fallas:
+        for falla in fallas:
+            print("FALLA: " + falla)
+        return 1
+    print(f"OK: {votaciones} votaciones recuperadas en menos de {args.max_ms:g} ms, con el mismo estado")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())